@@ -14,6 +14,8 @@ import pandas as pd
 import streamlit as st
 
 from src.db import health_check
+from src.cache_warmer import start_cache_warmer
+from src.materialized_views import start_refresh_scheduler
 from src.finance_queries import get_finance_kpis, get_finance_summary
 from src.procurement_queries import get_procurement_kpis, get_procurement_summary
 from src.ui import kpi_row, empty_state
@@ -1004,6 +1006,11 @@ if not health_check():
     st.error("Database connection failed. Please check your connection settings.")
     st.stop()
 
+# Keep the materialized views fresh in the background (started once per server)
+start_refresh_scheduler()
+# Pre-populate the query cache with the most requested results
+start_cache_warmer()
+
 try:
     # Default date range for main dashboard (last 30 days)
     today = dt.date.today()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark of query result materialization: pd.read_sql vs Arrow transfer.
+
+Generates a synthetic result shaped like the transaction fact (DECIMAL(15,2)
+amounts, dates, repeated strings) with generate_series and materializes it
+into a DataFrame through each path, reporting wall time, peak Python
+allocations and the resulting frame size. Read-only; safe on any database.
+
+Usage:
+    python database/benchmark_arrow_transfer.py --rows 1000000 --repeat 3
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pandas as pd
+from sqlalchemy import bindparam, create_engine, text
+
+from database.setup_database import get_database_url
+from src import db
+
+RESULT_SQL = text("""
+    SELECT
+        g AS transaction_id,
+        DATE '2024-01-01' + (g % 365) AS transaction_date,
+        ROUND((g % 9973) * 1.37, 2)::DECIMAL(15,2) AS amount,
+        (ARRAY['Revenue', 'Expense', 'Transfer'])[1 + g % 3] AS transaction_type,
+        'Department ' || (g % 12) AS dept_name,
+        'Vendor ' || (g % 250) AS vendor_name
+    FROM generate_series(1, :rows) AS g
+""").bindparams(bindparam("rows"))
+
+
+def _read_sql(engine, rows):
+    with engine.connect() as connection:
+        return pd.read_sql(RESULT_SQL, connection, params={"rows": rows})
+
+
+def _arrow_cursor(engine, rows):
+    return db.arrow_to_frame(db._fetch_cursor(engine, RESULT_SQL, {"rows": rows}))
+
+
+def _arrow_adbc(engine, rows):
+    return db.arrow_to_frame(db._fetch_adbc(engine, RESULT_SQL, {"rows": rows}))
+
+
+def _measure(method, engine, rows):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    frame = method(engine, rows)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, frame
+
+
+def run_benchmark(rows, repeat):
+    """Time each transfer path and print a comparison table."""
+    engine = create_engine(get_database_url())
+    methods = {"pd.read_sql": _read_sql, "arrow (cursor)": _arrow_cursor}
+    if db.adbc_postgresql is not None:
+        methods["arrow (adbc)"] = _arrow_adbc
+    else:
+        print("adbc-driver-postgresql not installed; skipping the ADBC path")
+
+    print(f"{'method':<16} {'best s':>8} {'peak MB':>9} {'frame MB':>9}  dtypes")
+    for name, method in methods.items():
+        runs = [_measure(method, engine, rows) for _ in range(repeat)]
+        elapsed = min(run[0] for run in runs)
+        peak = min(run[1] for run in runs)
+        frame = runs[-1][2]
+        assert len(frame) == rows, f"{name} returned {len(frame)} rows"
+        dtypes = ", ".join(f"{column}:{dtype}" for column, dtype in frame.dtypes.items())
+        print(f"{name:<16} {elapsed:>8.2f} {peak / 1e6:>9.1f} "
+              f"{frame.memory_usage(deep=True).sum() / 1e6:>9.1f}  {dtypes}")
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark result transfer from Postgres into pandas")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.rows, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Benchmark and parity check of the gap-filled trend bucketing.
+
+Generates a synthetic order fact (10M rows by default) over three years with
+two whole months left empty, then buckets it at every grain of
+src/date_dimension.py with a 3-bucket rolling sum and average:
+
+  - in memory: OLAP cube group-reduce, `fill_calendar()` and `add_rolling()`
+  - in Postgres: `calendar_query()` over a temporary table, with the
+    legacy date_trunc GROUP BY timed alongside for reference
+
+Each grain must return one row per bucket of the window, zeros for the
+empty months, totals equal to the raw sum, and the same buckets, totals
+and rolling values on both paths. Needs dim_date (migration 014); the
+temporary table is dropped with the connection. Safe on any database.
+
+Usage:
+    python database/benchmark_trend_buckets.py --rows 10000000
+    python database/benchmark_trend_buckets.py --rows 1000000 --skip-sql
+"""
+
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Column, Date, MetaData, Numeric, Table, create_engine, func, text
+
+from database.setup_database import get_database_url
+from src.date_dimension import CALENDAR_GRAINS, Rolling, calendar_query, fill_calendar
+from src.metrics import FACTS
+from src.olap_cube import FactCube, OlapCube, load_dimension
+from src.query_builder import QuerySpec
+
+FROM_DT, TO_DT = date(2023, 1, 1), date(2025, 12, 31)
+EMPTY_MONTHS = ("2024-03", "2025-08")
+ROLLING = {"rolling_value": Rolling("total_value", 3), "rolling_avg_value": Rolling("total_value", 3, "avg")}
+
+bench = Table(
+    "bench_orders", MetaData(),
+    Column("order_date", Date),
+    Column("reporting_total", Numeric(15, 2)),
+)
+BENCH_TRENDS = QuerySpec(
+    fact=bench,
+    date_column=bench.c.order_date,
+    measures={
+        "order_count": func.count(),
+        "total_value": func.coalesce(func.sum(bench.c.reporting_total), 0),
+    },
+)
+
+# Same rows as _synthetic_orders(), built server-side
+CREATE_SQL = text("""
+    CREATE TEMPORARY TABLE bench_orders AS
+    SELECT order_date, reporting_total FROM (
+        SELECT
+            DATE '2023-01-01' + (g * 7919 % 1096)::integer AS order_date,
+            ROUND((g % 9973) * 0.37, 2)::DECIMAL(15,2) AS reporting_total
+        FROM generate_series(1, :rows) AS g
+    ) orders
+    WHERE TO_CHAR(order_date, 'YYYY-MM') NOT IN ('2024-03', '2025-08')
+""")
+
+
+def _synthetic_orders(rows):
+    g = np.arange(1, rows + 1, dtype=np.int64)
+    days = np.datetime64(FROM_DT, "D") + (g * 7919 % 1096).astype("timedelta64[D]")
+    frame = pd.DataFrame({
+        "order_date": days,
+        "status": np.where(g % 4 == 0, "Received", "Ordered"),
+        "priority": "Normal",
+        "dept_id": g % 12,
+        "cost_center_id": g % 40,
+        "vendor_id": g % 250,
+        "category_id": g % 30,
+        "reporting_total": np.round((g % 9973) * 0.37, 2),
+    })
+    months = frame["order_date"].dt.strftime("%Y-%m")
+    return frame[~months.isin(EMPTY_MONTHS)].reset_index(drop=True)
+
+
+def _check(grain, result, calendar, raw_total):
+    """Assert one bucket per calendar bucket of the window, zero-filled gaps and the raw total."""
+
+    window = calendar.loc[pd.Timestamp(FROM_DT):pd.Timestamp(TO_DT)]
+    expected = window[CALENDAR_GRAINS[grain].start].nunique()
+    assert len(result) == expected, f"{grain}: {len(result)} buckets, expected {expected}"
+    assert result["period_start"].is_monotonic_increasing, f"{grain}: buckets out of order"
+    assert np.isclose(float(result["total_value"].sum()), raw_total), f"{grain}: totals do not add up"
+    if grain == "month":
+        empty = result[result["period_start"].dt.strftime("%Y-%m").isin(EMPTY_MONTHS)]
+        assert len(empty) == len(EMPTY_MONTHS) and (empty["order_count"] == 0).all(), "empty months not zero-filled"
+
+
+def run_memory(frame, calendar):
+    """Bucket every grain through the cube; returns the results per grain."""
+
+    started = time.perf_counter()
+    cube = OlapCube((0,), {"orders": FactCube(FACTS["orders"], frame)}, {"calendar": calendar})
+    print(f"cube load: {time.perf_counter() - started:.2f}s for {len(frame):,} rows")
+
+    raw_total = float(frame["reporting_total"].sum())
+    results = {}
+    for grain in CALENDAR_GRAINS:
+        started = time.perf_counter()
+        grouped = cube.aggregate(
+            (("order_count", "total_orders"), ("total_value", "total_spend")), FROM_DT, TO_DT, (grain,)
+        ).rename(columns={grain: "period_start"})
+        result = fill_calendar(calendar, grouped, grain, FROM_DT, TO_DT, rolling=ROLLING)
+        elapsed = time.perf_counter() - started
+        _check(grain, result, calendar, raw_total)
+        results[grain] = result
+        print(f"  memory {grain:<15} {len(result):>6} buckets {elapsed * 1000:>9.1f} ms")
+    return results
+
+
+def run_sql(engine, rows, calendar, memory):
+    """Bucket every grain with calendar_query on a temporary table and compare with the in-memory results."""
+
+    with engine.connect() as connection:
+        started = time.perf_counter()
+        connection.execute(CREATE_SQL, {"rows": rows})
+        connection.execute(text("ANALYZE bench_orders"))
+        count, total = connection.execute(text("SELECT COUNT(*), SUM(reporting_total) FROM bench_orders")).one()
+        print(f"temp table: {time.perf_counter() - started:.2f}s for {count:,} rows")
+
+        started = time.perf_counter()
+        connection.execute(text(
+            "SELECT date_trunc('month', order_date::timestamp), COUNT(*), SUM(reporting_total) "
+            "FROM bench_orders GROUP BY 1 ORDER BY 1"
+        )).all()
+        print(f"  legacy date_trunc month      {(time.perf_counter() - started) * 1000:>9.1f} ms (no gap fill)")
+
+        for grain in CALENDAR_GRAINS:
+            stmt, params = calendar_query(BENCH_TRENDS, grain, FROM_DT, TO_DT, rolling=ROLLING)
+            started = time.perf_counter()
+            result = pd.DataFrame(connection.execute(stmt, params).mappings().all())
+            elapsed = time.perf_counter() - started
+            result["period_start"] = pd.to_datetime(result["period_start"])
+            for column in ("total_value", *ROLLING):
+                result[column] = result[column].astype(float)
+            _check(grain, result, calendar, float(total))
+
+            expected = memory.get(grain)
+            if expected is not None:
+                assert (result["period_start"].to_numpy() == expected["period_start"].to_numpy()).all(), grain
+                for column in ("order_count", "total_value", *ROLLING):
+                    assert np.allclose(result[column].astype(float), expected[column]), f"{grain}: {column} differs"
+            print(f"  sql    {grain:<15} {len(result):>6} buckets {elapsed * 1000:>9.1f} ms")
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Benchmark gap-filled trend bucketing at every grain")
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--skip-sql", action="store_true", help="only run the in-memory path")
+    args = parser.parse_args()
+
+    engine = create_engine(get_database_url())
+    calendar = load_dimension(engine, "calendar")
+    memory = run_memory(_synthetic_orders(args.rows), calendar)
+    if not args.skip_sql:
+        run_sql(engine, args.rows, calendar, memory)
+    print("✅ All grains gap-filled and matching")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Regenerate dim_date (migration 014) for a fiscal year start month.
+
+Fiscal years start on the first day of the month and are named after the
+calendar year they end in. The migration fills dim_date with calendar
+fiscal years (January start); run this to switch, e.g. to July.
+
+Usage:
+    python database/build_dim_date.py --fiscal-start-month 7
+    python database/build_dim_date.py --from 1990-01-01 --to 2079-12-31
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine, text
+
+from database.setup_database import get_database_url
+
+
+def build_dim_date(engine, fiscal_start_month=None, from_dt=date(2000, 1, 1), to_dt=date(2059, 12, 31)):
+    """Regenerate dim_date for [from_dt, to_dt]; returns the number of days in the table."""
+
+    fiscal_start_month = fiscal_start_month or int(os.getenv("FISCAL_YEAR_START_MONTH", "1"))
+    with engine.begin() as conn:
+        conn.execute(
+            text("SELECT populate_dim_date(:month, :from_dt, :to_dt)"),
+            {"month": fiscal_start_month, "from_dt": from_dt, "to_dt": to_dt},
+        )
+        days = conn.execute(text("SELECT COUNT(*) FROM dim_date")).scalar()
+    print(f"✅ dim_date has {days} days, fiscal years starting in month {fiscal_start_month}")
+    return days
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Regenerate the date dimension")
+    parser.add_argument("--fiscal-start-month", type=int, help="1-12, defaults to $FISCAL_YEAR_START_MONTH or 1")
+    parser.add_argument("--from", dest="from_dt", type=date.fromisoformat, default=date(2000, 1, 1))
+    parser.add_argument("--to", dest="to_dt", type=date.fromisoformat, default=date(2059, 12, 31))
+    args = parser.parse_args()
+
+    build_dim_date(create_engine(get_database_url()), args.fiscal_start_month, args.from_dt, args.to_dt)
+
+
+if __name__ == "__main__":
+    main()
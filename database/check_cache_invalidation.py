@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+End-to-end check of the change notifications behind cache invalidation.
+
+Against a local Postgres with migration 006 applied: LISTENs on the change
+channel, inserts a probe transaction far in the future, moves it to another
+date and department, deletes it, and touches one budget. Each statement
+must NOTIFY the dates and departments of the rows it touched. The parsed
+changes are then run through `src.cache_invalidation` against cache
+entries for overlapping and disjoint windows, and only the overlapping
+ones must be dropped. Finally, with the OLAP cube enabled and warm, a
+completed probe transaction is announced and invalidated: the finance KPIs
+recomputed right after must count it, not come from the cube loaded before
+it. The probe rows are removed again; the budget touch only rewrites
+updated_at. Migration 015 must be applied too. Do not run against
+production.
+
+Usage:
+    python database/check_cache_invalidation.py
+"""
+
+import os
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine, text
+
+from database.setup_database import get_database_url
+from src.cache_invalidation import DataChange, invalidate, parse_change
+from src.db import listen, poll_notifications
+from src.finance_queries import get_finance_kpis
+from src.materialized_views import CHANGE_CHANNEL
+from src.olap_cube import CUBE_ENABLED, get_cube
+from src.query_cache import freeze_key, shared_cache
+
+PROBE_FROM = date(2099, 6, 15)
+PROBE_TO = date(2099, 9, 1)
+
+
+def _statement(engine, sql, params=None):
+    with engine.begin() as conn:
+        return conn.execute(text(sql), params or {})
+
+
+def _received(listener):
+    changes = []
+    while True:
+        batch = poll_notifications(listener, 2.0)
+        if not batch:
+            return changes
+        changes += [parse_change(payload) for channel, payload in batch if channel == CHANGE_CHANNEL]
+
+
+def check_notifications(engine):
+    """Run the probe statements and return the changes they announced."""
+    with engine.connect() as conn:
+        dept_ids = [row[0] for row in conn.execute(text("SELECT dept_id FROM finance_departments ORDER BY dept_id LIMIT 2"))]
+        budget_year = conn.execute(text("SELECT budget_year FROM finance_budgets ORDER BY budget_id LIMIT 1")).scalar()
+    assert len(dept_ids) == 2, "need two departments; run setup_database.py and populate_sample_data.py"
+    first, second = dept_ids
+
+    listener = listen(engine, [CHANGE_CHANNEL])
+    try:
+        _received(listener)  # drain anything queued before the probe
+        probe_id = _statement(engine, """
+            INSERT INTO finance_transactions (transaction_date, transaction_type, dept_id, amount, status, description)
+            VALUES (:day, 'Expense', :dept, 1.00, 'Pending', 'cache invalidation probe')
+            RETURNING transaction_id
+        """, {"day": PROBE_FROM, "dept": first}).scalar()
+        _statement(engine, "UPDATE finance_transactions SET transaction_date = :day, dept_id = :dept WHERE transaction_id = :id",
+                   {"day": PROBE_TO, "dept": second, "id": probe_id})
+        _statement(engine, "DELETE FROM finance_transactions WHERE transaction_id = :id", {"id": probe_id})
+        _statement(engine, "UPDATE finance_transactions SET amount = amount WHERE transaction_id = -1")
+        if budget_year is not None:
+            _statement(engine, "UPDATE finance_budgets SET updated_at = updated_at WHERE budget_id = "
+                               "(SELECT MIN(budget_id) FROM finance_budgets)")
+        changes = _received(listener)
+    finally:
+        listener.close()
+
+    expected = [
+        DataChange("finance_transactions", PROBE_FROM, PROBE_FROM, frozenset({first})),
+        DataChange("finance_transactions", PROBE_FROM, PROBE_TO, frozenset({first, second})),
+        DataChange("finance_transactions", PROBE_TO, PROBE_TO, frozenset({second})),
+    ]
+    if budget_year is not None:
+        expected.append(DataChange("finance_budgets", date(budget_year, 1, 1), date(budget_year, 12, 31)))
+    for change in changes:
+        print(f"  {change}")
+    # Budget dept_ids depend on the data; compare the rest
+    got = [change if change.table != "finance_budgets" else DataChange(change.table, change.from_dt, change.to_dt)
+           for change in changes]
+    assert got == expected, f"expected {expected}"
+    print(f"✅ {len(changes)} notifications with the touched windows (none for the no-op update)")
+    return changes
+
+
+def check_invalidation(changes):
+    """Only cache entries whose windows overlap a change are dropped."""
+    cache = shared_cache()
+    cache.clear()
+    windows = {
+        "overlapping": (date(2099, 6, 1), date(2099, 6, 30)),
+        "previous period of a later window": (date(2099, 6, 20), date(2099, 6, 25)),
+        "same window a year later": (date(2100, 6, 10), date(2100, 6, 20)),
+        "disjoint": (date(2099, 1, 1), date(2099, 1, 31)),
+    }
+    for name, (from_dt, to_dt) in windows.items():
+        arguments = {"from_dt": from_dt, "to_dt": to_dt, "dept_id": None}
+        cache.store(("check.query", freeze_key(arguments)), name, 1.0)
+    cache.store(("range:check", freeze_key({"dept_id": 999999})), (date(2099, 1, 1), date(2099, 12, 31), None), 1.0)
+
+    dropped = invalidate([change for change in changes if change.table == "finance_transactions"][:1])
+    remaining = {entry.value if isinstance(entry.value, str) else "range" for entry in cache._entries.values()}
+    cache.clear()
+    assert dropped == 3 and remaining == {"disjoint", "range"}, (dropped, remaining)
+    print("✅ Only the overlapping windows were invalidated")
+
+
+def _warm_cube(timeout=300.0):
+    deadline = time.monotonic() + timeout
+    while (cube := get_cube()) is None:
+        assert time.monotonic() < deadline, "the OLAP cube did not load; see the log for why"
+        time.sleep(1.0)
+    return cube
+
+
+def check_cube_invalidation(engine):
+    """Results recomputed after a notification include the change while the cube is enabled."""
+    assert CUBE_ENABLED, "set OLAP_CUBE_ENABLED=1 to check the cube"
+    shared_cache().clear()
+    _warm_cube()
+    before = int(get_finance_kpis(PROBE_FROM, PROBE_TO)["total_transactions"].iloc[0])
+
+    with engine.connect() as conn:
+        dept_id = conn.execute(text("SELECT MIN(dept_id) FROM finance_departments")).scalar()
+    listener = listen(engine, [CHANGE_CHANNEL])
+    try:
+        _received(listener)
+        probe_id = _statement(engine, """
+            INSERT INTO finance_transactions
+                (transaction_date, transaction_type, dept_id, amount, status, description)
+            VALUES (:day, 'Revenue', :dept, 1.00, 'Completed', 'cube invalidation probe')
+            RETURNING transaction_id
+        """, {"day": PROBE_FROM, "dept": dept_id}).scalar()
+        try:
+            dropped = invalidate(_received(listener))
+            after = int(get_finance_kpis(PROBE_FROM, PROBE_TO)["total_transactions"].iloc[0])
+            assert dropped >= 1 and after == before + 1, (dropped, before, after)
+            print("✅ KPIs recomputed after the notification count the new row")
+            reloaded = _warm_cube()
+            shared_cache().clear()
+            from_cube = int(get_finance_kpis(PROBE_FROM, PROBE_TO)["total_transactions"].iloc[0])
+            assert get_cube() is reloaded and from_cube == after, (from_cube, after)
+            print("✅ The reloaded cube agrees")
+        finally:
+            _statement(engine, "DELETE FROM finance_transactions WHERE transaction_id = :id",
+                       {"id": probe_id})
+            invalidate(_received(listener))
+    finally:
+        listener.close()
+        shared_cache().clear()
+
+
+def main():
+    """Command line entry point."""
+    engine = create_engine(get_database_url())
+    # The app's connection (and so the cube) must read the same database
+    os.environ["SUPABASE_URL"] = get_database_url()
+    print("🔔 Checking change notifications...")
+    changes = check_notifications(engine)
+    print("🧹 Checking cache invalidation...")
+    check_invalidation(changes)
+    print("🧊 Checking cache invalidation with the OLAP cube...")
+    check_cube_invalidation(engine)
+
+
+if __name__ == "__main__":
+    main()
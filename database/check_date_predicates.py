@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Result-parity check for the index-friendly date predicates.
+
+Runs each legacy query shape (BETWEEN windows, EXTRACT/TO_CHAR grouping,
+EXTRACT(YEAR) view filters) side by side with its rewrite from
+src/date_windows.py and migration 004 over a set of random windows, and
+fails if any pair of result sets differs. Read-only; safe on any database.
+
+Usage:
+    python database/check_date_predicates.py --windows 25
+    python database/check_date_predicates.py --explain
+"""
+
+import argparse
+import random
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from database.setup_database import get_database_url
+from src.date_windows import bucket_start, date_range, window_params
+
+FACT_TABLES = {
+    "finance_transactions": ("transaction_date", "amount"),
+    "procurement_orders": ("order_date", "grand_total"),
+}
+
+
+def _window_pairs(table, column, measure):
+    """Legacy and rewritten SQL for the windowed query shapes on one table."""
+
+    pairs = {
+        "window totals": (
+            f"SELECT COUNT(*) AS n, SUM({measure}) AS total FROM {table} "
+            f"WHERE {column} BETWEEN :from_dt AND :to_dt",
+            f"SELECT COUNT(*) AS n, SUM({measure}) AS total FROM {table} "
+            f"WHERE {date_range(column)}",
+        ),
+    }
+    for grain, part in (("month", "MONTH"), ("quarter", "QUARTER")):
+        start = bucket_start(column, grain)
+        pairs[f"{grain} buckets"] = (
+            f"SELECT EXTRACT(YEAR FROM {column}) AS year, EXTRACT({part} FROM {column}) AS period, "
+            f"COUNT(*) AS n, SUM({measure}) AS total FROM {table} "
+            f"WHERE {column} BETWEEN :from_dt AND :to_dt "
+            f"GROUP BY EXTRACT(YEAR FROM {column}), EXTRACT({part} FROM {column}) ORDER BY 1, 2",
+            f"SELECT EXTRACT(YEAR FROM {start}) AS year, EXTRACT({part} FROM {start}) AS period, "
+            f"COUNT(*) AS n, SUM({measure}) AS total FROM {table} "
+            f"WHERE {date_range(column)} "
+            f"GROUP BY {start} ORDER BY 1, 2",
+        )
+    return pairs
+
+
+# Original view bodies from schema.sql, compared with the rewritten views
+LEGACY_VIEWS = {
+    "v_finance_summary": """
+        SELECT d.dept_name, COALESCE(SUM(t.amount), 0) AS total_spent
+        FROM finance_departments d
+        LEFT JOIN finance_transactions t ON d.dept_id = t.dept_id
+            AND t.status = 'Completed'
+            AND EXTRACT(YEAR FROM t.transaction_date) = EXTRACT(YEAR FROM CURRENT_DATE)
+        GROUP BY d.dept_id, d.dept_name
+    """,
+    "v_finance_monthly_trends": """
+        SELECT EXTRACT(YEAR FROM transaction_date) AS year, EXTRACT(MONTH FROM transaction_date) AS month,
+               transaction_type, SUM(amount) AS total_amount, COUNT(*) AS transaction_count
+        FROM finance_transactions
+        WHERE status = 'Completed'
+        GROUP BY EXTRACT(YEAR FROM transaction_date), EXTRACT(MONTH FROM transaction_date), transaction_type
+    """,
+    "v_procurement_summary": """
+        SELECT d.dept_name, COUNT(po.order_id) AS total_orders, SUM(po.grand_total) AS total_value
+        FROM finance_departments d
+        LEFT JOIN procurement_orders po ON d.dept_id = po.dept_id
+            AND EXTRACT(YEAR FROM po.order_date) = EXTRACT(YEAR FROM CURRENT_DATE)
+        GROUP BY d.dept_id, d.dept_name
+    """,
+    "v_vendor_performance": """
+        SELECT v.vendor_name, COUNT(po.order_id) AS total_orders, SUM(po.grand_total) AS total_value
+        FROM procurement_vendors v
+        LEFT JOIN procurement_orders po ON v.vendor_id = po.vendor_id
+            AND EXTRACT(YEAR FROM po.order_date) = EXTRACT(YEAR FROM CURRENT_DATE)
+        GROUP BY v.vendor_id, v.vendor_name
+    """,
+    "v_category_analysis": """
+        SELECT c.category_name, COUNT(po.order_id) AS order_count, SUM(po.grand_total) AS total_value
+        FROM procurement_categories c
+        LEFT JOIN procurement_orders po ON c.category_id = po.category_id
+            AND EXTRACT(YEAR FROM po.order_date) = EXTRACT(YEAR FROM CURRENT_DATE)
+        GROUP BY c.category_id, c.category_name
+    """,
+}
+
+
+def _frame(conn, sql, params=None):
+    df = pd.read_sql(text(sql), conn, params=params or {})
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def _same(legacy, rewritten):
+    try:
+        pd.testing.assert_frame_equal(legacy, rewritten, check_dtype=False)
+        return True
+    except AssertionError:
+        return False
+
+
+def _random_windows(conn, count, seed):
+    bounds = conn.execute(text("SELECT MIN(transaction_date), MAX(transaction_date) FROM finance_transactions")).one()
+    low, high = bounds[0] or date.today() - timedelta(days=365), bounds[1] or date.today()
+    rng = random.Random(seed)
+    windows = [(low, high), (date(low.year, 1, 1), date(high.year, 12, 31))]
+    while len(windows) < count:
+        start = low + timedelta(days=rng.randint(0, max((high - low).days, 0)))
+        windows.append((start, start + timedelta(days=rng.choice([0, 6, 29, 30, 89, 364]))))
+    return windows
+
+
+def run_checks(window_count, seed):
+    """Compare every legacy/rewritten pair and return True when all match."""
+
+    engine = create_engine(get_database_url())
+    failures = 0
+    checks = 0
+    with engine.connect() as conn:
+        windows = _random_windows(conn, window_count, seed)
+        for table, (column, measure) in FACT_TABLES.items():
+            for name, (legacy_sql, new_sql) in _window_pairs(table, column, measure).items():
+                for from_dt, to_dt in windows:
+                    legacy = _frame(conn, legacy_sql, {"from_dt": from_dt, "to_dt": to_dt})
+                    rewritten = _frame(conn, new_sql, window_params(from_dt, to_dt))
+                    checks += 1
+                    if not _same(legacy, rewritten):
+                        failures += 1
+                        print(f"❌ {table} {name} differs for {from_dt}..{to_dt}")
+
+        for view, legacy_sql in LEGACY_VIEWS.items():
+            legacy = _frame(conn, legacy_sql)
+            rewritten = _frame(conn, f"SELECT {', '.join(legacy.columns)} FROM {view}")
+            checks += 1
+            if not _same(legacy, rewritten):
+                failures += 1
+                print(f"❌ {view} differs from its original definition")
+
+    if failures:
+        print(f"❌ {failures} of {checks} comparisons differ")
+    else:
+        print(f"✅ {checks} comparisons over {len(windows)} windows match")
+    return failures == 0
+
+
+def explain(from_dt, to_dt):
+    """Print plans for the rewritten predicates so index use and pruning can be checked."""
+
+    engine = create_engine(get_database_url())
+    with engine.connect() as conn:
+        for table, (column, measure) in FACT_TABLES.items():
+            start = bucket_start(column, "month")
+            sql = (f"EXPLAIN SELECT {start}, SUM({measure}) FROM {table} "
+                   f"WHERE {date_range(column)} GROUP BY {start}")
+            print(f"\n📋 {table}")
+            for row in conn.execute(text(sql), window_params(from_dt, to_dt)):
+                print(f"   {row[0]}")
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Check result parity of the rewritten date predicates")
+    parser.add_argument("--windows", type=int, default=25, help="number of random windows to compare")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--explain", action="store_true", help="print query plans for the last 30 days instead")
+    args = parser.parse_args()
+
+    if args.explain:
+        explain(date.today() - timedelta(days=30), date.today())
+        return
+    sys.exit(0 if run_checks(args.windows, args.seed) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Index-use and latency check for the text search (src/search.py, migration 010).
+
+Picks search terms from the data itself (words of descriptions, vendor names,
+reference number fragments, order numbers), runs each search through
+EXPLAIN ANALYZE and fails if a plan reads a fact table without one of the
+search indexes or a search takes longer than the budget. Read-only.
+
+Usage:
+    python database/check_search.py --terms 20 --budget-ms 100
+    python database/check_search.py --explain "office supplies"
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine, text
+
+from database.setup_database import get_database_url
+from src.search import SEARCH_TARGETS, search_params, search_statement
+
+SAMPLE_SQL = {
+    "transactions": "SELECT description, vendor_name, reference_number FROM finance_transactions "
+                    "TABLESAMPLE SYSTEM (1) LIMIT 200",
+    "orders": "SELECT order_number, notes FROM procurement_orders TABLESAMPLE SYSTEM (1) LIMIT 200",
+}
+
+
+def _terms(conn, name, count, rng):
+    """Whole words, word prefixes and substrings taken from sampled rows."""
+
+    words = set()
+    for row in conn.execute(text(SAMPLE_SQL[name])):
+        for value in row:
+            words.update(word for word in re.findall(r"[\w-]+", value or "") if len(word) >= 3)
+    words = sorted(words)
+    rng.shuffle(words)
+    terms = []
+    for word in words[:count]:
+        shape = rng.choice(("word", "prefix", "substring"))
+        if shape == "prefix":
+            word = word[:max(3, len(word) // 2)]
+        elif shape == "substring" and len(word) > 4:
+            word = word[1:-1]
+        terms.append(word)
+    return terms
+
+
+def _explain(conn, name, term, window):
+    target = SEARCH_TARGETS[name]
+    statement = search_statement(target, term, dated=window is not None)
+    sql = str(statement.compile(dialect=conn.dialect))
+    params = search_params(term, 0, 20, *(window or (None, None)))
+    plan = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}", params).scalar()
+    return plan[0] if isinstance(plan, list) else json.loads(plan)[0]
+
+
+def _nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _nodes(child)
+
+
+def _seq_scans(plan):
+    return sorted({
+        node.get("Relation Name", "?")
+        for node in _nodes(plan["Plan"])
+        if node["Node Type"] == "Seq Scan"
+    })
+
+
+def run_checks(term_count, budget_ms, seed):
+    """Explain every sampled search and return True when all use the indexes within budget."""
+
+    engine = create_engine(get_database_url())
+    rng = random.Random(seed)
+    failures = 0
+    checks = 0
+    with engine.connect() as conn:
+        windows = [None, (date.today() - timedelta(days=90), date.today())]
+        for name in SEARCH_TARGETS:
+            for term in _terms(conn, name, term_count, rng):
+                for window in windows:
+                    plan = _explain(conn, name, term, window)
+                    elapsed = plan["Planning Time"] + plan["Execution Time"]
+                    scans = _seq_scans(plan)
+                    checks += 1
+                    label = f"{name} {term!r} {'all dates' if window is None else 'last 90 days'}"
+                    if scans or elapsed > budget_ms:
+                        failures += 1
+                        detail = f"seq scan on {', '.join(scans)}" if scans else f"{elapsed:.1f} ms"
+                        print(f"❌ {label}: {detail}")
+                    else:
+                        print(f"   {label}: {elapsed:.1f} ms")
+
+    if failures:
+        print(f"❌ {failures} of {checks} searches missed the indexes or the {budget_ms} ms budget")
+    else:
+        print(f"✅ {checks} searches used the indexes within {budget_ms} ms")
+    return failures == 0
+
+
+def explain(term):
+    """Print the plans of one search term on both facts."""
+
+    engine = create_engine(get_database_url())
+    with engine.connect() as conn:
+        for name in SEARCH_TARGETS:
+            plan = _explain(conn, name, term, None)
+            print(f"\n📋 {name}: {plan['Planning Time'] + plan['Execution Time']:.1f} ms")
+            for node in _nodes(plan["Plan"]):
+                print(f"   {node['Node Type']} {node.get('Relation Name', '')} {node.get('Index Name', '')}")
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Check that text searches use the search indexes")
+    parser.add_argument("--terms", type=int, default=20, help="sampled search terms per fact")
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--explain", metavar="TERM", help="print the plans for one term instead")
+    args = parser.parse_args()
+
+    if args.explain:
+        explain(args.explain)
+        return
+    sys.exit(0 if run_checks(args.terms, args.budget_ms, args.seed) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Load exchange rates into fx_rates (migration 013) and re-convert order totals.
+
+The CSV quotes every currency in US dollars (rate_date, currency, usd_rate).
+Rates are cross-converted into the reporting currency on each date, so
+fx_rates holds the value of one unit of each currency in the reporting
+currency. Then every procurement_orders.reporting_total is recomputed and the
+month views are refreshed. The reporting currency must be quoted in the CSV.
+
+Usage:
+    python database/load_fx_rates.py
+    python database/load_fx_rates.py --csv rates.csv --reporting-currency EUR
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+from database.setup_database import get_database_url
+
+DEFAULT_CSV = Path(__file__).parent / "fx_rates.csv"
+
+
+def reporting_rates(usd_rates, reporting_currency):
+    """fx_rates rows from USD quotes: each rate divided by the reporting currency's rate of that date.
+
+    Dates on which the reporting currency has no quote use its latest earlier one.
+    """
+
+    quotes = usd_rates.assign(
+        rate_date=pd.to_datetime(usd_rates["rate_date"]).dt.date,
+        currency=usd_rates["currency"].str.strip().str.upper(),
+    ).pivot_table(index="rate_date", columns="currency", values="usd_rate", aggfunc="last").sort_index()
+    if reporting_currency not in quotes:
+        raise ValueError(f"No {reporting_currency} quotes in the rates file")
+    base = quotes[reporting_currency].ffill().bfill()
+    rates = quotes.div(base, axis=0).stack().rename("rate").reset_index()
+    return rates[["currency", "rate_date", "rate"]]
+
+
+def load_fx_rates(engine, csv_path=DEFAULT_CSV, reporting_currency=None):
+    """Replace fx_rates from `csv_path` and re-convert the orders; returns the orders changed."""
+
+    reporting_currency = (reporting_currency or os.getenv("REPORTING_CURRENCY", "USD")).upper()
+    rates = reporting_rates(pd.read_csv(csv_path), reporting_currency)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM fx_rates"))
+        conn.execute(
+            text("INSERT INTO fx_rates (currency, rate_date, rate) VALUES (:currency, :rate_date, :rate)"),
+            rates.to_dict("records"),
+        )
+        changed = conn.execute(text("SELECT convert_order_totals()")).scalar()
+        missing = conn.execute(text(
+            "SELECT COALESCE(currency, 'USD') AS currency, COUNT(*) FROM procurement_orders "
+            "WHERE reporting_total IS NULL AND grand_total IS NOT NULL GROUP BY 1"
+        )).all()
+        conn.execute(text("SELECT refresh_analytics_views()"))
+
+    print(f"✅ Loaded {len(rates)} {reporting_currency} rates, re-converted {changed} orders")
+    for currency, count in missing:
+        print(f"⚠️ {count} {currency} orders have no rate and are left out of the totals")
+    return changed
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Load exchange rates and convert order totals")
+    parser.add_argument("--csv", type=Path, default=DEFAULT_CSV, help="rates file (rate_date, currency, usd_rate)")
+    parser.add_argument("--reporting-currency", help="defaults to $REPORTING_CURRENCY or USD")
+    args = parser.parse_args()
+
+    load_fx_rates(create_engine(get_database_url()), args.csv, args.reporting_currency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Partition maintenance for Reflexta Analytics Platform.
+Creates upcoming monthly partitions, archives old ones and shows partition
+pruning on the dashboard KPI queries.
+
+Usage:
+    python database/manage_partitions.py ensure --months-ahead 3
+    python database/manage_partitions.py archive --before 2023-01-01
+    python database/manage_partitions.py list
+    python database/manage_partitions.py explain --from 2024-01-01 --to 2024-01-31
+"""
+
+import argparse
+import datetime as dt
+import sys
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine, text
+
+from database.setup_database import get_database_url
+
+FACT_TABLES = ("finance_transactions", "procurement_orders")
+
+# Same predicates as get_finance_kpis / get_procurement_kpis
+KPI_QUERIES = {
+    "finance_transactions": """
+        SELECT COUNT(*), SUM(amount)
+        FROM finance_transactions
+        WHERE transaction_date BETWEEN :from_dt AND :to_dt
+            AND status = 'Completed'
+    """,
+    "procurement_orders": """
+        SELECT COUNT(*), SUM(grand_total)
+        FROM procurement_orders
+        WHERE order_date BETWEEN :from_dt AND :to_dt
+    """,
+}
+
+
+def ensure_partitions(engine, months_ahead):
+    """Create any missing partitions up to `months_ahead` months from now."""
+
+    with engine.begin() as conn:
+        created = conn.execute(
+            text("SELECT ensure_future_partitions(:months)"), {"months": months_ahead}
+        ).scalar()
+    print(f"✅ Created {created} new partition(s)")
+    return created
+
+
+def archive_partitions(engine, cutoff, archive_schema):
+    """Detach partitions that end on or before `cutoff` into `archive_schema`."""
+
+    archived = []
+    with engine.begin() as conn:
+        for table in FACT_TABLES:
+            rows = conn.execute(
+                text("SELECT archive_partitions_before(CAST(:parent AS regclass), :cutoff, :schema)"),
+                {"parent": table, "cutoff": cutoff, "schema": archive_schema},
+            ).scalars().all()
+            archived.extend(rows)
+
+    for name in archived:
+        print(f"📦 Archived {name}")
+    if not archived:
+        print("ℹ️ Nothing to archive")
+    return archived
+
+
+def list_partitions(engine):
+    """Print every partition with its bounds and approximate row count."""
+
+    sql = text("""
+        SELECT i.inhparent::regclass::text AS parent,
+               c.relname AS partition_name,
+               pg_get_expr(c.relpartbound, c.oid) AS bounds,
+               c.reltuples::bigint AS approx_rows
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = ANY(CAST(:parents AS regclass[]))
+        ORDER BY parent, partition_name
+    """)
+    with engine.connect() as conn:
+        rows = conn.execute(sql, {"parents": list(FACT_TABLES)}).all()
+
+    for parent, name, bounds, approx_rows in rows:
+        print(f"  {parent:<22} {name:<40} {bounds:<60} ~{max(approx_rows, 0):,} rows")
+    return rows
+
+
+def explain_kpi_pruning(engine, from_dt, to_dt):
+    """Show which partitions the KPI queries touch for a date window."""
+
+    scanned = {}
+    with engine.connect() as conn:
+        for table, sql in KPI_QUERIES.items():
+            plan = conn.execute(
+                text(f"EXPLAIN (COSTS OFF) {sql}"), {"from_dt": from_dt, "to_dt": to_dt}
+            ).scalars().all()
+            partitions = sorted({
+                line.split(" on ")[1].split()[0]
+                for line in plan
+                if " on " in line and "Scan" in line
+            })
+            scanned[table] = partitions
+            print(f"\n🔍 {table}: {len(partitions)} partition(s) scanned")
+            for line in plan:
+                print(f"    {line}")
+    return scanned
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Manage fact table partitions")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ensure = sub.add_parser("ensure", help="create upcoming monthly partitions")
+    ensure.add_argument("--months-ahead", type=int, default=3)
+
+    archive = sub.add_parser("archive", help="detach and archive old partitions")
+    archive.add_argument("--before", type=dt.date.fromisoformat, required=True)
+    archive.add_argument("--schema", default="archive")
+
+    sub.add_parser("list", help="list partitions")
+
+    explain = sub.add_parser("explain", help="show partition pruning for the KPI queries")
+    explain.add_argument("--from", dest="from_dt", type=dt.date.fromisoformat,
+                         default=dt.date.today() - dt.timedelta(days=30))
+    explain.add_argument("--to", dest="to_dt", type=dt.date.fromisoformat, default=dt.date.today())
+
+    args = parser.parse_args()
+    engine = create_engine(get_database_url())
+
+    if args.command == "ensure":
+        ensure_partitions(engine, args.months_ahead)
+    elif args.command == "archive":
+        archive_partitions(engine, args.before, args.schema)
+    elif args.command == "list":
+        list_partitions(engine)
+    else:
+        explain_kpi_pruning(engine, args.from_dt, args.to_dt)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+-- =====================================================
+-- MIGRATION 001: MONTHLY RANGE PARTITIONING OF FACT TABLES
+-- Converts finance_transactions and procurement_orders into declarative
+-- range-partitioned tables (one partition per calendar month) and adds
+-- helpers to create future partitions and archive old ones.
+--
+-- Unique constraints on a partitioned table must include the partition key,
+-- so uniqueness is weaker afterwards: the primary keys become (id, date) and
+-- procurement_orders.order_number is unique only per order_date, no longer
+-- across the table. The ids still come from their sequences; order numbers
+-- must be kept unique by whoever assigns them.
+--
+-- Safe to re-run: tables that are already partitioned are left untouched.
+-- =====================================================
+
+-- -----------------------------------------------------
+-- Partition maintenance helpers
+-- -----------------------------------------------------
+
+-- Name of the column a range-partitioned table is partitioned on
+CREATE OR REPLACE FUNCTION partition_key_column(p_parent regclass)
+RETURNS text AS $$
+    SELECT a.attname::text
+    FROM pg_partitioned_table pt
+    JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+    WHERE pt.partrelid = p_parent;
+$$ LANGUAGE sql STABLE;
+
+-- Create one partition per month covering [p_from, p_to]. Rows that landed in
+-- the default partition for a newly created month are moved into it.
+CREATE OR REPLACE FUNCTION create_monthly_partitions(p_parent regclass, p_from date, p_to date)
+RETURNS integer AS $$
+DECLARE
+    v_parent_name text := (SELECT relname FROM pg_class WHERE oid = p_parent);
+    v_default text := v_parent_name || '_default';
+    v_key text := partition_key_column(p_parent);
+    v_month date := date_trunc('month', p_from::timestamp)::date;
+    v_next date;
+    v_partition text;
+    v_columns text;
+    v_stranded boolean;
+    v_created integer := 0;
+BEGIN
+    IF v_key IS NULL THEN
+        RAISE EXCEPTION '% is not a range-partitioned table', v_parent_name;
+    END IF;
+
+    -- Generated columns (e.g. grand_total) cannot be inserted explicitly
+    SELECT string_agg(quote_ident(attname), ', ' ORDER BY attnum) INTO v_columns
+    FROM pg_attribute
+    WHERE attrelid = p_parent AND attnum > 0 AND NOT attisdropped AND attgenerated = '';
+
+    WHILE v_month <= p_to LOOP
+        v_next := (v_month + INTERVAL '1 month')::date;
+        v_partition := format('%s_y%sm%s', v_parent_name, to_char(v_month, 'YYYY'), to_char(v_month, 'MM'));
+
+        IF to_regclass(v_partition) IS NULL THEN
+            v_stranded := false;
+            IF to_regclass(v_default) IS NOT NULL THEN
+                EXECUTE format('SELECT EXISTS (SELECT 1 FROM %I WHERE %I >= %L AND %I < %L)',
+                               v_default, v_key, v_month, v_key, v_next)
+                INTO v_stranded;
+            END IF;
+
+            IF v_stranded THEN
+                EXECUTE format('ALTER TABLE %s DETACH PARTITION %I', p_parent, v_default);
+            END IF;
+
+            EXECUTE format('CREATE TABLE %I PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+                           v_partition, p_parent, v_month, v_next);
+
+            IF v_stranded THEN
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM %I WHERE %I >= %L AND %I < %L RETURNING %s) '
+                    'INSERT INTO %s (%s) SELECT %s FROM moved',
+                    v_default, v_key, v_month, v_key, v_next, v_columns,
+                    p_parent, v_columns, v_columns);
+                EXECUTE format('ALTER TABLE %s ATTACH PARTITION %I DEFAULT', p_parent, v_default);
+            END IF;
+
+            v_created := v_created + 1;
+        END IF;
+
+        v_month := v_next;
+    END LOOP;
+
+    RETURN v_created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Keep partitions available for the current month plus p_months_ahead months.
+-- Intended to run on a schedule (cron, pg_cron or database/manage_partitions.py).
+CREATE OR REPLACE FUNCTION ensure_future_partitions(p_months_ahead integer DEFAULT 3)
+RETURNS integer AS $$
+DECLARE
+    v_horizon date := (date_trunc('month', CURRENT_DATE) + make_interval(months => p_months_ahead))::date;
+    v_created integer := 0;
+BEGIN
+    v_created := v_created + create_monthly_partitions('finance_transactions', CURRENT_DATE, v_horizon);
+    v_created := v_created + create_monthly_partitions('procurement_orders', CURRENT_DATE, v_horizon);
+    RETURN v_created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Detach every monthly partition that ends on or before p_cutoff and move it
+-- into p_archive_schema. Archived partitions stay queryable (and can be dumped
+-- or dropped) without a large DELETE on the live table.
+CREATE OR REPLACE FUNCTION archive_partitions_before(
+    p_parent regclass,
+    p_cutoff date,
+    p_archive_schema text DEFAULT 'archive'
+)
+RETURNS SETOF text AS $$
+DECLARE
+    r record;
+BEGIN
+    EXECUTE format('CREATE SCHEMA IF NOT EXISTS %I', p_archive_schema);
+
+    FOR r IN
+        SELECT c.relname AS partition_name,
+               (regexp_match(pg_get_expr(c.relpartbound, c.oid), 'TO \(''([^'']+)''\)'))[1]::date AS upper_bound
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = p_parent
+          AND pg_get_expr(c.relpartbound, c.oid) <> 'DEFAULT'
+        ORDER BY 2
+    LOOP
+        CONTINUE WHEN r.upper_bound IS NULL OR r.upper_bound > p_cutoff;
+
+        EXECUTE format('ALTER TABLE %s DETACH PARTITION %I', p_parent, r.partition_name);
+        EXECUTE format('ALTER TABLE %I SET SCHEMA %I', r.partition_name, p_archive_schema);
+        RETURN NEXT p_archive_schema || '.' || r.partition_name;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- -----------------------------------------------------
+-- Conversion of finance_transactions
+-- -----------------------------------------------------
+DO $$
+DECLARE
+    r record;
+    v_views record;
+    v_saved_views jsonb := '[]'::jsonb;
+    v_first date;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('finance_transactions')) = 'p' THEN
+        RAISE NOTICE 'finance_transactions is already partitioned';
+        RETURN;
+    END IF;
+
+    -- Views are bound to the table OID, so capture them and recreate them
+    -- against the partitioned table at the end of the conversion
+    FOR v_views IN
+        SELECT DISTINCT v.relname, pg_get_viewdef(v.oid) AS definition
+        FROM pg_depend d
+        JOIN pg_rewrite rw ON rw.oid = d.objid
+        JOIN pg_class v ON v.oid = rw.ev_class AND v.relkind = 'v'
+        WHERE d.refobjid = to_regclass('finance_transactions')
+    LOOP
+        v_saved_views := v_saved_views || jsonb_build_object('name', v_views.relname, 'definition', v_views.definition);
+    END LOOP;
+    FOR r IN SELECT value->>'name' AS name FROM jsonb_array_elements(v_saved_views) LOOP
+        EXECUTE format('DROP VIEW IF EXISTS %I', r.name);
+    END LOOP;
+
+    ALTER TABLE finance_transactions RENAME TO finance_transactions_legacy;
+    FOR r IN SELECT indexrelid::regclass::text AS name FROM pg_index
+             WHERE indrelid = 'finance_transactions_legacy'::regclass LOOP
+        EXECUTE format('ALTER INDEX %s RENAME TO %I', r.name, r.name || '_legacy');
+    END LOOP;
+
+    CREATE TABLE finance_transactions (
+        transaction_id INTEGER NOT NULL DEFAULT nextval('finance_transactions_transaction_id_seq'),
+        transaction_date DATE NOT NULL,
+        transaction_type VARCHAR(50) NOT NULL CHECK (transaction_type IN ('Revenue', 'Expense', 'Asset', 'Liability', 'Equity')),
+        account_id INTEGER REFERENCES finance_accounts(account_id),
+        dept_id INTEGER REFERENCES finance_departments(dept_id),
+        cost_center_id INTEGER REFERENCES finance_cost_centers(cost_center_id),
+        amount DECIMAL(15,2) NOT NULL,
+        description TEXT,
+        reference_number VARCHAR(100),
+        vendor_name VARCHAR(200),
+        payment_method VARCHAR(50),
+        status VARCHAR(20) DEFAULT 'Pending' CHECK (status IN ('Pending', 'Approved', 'Rejected', 'Completed')),
+        created_by VARCHAR(100),
+        approved_by VARCHAR(100),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        -- The partition key must be part of every unique constraint
+        PRIMARY KEY (transaction_id, transaction_date)
+    ) PARTITION BY RANGE (transaction_date);
+
+    CREATE TABLE finance_transactions_default PARTITION OF finance_transactions DEFAULT;
+
+    SELECT COALESCE(MIN(transaction_date), CURRENT_DATE) INTO v_first FROM finance_transactions_legacy;
+    PERFORM create_monthly_partitions('finance_transactions', v_first, (CURRENT_DATE + INTERVAL '3 months')::date);
+
+    INSERT INTO finance_transactions (
+        transaction_id, transaction_date, transaction_type, account_id, dept_id, cost_center_id,
+        amount, description, reference_number, vendor_name, payment_method, status,
+        created_by, approved_by, created_at, updated_at
+    )
+    SELECT
+        transaction_id, transaction_date, transaction_type, account_id, dept_id, cost_center_id,
+        amount, description, reference_number, vendor_name, payment_method, status,
+        created_by, approved_by, created_at, updated_at
+    FROM finance_transactions_legacy;
+
+    ALTER SEQUENCE finance_transactions_transaction_id_seq OWNED BY finance_transactions.transaction_id;
+    DROP TABLE finance_transactions_legacy;
+
+    CREATE INDEX idx_finance_transactions_date ON finance_transactions(transaction_date);
+    CREATE INDEX idx_finance_transactions_type ON finance_transactions(transaction_type);
+    CREATE INDEX idx_finance_transactions_dept ON finance_transactions(dept_id);
+    CREATE INDEX idx_finance_transactions_account ON finance_transactions(account_id);
+
+    -- Row triggers on a partitioned table are cloned onto every partition
+    CREATE TRIGGER trigger_update_budget_spent
+        AFTER UPDATE ON finance_transactions
+        FOR EACH ROW
+        EXECUTE FUNCTION update_budget_spent();
+
+    FOR r IN SELECT value->>'name' AS name, value->>'definition' AS definition
+             FROM jsonb_array_elements(v_saved_views) LOOP
+        EXECUTE format('CREATE VIEW %I AS %s', r.name, r.definition);
+    END LOOP;
+END;
+$$;
+
+-- -----------------------------------------------------
+-- Conversion of procurement_orders
+-- -----------------------------------------------------
+DO $$
+DECLARE
+    r record;
+    v_views record;
+    v_saved_views jsonb := '[]'::jsonb;
+    v_first date;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('procurement_orders')) = 'p' THEN
+        RAISE NOTICE 'procurement_orders is already partitioned';
+        RETURN;
+    END IF;
+
+    FOR v_views IN
+        SELECT DISTINCT v.relname, pg_get_viewdef(v.oid) AS definition
+        FROM pg_depend d
+        JOIN pg_rewrite rw ON rw.oid = d.objid
+        JOIN pg_class v ON v.oid = rw.ev_class AND v.relkind = 'v'
+        WHERE d.refobjid = to_regclass('procurement_orders')
+    LOOP
+        v_saved_views := v_saved_views || jsonb_build_object('name', v_views.relname, 'definition', v_views.definition);
+    END LOOP;
+    FOR r IN SELECT value->>'name' AS name FROM jsonb_array_elements(v_saved_views) LOOP
+        EXECUTE format('DROP VIEW IF EXISTS %I', r.name);
+    END LOOP;
+
+    ALTER TABLE procurement_orders RENAME TO procurement_orders_legacy;
+    FOR r IN SELECT indexrelid::regclass::text AS name FROM pg_index
+             WHERE indrelid = 'procurement_orders_legacy'::regclass LOOP
+        EXECUTE format('ALTER INDEX %s RENAME TO %I', r.name, r.name || '_legacy');
+    END LOOP;
+
+    CREATE TABLE procurement_orders (
+        order_id INTEGER NOT NULL DEFAULT nextval('procurement_orders_order_id_seq'),
+        order_number VARCHAR(50) NOT NULL,
+        order_date DATE NOT NULL,
+        vendor_id INTEGER REFERENCES procurement_vendors(vendor_id),
+        category_id INTEGER REFERENCES procurement_categories(category_id),
+        dept_id INTEGER REFERENCES finance_departments(dept_id),
+        cost_center_id INTEGER REFERENCES finance_cost_centers(cost_center_id),
+        total_amount DECIMAL(15,2) NOT NULL,
+        tax_amount DECIMAL(15,2) DEFAULT 0,
+        shipping_amount DECIMAL(15,2) DEFAULT 0,
+        grand_total DECIMAL(15,2) GENERATED ALWAYS AS (total_amount + tax_amount + shipping_amount) STORED,
+        currency VARCHAR(3) DEFAULT 'USD',
+        status VARCHAR(20) DEFAULT 'Draft' CHECK (status IN ('Draft', 'Submitted', 'Approved', 'Rejected', 'Ordered', 'Received', 'Closed', 'Cancelled')),
+        priority VARCHAR(10) DEFAULT 'Medium' CHECK (priority IN ('Low', 'Medium', 'High', 'Urgent')),
+        requested_by VARCHAR(100),
+        approved_by VARCHAR(100),
+        notes TEXT,
+        expected_delivery_date DATE,
+        actual_delivery_date DATE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (order_id, order_date),
+        -- Was UNIQUE (order_number): the same number may now recur on another date
+        UNIQUE (order_number, order_date)
+    ) PARTITION BY RANGE (order_date);
+
+    CREATE TABLE procurement_orders_default PARTITION OF procurement_orders DEFAULT;
+
+    SELECT COALESCE(MIN(order_date), CURRENT_DATE) INTO v_first FROM procurement_orders_legacy;
+    PERFORM create_monthly_partitions('procurement_orders', v_first, (CURRENT_DATE + INTERVAL '3 months')::date);
+
+    INSERT INTO procurement_orders (
+        order_id, order_number, order_date, vendor_id, category_id, dept_id, cost_center_id,
+        total_amount, tax_amount, shipping_amount, currency, status, priority,
+        requested_by, approved_by, notes, expected_delivery_date, actual_delivery_date,
+        created_at, updated_at
+    )
+    SELECT
+        order_id, order_number, order_date, vendor_id, category_id, dept_id, cost_center_id,
+        total_amount, tax_amount, shipping_amount, currency, status, priority,
+        requested_by, approved_by, notes, expected_delivery_date, actual_delivery_date,
+        created_at, updated_at
+    FROM procurement_orders_legacy;
+
+    ALTER SEQUENCE procurement_orders_order_id_seq OWNED BY procurement_orders.order_id;
+    DROP TABLE procurement_orders_legacy;
+
+    CREATE INDEX idx_procurement_orders_date ON procurement_orders(order_date);
+    CREATE INDEX idx_procurement_orders_vendor ON procurement_orders(vendor_id);
+    CREATE INDEX idx_procurement_orders_status ON procurement_orders(status);
+    CREATE INDEX idx_procurement_orders_dept ON procurement_orders(dept_id);
+
+    FOR r IN SELECT value->>'name' AS name, value->>'definition' AS definition
+             FROM jsonb_array_elements(v_saved_views) LOOP
+        EXECUTE format('CREATE VIEW %I AS %s', r.name, r.definition);
+    END LOOP;
+END;
+$$;
+
+-- Scheduling example (requires the pg_cron extension):
+-- SELECT cron.schedule('ensure-partitions', '0 3 * * *', 'SELECT ensure_future_partitions(3)');
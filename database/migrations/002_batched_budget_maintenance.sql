@@ -0,0 +1,67 @@
+-- =====================================================
+-- MIGRATION 002: BATCHED BUDGET MAINTENANCE
+-- Replaces the FOR EACH ROW budget trigger with a statement-level trigger
+-- that reads the OLD/NEW transition tables, nets the spent delta per
+-- (dept, cost center, account, budget year) and applies it in one UPDATE.
+--
+-- A transaction contributes its amount to a budget while its status is
+-- 'Completed'. The delta of a statement is therefore
+--     sum(new contributions) - sum(old contributions)
+-- which covers completions, reversals (Completed -> anything else), amount
+-- edits and moves between departments, cost centers, accounts or years.
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION apply_budget_spent_deltas()
+RETURNS TRIGGER AS $$
+BEGIN
+    WITH contributions AS (
+        SELECT dept_id, cost_center_id, account_id,
+               EXTRACT(YEAR FROM transaction_date)::integer AS budget_year,
+               -amount AS amount
+        FROM old_rows
+        WHERE status = 'Completed'
+        UNION ALL
+        SELECT dept_id, cost_center_id, account_id,
+               EXTRACT(YEAR FROM transaction_date)::integer AS budget_year,
+               amount
+        FROM new_rows
+        WHERE status = 'Completed'
+    ),
+    deltas AS (
+        SELECT dept_id, cost_center_id, account_id, budget_year, SUM(amount) AS delta
+        FROM contributions
+        GROUP BY dept_id, cost_center_id, account_id, budget_year
+        HAVING SUM(amount) <> 0
+    ),
+    -- Lock the affected budget rows in a fixed order so concurrent bulk
+    -- updates queue up instead of deadlocking
+    locked AS (
+        SELECT b.budget_id, d.delta
+        FROM finance_budgets b
+        JOIN deltas d
+          ON b.dept_id = d.dept_id
+         AND b.cost_center_id = d.cost_center_id
+         AND b.account_id = d.account_id
+         AND b.budget_year = d.budget_year
+        ORDER BY b.budget_id
+        FOR UPDATE OF b
+    )
+    UPDATE finance_budgets b
+    SET spent_amount = b.spent_amount + l.delta,
+        updated_at = CURRENT_TIMESTAMP
+    FROM locked l
+    WHERE b.budget_id = l.budget_id;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_update_budget_spent ON finance_transactions;
+
+CREATE TRIGGER trigger_update_budget_spent
+    AFTER UPDATE ON finance_transactions
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION apply_budget_spent_deltas();
+
+DROP FUNCTION IF EXISTS update_budget_spent();
@@ -0,0 +1,122 @@
+-- =====================================================
+-- MIGRATION 003: MATERIALIZED ANALYTICAL VIEWS
+-- Month-grain materialized counterparts of the v_* views. Aggregates are
+-- additive per month, so any window made of whole months is answered by
+-- summing pre-aggregated rows instead of scanning the fact tables.
+--
+-- Every view has a unique index on its grain columns, which is what
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY requires. Nullable keys are
+-- coalesced to 0 so the grain is always unique.
+-- =====================================================
+
+-- Counterpart of v_finance_summary: completed spend per department and month
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_finance_summary AS
+SELECT
+    date_trunc('month', transaction_date::timestamp)::date AS month_start,
+    COALESCE(dept_id, 0) AS dept_id,
+    SUM(amount) AS total_spent,
+    COUNT(*) AS transaction_count
+FROM finance_transactions
+WHERE status = 'Completed'
+GROUP BY 1, 2;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_finance_summary
+    ON mv_finance_summary (month_start, dept_id);
+
+-- Counterpart of v_finance_monthly_trends
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_finance_monthly_trends AS
+SELECT
+    date_trunc('month', transaction_date::timestamp)::date AS month_start,
+    transaction_type,
+    SUM(amount) AS total_amount,
+    COUNT(*) AS transaction_count
+FROM finance_transactions
+WHERE status = 'Completed'
+GROUP BY 1, 2;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_finance_monthly_trends
+    ON mv_finance_monthly_trends (month_start, transaction_type);
+
+-- Counterpart of v_procurement_summary
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_procurement_summary AS
+SELECT
+    date_trunc('month', order_date::timestamp)::date AS month_start,
+    COALESCE(dept_id, 0) AS dept_id,
+    COUNT(*) AS total_orders,
+    SUM(grand_total) AS total_value,
+    COUNT(CASE WHEN status = 'Received' THEN 1 END) AS completed_orders,
+    COUNT(CASE WHEN status IN ('Draft', 'Submitted', 'Approved', 'Ordered') THEN 1 END) AS pending_orders
+FROM procurement_orders
+GROUP BY 1, 2;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_procurement_summary
+    ON mv_procurement_summary (month_start, dept_id);
+
+-- Counterpart of v_vendor_performance, kept per department for dept filters
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_vendor_performance AS
+SELECT
+    date_trunc('month', order_date::timestamp)::date AS month_start,
+    COALESCE(vendor_id, 0) AS vendor_id,
+    COALESCE(dept_id, 0) AS dept_id,
+    COUNT(*) AS total_orders,
+    SUM(grand_total) AS total_value,
+    COUNT(CASE WHEN status = 'Received' THEN 1 END) AS completed_orders
+FROM procurement_orders
+GROUP BY 1, 2, 3;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_vendor_performance
+    ON mv_vendor_performance (month_start, vendor_id, dept_id);
+
+-- Counterpart of v_category_analysis. The vendor and department stay in the
+-- grain so distinct vendor / department counts remain exact over any window.
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_category_analysis AS
+SELECT
+    date_trunc('month', order_date::timestamp)::date AS month_start,
+    COALESCE(category_id, 0) AS category_id,
+    COALESCE(dept_id, 0) AS dept_id,
+    COALESCE(vendor_id, 0) AS vendor_id,
+    COUNT(*) AS order_count,
+    SUM(grand_total) AS total_value,
+    COUNT(CASE WHEN status = 'Received' THEN 1 END) AS completed_orders
+FROM procurement_orders
+GROUP BY 1, 2, 3, 4;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_category_analysis
+    ON mv_category_analysis (month_start, category_id, dept_id, vendor_id);
+
+-- Refresh all materialized views without blocking readers
+CREATE OR REPLACE FUNCTION refresh_analytics_views()
+RETURNS void AS $$
+BEGIN
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_finance_summary;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_finance_monthly_trends;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_procurement_summary;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_vendor_performance;
+    REFRESH MATERIALIZED VIEW CONCURRENTLY mv_category_analysis;
+END;
+$$ LANGUAGE plpgsql;
+
+-- -----------------------------------------------------
+-- Change notification
+-- One NOTIFY per statement on the fact tables, so the app can refresh the
+-- materialized views when data changes instead of only on a timer.
+-- -----------------------------------------------------
+CREATE OR REPLACE FUNCTION notify_data_changed()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('reflexta_data_changed', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_notify_finance_transactions ON finance_transactions;
+CREATE TRIGGER trigger_notify_finance_transactions
+    AFTER INSERT OR UPDATE OR DELETE ON finance_transactions
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_data_changed();
+
+DROP TRIGGER IF EXISTS trigger_notify_procurement_orders ON procurement_orders;
+CREATE TRIGGER trigger_notify_procurement_orders
+    AFTER INSERT OR UPDATE OR DELETE ON procurement_orders
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION notify_data_changed();
@@ -0,0 +1,99 @@
+-- =====================================================
+-- MIGRATION 004: INDEX-FRIENDLY DATE PREDICATES
+-- The dashboard views filtered on EXTRACT(YEAR FROM <date>) = ..., which
+-- hides the column from the date indexes and from partition pruning, so every
+-- query scanned the whole fact table. They now use half-open ranges on the
+-- bare column and group on date_trunc of the bucket start.
+--
+-- The expression indexes below match src/date_windows.bucket_start exactly
+-- (date_trunc('<grain>', <col>::timestamp)); the ::timestamp cast keeps the
+-- expression immutable so it can be indexed.
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_finance_transactions_month
+    ON finance_transactions ((date_trunc('month', transaction_date::timestamp)), transaction_type);
+
+CREATE INDEX IF NOT EXISTS idx_procurement_orders_month
+    ON procurement_orders ((date_trunc('month', order_date::timestamp)));
+
+CREATE INDEX IF NOT EXISTS idx_procurement_orders_quarter
+    ON procurement_orders ((date_trunc('quarter', order_date::timestamp)));
+
+CREATE INDEX IF NOT EXISTS idx_procurement_orders_week
+    ON procurement_orders ((date_trunc('week', order_date::timestamp)));
+
+-- Finance Dashboard Views
+CREATE OR REPLACE VIEW v_finance_summary AS
+SELECT
+    d.dept_name,
+    d.dept_code,
+    d.budget_allocation,
+    COALESCE(SUM(t.amount), 0) as total_spent,
+    d.budget_allocation - COALESCE(SUM(t.amount), 0) as remaining_budget,
+    ROUND((COALESCE(SUM(t.amount), 0) / d.budget_allocation) * 100, 2) as budget_utilization_pct
+FROM finance_departments d
+LEFT JOIN finance_transactions t ON d.dept_id = t.dept_id
+    AND t.status = 'Completed'
+    AND t.transaction_date >= date_trunc('year', CURRENT_DATE)::date
+    AND t.transaction_date < (date_trunc('year', CURRENT_DATE) + INTERVAL '1 year')::date
+GROUP BY d.dept_id, d.dept_name, d.dept_code, d.budget_allocation;
+
+-- Monthly Finance Trends
+CREATE OR REPLACE VIEW v_finance_monthly_trends AS
+SELECT
+    EXTRACT(YEAR FROM date_trunc('month', transaction_date::timestamp)) as year,
+    EXTRACT(MONTH FROM date_trunc('month', transaction_date::timestamp)) as month,
+    transaction_type,
+    SUM(amount) as total_amount,
+    COUNT(*) as transaction_count
+FROM finance_transactions
+WHERE status = 'Completed'
+GROUP BY date_trunc('month', transaction_date::timestamp), transaction_type
+ORDER BY year, month, transaction_type;
+
+-- Procurement Dashboard Views
+CREATE OR REPLACE VIEW v_procurement_summary AS
+SELECT
+    d.dept_name,
+    COUNT(po.order_id) as total_orders,
+    SUM(po.grand_total) as total_value,
+    AVG(po.grand_total) as avg_order_value,
+    COUNT(CASE WHEN po.status = 'Received' THEN 1 END) as completed_orders,
+    COUNT(CASE WHEN po.status = 'Pending' OR po.status = 'Approved' THEN 1 END) as pending_orders
+FROM finance_departments d
+LEFT JOIN procurement_orders po ON d.dept_id = po.dept_id
+    AND po.order_date >= date_trunc('year', CURRENT_DATE)::date
+    AND po.order_date < (date_trunc('year', CURRENT_DATE) + INTERVAL '1 year')::date
+GROUP BY d.dept_id, d.dept_name;
+
+-- Vendor Performance
+CREATE OR REPLACE VIEW v_vendor_performance AS
+SELECT
+    v.vendor_name,
+    v.vendor_code,
+    v.rating,
+    COUNT(po.order_id) as total_orders,
+    SUM(po.grand_total) as total_value,
+    AVG(po.grand_total) as avg_order_value,
+    COUNT(CASE WHEN po.status = 'Received' THEN 1 END) as completed_orders,
+    ROUND((COUNT(CASE WHEN po.status = 'Received' THEN 1 END)::DECIMAL / COUNT(po.order_id)) * 100, 2) as completion_rate
+FROM procurement_vendors v
+LEFT JOIN procurement_orders po ON v.vendor_id = po.vendor_id
+    AND po.order_date >= date_trunc('year', CURRENT_DATE)::date
+    AND po.order_date < (date_trunc('year', CURRENT_DATE) + INTERVAL '1 year')::date
+GROUP BY v.vendor_id, v.vendor_name, v.vendor_code, v.rating;
+
+-- Category Analysis
+CREATE OR REPLACE VIEW v_category_analysis AS
+SELECT
+    c.category_name,
+    c.category_code,
+    COUNT(po.order_id) as order_count,
+    SUM(po.grand_total) as total_value,
+    AVG(po.grand_total) as avg_order_value,
+    COUNT(DISTINCT po.vendor_id) as unique_vendors
+FROM procurement_categories c
+LEFT JOIN procurement_orders po ON c.category_id = po.category_id
+    AND po.order_date >= date_trunc('year', CURRENT_DATE)::date
+    AND po.order_date < (date_trunc('year', CURRENT_DATE) + INTERVAL '1 year')::date
+GROUP BY c.category_id, c.category_name, c.category_code;
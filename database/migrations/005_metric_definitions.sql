@@ -0,0 +1,40 @@
+-- =====================================================
+-- MIGRATION 005: ALIGN DASHBOARD VIEWS WITH THE METRIC REGISTRY
+-- src/metrics.py is the single definition of the dashboard metrics. Two
+-- views disagreed with it:
+--   * v_procurement_summary counted 'Pending'/'Approved' as pending orders;
+--     pending means Draft, Submitted, Approved or Ordered (no order is ever
+--     'Pending').
+--   * v_vendor_performance divided by COUNT(po.order_id) without NULLIF, so
+--     selecting a vendor without orders this year raised division by zero.
+-- =====================================================
+
+CREATE OR REPLACE VIEW v_procurement_summary AS
+SELECT
+    d.dept_name,
+    COUNT(po.order_id) as total_orders,
+    SUM(po.grand_total) as total_value,
+    AVG(po.grand_total) as avg_order_value,
+    COUNT(CASE WHEN po.status = 'Received' THEN 1 END) as completed_orders,
+    COUNT(CASE WHEN po.status IN ('Draft', 'Submitted', 'Approved', 'Ordered') THEN 1 END) as pending_orders
+FROM finance_departments d
+LEFT JOIN procurement_orders po ON d.dept_id = po.dept_id
+    AND po.order_date >= date_trunc('year', CURRENT_DATE)::date
+    AND po.order_date < (date_trunc('year', CURRENT_DATE) + INTERVAL '1 year')::date
+GROUP BY d.dept_id, d.dept_name;
+
+CREATE OR REPLACE VIEW v_vendor_performance AS
+SELECT
+    v.vendor_name,
+    v.vendor_code,
+    v.rating,
+    COUNT(po.order_id) as total_orders,
+    SUM(po.grand_total) as total_value,
+    AVG(po.grand_total) as avg_order_value,
+    COUNT(CASE WHEN po.status = 'Received' THEN 1 END) as completed_orders,
+    ROUND(COUNT(CASE WHEN po.status = 'Received' THEN 1 END)::DECIMAL * 100 / NULLIF(COUNT(po.order_id), 0), 2) as completion_rate
+FROM procurement_vendors v
+LEFT JOIN procurement_orders po ON v.vendor_id = po.vendor_id
+    AND po.order_date >= date_trunc('year', CURRENT_DATE)::date
+    AND po.order_date < (date_trunc('year', CURRENT_DATE) + INTERVAL '1 year')::date
+GROUP BY v.vendor_id, v.vendor_name, v.vendor_code, v.rating;
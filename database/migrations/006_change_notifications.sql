@@ -0,0 +1,79 @@
+-- =====================================================
+-- MIGRATION 006: CHANGE NOTIFICATIONS WITH AFFECTED WINDOWS
+-- The statement triggers from migration 003 only sent the table name, so
+-- the app could refresh the materialized views but not tell which cached
+-- query results a write affects. The payload is now a JSON object with the
+-- date range and departments of the rows a statement touched:
+--     {"table": "finance_transactions", "from": "2024-03-01",
+--      "to": "2024-03-31", "dept_ids": [2, 5]}
+-- The range covers both old and new rows, so moving a row between dates or
+-- departments invalidates both sides. Budgets report their whole budget
+-- years. Statements that touch no rows send nothing.
+--
+-- Triggers with transition tables take a single event, hence one trigger
+-- per INSERT/UPDATE/DELETE. Arguments: the SQL expressions for the first
+-- and last date of a row.
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION notify_rows_changed()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_rows text;
+    v_payload text;
+BEGIN
+    v_rows := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT * FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT * FROM old_rows'
+        ELSE 'SELECT * FROM old_rows UNION ALL SELECT * FROM new_rows'
+    END;
+
+    EXECUTE format(
+        'SELECT json_build_object(''table'', %L, ''from'', MIN(%s), ''to'', MAX(%s),'
+        ' ''dept_ids'', json_agg(DISTINCT dept_id))::text'
+        ' FROM (%s) AS changed HAVING COUNT(*) > 0',
+        TG_TABLE_NAME, TG_ARGV[0], TG_ARGV[1], v_rows
+    ) INTO v_payload;
+
+    IF v_payload IS NOT NULL THEN
+        PERFORM pg_notify('reflexta_data_changed', v_payload);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_notify_finance_transactions ON finance_transactions;
+DROP TRIGGER IF EXISTS trigger_notify_procurement_orders ON procurement_orders;
+DROP FUNCTION IF EXISTS notify_data_changed();
+
+DO $$
+DECLARE
+    r record;
+    v_event text;
+BEGIN
+    FOR r IN
+        SELECT * FROM (VALUES
+            ('finance_transactions', 'transaction_date', 'transaction_date'),
+            ('procurement_orders', 'order_date', 'order_date'),
+            ('finance_budgets', 'make_date(budget_year, 1, 1)', 'make_date(budget_year, 12, 31)')
+        ) AS t(table_name, first_date, last_date)
+    LOOP
+        FOREACH v_event IN ARRAY ARRAY['insert', 'update', 'delete'] LOOP
+            EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I',
+                           'trigger_notify_' || v_event || '_' || r.table_name, r.table_name);
+            EXECUTE format(
+                'CREATE TRIGGER %I AFTER %s ON %I REFERENCING %s FOR EACH STATEMENT '
+                'EXECUTE FUNCTION notify_rows_changed(%L, %L)',
+                'trigger_notify_' || v_event || '_' || r.table_name,
+                upper(v_event),
+                r.table_name,
+                CASE v_event
+                    WHEN 'insert' THEN 'NEW TABLE AS new_rows'
+                    WHEN 'delete' THEN 'OLD TABLE AS old_rows'
+                    ELSE 'OLD TABLE AS old_rows NEW TABLE AS new_rows'
+                END,
+                r.first_date,
+                r.last_date
+            );
+        END LOOP;
+    END LOOP;
+END $$;
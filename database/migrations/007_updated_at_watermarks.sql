@@ -0,0 +1,40 @@
+-- =====================================================
+-- MIGRATION 007: UPDATED_AT WATERMARKS FOR LIVE DELTA POLLING
+-- The live Finance Dashboard fetches only the rows with an updated_at newer
+-- than the last one it has seen. That needs two things the schema did not
+-- guarantee: updated_at must move on every UPDATE (it only had a default,
+-- so writers that forgot to set it were invisible), and "updated_at > $1"
+-- must be an index range scan instead of a full scan of the fact table.
+--
+-- Updates that change nothing keep their timestamp, so a no-op UPDATE does
+-- not make every live dashboard re-read the rows.
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION touch_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW IS DISTINCT FROM OLD AND NEW.updated_at IS NOT DISTINCT FROM OLD.updated_at THEN
+        NEW.updated_at := CURRENT_TIMESTAMP;
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Row triggers on a partitioned table are cloned onto every partition
+DROP TRIGGER IF EXISTS trigger_touch_finance_transactions ON finance_transactions;
+CREATE TRIGGER trigger_touch_finance_transactions
+    BEFORE UPDATE ON finance_transactions
+    FOR EACH ROW
+    EXECUTE FUNCTION touch_updated_at();
+
+DROP TRIGGER IF EXISTS trigger_touch_procurement_orders ON procurement_orders;
+CREATE TRIGGER trigger_touch_procurement_orders
+    BEFORE UPDATE ON procurement_orders
+    FOR EACH ROW
+    EXECUTE FUNCTION touch_updated_at();
+
+CREATE INDEX IF NOT EXISTS idx_finance_transactions_updated_at
+    ON finance_transactions (updated_at);
+
+CREATE INDEX IF NOT EXISTS idx_procurement_orders_updated_at
+    ON procurement_orders (updated_at);
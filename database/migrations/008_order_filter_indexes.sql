@@ -0,0 +1,24 @@
+-- =====================================================
+-- MIGRATION 008: INDEXES FOR THE PROCUREMENT FILTERS
+-- Every procurement query now takes optional status, vendor, category and
+-- priority predicates (`= ANY(array)` on the order columns) next to the
+-- order_date window. Each gets a (column, order_date) index, so a narrow
+-- selection reads only the matching orders of the window instead of the
+-- whole window. The single-column vendor and status indexes from migration
+-- 001 are prefixes of the new ones and are dropped.
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_procurement_orders_status_date
+    ON procurement_orders (status, order_date);
+
+CREATE INDEX IF NOT EXISTS idx_procurement_orders_vendor_date
+    ON procurement_orders (vendor_id, order_date);
+
+CREATE INDEX IF NOT EXISTS idx_procurement_orders_category_date
+    ON procurement_orders (category_id, order_date);
+
+CREATE INDEX IF NOT EXISTS idx_procurement_orders_priority_date
+    ON procurement_orders (priority, order_date);
+
+DROP INDEX IF EXISTS idx_procurement_orders_vendor;
+DROP INDEX IF EXISTS idx_procurement_orders_status;
@@ -0,0 +1,45 @@
+-- =====================================================
+-- MIGRATION 009: DIMENSION TABLE VERSIONS
+-- The filter widgets read departments, vendors and categories once and keep
+-- them in memory (src/dimensions.py). To know when to read them again
+-- without scanning them, every write to a dimension table bumps its row in
+-- dimension_versions. The app polls that small table.
+-- The write is also announced on reflexta_data_changed with the table name
+-- only. Cached results carry dimension names, so the cache invalidation
+-- treats that as "anything may have changed".
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS dimension_versions (
+    table_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION bump_dimension_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO dimension_versions (table_name, version)
+    VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE
+        SET version = dimension_versions.version + 1,
+            changed_at = CURRENT_TIMESTAMP;
+    PERFORM pg_notify('reflexta_data_changed', json_build_object('table', TG_TABLE_NAME)::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    v_table text;
+BEGIN
+    FOREACH v_table IN ARRAY ARRAY['finance_departments', 'procurement_vendors', 'procurement_categories'] LOOP
+        INSERT INTO dimension_versions (table_name) VALUES (v_table) ON CONFLICT DO NOTHING;
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trigger_dimension_version_' || v_table, v_table);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION bump_dimension_version()',
+            'trigger_dimension_version_' || v_table,
+            v_table
+        );
+    END LOOP;
+END $$;
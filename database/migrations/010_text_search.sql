@@ -0,0 +1,30 @@
+-- =====================================================
+-- MIGRATION 010: TEXT SEARCH INDEXES
+-- The dashboards search transactions by description, vendor name and
+-- reference number, and orders by order number and notes (src/search.py).
+-- Each table gets one search document, the searched columns joined with
+-- spaces, and two GIN indexes on it: a 'simple' tsvector for word and
+-- word-prefix matches, and pg_trgm trigrams for substring matches
+-- ("INV-20" inside a reference number, a fragment of a vendor name).
+-- Both are expression indexes, so the partitioned tables are not rewritten.
+-- src/search.py builds the same expressions; keep the two in step.
+-- =====================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_finance_transactions_search_tsv
+    ON finance_transactions USING GIN (to_tsvector('simple',
+        coalesce(description, '') || ' ' || coalesce(vendor_name, '') || ' ' || coalesce(reference_number, '')));
+
+CREATE INDEX IF NOT EXISTS idx_finance_transactions_search_trgm
+    ON finance_transactions USING GIN (
+        (coalesce(description, '') || ' ' || coalesce(vendor_name, '') || ' ' || coalesce(reference_number, ''))
+        gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_procurement_orders_search_tsv
+    ON procurement_orders USING GIN (to_tsvector('simple',
+        coalesce(order_number, '') || ' ' || coalesce(notes, '')));
+
+CREATE INDEX IF NOT EXISTS idx_procurement_orders_search_trgm
+    ON procurement_orders USING GIN (
+        (coalesce(order_number, '') || ' ' || coalesce(notes, '')) gin_trgm_ops);
@@ -0,0 +1,22 @@
+-- =====================================================
+-- MIGRATION 011: INDEXES FOR THE DRILL-DOWN PATHS
+-- The drill-down engine (src/drill_down.py) queries one level at a time,
+-- filtered by the ids clicked above it: department, then cost center, then
+-- account. Each of those gets a (column, transaction_date) index so a level
+-- reads only the transactions under its path within the window. The order
+-- hierarchies filter on vendor_id and category_id, already covered by
+-- migration 008. The single-column dept and account indexes from
+-- schema.sql are prefixes of the new ones and are dropped.
+-- =====================================================
+
+CREATE INDEX IF NOT EXISTS idx_finance_transactions_dept_date
+    ON finance_transactions (dept_id, transaction_date);
+
+CREATE INDEX IF NOT EXISTS idx_finance_transactions_cost_center_date
+    ON finance_transactions (cost_center_id, transaction_date);
+
+CREATE INDEX IF NOT EXISTS idx_finance_transactions_account_date
+    ON finance_transactions (account_id, transaction_date);
+
+DROP INDEX IF EXISTS idx_finance_transactions_dept;
+DROP INDEX IF EXISTS idx_finance_transactions_account;
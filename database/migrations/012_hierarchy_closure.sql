@@ -0,0 +1,80 @@
+-- =====================================================
+-- MIGRATION 012: CLOSURE TABLES FOR THE ACCOUNT AND CATEGORY HIERARCHIES
+-- finance_accounts.parent_account_id and
+-- procurement_categories.parent_category_id form trees. The rollup queries
+-- (src/rollups.py) total a node over all its descendants by joining a
+-- closure table: one (ancestor_id, descendant_id, depth) row per pair,
+-- including every node with itself at depth 0. Queries need no recursive
+-- CTEs that way.
+-- The hierarchy tables are small and seldom written, so each writing
+-- statement rebuilds its closure table in the same transaction. Moving a
+-- subtree is then as simple as changing one parent id. finance_accounts
+-- also bumps its dimension version (migration 009), so cached rollups are
+-- invalidated after the hierarchy changes.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS finance_account_closure (
+    ancestor_id INTEGER NOT NULL,
+    descendant_id INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+);
+CREATE INDEX IF NOT EXISTS idx_finance_account_closure_descendant
+    ON finance_account_closure (descendant_id);
+
+CREATE TABLE IF NOT EXISTS procurement_category_closure (
+    ancestor_id INTEGER NOT NULL,
+    descendant_id INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+);
+CREATE INDEX IF NOT EXISTS idx_procurement_category_closure_descendant
+    ON procurement_category_closure (descendant_id);
+
+-- Rebuild closure table p_closure of the tree p_table(p_key, p_parent).
+-- Paths longer than 64 levels are cut off, so a parent cycle cannot loop.
+CREATE OR REPLACE FUNCTION rebuild_closure(p_closure text, p_table text, p_key text, p_parent text)
+RETURNS void AS $$
+BEGIN
+    EXECUTE format('DELETE FROM %I', p_closure);
+    EXECUTE format(
+        'INSERT INTO %1$I (ancestor_id, descendant_id, depth) '
+        'WITH RECURSIVE tree AS ('
+        '    SELECT %3$I AS ancestor_id, %3$I AS descendant_id, 0 AS depth FROM %2$I '
+        '    UNION ALL '
+        '    SELECT tree.ancestor_id, child.%3$I, tree.depth + 1 '
+        '    FROM tree JOIN %2$I child ON child.%4$I = tree.descendant_id '
+        '    WHERE tree.depth < 64'
+        ') '
+        'SELECT ancestor_id, descendant_id, MIN(depth) FROM tree GROUP BY ancestor_id, descendant_id',
+        p_closure, p_table, p_key, p_parent
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION maintain_closure()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM rebuild_closure(TG_ARGV[0], TG_TABLE_NAME, TG_ARGV[1], TG_ARGV[2]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_closure_finance_accounts ON finance_accounts;
+CREATE TRIGGER trigger_closure_finance_accounts
+    AFTER INSERT OR DELETE OR UPDATE OF account_id, parent_account_id ON finance_accounts
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_closure('finance_account_closure', 'account_id', 'parent_account_id');
+
+DROP TRIGGER IF EXISTS trigger_closure_procurement_categories ON procurement_categories;
+CREATE TRIGGER trigger_closure_procurement_categories
+    AFTER INSERT OR DELETE OR UPDATE OF category_id, parent_category_id ON procurement_categories
+    FOR EACH STATEMENT EXECUTE FUNCTION maintain_closure('procurement_category_closure', 'category_id', 'parent_category_id');
+
+SELECT rebuild_closure('finance_account_closure', 'finance_accounts', 'account_id', 'parent_account_id');
+SELECT rebuild_closure('procurement_category_closure', 'procurement_categories', 'category_id', 'parent_category_id');
+
+INSERT INTO dimension_versions (table_name) VALUES ('finance_accounts') ON CONFLICT DO NOTHING;
+DROP TRIGGER IF EXISTS trigger_dimension_version_finance_accounts ON finance_accounts;
+CREATE TRIGGER trigger_dimension_version_finance_accounts
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON finance_accounts
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_dimension_version();
@@ -0,0 +1,191 @@
+-- =====================================================
+-- MIGRATION 013: ORDER TOTALS IN THE REPORTING CURRENCY
+-- procurement_orders.currency is USD, EUR or GBP, but every procurement
+-- aggregate summed grand_total as if all orders were in one unit.
+--
+-- fx_rates holds the value of one unit of each currency in the reporting
+-- currency, per date. It is loaded from database/fx_rates.csv by
+-- database/load_fx_rates.py, which also picks the reporting currency.
+-- Each order stores its grand total converted at the rate of its order date
+-- (the latest rate on or before that date) in reporting_total. A row trigger
+-- keeps it current as orders are written. The metrics, the month views, the
+-- OLAP cube and the live windows all sum reporting_total, so converting
+-- costs nothing at query time.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS fx_rates (
+    currency VARCHAR(3) NOT NULL,
+    rate_date DATE NOT NULL,
+    rate NUMERIC(18, 8) NOT NULL CHECK (rate > 0),
+    PRIMARY KEY (currency, rate_date)
+);
+
+ALTER TABLE procurement_orders ADD COLUMN IF NOT EXISTS reporting_total DECIMAL(15,2);
+
+-- Rate of p_currency on p_date: the latest one on or before the date, or the
+-- earliest one for dates before the first rate. NULL for unknown currencies.
+CREATE OR REPLACE FUNCTION fx_rate(p_currency text, p_date date)
+RETURNS numeric AS $$
+    SELECT rate FROM (
+        (SELECT rate, 0 AS preference FROM fx_rates
+         WHERE currency = p_currency AND rate_date <= p_date
+         ORDER BY rate_date DESC LIMIT 1)
+        UNION ALL
+        (SELECT rate, 1 AS preference FROM fx_rates
+         WHERE currency = p_currency AND rate_date > p_date
+         ORDER BY rate_date LIMIT 1)
+    ) candidates
+    ORDER BY preference
+    LIMIT 1;
+$$ LANGUAGE sql STABLE;
+
+-- grand_total is a generated column, which is not computed yet when BEFORE
+-- triggers run, so the trigger adds up its parts itself
+CREATE OR REPLACE FUNCTION convert_order_total()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.reporting_total := ROUND(
+        (NEW.total_amount + COALESCE(NEW.tax_amount, 0) + COALESCE(NEW.shipping_amount, 0))
+        * fx_rate(COALESCE(NEW.currency, 'USD'), NEW.order_date),
+        2
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Row triggers on a partitioned table are cloned onto every partition
+DROP TRIGGER IF EXISTS trigger_convert_procurement_orders ON procurement_orders;
+CREATE TRIGGER trigger_convert_procurement_orders
+    BEFORE INSERT OR UPDATE OF total_amount, tax_amount, shipping_amount, currency, order_date
+    ON procurement_orders
+    FOR EACH ROW
+    EXECUTE FUNCTION convert_order_total();
+
+-- Re-convert every order after fx_rates changed, as one set-based update
+-- against the rate validity ranges. Returns the number of orders changed.
+CREATE OR REPLACE FUNCTION convert_order_totals()
+RETURNS bigint AS $$
+DECLARE
+    v_changed bigint;
+BEGIN
+    WITH ranges AS (
+        SELECT
+            currency,
+            CASE WHEN rate_date = MIN(rate_date) OVER (PARTITION BY currency)
+                 THEN '-infinity'::date ELSE rate_date END AS valid_from,
+            COALESCE(LEAD(rate_date) OVER (PARTITION BY currency ORDER BY rate_date), 'infinity'::date) AS valid_to,
+            rate
+        FROM fx_rates
+    ),
+    converted AS (
+        SELECT po.order_id, po.order_date, ROUND(po.grand_total * r.rate, 2) AS reporting_total
+        FROM procurement_orders po
+        LEFT JOIN ranges r
+            ON r.currency = COALESCE(po.currency, 'USD')
+            AND po.order_date >= r.valid_from
+            AND po.order_date < r.valid_to
+    )
+    UPDATE procurement_orders po
+    SET reporting_total = converted.reporting_total
+    FROM converted
+    WHERE po.order_id = converted.order_id
+        AND po.order_date = converted.order_date
+        AND po.reporting_total IS DISTINCT FROM converted.reporting_total;
+    GET DIAGNOSTICS v_changed = ROW_COUNT;
+    RETURN v_changed;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT convert_order_totals();
+
+-- Month views (migration 003) over the converted totals
+DROP MATERIALIZED VIEW IF EXISTS mv_procurement_summary;
+CREATE MATERIALIZED VIEW mv_procurement_summary AS
+SELECT
+    date_trunc('month', order_date::timestamp)::date AS month_start,
+    COALESCE(dept_id, 0) AS dept_id,
+    COUNT(*) AS total_orders,
+    SUM(reporting_total) AS total_value,
+    COUNT(CASE WHEN status = 'Received' THEN 1 END) AS completed_orders,
+    COUNT(CASE WHEN status IN ('Draft', 'Submitted', 'Approved', 'Ordered') THEN 1 END) AS pending_orders
+FROM procurement_orders
+GROUP BY 1, 2;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_procurement_summary
+    ON mv_procurement_summary (month_start, dept_id);
+
+DROP MATERIALIZED VIEW IF EXISTS mv_vendor_performance;
+CREATE MATERIALIZED VIEW mv_vendor_performance AS
+SELECT
+    date_trunc('month', order_date::timestamp)::date AS month_start,
+    COALESCE(vendor_id, 0) AS vendor_id,
+    COALESCE(dept_id, 0) AS dept_id,
+    COUNT(*) AS total_orders,
+    SUM(reporting_total) AS total_value,
+    COUNT(CASE WHEN status = 'Received' THEN 1 END) AS completed_orders
+FROM procurement_orders
+GROUP BY 1, 2, 3;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_vendor_performance
+    ON mv_vendor_performance (month_start, vendor_id, dept_id);
+
+DROP MATERIALIZED VIEW IF EXISTS mv_category_analysis;
+CREATE MATERIALIZED VIEW mv_category_analysis AS
+SELECT
+    date_trunc('month', order_date::timestamp)::date AS month_start,
+    COALESCE(category_id, 0) AS category_id,
+    COALESCE(dept_id, 0) AS dept_id,
+    COALESCE(vendor_id, 0) AS vendor_id,
+    COUNT(*) AS order_count,
+    SUM(reporting_total) AS total_value,
+    COUNT(CASE WHEN status = 'Received' THEN 1 END) AS completed_orders
+FROM procurement_orders
+GROUP BY 1, 2, 3, 4;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_mv_category_analysis
+    ON mv_category_analysis (month_start, category_id, dept_id, vendor_id);
+
+-- Dashboard views (migrations 004 and 005)
+CREATE OR REPLACE VIEW v_procurement_summary AS
+SELECT
+    d.dept_name,
+    COUNT(po.order_id) as total_orders,
+    SUM(po.reporting_total) as total_value,
+    AVG(po.reporting_total) as avg_order_value,
+    COUNT(CASE WHEN po.status = 'Received' THEN 1 END) as completed_orders,
+    COUNT(CASE WHEN po.status IN ('Draft', 'Submitted', 'Approved', 'Ordered') THEN 1 END) as pending_orders
+FROM finance_departments d
+LEFT JOIN procurement_orders po ON d.dept_id = po.dept_id
+    AND po.order_date >= date_trunc('year', CURRENT_DATE)::date
+    AND po.order_date < (date_trunc('year', CURRENT_DATE) + INTERVAL '1 year')::date
+GROUP BY d.dept_id, d.dept_name;
+
+CREATE OR REPLACE VIEW v_vendor_performance AS
+SELECT
+    v.vendor_name,
+    v.vendor_code,
+    v.rating,
+    COUNT(po.order_id) as total_orders,
+    SUM(po.reporting_total) as total_value,
+    AVG(po.reporting_total) as avg_order_value,
+    COUNT(CASE WHEN po.status = 'Received' THEN 1 END) as completed_orders,
+    ROUND(COUNT(CASE WHEN po.status = 'Received' THEN 1 END)::DECIMAL * 100 / NULLIF(COUNT(po.order_id), 0), 2) as completion_rate
+FROM procurement_vendors v
+LEFT JOIN procurement_orders po ON v.vendor_id = po.vendor_id
+    AND po.order_date >= date_trunc('year', CURRENT_DATE)::date
+    AND po.order_date < (date_trunc('year', CURRENT_DATE) + INTERVAL '1 year')::date
+GROUP BY v.vendor_id, v.vendor_name, v.vendor_code, v.rating;
+
+CREATE OR REPLACE VIEW v_category_analysis AS
+SELECT
+    c.category_name,
+    c.category_code,
+    COUNT(po.order_id) as order_count,
+    SUM(po.reporting_total) as total_value,
+    AVG(po.reporting_total) as avg_order_value,
+    COUNT(DISTINCT po.vendor_id) as unique_vendors
+FROM procurement_categories c
+LEFT JOIN procurement_orders po ON c.category_id = po.category_id
+    AND po.order_date >= date_trunc('year', CURRENT_DATE)::date
+    AND po.order_date < (date_trunc('year', CURRENT_DATE) + INTERVAL '1 year')::date
+GROUP BY c.category_id, c.category_name, c.category_code;
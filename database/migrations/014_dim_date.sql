@@ -0,0 +1,140 @@
+-- =====================================================
+-- MIGRATION 014: DATE DIMENSION WITH FISCAL CALENDAR
+-- Trend queries computed EXTRACT(...) and TO_CHAR(...) on every fact row
+-- of every request. dim_date holds those attributes once per day:
+-- calendar and ISO week fields, the fiscal year, quarter, period and week,
+-- the start date of every bucket, and display labels. Trend queries join the
+-- fact date to date_key and group by a bucket start column. The window's
+-- rows of dim_date also list every bucket, so empty buckets can be filled.
+-- (src/date_dimension.py)
+--
+-- Fiscal years start on the first day of a configurable month and are
+-- named after the calendar year they end in (FY2025 = Jul 2024 - Jun 2025
+-- for a July start). Fiscal periods are calendar months numbered from the
+-- fiscal year start. Fiscal weeks are 7-day blocks counted from the fiscal
+-- year start, so the last one can be short. Re-run populate_dim_date() with
+-- another start month (database/build_dim_date.py) to change the calendar.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS dim_date (
+    date_key DATE PRIMARY KEY,
+    year SMALLINT NOT NULL,
+    quarter SMALLINT NOT NULL,
+    month SMALLINT NOT NULL,
+    day_of_month SMALLINT NOT NULL,
+    day_of_week SMALLINT NOT NULL,            -- ISO: Monday = 1
+    is_weekend BOOLEAN NOT NULL,
+    iso_year SMALLINT NOT NULL,
+    iso_week SMALLINT NOT NULL,
+    month_name VARCHAR(3) NOT NULL,           -- 'Jan'
+    quarter_name VARCHAR(1) NOT NULL,         -- '1'
+    week_name VARCHAR(2) NOT NULL,            -- '05'
+    week_start DATE NOT NULL,
+    month_start DATE NOT NULL,
+    quarter_start DATE NOT NULL,
+    year_start DATE NOT NULL,
+    fiscal_year SMALLINT NOT NULL,
+    fiscal_quarter SMALLINT NOT NULL,
+    fiscal_period SMALLINT NOT NULL,
+    fiscal_week SMALLINT NOT NULL,
+    fiscal_week_start DATE NOT NULL,
+    fiscal_quarter_start DATE NOT NULL,
+    fiscal_year_start DATE NOT NULL,
+    day_label VARCHAR(10) NOT NULL,           -- '2025-01-31'
+    week_label VARCHAR(8) NOT NULL,           -- '2025-W05'
+    month_label VARCHAR(8) NOT NULL,          -- 'Jan 2025'
+    quarter_label VARCHAR(7) NOT NULL,        -- '2025-Q1'
+    year_label VARCHAR(4) NOT NULL,           -- '2025'
+    fiscal_week_label VARCHAR(10) NOT NULL,   -- 'FY2025-W01'
+    fiscal_period_label VARCHAR(10) NOT NULL, -- 'FY2025-P01'
+    fiscal_quarter_label VARCHAR(9) NOT NULL, -- 'FY2025-Q1'
+    fiscal_year_label VARCHAR(6) NOT NULL     -- 'FY2025'
+);
+
+-- (Re)generate dim_date for [p_from, p_to] with fiscal years starting in
+-- month p_fiscal_start_month
+CREATE OR REPLACE FUNCTION populate_dim_date(
+    p_fiscal_start_month integer DEFAULT 1,
+    p_from date DEFAULT '2000-01-01',
+    p_to date DEFAULT '2059-12-31'
+)
+RETURNS void AS $$
+BEGIN
+    IF p_fiscal_start_month NOT BETWEEN 1 AND 12 THEN
+        RAISE EXCEPTION 'Fiscal year start month must be 1-12, got %', p_fiscal_start_month;
+    END IF;
+
+    DELETE FROM dim_date WHERE date_key BETWEEN p_from AND p_to;
+    INSERT INTO dim_date
+    SELECT
+        d,
+        EXTRACT(year FROM d),
+        EXTRACT(quarter FROM d),
+        EXTRACT(month FROM d),
+        EXTRACT(day FROM d),
+        EXTRACT(isodow FROM d),
+        EXTRACT(isodow FROM d) >= 6,
+        EXTRACT(isoyear FROM d),
+        EXTRACT(week FROM d),
+        TO_CHAR(d, 'Mon'),
+        TO_CHAR(d, 'Q'),
+        TO_CHAR(d, 'IW'),
+        date_trunc('week', d)::date,
+        date_trunc('month', d)::date,
+        date_trunc('quarter', d)::date,
+        date_trunc('year', d)::date,
+        f.fiscal_year,
+        (f.fiscal_period - 1) / 3 + 1,
+        f.fiscal_period,
+        (d - f.fiscal_year_start) / 7 + 1,
+        f.fiscal_year_start + ((d - f.fiscal_year_start) / 7) * 7,
+        (f.fiscal_year_start + make_interval(months => ((f.fiscal_period - 1) / 3) * 3))::date,
+        f.fiscal_year_start,
+        TO_CHAR(d, 'YYYY-MM-DD'),
+        TO_CHAR(d, 'IYYY-"W"IW'),
+        TO_CHAR(d, 'Mon YYYY'),
+        TO_CHAR(d, 'YYYY-"Q"Q'),
+        TO_CHAR(d, 'YYYY'),
+        'FY' || f.fiscal_year || '-W' || LPAD(((d - f.fiscal_year_start) / 7 + 1)::text, 2, '0'),
+        'FY' || f.fiscal_year || '-P' || LPAD(f.fiscal_period::text, 2, '0'),
+        'FY' || f.fiscal_year || '-Q' || ((f.fiscal_period - 1) / 3 + 1),
+        'FY' || f.fiscal_year
+    FROM generate_series(p_from, p_to, INTERVAL '1 day') AS days(day)
+    CROSS JOIN LATERAL (SELECT day::date AS d) AS dates
+    CROSS JOIN LATERAL (
+        SELECT
+            fy.fiscal_year_start,
+            EXTRACT(year FROM fy.fiscal_year_start)::integer + (p_fiscal_start_month > 1)::integer AS fiscal_year,
+            ((EXTRACT(month FROM d)::integer - p_fiscal_start_month + 12) % 12) + 1 AS fiscal_period
+        FROM (
+            SELECT make_date(
+                EXTRACT(year FROM d)::integer - (EXTRACT(month FROM d) < p_fiscal_start_month)::integer,
+                p_fiscal_start_month,
+                1
+            ) AS fiscal_year_start
+        ) AS fy
+    ) AS f;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Only fill an empty table, so re-running the migration keeps a configured
+-- fiscal calendar
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM dim_date) THEN
+        PERFORM populate_dim_date();
+    END IF;
+END;
+$$;
+
+-- Bucket lookups by start date (labels of the buckets in a window)
+CREATE INDEX IF NOT EXISTS idx_dim_date_week_start ON dim_date (week_start);
+CREATE INDEX IF NOT EXISTS idx_dim_date_month_start ON dim_date (month_start);
+CREATE INDEX IF NOT EXISTS idx_dim_date_fiscal_year_start ON dim_date (fiscal_year_start);
+
+-- Cached trend results depend on the calendar (migration 009)
+INSERT INTO dimension_versions (table_name) VALUES ('dim_date') ON CONFLICT DO NOTHING;
+DROP TRIGGER IF EXISTS trigger_dimension_version_dim_date ON dim_date;
+CREATE TRIGGER trigger_dimension_version_dim_date
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON dim_date
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_dimension_version();
@@ -0,0 +1,90 @@
+-- =====================================================
+-- MIGRATION 015: FACT TABLE VERSIONS
+-- The OLAP cube (src/olap_cube.py) reloads when the facts change. It used to
+-- tell by probing COUNT(*) and MAX(updated_at) of both partitioned fact
+-- tables every minute: two full counts per server, and blind to UPDATEs that
+-- leave updated_at alone. Every statement that writes rows now bumps the
+-- table's version in fact_versions and adjusts its row count from the
+-- transition tables, so the cube polls one small table instead.
+--
+-- Triggers with transition tables take a single event, hence one trigger
+-- per INSERT/UPDATE/DELETE, plus one for TRUNCATE. Statements that touch no
+-- rows change nothing.
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS fact_versions (
+    table_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    row_count BIGINT NOT NULL DEFAULT 0,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE OR REPLACE FUNCTION bump_fact_version()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_rows bigint;
+    v_delta bigint;
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        UPDATE fact_versions
+        SET version = version + 1, row_count = 0, changed_at = CURRENT_TIMESTAMP
+        WHERE table_name = TG_TABLE_NAME;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'INSERT' THEN
+        SELECT COUNT(*) INTO v_rows FROM new_rows;
+        v_delta := v_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT COUNT(*) INTO v_rows FROM old_rows;
+        v_delta := -v_rows;
+    ELSE
+        SELECT COUNT(*) INTO v_rows FROM new_rows;
+        v_delta := 0;
+    END IF;
+
+    IF v_rows > 0 THEN
+        UPDATE fact_versions
+        SET version = version + 1, row_count = row_count + v_delta, changed_at = CURRENT_TIMESTAMP
+        WHERE table_name = TG_TABLE_NAME;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    v_table text;
+    v_event text;
+BEGIN
+    FOREACH v_table IN ARRAY ARRAY['finance_transactions', 'procurement_orders'] LOOP
+        EXECUTE format(
+            'INSERT INTO fact_versions (table_name, row_count) SELECT %L, COUNT(*) FROM %I '
+            'ON CONFLICT (table_name) DO UPDATE SET row_count = EXCLUDED.row_count, '
+            'version = fact_versions.version + 1',
+            v_table, v_table
+        );
+        FOREACH v_event IN ARRAY ARRAY['insert', 'update', 'delete'] LOOP
+            EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I',
+                           'trigger_fact_version_' || v_event || '_' || v_table, v_table);
+            EXECUTE format(
+                'CREATE TRIGGER %I AFTER %s ON %I REFERENCING %s FOR EACH STATEMENT '
+                'EXECUTE FUNCTION bump_fact_version()',
+                'trigger_fact_version_' || v_event || '_' || v_table,
+                upper(v_event),
+                v_table,
+                CASE v_event
+                    WHEN 'insert' THEN 'NEW TABLE AS new_rows'
+                    WHEN 'delete' THEN 'OLD TABLE AS old_rows'
+                    ELSE 'OLD TABLE AS old_rows NEW TABLE AS new_rows'
+                END
+            );
+        END LOOP;
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', 'trigger_fact_version_truncate_' || v_table, v_table);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER TRUNCATE ON %I FOR EACH STATEMENT EXECUTE FUNCTION bump_fact_version()',
+            'trigger_fact_version_truncate_' || v_table,
+            v_table
+        );
+    END LOOP;
+END $$;
@@ -283,20 +283,21 @@ SELECT
 FROM finance_departments d
 LEFT JOIN finance_transactions t ON d.dept_id = t.dept_id 
     AND t.status = 'Completed'
-    AND EXTRACT(YEAR FROM t.transaction_date) = EXTRACT(YEAR FROM CURRENT_DATE)
+    AND t.transaction_date >= date_trunc('year', CURRENT_DATE)::date
+    AND t.transaction_date < (date_trunc('year', CURRENT_DATE) + INTERVAL '1 year')::date
 GROUP BY d.dept_id, d.dept_name, d.dept_code, d.budget_allocation;
 
 -- Monthly Finance Trends
 CREATE VIEW v_finance_monthly_trends AS
 SELECT 
-    EXTRACT(YEAR FROM transaction_date) as year,
-    EXTRACT(MONTH FROM transaction_date) as month,
+    EXTRACT(YEAR FROM date_trunc('month', transaction_date::timestamp)) as year,
+    EXTRACT(MONTH FROM date_trunc('month', transaction_date::timestamp)) as month,
     transaction_type,
     SUM(amount) as total_amount,
     COUNT(*) as transaction_count
 FROM finance_transactions
 WHERE status = 'Completed'
-GROUP BY EXTRACT(YEAR FROM transaction_date), EXTRACT(MONTH FROM transaction_date), transaction_type
+GROUP BY date_trunc('month', transaction_date::timestamp), transaction_type
 ORDER BY year, month, transaction_type;
 
 -- Procurement Dashboard Views
@@ -307,10 +308,11 @@ SELECT
     SUM(po.grand_total) as total_value,
     AVG(po.grand_total) as avg_order_value,
     COUNT(CASE WHEN po.status = 'Received' THEN 1 END) as completed_orders,
-    COUNT(CASE WHEN po.status = 'Pending' OR po.status = 'Approved' THEN 1 END) as pending_orders
+    COUNT(CASE WHEN po.status IN ('Draft', 'Submitted', 'Approved', 'Ordered') THEN 1 END) as pending_orders
 FROM finance_departments d
 LEFT JOIN procurement_orders po ON d.dept_id = po.dept_id
-    AND EXTRACT(YEAR FROM po.order_date) = EXTRACT(YEAR FROM CURRENT_DATE)
+    AND po.order_date >= date_trunc('year', CURRENT_DATE)::date
+    AND po.order_date < (date_trunc('year', CURRENT_DATE) + INTERVAL '1 year')::date
 GROUP BY d.dept_id, d.dept_name;
 
 -- Vendor Performance
@@ -323,10 +325,11 @@ SELECT
     SUM(po.grand_total) as total_value,
     AVG(po.grand_total) as avg_order_value,
     COUNT(CASE WHEN po.status = 'Received' THEN 1 END) as completed_orders,
-    ROUND((COUNT(CASE WHEN po.status = 'Received' THEN 1 END)::DECIMAL / COUNT(po.order_id)) * 100, 2) as completion_rate
+    ROUND(COUNT(CASE WHEN po.status = 'Received' THEN 1 END)::DECIMAL * 100 / NULLIF(COUNT(po.order_id), 0), 2) as completion_rate
 FROM procurement_vendors v
 LEFT JOIN procurement_orders po ON v.vendor_id = po.vendor_id
-    AND EXTRACT(YEAR FROM po.order_date) = EXTRACT(YEAR FROM CURRENT_DATE)
+    AND po.order_date >= date_trunc('year', CURRENT_DATE)::date
+    AND po.order_date < (date_trunc('year', CURRENT_DATE) + INTERVAL '1 year')::date
 GROUP BY v.vendor_id, v.vendor_name, v.vendor_code, v.rating;
 
 -- Category Analysis
@@ -340,7 +343,8 @@ SELECT
     COUNT(DISTINCT po.vendor_id) as unique_vendors
 FROM procurement_categories c
 LEFT JOIN procurement_orders po ON c.category_id = po.category_id
-    AND EXTRACT(YEAR FROM po.order_date) = EXTRACT(YEAR FROM CURRENT_DATE)
+    AND po.order_date >= date_trunc('year', CURRENT_DATE)::date
+    AND po.order_date < (date_trunc('year', CURRENT_DATE) + INTERVAL '1 year')::date
 GROUP BY c.category_id, c.category_name, c.category_code;
 
 -- =====================================================
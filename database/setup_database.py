@@ -5,6 +5,7 @@ Creates all necessary tables, views, and sample data for Finance and Procurement
 """
 
 import os
+import re
 import sys
 from pathlib import Path
 
@@ -13,7 +14,7 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine
 
 def get_database_url():
     """Get database URL from environment or secrets."""
@@ -35,6 +36,109 @@ def get_database_url():
     
     return db_url
 
+_DOLLAR_QUOTE = re.compile(r"\$[A-Za-z_]*\$")
+
+
+def split_sql_statements(sql_text):
+    """Split a SQL script on top-level semicolons.
+
+    Semicolons inside dollar-quoted bodies (``$$ ... $$``, ``$fn$ ... $fn$``),
+    string literals and ``--`` comments are ignored, so PL/pgSQL functions and
+    DO blocks are executed as a single statement.
+    """
+    statements = []
+    current = []
+    i = 0
+    length = len(sql_text)
+    dollar_tag = None
+    in_string = False
+
+    while i < length:
+        ch = sql_text[i]
+
+        if dollar_tag:
+            if sql_text.startswith(dollar_tag, i):
+                current.append(dollar_tag)
+                i += len(dollar_tag)
+                dollar_tag = None
+                continue
+        elif in_string:
+            if ch == "'":
+                in_string = False
+        elif ch == "'":
+            in_string = True
+        elif ch == "-" and sql_text.startswith("--", i):
+            end = sql_text.find("\n", i)
+            end = length if end == -1 else end
+            current.append(sql_text[i:end])
+            i = end
+            continue
+        elif ch == "$":
+            match = _DOLLAR_QUOTE.match(sql_text, i)
+            if match:
+                dollar_tag = match.group(0)
+                current.append(dollar_tag)
+                i += len(dollar_tag)
+                continue
+        elif ch == ";":
+            statements.append("".join(current).strip())
+            current = []
+            i += 1
+            continue
+
+        current.append(ch)
+        i += 1
+
+    statements.append("".join(current).strip())
+    return [stmt for stmt in statements if stmt and not _is_comment_only(stmt)]
+
+
+def _is_comment_only(statement):
+    """Return True if a statement contains nothing but ``--`` comments."""
+    return all(not line.strip() or line.strip().startswith("--") for line in statement.splitlines())
+
+
+def run_sql_file(engine, sql_file):
+    """Execute every statement of a SQL file, committing after each one."""
+
+    with open(sql_file, 'r', encoding='utf-8') as f:
+        statements = split_sql_statements(f.read())
+
+    failures = 0
+    with engine.connect() as conn:
+        for i, statement in enumerate(statements):
+            try:
+                # exec_driver_sql skips bind-parameter parsing, so ":" in
+                # PL/pgSQL bodies and casts is passed through untouched
+                conn.exec_driver_sql(statement)
+                conn.commit()
+                print(f"✅ Executed statement {i+1}/{len(statements)}")
+            except Exception as e:
+                conn.rollback()
+                failures += 1
+                print(f"⚠️ Warning executing statement {i+1}: {e}")
+                # Continue with other statements
+    return failures
+
+
+def apply_migrations(engine):
+    """Apply the numbered migrations in ``database/migrations`` in order.
+
+    Migrations are written to be idempotent, so re-running them against an
+    already migrated database is safe.
+    """
+
+    migrations_dir = Path(__file__).parent / "migrations"
+    if not migrations_dir.exists():
+        return True
+
+    for migration in sorted(migrations_dir.glob("*.sql")):
+        print(f"🔄 Applying migration {migration.name}...")
+        if run_sql_file(engine, migration):
+            print(f"⚠️ Migration {migration.name} finished with warnings")
+    return True
+
+
 def setup_database():
     """Set up the database with all tables and sample data."""
     
@@ -49,25 +153,20 @@ def setup_database():
         return False
     
     try:
-        with open(schema_file, 'r', encoding='utf-8') as f:
-            schema_sql = f.read()
-        
         print("🔄 Setting up database schema...")
         
-        # Execute the schema
-        with engine.connect() as conn:
-            # Split by semicolon and execute each statement
-            statements = [stmt.strip() for stmt in schema_sql.split(';') if stmt.strip()]
-            
-            for i, statement in enumerate(statements):
-                if statement:
-                    try:
-                        conn.execute(text(statement))
-                        conn.commit()
-                        print(f"✅ Executed statement {i+1}/{len(statements)}")
-                    except Exception as e:
-                        print(f"⚠️ Warning executing statement {i+1}: {e}")
-                        # Continue with other statements
+        # Execute the schema, then bring it up to date with the migrations
+        run_sql_file(engine, schema_file)
+        apply_migrations(engine)
+
+        # Order totals in the reporting currency need the rates (migration 013)
+        from database.load_fx_rates import load_fx_rates
+        load_fx_rates(engine)
+
+        # The fiscal calendar of dim_date (migration 014) follows FISCAL_YEAR_START_MONTH
+        if os.getenv("FISCAL_YEAR_START_MONTH", "1") != "1":
+            from database.build_dim_date import build_dim_date
+            build_dim_date(engine)
         
         print("✅ Database setup completed successfully!")
         return True
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Concurrency stress test for the batched budget trigger.
+
+Runs many concurrent bulk approvals, reversals and amount edits against
+finance_transactions and then checks that every budget's spent_amount moved
+by exactly the change in completed transaction totals for its
+(dept, cost center, account, year) key.
+
+Usage:
+    python database/stress_budget_trigger.py --workers 8 --rounds 50
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+# Add the project root to Python path
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import create_engine, text
+
+from database.setup_database import get_database_url
+
+BUDGET_SPENT_SQL = text("""
+    SELECT budget_id, spent_amount
+    FROM finance_budgets
+    ORDER BY budget_id
+""")
+
+# Completed totals per budget key, mirroring the trigger's definition
+COMPLETED_TOTALS_SQL = text("""
+    SELECT b.budget_id, COALESCE(SUM(t.amount), 0) AS completed_amount
+    FROM finance_budgets b
+    LEFT JOIN finance_transactions t
+      ON t.dept_id = b.dept_id
+     AND t.cost_center_id = b.cost_center_id
+     AND t.account_id = b.account_id
+     AND EXTRACT(YEAR FROM t.transaction_date) = b.budget_year
+     AND t.status = 'Completed'
+    GROUP BY b.budget_id
+    ORDER BY b.budget_id
+""")
+
+OPERATIONS = {
+    # Bulk approval of a random slice of non-completed rows
+    "complete": text("""
+        UPDATE finance_transactions SET status = 'Completed', updated_at = CURRENT_TIMESTAMP
+        WHERE status <> 'Completed' AND transaction_id % :modulus = :remainder
+    """),
+    # Reversal of a random slice of completed rows
+    "reverse": text("""
+        UPDATE finance_transactions SET status = 'Approved', updated_at = CURRENT_TIMESTAMP
+        WHERE status = 'Completed' AND transaction_id % :modulus = :remainder
+    """),
+    # Amount edit on completed and non-completed rows alike
+    "edit": text("""
+        UPDATE finance_transactions SET amount = ROUND(amount * 1.01, 2), updated_at = CURRENT_TIMESTAMP
+        WHERE transaction_id % :modulus = :remainder
+    """),
+}
+
+
+def _snapshot(engine):
+    with engine.connect() as conn:
+        spent = {row.budget_id: Decimal(row.spent_amount or 0) for row in conn.execute(BUDGET_SPENT_SQL)}
+        completed = {row.budget_id: Decimal(row.completed_amount) for row in conn.execute(COMPLETED_TOTALS_SQL)}
+    return spent, completed
+
+
+def _worker(engine, rounds, seed, stats, errors):
+    rng = random.Random(seed)
+    for _ in range(rounds):
+        name = rng.choice(list(OPERATIONS))
+        params = {"modulus": rng.randint(3, 11)}
+        params["remainder"] = rng.randrange(params["modulus"])
+        try:
+            with engine.begin() as conn:
+                result = conn.execute(OPERATIONS[name], params)
+            with stats["lock"]:
+                stats[name] += 1
+                stats["rows"] += result.rowcount
+        except Exception as exc:  # noqa: BLE001
+            errors.append(f"{name}: {exc}")
+
+
+def run_stress_test(workers, rounds):
+    """Run the stress test and return True when all budgets reconcile."""
+
+    engine = create_engine(get_database_url(), pool_size=workers, max_overflow=0)
+    spent_before, completed_before = _snapshot(engine)
+
+    stats = {"lock": threading.Lock(), "complete": 0, "reverse": 0, "edit": 0, "rows": 0}
+    errors = []
+    threads = [
+        threading.Thread(target=_worker, args=(engine, rounds, seed, stats, errors))
+        for seed in range(workers)
+    ]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    spent_after, completed_after = _snapshot(engine)
+
+    print(f"⏱️ {workers} workers x {rounds} statements in {elapsed:.2f}s "
+          f"({stats['rows']:,} rows updated: {stats['complete']} completions, "
+          f"{stats['reverse']} reversals, {stats['edit']} edits)")
+
+    for error in errors:
+        print(f"⚠️ {error}")
+
+    mismatches = []
+    for budget_id, before in spent_before.items():
+        expected = before + completed_after[budget_id] - completed_before[budget_id]
+        if spent_after[budget_id] != expected:
+            mismatches.append((budget_id, expected, spent_after[budget_id]))
+
+    for budget_id, expected, actual in mismatches:
+        print(f"❌ Budget {budget_id}: expected spent {expected}, found {actual}")
+    if not mismatches and not errors:
+        print(f"✅ All {len(spent_before)} budgets reconcile")
+    return not mismatches and not errors
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Stress test the batched budget trigger")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    print("⚠️ This test rewrites transaction statuses and amounts. Do not run it against production.")
+    sys.exit(0 if run_stress_test(args.workers, args.rounds) else 1)
+
+
+if __name__ == "__main__":
+    main()
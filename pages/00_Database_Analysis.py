@@ -10,6 +10,8 @@ from typing import Optional, Any
 
 # Import database and query functions
 from src.db import get_conn, health_check
+from src.query_cache import cache_stats, cache_usage
+from src.result_frames import savings_report
 from src.ui import empty_state
 
 st.set_page_config(page_title="Database Analysis", layout="wide")
@@ -447,6 +449,29 @@ except Exception as e:
     st.error(f"Error loading database analysis: {str(e)}")
     st.info("Please check your database connection and try again.")
 
+# Query cache and memory saved by dtype compaction (this server process)
+st.markdown('<div class="section-header">🧮 Query Result Memory</div>', unsafe_allow_html=True)
+stats = cache_stats()
+col1, col2, col3, col4 = st.columns(4)
+with col1:
+    st.metric("Cache Size", f"{stats['bytes'] / 1e6:.1f} / {stats['max_bytes'] / 1e6:.0f} MB")
+with col2:
+    st.metric("Cached Results", f"{stats['entries']:,}")
+with col3:
+    st.metric("Hit Rate", f"{stats['hit_rate']:.1f}%", f"{stats['hits']:,} hits / {stats['misses']:,} misses")
+with col4:
+    st.metric("Evictions", f"{stats['evictions']:,}", f"{stats['evicted_bytes'] / 1e6:.1f} MB freed")
+st.caption(
+    f"{stats['stale_hits']:,} stale results served during {stats['refreshes']:,} background refreshes "
+    f"({stats['refresh_errors']:,} failed); {stats['warmups']:,} results pre-warmed"
+)
+usage_df = cache_usage()
+if not usage_df.empty:
+    st.dataframe(usage_df, hide_index=True)
+memory_df = savings_report()
+if not empty_state(memory_df, "No dashboard queries have run in this server process yet."):
+    st.dataframe(memory_df, hide_index=True)
+
 # Render sidebar AI chat
 from src.sidebar_ai_chat import render_sidebar_ai_chat
 render_sidebar_ai_chat()
@@ -5,6 +5,9 @@ import datetime as dt
 import streamlit as st
 
 from src.db import health_check
+from src.dimensions import get_dimension
+from src.cache_warmer import start_cache_warmer
+from src.materialized_views import start_refresh_scheduler
 from src.finance_queries import (
     get_finance_summary,
     get_finance_monthly_trends,
@@ -13,18 +16,29 @@ from src.finance_queries import (
     get_cost_center_analysis,
     get_budget_vs_actual,
     get_pending_transactions,
-    get_vendor_analysis
+    get_vendor_analysis,
+    get_spending_slice,
+    get_account_rollup,
+    live_finance_window,
+    get_live_finance_kpis,
+    get_live_finance_monthly_trends,
+    get_live_finance_summary
 )
 from src.finance_charts import (
     budget_vs_actual_chart,
     budget_utilization_gauge,
     monthly_trends_chart,
     account_analysis_pie,
+    department_spending_chart,
     cost_center_analysis_chart,
     vendor_spending_chart,
     cash_flow_chart
 )
-from src.ui import empty_state
+from src.live_aggregates import LIVE_REFRESH_SECONDS
+from src.drill_down import HIERARCHIES
+from src.interactive_charts import drill_down_panel, hierarchy_rollup_panel
+from src.search import search_transactions
+from src.ui import comparison_delta, comparison_help, empty_state, search_panel
 from src.auth import require_login
 
 st.set_page_config(page_title="Finance Dashboard", layout="wide")
@@ -46,9 +60,11 @@ with st.sidebar:
         help="Select end date for analysis"
     )
 
-    department = st.selectbox(
+    departments = get_dimension("departments")
+    dept_id = st.selectbox(
         "Department",
-        options=["All", "Finance", "Procurement", "IT", "HR", "Operations", "Marketing", "Sales", "Legal"],
+        options=[None, *departments.options()],
+        format_func=lambda value: "All" if value is None else departments.label(value),
         help="Filter by specific department"
     )
 
@@ -58,14 +74,11 @@ with st.sidebar:
         help="Filter by transaction type"
     )
 
-    # Get department ID if specific department is selected
-    dept_id = None
-    if department != "All":
-        dept_mapping = {
-            "Finance": 1, "Procurement": 2, "IT": 3, "HR": 4, "Operations": 5,
-            "Marketing": 6, "Sales": 7, "Legal": 8
-        }
-        dept_id = dept_mapping.get(department)
+    live_mode = st.toggle(
+        "Live updates",
+        value=False,
+        help=f"Refresh the KPIs, trends and cash flow every {LIVE_REFRESH_SECONDS}s from the rows that changed"
+    )
 
 
 # Professional CSS for Finance Dashboard
@@ -220,11 +233,13 @@ if not health_check():
     st.error("Database connection failed. Please check your connection settings.")
     st.stop()
 
-try:
-    # Finance KPIs
-    st.markdown('<div class="section-header">Key Financial Metrics</div>', unsafe_allow_html=True)
-    
-    kpis = get_finance_kpis(from_date, to_date, dept_id)
+# Keep the materialized views fresh in the background (started once per server)
+start_refresh_scheduler()
+# Pre-populate the query cache with the most requested results
+start_cache_warmer()
+
+
+def show_kpis(kpis):
     if not kpis.empty:
         row = kpis.iloc[0]
         
@@ -234,57 +249,38 @@ try:
             st.metric(
                 label="Total Revenue",
                 value=f"${row['total_revenue']:,.2f}" if row['total_revenue'] else "$0.00",
-                delta=f"${row['revenue_growth']:,.2f}" if row['revenue_growth'] else None
+                delta=comparison_delta(row, 'total_revenue'),
+                help=comparison_help(row, 'total_revenue', "${:,.2f}")
             )
         
         with col2:
             st.metric(
                 label="Total Expenses",
                 value=f"${row['total_expenses']:,.2f}" if row['total_expenses'] else "$0.00",
-                delta=f"${row['expense_growth']:,.2f}" if row['expense_growth'] else None
+                delta=comparison_delta(row, 'total_expenses'),
+                help=comparison_help(row, 'total_expenses', "${:,.2f}")
             )
         
         with col3:
             st.metric(
                 label="Net Income",
                 value=f"${row['net_income']:,.2f}" if row['net_income'] else "$0.00",
-                delta=f"${row['net_income_growth']:,.2f}" if row['net_income_growth'] else None
+                delta=comparison_delta(row, 'net_income'),
+                help=comparison_help(row, 'net_income', "${:,.2f}")
             )
         
         with col4:
             st.metric(
                 label="Transaction Count",
                 value=f"{row['total_transactions']:,}" if row['total_transactions'] else "0",
-                delta=f"{row['transaction_growth']:,}" if row['transaction_growth'] else None
+                delta=comparison_delta(row, 'total_transactions'),
+                help=comparison_help(row, 'total_transactions', "{:,}")
             )
     else:
         st.warning("No financial data available for the selected period.")
-    
-    # Budget vs Actual Analysis
-    st.markdown('<div class="section-header">Budget vs Actual Analysis</div>', unsafe_allow_html=True)
-    
-    budget_data = get_budget_vs_actual(from_date, to_date, dept_id)
-    if not empty_state(budget_data):
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            st.plotly_chart(
-                budget_vs_actual_chart(budget_data),
-                use_container_width=True
-            )
-        
-        with col2:
-            st.plotly_chart(
-                budget_utilization_gauge(budget_data),
-                use_container_width=True
-            )
-    else:
-        st.info("No budget data available for the selected period.")
-    
-    # Monthly Trends
-    st.markdown('<div class="section-header">Financial Trends</div>', unsafe_allow_html=True)
-    
-    trends_data = get_finance_monthly_trends(from_date, to_date, transaction_type)
+
+
+def show_trends(trends_data):
     if not empty_state(trends_data):
         st.plotly_chart(
             monthly_trends_chart(trends_data),
@@ -292,12 +288,24 @@ try:
         )
     else:
         st.info("No trend data available for the selected period.")
-    
+
+
+def show_cash_flow(cash_flow_data):
+    if not empty_state(cash_flow_data):
+        st.plotly_chart(
+            cash_flow_chart(cash_flow_data),
+            use_container_width=True
+        )
+    else:
+        st.info("No cash flow data available for the selected period.")
+
+
+def show_spending_sections(from_date, to_date, dept_id):
     # Account Analysis
     st.markdown('<div class="section-header">Account Analysis</div>', unsafe_allow_html=True)
-    
+
     col1, col2 = st.columns(2)
-    
+
     with col1:
         st.markdown("#### Account Distribution")
         account_data = get_account_analysis(from_date, to_date)
@@ -308,7 +316,7 @@ try:
             )
         else:
             st.info("No account data available.")
-    
+
     with col2:
         st.markdown("#### Cost Center Analysis")
         cost_center_data = get_cost_center_analysis(from_date, to_date)
@@ -319,10 +327,10 @@ try:
             )
         else:
             st.info("No cost center data available.")
-    
+
     # Vendor Analysis
     st.markdown('<div class="section-header">Vendor Spending Analysis</div>', unsafe_allow_html=True)
-    
+
     vendor_data = get_vendor_analysis(from_date, to_date, dept_id)
     if not empty_state(vendor_data):
         st.plotly_chart(
@@ -331,19 +339,163 @@ try:
         )
     else:
         st.info("No vendor data available for the selected period.")
+
+
+# Cross-filtering: a selection on any of the four charts filters the other
+# three. They are recomputed in memory from one slice of the window's
+# transactions (src.cross_filter), so a click runs no SQL.
+SPENDING_CHARTS = {
+    # slice column: (label column, field of a selected point)
+    "dept_id": ("dept_name", "x"),
+    "account_id": ("account_name", "label"),
+    "cost_center_id": ("cost_center_name", "x"),
+    "vendor_name": ("vendor_name", "x"),
+}
+
+
+def _clear_spending_selections():
+    # New chart keys drop the charts' selections
+    st.session_state["spending_generation"] = st.session_state.get("spending_generation", 0) + 1
+
+
+@st.fragment
+def spending_breakdown(spending, dept_id):
+    generation = st.session_state.get("spending_generation", 0)
+    selections = {}
+    for column, (label_column, field) in SPENDING_CHARTS.items():
+        state = st.session_state.get(f"spending_{column}_{generation}")
+        labels = [point.get(field) for point in state["selection"]["points"]] if state else []
+        selections[column] = spending.keys_for(column, label_column, labels) if labels else []
+    if not selections["dept_id"] and dept_id is not None:
+        selections["dept_id"] = [dept_id]
+    frames, elapsed_ms = spending.cross_filter(selections)
+
+    def linked_chart(column, figure):
+        st.plotly_chart(
+            figure,
+            use_container_width=True,
+            on_select="rerun",
+            selection_mode="points",
+            key=f"spending_{column}_{generation}"
+        )
+
+    col1, col2 = st.columns(2)
     
-    # Cash Flow Analysis
-    st.markdown('<div class="section-header">Cash Flow Analysis</div>', unsafe_allow_html=True)
+    with col1:
+        st.markdown("#### Department Spending")
+        linked_chart("dept_id", department_spending_chart(frames["dept_id"]))
     
-    cash_flow_data = get_finance_summary(from_date, to_date, dept_id)
-    if not empty_state(cash_flow_data):
-        st.plotly_chart(
-            cash_flow_chart(cash_flow_data),
-            use_container_width=True
+    with col2:
+        st.markdown("#### Top Vendors")
+        linked_chart("vendor_name", vendor_spending_chart(frames["vendor_name"]))
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.markdown("#### Account Distribution")
+        linked_chart("account_id", account_analysis_pie(frames["account_id"]))
+    
+    with col2:
+        st.markdown("#### Cost Center Analysis")
+        linked_chart("cost_center_id", cost_center_analysis_chart(frames["cost_center_id"]))
+
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        active = sum(1 for keys in selections.values() if keys)
+        st.caption(
+            f"{active} active selection(s) · {spending.rows:,} transactions recomputed in {elapsed_ms:.1f} ms · "
+            "click bars or slices to filter the other charts"
         )
+    with col2:
+        st.button("🔄 Clear selections", on_click=_clear_spending_selections, use_container_width=True)
+
+
+# Live mode: each section is a fragment that reruns on its own every
+# LIVE_REFRESH_SECONDS, applies the rows changed since the last poll and
+# redraws only itself. The sections share one window and one poll per cycle.
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_kpis(from_date, to_date, dept_id):
+    live = live_finance_window(from_date, to_date)
+    live.poll(min_interval=LIVE_REFRESH_SECONDS / 2)
+    show_kpis(get_live_finance_kpis(live, from_date, to_date, dept_id))
+    st.caption(f"🔴 Live · {live.changed_rows:,} changed rows applied · last checked {dt.datetime.now():%H:%M:%S}")
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_trends(from_date, to_date, transaction_type, rolling_months):
+    live = live_finance_window(from_date, to_date)
+    live.poll(min_interval=LIVE_REFRESH_SECONDS / 2)
+    show_trends(get_live_finance_monthly_trends(live, from_date, to_date, transaction_type, rolling_months))
+
+
+@st.fragment(run_every=LIVE_REFRESH_SECONDS)
+def live_cash_flow(from_date, to_date, dept_id):
+    live = live_finance_window(from_date, to_date)
+    live.poll(min_interval=LIVE_REFRESH_SECONDS / 2)
+    show_cash_flow(get_live_finance_summary(live, from_date, to_date, dept_id))
+
+
+try:
+    # Finance KPIs
+    st.markdown('<div class="section-header">Key Financial Metrics</div>', unsafe_allow_html=True)
+    
+    if live_mode:
+        live_kpis(from_date, to_date, dept_id)
     else:
-        st.info("No cash flow data available for the selected period.")
+        show_kpis(get_finance_kpis(from_date, to_date, dept_id))
+
+    # Budget vs Actual Analysis
+    st.markdown('<div class="section-header">Budget vs Actual Analysis</div>', unsafe_allow_html=True)
     
+    budget_data = get_budget_vs_actual(from_date, to_date, dept_id)
+    if not empty_state(budget_data):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.plotly_chart(
+                budget_vs_actual_chart(budget_data),
+                use_container_width=True
+            )
+        
+        with col2:
+            st.plotly_chart(
+                budget_utilization_gauge(budget_data),
+                use_container_width=True
+            )
+    else:
+        st.info("No budget data available for the selected period.")
+    
+    # Monthly Trends
+    st.markdown('<div class="section-header">Financial Trends</div>', unsafe_allow_html=True)
+    
+    rolling_months = st.selectbox(
+        "Moving average",
+        options=[0, 3, 6, 12],
+        format_func=lambda months: "Off" if not months else f"{months} months",
+        key="trend_rolling",
+        help="Average of the trailing months, drawn as a dashed line"
+    )
+    if live_mode:
+        live_trends(from_date, to_date, transaction_type, rolling_months)
+    else:
+        show_trends(get_finance_monthly_trends(from_date, to_date, transaction_type, rolling_months))
+
+    # Account, cost center and vendor spending, cross-filtered when the window fits in memory
+    spending = get_spending_slice(from_date, to_date)
+    if spending is not None:
+        st.markdown('<div class="section-header">Spending Breakdown</div>', unsafe_allow_html=True)
+        spending_breakdown(spending, dept_id)
+    else:
+        show_spending_sections(from_date, to_date, dept_id)
+
+    # Cash Flow Analysis
+    st.markdown('<div class="section-header">Cash Flow Analysis</div>', unsafe_allow_html=True)
+    
+    if live_mode:
+        live_cash_flow(from_date, to_date, dept_id)
+    else:
+        show_cash_flow(get_finance_summary(from_date, to_date, dept_id))
+
     # Pending Transactions
     st.markdown('<div class="section-header">Pending Transactions</div>', unsafe_allow_html=True)
     
@@ -357,6 +509,37 @@ try:
     else:
         st.info("No pending transactions for the selected period.")
 
+    # Chart of Accounts
+    st.markdown('<div class="section-header">Chart of Accounts Rollup</div>', unsafe_allow_html=True)
+
+    hierarchy_rollup_panel(
+        get_account_rollup, from_date, to_date,
+        id_column="account_id", label_column="account_name",
+        value_column="total_amount", count_column="transaction_count",
+        filters={"dept_id": dept_id}, title="All Accounts", key="account_rollup",
+    )
+
+    # Drill-Down
+    st.markdown('<div class="section-header">Drill-Down Analysis</div>', unsafe_allow_html=True)
+
+    hierarchy = st.radio(
+        "Drill down by",
+        options=["department", "calendar"],
+        format_func=lambda name: HIERARCHIES[name].title,
+        horizontal=True,
+        key="finance_drill_hierarchy",
+    )
+    drill_down_panel(hierarchy, from_date, to_date, key=f"finance_drill_{hierarchy}")
+
+    # Transaction Search
+    st.markdown('<div class="section-header">Transaction Search</div>', unsafe_allow_html=True)
+
+    search_panel(
+        "transaction_search", search_transactions, from_date, to_date,
+        label="Find Transactions",
+        placeholder="Description, vendor or reference number",
+    )
+
 except Exception as e:
     st.error(f"Error loading finance data: {str(e)}")
     st.info("Please check your database connection and try again.")
@@ -4,7 +4,11 @@ import datetime as dt
 
 import streamlit as st
 
+from src.date_dimension import GRAIN_TITLES
 from src.db import health_check
+from src.dimensions import get_dimension
+from src.cache_warmer import start_cache_warmer
+from src.materialized_views import start_refresh_scheduler
 from src.procurement_queries import (
     get_procurement_summary,
     get_procurement_kpis,
@@ -13,7 +17,11 @@ from src.procurement_queries import (
     get_procurement_trends,
     get_pending_orders,
     get_delivery_performance,
-    get_spend_analysis
+    get_spend_analysis,
+    get_category_rollup,
+    OrderFilters,
+    ORDER_STATUSES,
+    ORDER_PRIORITIES
 )
 from src.procurement_charts import (
     vendor_performance_chart,
@@ -26,7 +34,10 @@ from src.procurement_charts import (
     order_status_distribution,
     priority_analysis_chart
 )
-from src.ui import empty_state
+from src.drill_down import HIERARCHIES
+from src.interactive_charts import drill_down_panel, hierarchy_rollup_panel
+from src.search import search_orders
+from src.ui import comparison_delta, comparison_help, empty_state, search_panel
 
 st.set_page_config(page_title="Procurement Dashboard", layout="wide")
 from src.auth import require_login
@@ -48,47 +59,53 @@ with st.sidebar:
         help="Select end date for analysis"
     )
 
-    department = st.selectbox(
+    departments = get_dimension("departments")
+    dept_id = st.selectbox(
         "Department",
-        options=["All", "Finance", "Procurement", "IT", "HR", "Operations", "Marketing", "Sales", "Legal"],
+        options=[None, *departments.options()],
+        format_func=lambda value: "All" if value is None else departments.label(value),
         help="Filter by specific department"
     )
 
-    order_status = st.selectbox(
+    order_statuses = st.multiselect(
         "Order Status",
-        options=["All", "Pending", "Approved", "In Progress", "Completed", "Cancelled"],
-        help="Filter by order status"
+        options=list(ORDER_STATUSES),
+        help="Filter by order status (none selected: all)"
     )
 
     # Additional filters
     st.markdown("**Additional Filters**")
-    
-    vendor = st.selectbox(
+
+    # Vendors can number in the tens of thousands: offer the prefix matches
+    # of the search box, plus whatever is already selected
+    vendors = get_dimension("vendors")
+    vendor_search = st.text_input("Find Vendor", placeholder="Type the start of a vendor name")
+    vendor_ids = st.multiselect(
         "Vendor",
-        options=["All"] + [f"Vendor {i}" for i in range(1, 11)],
-        help="Filter by specific vendor"
+        options=list(dict.fromkeys([*st.session_state.get("vendor_ids", []), *vendors.search(vendor_search, 200)])),
+        format_func=vendors.label,
+        key="vendor_ids",
+        help="Filter by vendor (none selected: all)"
     )
 
-    category = st.selectbox(
+    categories = get_dimension("categories")
+    category_ids = st.multiselect(
         "Category",
-        options=["All", "Office Supplies", "IT Equipment", "Marketing", "Travel", "Utilities", "Professional Services", "Equipment", "Software", "Consulting", "Training"],
-        help="Filter by category"
+        options=categories.options(),
+        format_func=categories.label,
+        help="Filter by category (none selected: all)"
     )
 
-    priority = st.selectbox(
+    priorities = st.multiselect(
         "Priority",
-        options=["All", "Low", "Medium", "High", "Urgent"],
-        help="Filter by priority level"
+        options=list(ORDER_PRIORITIES),
+        help="Filter by priority level (none selected: all)"
     )
 
-    # Get department ID if specific department is selected
-    dept_id = None
-    if department != "All":
-        dept_mapping = {
-            "Finance": 1, "Procurement": 2, "IT": 3, "HR": 4, "Operations": 5,
-            "Marketing": 6, "Sales": 7, "Legal": 8
-        }
-        dept_id = dept_mapping.get(department)
+    # Pushed down into every query below
+    order_filters = OrderFilters(
+        statuses=order_statuses, vendor_ids=vendor_ids, category_ids=category_ids, priorities=priorities
+    )
 
 
 # Professional CSS for Procurement Dashboard
@@ -243,11 +260,16 @@ if not health_check():
     st.error("Database connection failed. Please check your connection settings.")
     st.stop()
 
+# Keep the materialized views fresh in the background (started once per server)
+start_refresh_scheduler()
+# Pre-populate the query cache with the most requested results
+start_cache_warmer()
+
 try:
     # Procurement KPIs
     st.markdown('<div class="section-header">Key Procurement Metrics</div>', unsafe_allow_html=True)
     
-    kpis = get_procurement_kpis(from_date, to_date, dept_id)
+    kpis = get_procurement_kpis(from_date, to_date, dept_id, order_filters=order_filters)
     if not kpis.empty:
         row = kpis.iloc[0]
         
@@ -257,28 +279,32 @@ try:
             st.metric(
                 label="Total Orders",
                 value=f"{row['total_orders']:,}" if row['total_orders'] else "0",
-                delta=f"{row['order_growth']:,}" if row['order_growth'] else None
+                delta=comparison_delta(row, 'total_orders'),
+                help=comparison_help(row, 'total_orders', "{:,}")
             )
         
         with col2:
             st.metric(
                 label="Total Spend",
                 value=f"${row['total_spend']:,.2f}" if row['total_spend'] else "$0.00",
-                delta=f"${row['spend_growth']:,.2f}" if row['spend_growth'] else None
+                delta=comparison_delta(row, 'total_spend'),
+                help=comparison_help(row, 'total_spend', "${:,.2f}")
             )
         
         with col3:
             st.metric(
                 label="Average Order Value",
                 value=f"${row['avg_order_value']:,.2f}" if row['avg_order_value'] else "$0.00",
-                delta=f"${row['aov_growth']:,.2f}" if row['aov_growth'] else None
+                delta=comparison_delta(row, 'avg_order_value'),
+                help=comparison_help(row, 'avg_order_value', "${:,.2f}")
             )
         
         with col4:
             st.metric(
                 label="Active Vendors",
                 value=f"{row['active_vendors']:,}" if row['active_vendors'] else "0",
-                delta=f"{row['vendor_growth']:,}" if row['vendor_growth'] else None
+                delta=comparison_delta(row, 'active_vendors'),
+                help=comparison_help(row, 'active_vendors', "{:,}")
             )
     else:
         st.warning("No procurement data available for the selected period.")
@@ -286,7 +312,7 @@ try:
     # Vendor Performance Analysis
     st.markdown('<div class="section-header">Vendor Performance Analysis</div>', unsafe_allow_html=True)
     
-    vendor_data = get_vendor_performance(from_date, to_date, dept_id)
+    vendor_data = get_vendor_performance(from_date, to_date, dept_id, order_filters=order_filters)
     if not empty_state(vendor_data):
         st.plotly_chart(
             vendor_performance_chart(vendor_data),
@@ -298,10 +324,30 @@ try:
     # Procurement Trends
     st.markdown('<div class="section-header">Procurement Trends</div>', unsafe_allow_html=True)
     
-    trends_data = get_procurement_trends(from_date, to_date, dept_id)
+    grain_col, rolling_col = st.columns(2)
+    with grain_col:
+        trend_grain = st.selectbox(
+            "Group by",
+            options=["month", "quarter", "week", "fiscal_period", "fiscal_quarter", "fiscal_year"],
+            format_func=GRAIN_TITLES.get,
+            key="trend_grain",
+            help="Calendar or fiscal buckets (empty buckets are shown as zero)"
+        )
+    with rolling_col:
+        rolling_periods = st.selectbox(
+            "Moving average",
+            options=[0, 3, 6, 12],
+            format_func=lambda periods: "Off" if not periods else f"{periods} periods",
+            key="trend_rolling",
+            help="Average of the trailing buckets, drawn as a dashed line"
+        )
+    trends_data = get_procurement_trends(
+        from_date, to_date, dept_id, group_by=trend_grain, order_filters=order_filters,
+        rolling_periods=rolling_periods
+    )
     if not empty_state(trends_data):
         st.plotly_chart(
-            procurement_trends_chart(trends_data),
+            procurement_trends_chart(trends_data, GRAIN_TITLES[trend_grain]),
             use_container_width=True
         )
     else:
@@ -314,7 +360,7 @@ try:
     
     with col1:
         st.markdown("#### Category Distribution")
-        category_data = get_category_analysis(from_date, to_date, dept_id)
+        category_data = get_category_analysis(from_date, to_date, dept_id, order_filters=order_filters)
         if not empty_state(category_data):
             st.plotly_chart(
                 category_spending_pie(category_data),
@@ -325,7 +371,7 @@ try:
     
     with col2:
         st.markdown("#### Department Procurement")
-        dept_data = get_spend_analysis(from_date, to_date, dept_id)
+        dept_data = get_spend_analysis(from_date, to_date, dept_id, order_filters=order_filters)
         if not empty_state(dept_data):
             st.plotly_chart(
                 department_procurement_chart(dept_data),
@@ -337,7 +383,7 @@ try:
     # Delivery Performance
     st.markdown('<div class="section-header">Delivery Performance</div>', unsafe_allow_html=True)
     
-    delivery_data = get_delivery_performance(from_date, to_date, dept_id)
+    delivery_data = get_delivery_performance(from_date, to_date, dept_id, order_filters=order_filters)
     if not empty_state(delivery_data):
         st.plotly_chart(
             delivery_performance_chart(delivery_data),
@@ -353,7 +399,7 @@ try:
     
     with col1:
         st.markdown("#### Order Status Distribution")
-        status_data = get_pending_orders(from_date, to_date, dept_id)
+        status_data = get_pending_orders(from_date, to_date, dept_id, order_filters=order_filters)
         if not empty_state(status_data):
             st.plotly_chart(
                 order_status_distribution(status_data),
@@ -364,7 +410,7 @@ try:
     
     with col2:
         st.markdown("#### Priority Analysis")
-        priority_data = get_pending_orders(from_date, to_date, dept_id)
+        priority_data = get_pending_orders(from_date, to_date, dept_id, order_filters=order_filters)
         if not empty_state(priority_data):
             st.plotly_chart(
                 priority_analysis_chart(priority_data),
@@ -376,7 +422,7 @@ try:
     # Procurement Summary Table
     st.markdown('<div class="section-header">Procurement Summary</div>', unsafe_allow_html=True)
     
-    summary_data = get_procurement_summary(from_date, to_date, dept_id)
+    summary_data = get_procurement_summary(from_date, to_date, dept_id, order_filters=order_filters)
     if not empty_state(summary_data):
         st.dataframe(
             summary_data,
@@ -386,6 +432,38 @@ try:
     else:
         st.info("No summary data available for the selected period.")
 
+    # Category Tree
+    st.markdown('<div class="section-header">Category Rollup</div>', unsafe_allow_html=True)
+
+    hierarchy_rollup_panel(
+        get_category_rollup, from_date, to_date,
+        id_column="category_id", label_column="category_name",
+        value_column="total_value", count_column="order_count",
+        filters={"dept_id": dept_id, "order_filters": order_filters},
+        title="All Categories", value_label="Spend", key="category_rollup",
+    )
+
+    # Drill-Down
+    st.markdown('<div class="section-header">Drill-Down Analysis</div>', unsafe_allow_html=True)
+
+    hierarchy = st.radio(
+        "Drill down by",
+        options=["vendor", "category"],
+        format_func=lambda name: HIERARCHIES[name].title,
+        horizontal=True,
+        key="procurement_drill_hierarchy",
+    )
+    drill_down_panel(hierarchy, from_date, to_date, key=f"procurement_drill_{hierarchy}")
+
+    # Order Search
+    st.markdown('<div class="section-header">Order Search</div>', unsafe_allow_html=True)
+
+    search_panel(
+        "order_search", search_orders, from_date, to_date,
+        label="Find Orders",
+        placeholder="Order number or notes",
+    )
+
 except Exception as e:
     st.error(f"Error loading procurement data: {str(e)}")
     st.info("Please check your database connection and try again.")
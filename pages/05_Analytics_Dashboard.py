@@ -10,9 +10,12 @@ from typing import Optional, Any
 
 # Import database and query functions
 from src.db import get_conn, health_check
+from src.dimensions import get_dimension
+from src.cache_warmer import start_cache_warmer
+from src.materialized_views import start_refresh_scheduler
 from src.finance_queries import get_finance_kpis, get_finance_monthly_trends, get_vendor_analysis
 from src.procurement_queries import get_procurement_kpis, get_procurement_trends, get_vendor_performance
-from src.ui import empty_state
+from src.ui import change_text, empty_state
 
 st.set_page_config(page_title="Analytics Dashboard", layout="wide")
 from src.auth import require_login
@@ -141,21 +144,14 @@ with st.sidebar:
         help="Select end date for analysis"
     )
 
-    department = st.selectbox(
+    departments = get_dimension("departments")
+    dept_id = st.selectbox(
         "Department",
-        options=["All", "Finance", "Procurement", "IT", "HR", "Operations", "Marketing", "Sales", "Legal"],
+        options=[None, *departments.options()],
+        format_func=lambda value: "All" if value is None else departments.label(value),
         help="Filter by specific department"
     )
 
-    # Get department ID if specific department is selected
-    dept_id = None
-    if department != "All":
-        dept_mapping = {
-            "Finance": 1, "Procurement": 2, "IT": 3, "HR": 4, "Operations": 5,
-            "Marketing": 6, "Sales": 7, "Legal": 8
-        }
-        dept_id = dept_mapping.get(department)
-
 # Header
 st.markdown("""
 <div class="analytics-header">
@@ -168,6 +164,11 @@ if not health_check():
     st.error("Database connection failed. Please check your connection settings.")
     st.stop()
 
+# Keep the materialized views fresh in the background (started once per server)
+start_refresh_scheduler()
+# Pre-populate the query cache with the most requested results
+start_cache_warmer()
+
 try:
     # Executive Summary KPIs
     st.markdown('<div class="section-header">Executive Summary</div>', unsafe_allow_html=True)
@@ -189,7 +190,8 @@ try:
                 <div class="metric-value">${fin_row['total_revenue']:,.0f}</div>
                 <div class="metric-label">Total Revenue</div>
                 <div class="metric-change {'positive' if fin_row['revenue_growth'] > 0 else 'negative' if fin_row['revenue_growth'] < 0 else 'neutral'}">
-                    {fin_row['revenue_growth']:+.0f} vs previous period
+                    {change_text(fin_row['total_revenue_change_pct']) or 'n/a'} vs previous period
+                    · {change_text(fin_row['total_revenue_yoy_pct']) or 'n/a'} YoY
                 </div>
             </div>
             """, unsafe_allow_html=True)
@@ -200,7 +202,8 @@ try:
                 <div class="metric-value">${fin_row['net_income']:,.0f}</div>
                 <div class="metric-label">Net Income</div>
                 <div class="metric-change {'positive' if fin_row['net_income_growth'] > 0 else 'negative' if fin_row['net_income_growth'] < 0 else 'neutral'}">
-                    {fin_row['net_income_growth']:+.0f} vs previous period
+                    {change_text(fin_row['net_income_change_pct']) or 'n/a'} vs previous period
+                    · {change_text(fin_row['net_income_yoy_pct']) or 'n/a'} YoY
                 </div>
             </div>
             """, unsafe_allow_html=True)
@@ -211,7 +214,8 @@ try:
                 <div class="metric-value">{proc_row['total_orders']:,.0f}</div>
                 <div class="metric-label">Total Orders</div>
                 <div class="metric-change {'positive' if proc_row['order_growth'] > 0 else 'negative' if proc_row['order_growth'] < 0 else 'neutral'}">
-                    {proc_row['order_growth']:+.0f} vs previous period
+                    {change_text(proc_row['total_orders_change_pct']) or 'n/a'} vs previous period
+                    · {change_text(proc_row['total_orders_yoy_pct']) or 'n/a'} YoY
                 </div>
             </div>
             """, unsafe_allow_html=True)
@@ -222,7 +226,8 @@ try:
                 <div class="metric-value">${proc_row['total_spend']:,.0f}</div>
                 <div class="metric-label">Total Spend</div>
                 <div class="metric-change {'positive' if proc_row['spend_growth'] > 0 else 'negative' if proc_row['spend_growth'] < 0 else 'neutral'}">
-                    {proc_row['spend_growth']:+.0f} vs previous period
+                    {change_text(proc_row['total_spend_change_pct']) or 'n/a'} vs previous period
+                    · {change_text(proc_row['total_spend_yoy_pct']) or 'n/a'} YoY
                 </div>
             </div>
             """, unsafe_allow_html=True)
@@ -239,7 +244,7 @@ try:
         revenue_data = trends_data[trends_data['transaction_type'] == 'Revenue']
         if not revenue_data.empty:
             fig.add_trace(go.Scatter(
-                x=revenue_data['month'],
+                x=revenue_data['period'],
                 y=revenue_data['total_amount'],
                 mode='lines+markers',
                 name='Revenue',
@@ -251,7 +256,7 @@ try:
         expense_data = trends_data[trends_data['transaction_type'] == 'Expense']
         if not expense_data.empty:
             fig.add_trace(go.Scatter(
-                x=expense_data['month'],
+                x=expense_data['period'],
                 y=expense_data['total_amount'],
                 mode='lines+markers',
                 name='Expenses',
@@ -281,7 +286,7 @@ try:
         fig = go.Figure()
         
         fig.add_trace(go.Scatter(
-            x=procurement_trends['month_name'],
+            x=procurement_trends['period'],
             y=procurement_trends['total_value'],
             mode='lines+markers',
             name='Procurement Value',
@@ -340,15 +345,9 @@ try:
     # Create a simple department performance table
     if dept_id is None:  # Show all departments
         dept_summary = []
-        departments = ["Finance", "Procurement", "IT", "HR", "Operations", "Marketing", "Sales", "Legal"]
         
-        for dept_name in departments:
-            dept_mapping = {
-                "Finance": 1, "Procurement": 2, "IT": 3, "HR": 4, "Operations": 5,
-                "Marketing": 6, "Sales": 7, "Legal": 8
-            }
-            current_dept_id = dept_mapping.get(dept_name)
-            
+        for current_dept_id in departments.options():
+            dept_name = departments.label(current_dept_id)
             if current_dept_id:
                 dept_finance = get_finance_kpis(from_date, to_date, current_dept_id)
                 dept_procurement = get_procurement_kpis(from_date, to_date, current_dept_id)
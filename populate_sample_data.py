@@ -156,6 +156,10 @@ def populate_transactions(conn):
     vendors = ["TechCorp", "OfficeSupplies", "ConsultingPro", "SoftwareInc", "EquipmentCo"]
     payment_methods = ["Credit Card", "Bank Transfer", "Check", "Cash", "Wire Transfer"]
     
+    # The partitioned fact tables key on (id, date), so ON CONFLICT (id) is not
+    # available; skip ids that already exist instead. Unlike ON CONFLICT this
+    # is not safe against concurrent inserts of the same id, which is fine for
+    # a seed script run on its own.
     with conn.cursor() as cur:
         # Generate 200 transactions over the last 6 months
         for i in range(200):
@@ -182,11 +186,13 @@ def populate_transactions(conn):
                 INSERT INTO finance_transactions (
                     transaction_id, transaction_date, transaction_type, account_id, dept_id, cost_center_id,
                     amount, description, reference_number, vendor_name, payment_method, status, created_by, created_at
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (transaction_id) DO NOTHING
+                )
+                SELECT %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                WHERE NOT EXISTS (SELECT 1 FROM finance_transactions WHERE transaction_id = %s)
             """, (
                 transaction_id, transaction_date, transaction_type, account_id, dept_id, cc_id,
-                amount, description, reference, vendor, payment_method, status, created_by, created_at
+                amount, description, reference, vendor, payment_method, status, created_by, created_at,
+                transaction_id
             ))
 
 
@@ -285,17 +291,20 @@ def populate_orders(conn):
             actual_delivery = expected_delivery + dt.timedelta(days=random.randint(-5, 10)) if status == "Completed" else None
             created_at = order_date + dt.timedelta(hours=random.randint(0, 24))
             
+            # Skips existing ids like the transactions above (not concurrency-safe)
             cur.execute("""
                 INSERT INTO procurement_orders (
                     order_id, order_number, order_date, vendor_id, category_id, dept_id, cost_center_id,
                     total_amount, tax_amount, shipping_amount, currency, status, priority,
                     requested_by, expected_delivery_date, actual_delivery_date, created_at
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (order_id) DO NOTHING
+                )
+                SELECT %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
+                WHERE NOT EXISTS (SELECT 1 FROM procurement_orders WHERE order_id = %s)
             """, (
                 order_id, order_number, order_date, vendor_id, category_id, dept_id, cc_id,
                 total_amount, tax_amount, shipping_amount, currency, status, priority,
-                created_by, expected_delivery, actual_delivery, created_at
+                created_by, expected_delivery, actual_delivery, created_at,
+                order_id
             ))
 
 
@@ -257,7 +257,7 @@ def financial_trends_chart(df: pd.DataFrame) -> go.Figure:
         type_data = df[df["transaction_type"] == transaction_type]
         
         fig.add_trace(go.Scatter(
-            x=type_data["month"],
+            x=type_data["period"],
             y=type_data["total_amount"],
             mode='lines+markers',
             name=transaction_type,
@@ -378,7 +378,7 @@ def procurement_trends_chart(df: pd.DataFrame) -> go.Figure:
         status_data = df[df["status"] == status]
         
         fig.add_trace(go.Scatter(
-            x=status_data["month"],
+            x=status_data["period"],
             y=status_data["total_value"],
             mode='lines+markers',
             name=status,
@@ -9,382 +9,308 @@ import datetime as dt
 from typing import Any
 
 import pandas as pd
-import streamlit as st
+from sqlalchemy import and_, case, func, select
 
-from src.db import get_conn
+from src.date_dimension import calendar_query
+from src.db import run_query
+from src.metrics import FACTS, build_metric_query, metric_columns, ratio
+from src.query_builder import (
+    Filter,
+    QuerySpec,
+    build_query,
+    finance_accounts,
+    finance_budgets,
+    finance_cost_centers,
+    finance_departments,
+    finance_transactions,
+    procurement_categories,
+    procurement_orders,
+    procurement_vendors,
+    with_period_change,
+)
+from src.query_cache import cached_query
 
+t = finance_transactions.alias("t")
+o = procurement_orders.alias("o")
+b = finance_budgets.alias("b")
+d = finance_departments.alias("d")
+cc = finance_cost_centers.alias("cc")
+a = finance_accounts.alias("a")
+v = procurement_vendors.alias("v")
+c = procurement_categories.alias("c")
 
-@st.cache_data(ttl=60, show_spinner=False)
-def get_executive_summary(from_dt: dt.date, to_dt: dt.date, dept_id: Any = None) -> pd.DataFrame:
-    """Get executive summary with key business metrics."""
-    
-    params = {"from_dt": from_dt, "to_dt": to_dt}
-    where_dept = ""
-    if dept_id:
-        where_dept = " AND dept_id = :dept_id"
-        params["dept_id"] = dept_id
-    
-    sql = f"""
-    WITH finance_summary AS (
-        SELECT 
-            COUNT(*) as total_transactions,
-            COALESCE(SUM(CASE WHEN transaction_type = 'Revenue' THEN amount ELSE 0 END), 0) as total_revenue,
-            COALESCE(SUM(CASE WHEN transaction_type = 'Expense' THEN amount ELSE 0 END), 0) as total_expenses,
-            COALESCE(SUM(CASE WHEN transaction_type = 'Revenue' THEN amount ELSE 0 END) - 
-                     SUM(CASE WHEN transaction_type = 'Expense' THEN amount ELSE 0 END), 0) as net_profit
-        FROM finance_transactions
-        WHERE transaction_date BETWEEN :from_dt AND :to_dt
-        {where_dept}
+COMPLETED = tuple(FACTS["transactions"].where(t))
+
+# Executive summary columns -> registry metrics (fetched in one fused query)
+EXECUTIVE_SUMMARY_METRICS = {
+    "total_transactions": "total_transactions",
+    "total_revenue": "total_revenue",
+    "total_expenses": "total_expenses",
+    "net_profit": "net_income",
+    "total_orders": "total_orders",
+    "total_procurement_value": "total_spend",
+    "avg_order_value": "avg_order_value",
+    "completed_orders": "completed_orders",
+    "total_budget": "total_budget",
+    "total_spent": "budget_spent",
+    "total_remaining": "budget_remaining",
+    "budget_utilization_pct": "budget_utilization_pct",
+}
+
+DEPT_FINANCE = QuerySpec(
+    fact=t,
+    date_column=t.c.transaction_date,
+    anchor=d,
+    anchor_on=d.c.dept_id == t.c.dept_id,
+    where=COMPLETED,
+    filters=(Filter("dept_id", d.c.dept_id),),
+    dimensions={
+        "dept_id": d.c.dept_id,
+        "dept_name": d.c.dept_name,
+        "dept_code": d.c.dept_code,
+        "budget_allocation": d.c.budget_allocation,
+    },
+    measures=metric_columns(
+        t,
+        ("transaction_count", "total_transactions"),
+        ("revenue", "total_revenue"),
+        ("expenses", "total_expenses"),
+        "total_amount",
+    ),
+)
+
+DEPT_PROCUREMENT = QuerySpec(
+    fact=o,
+    date_column=o.c.order_date,
+    anchor=d,
+    anchor_on=d.c.dept_id == o.c.dept_id,
+    filters=(Filter("dept_id", d.c.dept_id),),
+    dimensions={"dept_id": d.c.dept_id},
+    measures=metric_columns(
+        o,
+        ("order_count", "total_orders"),
+        ("procurement_value", "total_spend"),
+        "avg_order_value",
+        "completed_orders",
+        ("order_completion_rate", "completion_rate"),
+    ),
+)
+
+# Placeholder until delivery dates are recorded: received orders count as 15 days
+_delivery_delay = func.avg(case((o.c.status == "Received", 15)))
+
+VENDOR_PERFORMANCE_ANALYSIS = QuerySpec(
+    fact=o,
+    date_column=o.c.order_date,
+    anchor=v,
+    anchor_on=v.c.vendor_id == o.c.vendor_id,
+    dimensions={
+        "vendor_id": v.c.vendor_id,
+        "vendor_name": v.c.vendor_name,
+        "vendor_code": v.c.vendor_code,
+        "rating": v.c.rating,
+    },
+    measures=metric_columns(
+        o,
+        "total_orders",
+        ("total_value", "total_spend"),
+        "avg_order_value",
+        "completed_orders",
+        "cancelled_orders",
+        "completion_rate",
+        "cancellation_rate",
+    ),
+    derived={
+        "avg_delivery_delay_days": lambda m: func.coalesce(_delivery_delay, 0),
+        "delivery_performance": lambda m: case(
+            (_delivery_delay <= 0, "On Time"),
+            (_delivery_delay <= 3, "Slightly Late"),
+            (_delivery_delay <= 7, "Late"),
+            else_="Very Late",
+        ),
+    },
+)
+
+# Bucketed through dim_date by calendar_query, at any calendar or fiscal grain
+FINANCIAL_TRENDS = QuerySpec(
+    fact=t,
+    date_column=t.c.transaction_date,
+    where=COMPLETED,
+    dimensions={"transaction_type": t.c.transaction_type},
+    measures=metric_columns(
+        t, ("transaction_count", "total_transactions"), "total_amount", ("avg_amount", "avg_transaction_amount")
     ),
-    procurement_summary AS (
-        SELECT 
-            COUNT(*) as total_orders,
-            COALESCE(SUM(grand_total), 0) as total_procurement_value,
-            COALESCE(AVG(grand_total), 0) as avg_order_value,
-            COUNT(CASE WHEN status = 'Received' THEN 1 END) as completed_orders
-        FROM procurement_orders
-        WHERE order_date BETWEEN :from_dt AND :to_dt
-        {where_dept}
+)
+
+PROCUREMENT_STATUS_TRENDS = QuerySpec(
+    fact=o,
+    date_column=o.c.order_date,
+    dimensions={"status": o.c.status},
+    measures=metric_columns(o, ("order_count", "total_orders"), ("total_value", "total_spend"), "avg_order_value"),
+)
+
+BUDGET_VS_ACTUAL_ANALYSIS = QuerySpec(
+    fact=t,
+    date_column=t.c.transaction_date,
+    anchor=(
+        b.join(d, b.c.dept_id == d.c.dept_id)
+        .join(cc, b.c.cost_center_id == cc.c.cost_center_id)
+        .join(a, b.c.account_id == a.c.account_id)
+    ),
+    anchor_on=and_(
+        b.c.dept_id == t.c.dept_id,
+        b.c.cost_center_id == t.c.cost_center_id,
+        b.c.account_id == t.c.account_id,
     ),
-    budget_summary AS (
-        SELECT 
-            COALESCE(SUM(budget_amount), 0) as total_budget,
-            COALESCE(SUM(spent_amount), 0) as total_spent,
-            COALESCE(SUM(remaining_amount), 0) as total_remaining
-        FROM finance_budgets
-        WHERE budget_year = EXTRACT(YEAR FROM CURRENT_DATE)
+    dimensions={
+        "budget_id": b.c.budget_id,
+        "budget_name": b.c.budget_name,
+        "dept_name": d.c.dept_name,
+        "cost_center_name": cc.c.cost_center_name,
+        "account_name": a.c.account_name,
+        "budget_amount": b.c.budget_amount,
+        "spent_amount": b.c.spent_amount,
+        "remaining_amount": b.c.remaining_amount,
+    },
+    where=COMPLETED,
+    measures=metric_columns(t, ("actual_spent", "total_amount")),
+    derived={
+        "budget_utilization_pct": lambda m: ratio(m["spent_amount"], m["budget_amount"], default=0),
+        "budget_remaining_pct": lambda m: case(
+            (m["budget_amount"] > 0,
+             func.round((m["budget_amount"] - m["spent_amount"]) / m["budget_amount"] * 100, 2)),
+            else_=0,
+        ),
+        "budget_status": lambda m: case(
+            (m["actual_spent"] > m["budget_amount"], "Over Budget"),
+            (m["actual_spent"] > m["budget_amount"] * 0.9, "Near Budget Limit"),
+            (m["actual_spent"] > m["budget_amount"] * 0.7, "Moderate Usage"),
+            else_="Low Usage",
+        ),
+    },
+)
+
+CATEGORY_SPENDING_ANALYSIS = QuerySpec(
+    fact=o,
+    date_column=o.c.order_date,
+    anchor=c,
+    anchor_on=c.c.category_id == o.c.category_id,
+    dimensions={
+        "category_id": c.c.category_id,
+        "category_name": c.c.category_name,
+        "category_code": c.c.category_code,
+    },
+    measures=metric_columns(
+        o,
+        "total_orders",
+        ("total_spending", "total_spend"),
+        "avg_order_value",
+        "completed_orders",
+        "cancelled_orders",
+        ("unique_vendors", "active_vendors"),
+        "completion_rate",
+        "cancellation_rate",
+    ),
+)
+
+
+@cached_query(ttl=60)
+def get_executive_summary(from_dt: dt.date, to_dt: dt.date, dept_id: Any = None) -> pd.DataFrame:
+    """Get executive summary with key business metrics."""
+
+    stmt, params = build_metric_query(
+        tuple(EXECUTIVE_SUMMARY_METRICS.values()), from_dt, to_dt, filters={"dept_id": dept_id or None}
     )
-    SELECT 
-        f.total_transactions,
-        f.total_revenue,
-        f.total_expenses,
-        f.net_profit,
-        p.total_orders,
-        p.total_procurement_value,
-        p.avg_order_value,
-        p.completed_orders,
-        b.total_budget,
-        b.total_spent,
-        b.total_remaining,
-        CASE 
-            WHEN b.total_budget > 0 THEN ROUND((b.total_spent / b.total_budget) * 100, 2)
-            ELSE 0 
-        END as budget_utilization_pct
-    FROM finance_summary f
-    CROSS JOIN procurement_summary p
-    CROSS JOIN budget_summary b
-    """
-    
-    conn = get_conn()
-    return conn.query(sql, params=params)
-
-
-@st.cache_data(ttl=60, show_spinner=False)
+    frame = run_query(stmt, params)
+    return frame.rename(columns={metric: column for column, metric in EXECUTIVE_SUMMARY_METRICS.items()})
+
+
+@cached_query(ttl=60)
 def get_department_performance(from_dt: dt.date, to_dt: dt.date, dept_id: Any = None) -> pd.DataFrame:
     """Get comprehensive department performance analysis."""
-    
-    params = {"from_dt": from_dt, "to_dt": to_dt}
-    where_dept = ""
-    if dept_id:
-        where_dept = " AND d.dept_id = :dept_id"
-        params["dept_id"] = dept_id
-    
-    sql = f"""
-    WITH dept_finance AS (
-        SELECT 
-            d.dept_id,
-            d.dept_name,
-            d.dept_code,
-            d.budget_allocation,
-            COUNT(t.transaction_id) as transaction_count,
-            COALESCE(SUM(CASE WHEN t.transaction_type = 'Revenue' THEN t.amount ELSE 0 END), 0) as revenue,
-            COALESCE(SUM(CASE WHEN t.transaction_type = 'Expense' THEN t.amount ELSE 0 END), 0) as expenses,
-            COALESCE(SUM(t.amount), 0) as total_amount
-        FROM finance_departments d
-        LEFT JOIN finance_transactions t ON d.dept_id = t.dept_id
-        WHERE (t.transaction_date BETWEEN :from_dt AND :to_dt OR t.transaction_date IS NULL)
-        {where_dept}
-        GROUP BY d.dept_id, d.dept_name, d.dept_code, d.budget_allocation
-    ),
-    dept_procurement AS (
-        SELECT 
-            d.dept_id,
-            COUNT(o.order_id) as order_count,
-            COALESCE(SUM(o.grand_total), 0) as procurement_value,
-            COALESCE(AVG(o.grand_total), 0) as avg_order_value,
-            COUNT(CASE WHEN o.status = 'Received' THEN 1 END) as completed_orders
-        FROM finance_departments d
-        LEFT JOIN procurement_orders o ON d.dept_id = o.dept_id
-        WHERE (o.order_date BETWEEN :from_dt AND :to_dt OR o.order_date IS NULL)
-        {where_dept}
-        GROUP BY d.dept_id
+
+    filters = {"dept_id": dept_id}
+    finance, params = build_query(DEPT_FINANCE, from_dt, to_dt, filters, dimensions=tuple(DEPT_FINANCE.dimensions))
+    procurement, _ = build_query(DEPT_PROCUREMENT, from_dt, to_dt, filters, dimensions=("dept_id",))
+
+    f = finance.subquery("dept_finance")
+    p = procurement.subquery("dept_procurement")
+    stmt = (
+        select(
+            f,
+            *(p.c[name] for name in ("order_count", "procurement_value", "avg_order_value", "completed_orders")),
+            ratio(f.c.expenses, f.c.budget_allocation, default=0).label("budget_utilization_pct"),
+            func.coalesce(p.c.order_completion_rate, 0).label("order_completion_rate"),
+        )
+        .select_from(f.outerjoin(p, f.c.dept_id == p.c.dept_id))
+        .order_by(f.c.dept_name)
     )
-    SELECT 
-        f.dept_id,
-        f.dept_name,
-        f.dept_code,
-        f.budget_allocation,
-        f.transaction_count,
-        f.revenue,
-        f.expenses,
-        f.total_amount,
-        p.order_count,
-        p.procurement_value,
-        p.avg_order_value,
-        p.completed_orders,
-        CASE 
-            WHEN f.budget_allocation > 0 THEN ROUND((f.expenses / f.budget_allocation) * 100, 2)
-            ELSE 0 
-        END as budget_utilization_pct,
-        CASE 
-            WHEN p.order_count > 0 THEN ROUND((p.completed_orders::DECIMAL / p.order_count) * 100, 2)
-            ELSE 0 
-        END as order_completion_rate
-    FROM dept_finance f
-    LEFT JOIN dept_procurement p ON f.dept_id = p.dept_id
-    ORDER BY f.dept_name
-    """
-    
-    conn = get_conn()
-    return conn.query(sql, params=params)
-
-
-@st.cache_data(ttl=60, show_spinner=False)
+    return run_query(stmt, params)
+
+
+@cached_query(ttl=60)
 def get_vendor_performance_analysis(from_dt: dt.date, to_dt: dt.date, dept_id: Any = None) -> pd.DataFrame:
     """Get comprehensive vendor performance analysis."""
-    
-    sql = """
-    WITH vendor_orders AS (
-        SELECT 
-            v.vendor_id,
-            v.vendor_name,
-            v.vendor_code,
-            v.rating,
-            COUNT(o.order_id) as total_orders,
-            COALESCE(SUM(o.total_amount), 0) as total_value,
-            COALESCE(AVG(o.total_amount), 0) as avg_order_value,
-            COUNT(CASE WHEN o.status = 'Received' THEN 1 END) as completed_orders,
-            COUNT(CASE WHEN o.status = 'Cancelled' THEN 1 END) as cancelled_orders,
-            AVG(CASE 
-                WHEN o.status = 'Received' 
-                THEN 15
-                ELSE NULL 
-            END) as avg_delivery_delay_days
-        FROM procurement_vendors v
-        LEFT JOIN procurement_orders o ON v.vendor_id = o.vendor_id
-        WHERE o.order_date >= CURRENT_DATE - INTERVAL '90 days' OR o.order_date IS NULL
-        GROUP BY v.vendor_id, v.vendor_name, v.vendor_code, v.rating
+
+    stmt, params = build_query(
+        VENDOR_PERFORMANCE_ANALYSIS, from_dt, to_dt,
+        dimensions=tuple(VENDOR_PERFORMANCE_ANALYSIS.dimensions),
+        order_by=("total_value DESC", "rating DESC"),
     )
-    SELECT 
-        vendor_id,
-        vendor_name,
-        vendor_code,
-        rating,
-        total_orders,
-        total_value,
-        avg_order_value,
-        completed_orders,
-        cancelled_orders,
-        CASE 
-            WHEN total_orders > 0 THEN ROUND((completed_orders::DECIMAL / total_orders) * 100, 2)
-            ELSE 0 
-        END as completion_rate,
-        CASE 
-            WHEN total_orders > 0 THEN ROUND((cancelled_orders::DECIMAL / total_orders) * 100, 2)
-            ELSE 0 
-        END as cancellation_rate,
-        COALESCE(avg_delivery_delay_days, 0) as avg_delivery_delay_days,
-        CASE 
-            WHEN avg_delivery_delay_days <= 0 THEN 'On Time'
-            WHEN avg_delivery_delay_days <= 3 THEN 'Slightly Late'
-            WHEN avg_delivery_delay_days <= 7 THEN 'Late'
-            ELSE 'Very Late'
-        END as delivery_performance
-    FROM vendor_orders
-    ORDER BY total_value DESC, rating DESC
-    """
-    
-    conn = get_conn()
-    return conn.query(sql)
-
-
-@st.cache_data(ttl=60, show_spinner=False)
-def get_financial_trends(from_dt: dt.date, to_dt: dt.date, dept_id: Any = None) -> pd.DataFrame:
-    """Get financial trends over time."""
-    
-    sql = """
-    WITH monthly_trends AS (
-        SELECT 
-            DATE_TRUNC('month', transaction_date) as month,
-            transaction_type,
-            COUNT(*) as transaction_count,
-            COALESCE(SUM(amount), 0) as total_amount,
-            COALESCE(AVG(amount), 0) as avg_amount
-        FROM finance_transactions
-        WHERE transaction_date >= CURRENT_DATE - INTERVAL '12 months'
-        GROUP BY DATE_TRUNC('month', transaction_date), transaction_type
+    return run_query(stmt, params)
+
+
+@cached_query(ttl=60)
+def get_financial_trends(from_dt: dt.date, to_dt: dt.date, dept_id: Any = None,
+                         grain: str = "month") -> pd.DataFrame:
+    """Get financial trends per `grain` bucket, newest first, with the change on the previous bucket."""
+
+    buckets, params = calendar_query(
+        FINANCIAL_TRENDS, grain, from_dt, to_dt, dimensions=("transaction_type",), attributes={}
     )
-    SELECT 
-        month,
-        transaction_type,
-        transaction_count,
-        total_amount,
-        avg_amount,
-        LAG(total_amount) OVER (PARTITION BY transaction_type ORDER BY month) as prev_month_amount,
-        CASE 
-            WHEN LAG(total_amount) OVER (PARTITION BY transaction_type ORDER BY month) > 0 
-            THEN ROUND(((total_amount - LAG(total_amount) OVER (PARTITION BY transaction_type ORDER BY month)) / 
-                       LAG(total_amount) OVER (PARTITION BY transaction_type ORDER BY month)) * 100, 2)
-            ELSE 0 
-        END as month_over_month_change_pct
-    FROM monthly_trends
-    ORDER BY month DESC, transaction_type
-    """
-    
-    conn = get_conn()
-    return conn.query(sql)
-
-
-@st.cache_data(ttl=60, show_spinner=False)
-def get_procurement_trends(from_dt: dt.date, to_dt: dt.date, dept_id: Any = None) -> pd.DataFrame:
-    """Get procurement trends over time."""
-    
-    sql = """
-    WITH monthly_procurement AS (
-        SELECT 
-            DATE_TRUNC('month', order_date) as month,
-            status,
-            COUNT(*) as order_count,
-            COALESCE(SUM(total_amount), 0) as total_value,
-            COALESCE(AVG(total_amount), 0) as avg_order_value
-        FROM procurement_orders
-        WHERE order_date >= CURRENT_DATE - INTERVAL '12 months'
-        GROUP BY DATE_TRUNC('month', order_date), status
+    stmt = with_period_change(
+        buckets, "total_amount", partition="transaction_type", period="period_start",
+        previous="prev_period_amount", change="period_over_period_change_pct",
+        order_by=("period_start DESC", "transaction_type"),
     )
-    SELECT 
-        month,
-        status,
-        order_count,
-        total_value,
-        avg_order_value,
-        LAG(total_value) OVER (PARTITION BY status ORDER BY month) as prev_month_value,
-        CASE 
-            WHEN LAG(total_value) OVER (PARTITION BY status ORDER BY month) > 0 
-            THEN ROUND(((total_value - LAG(total_value) OVER (PARTITION BY status ORDER BY month)) / 
-                       LAG(total_value) OVER (PARTITION BY status ORDER BY month)) * 100, 2)
-            ELSE 0 
-        END as month_over_month_change_pct
-    FROM monthly_procurement
-    ORDER BY month DESC, status
-    """
-    
-    conn = get_conn()
-    return conn.query(sql)
-
-
-@st.cache_data(ttl=60, show_spinner=False)
+    return run_query(stmt, params)
+
+
+@cached_query(ttl=60)
+def get_procurement_trends(from_dt: dt.date, to_dt: dt.date, dept_id: Any = None,
+                           grain: str = "month") -> pd.DataFrame:
+    """Get procurement trends by status per `grain` bucket, newest first, with the change on the previous bucket."""
+
+    buckets, params = calendar_query(
+        PROCUREMENT_STATUS_TRENDS, grain, from_dt, to_dt, dimensions=("status",), attributes={}
+    )
+    stmt = with_period_change(
+        buckets, "total_value", partition="status", period="period_start",
+        previous="prev_period_value", change="period_over_period_change_pct",
+        order_by=("period_start DESC", "status"),
+    )
+    return run_query(stmt, params)
+
+
+@cached_query(ttl=60)
 def get_budget_vs_actual_analysis(from_dt: dt.date, to_dt: dt.date, dept_id: Any = None) -> pd.DataFrame:
     """Get detailed budget vs actual analysis."""
-    
-    sql = """
-    WITH budget_actual AS (
-        SELECT 
-            b.budget_id,
-            b.budget_name,
-            d.dept_name,
-            cc.cost_center_name,
-            a.account_name,
-            b.budget_amount,
-            b.spent_amount,
-            b.remaining_amount,
-            COALESCE(SUM(t.amount), 0) as actual_spent,
-            CASE 
-                WHEN b.budget_amount > 0 THEN ROUND((b.spent_amount / b.budget_amount) * 100, 2)
-                ELSE 0 
-            END as budget_utilization_pct,
-            CASE 
-                WHEN b.budget_amount > 0 THEN ROUND(((b.budget_amount - b.spent_amount) / b.budget_amount) * 100, 2)
-                ELSE 0 
-            END as budget_remaining_pct
-        FROM finance_budgets b
-        JOIN finance_departments d ON b.dept_id = d.dept_id
-        JOIN finance_cost_centers cc ON b.cost_center_id = cc.cost_center_id
-        JOIN finance_accounts a ON b.account_id = a.account_id
-        LEFT JOIN finance_transactions t ON b.dept_id = t.dept_id 
-            AND b.cost_center_id = t.cost_center_id 
-            AND b.account_id = t.account_id
-            AND t.transaction_date >= DATE_TRUNC('year', CURRENT_DATE)
-        GROUP BY b.budget_id, b.budget_name, d.dept_name, cc.cost_center_name, a.account_name, 
-                 b.budget_amount, b.spent_amount, b.remaining_amount
+
+    stmt, params = build_query(
+        BUDGET_VS_ACTUAL_ANALYSIS, from_dt, to_dt,
+        dimensions=tuple(BUDGET_VS_ACTUAL_ANALYSIS.dimensions),
+        order_by=("budget_utilization_pct DESC",),
     )
-    SELECT 
-        budget_id,
-        budget_name,
-        dept_name,
-        cost_center_name,
-        account_name,
-        budget_amount,
-        spent_amount,
-        remaining_amount,
-        actual_spent,
-        budget_utilization_pct,
-        budget_remaining_pct,
-        CASE 
-            WHEN actual_spent > budget_amount THEN 'Over Budget'
-            WHEN actual_spent > (budget_amount * 0.9) THEN 'Near Budget Limit'
-            WHEN actual_spent > (budget_amount * 0.7) THEN 'Moderate Usage'
-            ELSE 'Low Usage'
-        END as budget_status
-    FROM budget_actual
-    ORDER BY budget_utilization_pct DESC
-    """
-    
-    conn = get_conn()
-    return conn.query(sql)
-
-
-@st.cache_data(ttl=60, show_spinner=False)
+    return run_query(stmt, params)
+
+
+@cached_query(ttl=60)
 def get_category_spending_analysis(from_dt: dt.date, to_dt: dt.date, dept_id: Any = None) -> pd.DataFrame:
     """Get spending analysis by category."""
-    
-    sql = """
-    WITH category_spending AS (
-        SELECT 
-            c.category_id,
-            c.category_name,
-            c.category_code,
-            COUNT(o.order_id) as total_orders,
-            COALESCE(SUM(o.total_amount), 0) as total_spending,
-            COALESCE(AVG(o.total_amount), 0) as avg_order_value,
-            COUNT(CASE WHEN o.status = 'Received' THEN 1 END) as completed_orders,
-            COUNT(CASE WHEN o.status = 'Cancelled' THEN 1 END) as cancelled_orders,
-            COUNT(DISTINCT o.vendor_id) as unique_vendors
-        FROM procurement_categories c
-        LEFT JOIN procurement_orders o ON c.category_id = o.category_id
-        WHERE o.order_date >= CURRENT_DATE - INTERVAL '90 days' OR o.order_date IS NULL
-        GROUP BY c.category_id, c.category_name, c.category_code
+
+    stmt, params = build_query(
+        CATEGORY_SPENDING_ANALYSIS, from_dt, to_dt,
+        dimensions=tuple(CATEGORY_SPENDING_ANALYSIS.dimensions),
+        order_by=("total_spending DESC",),
     )
-    SELECT 
-        category_id,
-        category_name,
-        category_code,
-        total_orders,
-        total_spending,
-        avg_order_value,
-        completed_orders,
-        cancelled_orders,
-        unique_vendors,
-        CASE 
-            WHEN total_orders > 0 THEN ROUND((completed_orders::DECIMAL / total_orders) * 100, 2)
-            ELSE 0 
-        END as completion_rate,
-        CASE 
-            WHEN total_orders > 0 THEN ROUND((cancelled_orders::DECIMAL / total_orders) * 100, 2)
-            ELSE 0 
-        END as cancellation_rate
-    FROM category_spending
-    ORDER BY total_spending DESC
-    """
-    
-    conn = get_conn()
-    return conn.query(sql)
+    return run_query(stmt, params)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Change-Driven Cache Invalidation for Reflexta Analytics Platform
+Drops the cached results a data change can affect, and only those.
+
+The statement triggers of migration 006 NOTIFY `reflexta_data_changed` with
+the table, date range and departments of the rows each write touched. The
+materialized view refresher listens on that channel and passes every
+notification to `invalidate()`:
+
+  - query function results are dropped when the changed dates overlap
+    their window, the previous period or the same window last year (the
+    windows the KPI comparisons read, see `src.period_comparison`)
+  - cached daily partials (`src.range_cache`) are dropped when their
+    covered window overlaps and their dept_id filter, if any, matches
+
+Every notification first makes the OLAP cube re-read its data version
+(`olap_cube.note_data_change`), so the dropped results are not recomputed
+from a cube loaded before the change.
+
+Department filters of query functions are not used to narrow invalidation:
+some functions accept dept_id without filtering on it.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Iterable, Optional
+
+from .date_windows import comparison_windows
+from .olap_cube import note_data_change
+from .query_cache import CacheEntry, shared_cache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DataChange:
+    """Rows of `table` changed between from_dt and to_dt (None: unknown, i.e. any)."""
+
+    table: str
+    from_dt: Optional[date] = None
+    to_dt: Optional[date] = None
+    dept_ids: Optional[frozenset] = None
+
+    def overlaps(self, from_dt: Any, to_dt: Any) -> bool:
+        if not isinstance(from_dt, date) or not isinstance(to_dt, date):
+            return True
+        if self.from_dt is None or self.to_dt is None:
+            return True
+        return self.from_dt <= to_dt and from_dt <= self.to_dt
+
+    def touches_dept(self, dept_id: Any) -> bool:
+        if dept_id is None or dept_id == "" or dept_id == "All" or self.dept_ids is None:
+            return True
+        wanted = set(dept_id) if isinstance(dept_id, (list, tuple, set, frozenset)) else {dept_id}
+        return bool(wanted & self.dept_ids)
+
+
+def parse_change(payload: str) -> DataChange:
+    """Parse a NOTIFY payload; a bare table name (pre-006 triggers) means "anything changed"."""
+
+    try:
+        change = json.loads(payload)
+    except ValueError:
+        return DataChange(payload)
+    if not isinstance(change, dict):
+        return DataChange(str(payload))
+    from_dt, to_dt = change.get("from"), change.get("to")
+    dept_ids = change.get("dept_ids")
+    return DataChange(
+        table=change.get("table", ""),
+        from_dt=date.fromisoformat(from_dt) if from_dt else None,
+        to_dt=date.fromisoformat(to_dt) if to_dt else None,
+        dept_ids=frozenset(dept_ids) if dept_ids is not None else None,
+    )
+
+
+def _read_windows(from_dt: Any, to_dt: Any) -> list[tuple[Any, Any]]:
+    # KPI comparisons also read the previous period and the same window last year
+    if isinstance(from_dt, date) and isinstance(to_dt, date):
+        return list(comparison_windows(from_dt, to_dt).values())
+    return [(from_dt, to_dt)]
+
+
+def affects(change: DataChange, key: tuple, entry: CacheEntry) -> bool:
+    """Whether the cached result stored under `key` may be stale after `change`."""
+
+    if len(key) != 2 or not isinstance(key[1], tuple):
+        return False  # dimension lookups, not fact windows
+    arguments = dict(key[1])
+    if str(key[0]).startswith("range:"):
+        covered_from, covered_to, _ = entry.value
+        return change.overlaps(covered_from, covered_to) and change.touches_dept(arguments.get("dept_id"))
+    from_dt, to_dt = arguments.get("from_dt"), arguments.get("to_dt")
+    return any(change.overlaps(*window) for window in _read_windows(from_dt, to_dt))
+
+
+def invalidate(changes: Iterable[DataChange]) -> int:
+    """Drop the cached results any of `changes` may affect; returns how many were dropped."""
+
+    changes = list(changes)
+    if not changes:
+        return 0
+    # First, so results recomputed after the drop do not come from the old cube
+    note_data_change()
+    dropped = shared_cache().invalidate(lambda key, entry: any(affects(c, key, entry) for c in changes))
+    logger.debug("Invalidated %d cached results after %d changes", dropped, len(changes))
+    return dropped
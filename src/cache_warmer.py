@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Query Cache Warming for Reflexta Analytics Platform
+Pre-populates the query cache with the most requested results.
+
+`cached_query` counts every call in an access log, keyed by function and
+arguments with dates relative to the day of the call. The warmer runs at
+startup and every `CACHE_WARM_INTERVAL_SECONDS`: it recomputes the top
+`CACHE_WARM_TOP_N` calls that are missing or due for refresh, at most
+`CACHE_WARM_CONCURRENCY` at a time. When `CACHE_WARM_ACCESS_LOG` names a
+file, the log is saved there (owner-only permissions) so a restarted server
+warms what users asked for before; a file that other users could have
+written is not read. Until there is enough history, the dashboards' default
+window (the last 30 days, no filters) is warmed for the query functions.
+"""
+
+from __future__ import annotations
+
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Optional
+
+import streamlit as st
+
+from .query_cache import absolute_arguments, access_log, cached_functions
+
+logger = logging.getLogger(__name__)
+
+WARM_INTERVAL_SECONDS = int(os.getenv("CACHE_WARM_INTERVAL_SECONDS", "300"))
+WARM_TOP_N = int(os.getenv("CACHE_WARM_TOP_N", "25"))
+WARM_CONCURRENCY = int(os.getenv("CACHE_WARM_CONCURRENCY", "2"))
+# Counts are multiplied by this every cycle so old habits fade
+ACCESS_DECAY = float(os.getenv("CACHE_WARM_DECAY", "0.9"))
+# File the access log is kept in across restarts; unset keeps it in memory only
+ACCESS_LOG_PATH = os.getenv("CACHE_WARM_ACCESS_LOG") or None
+
+# Window the dashboards open with
+DEFAULT_WINDOW_DAYS = 30
+
+
+def default_calls(today: Optional[date] = None) -> list[tuple[str, dict[str, Any]]]:
+    """(function, arguments) for each window-only query function with its default window."""
+
+    today = today or date.today()
+    calls = []
+    for name, function in cached_functions().items():
+        parameters = list(inspect.signature(function).parameters.values())
+        if [p.name for p in parameters[:2]] != ["from_dt", "to_dt"]:
+            continue
+        if any(p.default is inspect.Parameter.empty for p in parameters[2:]):
+            continue
+        calls.append((name, {"from_dt": today - timedelta(days=DEFAULT_WINDOW_DAYS), "to_dt": today}))
+    return calls
+
+
+def _writable_by_others(status: os.stat_result) -> bool:
+    owner = os.getuid() if hasattr(os, "getuid") else status.st_uid
+    return status.st_uid != owner or bool(status.st_mode & 0o022)
+
+
+def load_access_log(path: Optional[str] = ACCESS_LOG_PATH) -> int:
+    """Merge a saved access log into the in-process one; returns the entries read."""
+
+    if not path:
+        return 0
+    try:
+        with open(path, encoding="utf-8") as handle:
+            if _writable_by_others(os.fstat(handle.fileno())):
+                logger.warning("Ignoring query access log %s: it is writable by other users", path)
+                return 0
+            entries = json.load(handle)
+        log = access_log()
+        for entry in entries:
+            log.record_relative(entry["function"], entry["arguments"], entry["count"])
+    except FileNotFoundError:
+        return 0
+    except (OSError, ValueError, TypeError, KeyError) as exc:
+        logger.warning("Ignoring unreadable query access log %s: %s", path, exc)
+        return 0
+    return len(entries)
+
+
+def save_access_log(path: Optional[str] = ACCESS_LOG_PATH, limit: int = 500) -> None:
+    """Write the most frequent calls of the access log to `path`, readable by its owner only."""
+
+    if not path:
+        return
+    entries = [
+        {"function": function, "arguments": arguments, "count": round(count, 3)}
+        for function, arguments, count in access_log().top(limit)
+    ]
+    temporary = f"{path}.tmp"
+    descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    # O_CREAT's mode does not apply to a leftover temporary file
+    os.chmod(temporary, 0o600)
+    with os.fdopen(descriptor, "w", encoding="utf-8") as handle:
+        json.dump(entries, handle)
+    os.replace(temporary, path)
+
+
+class CacheWarmer:
+    """Background thread that keeps the most requested query results cached.
+
+    Each cycle warms the top `top_n` calls of the access log that are not
+    fresh in the cache, through a pool of `concurrency` threads so warming
+    never runs more than that many queries against the database at once.
+    """
+
+    def __init__(self, interval_seconds: int = WARM_INTERVAL_SECONDS, top_n: int = WARM_TOP_N,
+                 concurrency: int = WARM_CONCURRENCY):
+        self.interval_seconds = interval_seconds
+        self.top_n = top_n
+        self.concurrency = max(concurrency, 1)
+        self.last_run: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_warmed = 0
+        self.run_count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="query-cache-warmer", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def planned_calls(self) -> list[tuple[str, dict[str, Any]]]:
+        """The calls the next cycle will warm, most requested first."""
+
+        today = date.today()
+        calls = []
+        for function, arguments, _ in access_log().top(self.top_n):
+            try:
+                calls.append((function, absolute_arguments(arguments, today)))
+            except (TypeError, ValueError) as exc:
+                logger.warning("Not warming a logged call of %s: %s", function, exc)
+        # Until enough history exists, fill up with the default windows
+        return calls + default_calls(today)[: self.top_n - len(calls)]
+
+    def _warm(self, function: str, arguments: dict[str, Any]) -> bool:
+        wrapper = cached_functions().get(function)
+        if wrapper is None:
+            return False
+        try:
+            return wrapper.warm(**arguments)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Warming %s failed: %s", function, exc)
+            return False
+
+    def warm_once(self) -> int:
+        """Warm the planned calls now; returns how many were computed."""
+
+        started = time.perf_counter()
+        calls = self.planned_calls()
+        with ThreadPoolExecutor(self.concurrency, thread_name_prefix="query-cache-warm") as pool:
+            warmed = sum(pool.map(lambda call: self._warm(*call), calls))
+        self.last_duration = time.perf_counter() - started
+        self.last_warmed = warmed
+        self.last_run = time.monotonic()
+        self.run_count += 1
+        logger.info("Warmed %d of %d query results in %.1fs", warmed, len(calls), self.last_duration)
+        return warmed
+
+    def _run(self) -> None:
+        load_access_log()
+        while not self._stop.is_set():
+            self.warm_once()
+            try:
+                save_access_log()
+            except (OSError, TypeError, ValueError) as exc:
+                logger.warning("Could not save the query access log: %s", exc)
+            access_log().decay(ACCESS_DECAY)
+            self._stop.wait(self.interval_seconds)
+
+
+@st.cache_resource(show_spinner=False)
+def start_cache_warmer() -> CacheWarmer:
+    """Start the process-wide query cache warmer (once per server)."""
+
+    warmer = CacheWarmer()
+    warmer.start()
+    return warmer
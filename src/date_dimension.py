@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Date Dimension for Reflexta Analytics Platform
+Calendar and fiscal time buckets from the precomputed dim_date table.
+
+dim_date (migration 014) holds one row per day with its calendar, ISO week
+and fiscal attributes, the start date of each bucket containing it, and
+display labels. A grain is a bucket size: one of the calendar grains
+(day ... year) or a fiscal one (fiscal_week ... fiscal_year).
+
+- SQL: `calendar_query()` joins the fact date to date_key and groups by the
+  grain's bucket start column, so no date function runs per fact row. It
+  then right-joins the window's buckets, which fills empty ones with zeros.
+- pandas: `bucket_days()` maps day arrays to bucket starts through the same
+  table, and `fill_calendar()` labels and gap-fills an aggregated frame. The
+  OLAP cube, the live windows and the range cache use these.
+
+Every path returns `period_start`, a `period` label and the grain's
+attribute columns, followed by the grouping keys and the measures. Trailing
+`Rolling` sums and averages over the filled buckets can be added: as window
+functions in SQL, or with `rolling()` in pandas.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, replace
+from datetime import date
+from typing import Any, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, func, select, true
+from sqlalchemy.sql.expression import Select
+
+from .db import run_query
+from .query_builder import QuerySpec, build_query, dim_date, in_window
+from .query_cache import shared_cache
+
+CALENDAR_TTL_SECONDS = 3600
+
+
+@dataclass(frozen=True)
+class CalendarGrain:
+    """A bucket size: the dim_date columns of each day's bucket start and label,
+    and the attribute columns returned by default (output name -> dim_date column)."""
+
+    start: str
+    label: str
+    attributes: Mapping[str, str]
+
+
+CALENDAR_GRAINS = {
+    "day": CalendarGrain("date_key", "day_label", {"year": "year", "month": "month", "day": "day_of_month"}),
+    "week": CalendarGrain(
+        "week_start", "week_label", {"year": "iso_year", "week": "iso_week", "week_name": "week_name"}
+    ),
+    "month": CalendarGrain(
+        "month_start", "month_label", {"year": "year", "month": "month", "month_name": "month_name"}
+    ),
+    "quarter": CalendarGrain(
+        "quarter_start", "quarter_label", {"year": "year", "quarter": "quarter", "quarter_name": "quarter_name"}
+    ),
+    "year": CalendarGrain("year_start", "year_label", {"year": "year"}),
+    "fiscal_week": CalendarGrain(
+        "fiscal_week_start", "fiscal_week_label", {"fiscal_year": "fiscal_year", "fiscal_week": "fiscal_week"}
+    ),
+    # Fiscal periods are calendar months, numbered from the fiscal year start
+    "fiscal_period": CalendarGrain(
+        "month_start", "fiscal_period_label", {"fiscal_year": "fiscal_year", "fiscal_period": "fiscal_period"}
+    ),
+    "fiscal_quarter": CalendarGrain(
+        "fiscal_quarter_start", "fiscal_quarter_label",
+        {"fiscal_year": "fiscal_year", "fiscal_quarter": "fiscal_quarter"},
+    ),
+    "fiscal_year": CalendarGrain("fiscal_year_start", "fiscal_year_label", {"fiscal_year": "fiscal_year"}),
+}
+
+GRAIN_TITLES = {
+    "day": "Day",
+    "week": "Week",
+    "month": "Month",
+    "quarter": "Quarter",
+    "year": "Year",
+    "fiscal_week": "Fiscal Week",
+    "fiscal_period": "Fiscal Period",
+    "fiscal_quarter": "Fiscal Quarter",
+    "fiscal_year": "Fiscal Year",
+}
+
+_DATE_COLUMNS = ("date_key", *sorted({grain.start for grain in CALENDAR_GRAINS.values()} - {"date_key"}))
+
+
+@dataclass(frozen=True)
+class Rolling:
+    """Sum or average of `measure` over the last `periods` buckets, the current one included.
+
+    Buckets before the window are not read, so the first `periods - 1`
+    values cover fewer buckets.
+    """
+
+    measure: str
+    periods: int
+    agg: str = "sum"
+
+    def __post_init__(self):
+        if self.agg not in ("sum", "avg"):
+            raise ValueError(f"Unsupported rolling aggregation {self.agg!r}; expected 'sum' or 'avg'")
+        if self.periods < 1:
+            raise ValueError(f"Rolling windows need at least one bucket, got {self.periods}")
+
+
+def _grain(grain: str) -> CalendarGrain:
+    try:
+        return CALENDAR_GRAINS[grain]
+    except KeyError:
+        raise ValueError(f"Unsupported grain {grain!r}; expected one of {', '.join(CALENDAR_GRAINS)}") from None
+
+
+# =====================================================
+# SQL
+# =====================================================
+
+
+def calendar_query(
+    spec: QuerySpec,
+    grain: str,
+    from_dt: date,
+    to_dt: date,
+    filters: Optional[Mapping[str, Any]] = None,
+    dimensions: Sequence[str] = (),
+    attributes: Optional[Mapping[str, str]] = None,
+    columns: Optional[Sequence[str]] = None,
+    rolling: Optional[Mapping[str, Rolling]] = None,
+) -> tuple[Select, dict[str, Any]]:
+    """`spec` aggregated per `grain` bucket of its date column, one row per bucket of the window.
+
+    The fact rows join dim_date on their date and group by the bucket start.
+    The result lists every bucket of the window (for each combination of the
+    grouped `dimensions` seen in the window), with zeros where nothing was
+    recorded, ordered by bucket. `attributes` renames or picks the dim_date
+    columns returned for each bucket. `rolling` adds trailing aggregates
+    (output column -> Rolling) as ROWS window frames per combination of
+    `dimensions`; every bucket has a row, so rows count buckets.
+    """
+
+    calendar = _grain(grain)
+    attributes = calendar.attributes if attributes is None else attributes
+    day = dim_date.alias("dd")
+    bucketed = replace(
+        spec,
+        joins=(*spec.joins, (day, day.c.date_key == spec.date_column)),
+        dimensions={**spec.dimensions, "period_start": day.c[calendar.start]},
+    )
+    grouped, params = build_query(
+        bucketed, from_dt, to_dt, filters, dimensions=("period_start", *dimensions), columns=columns
+    )
+    facts = grouped.cte("facts")
+
+    bucket = dim_date.alias("bucket")
+    bucket_columns = [
+        bucket.c[calendar.start], bucket.c[calendar.label], *(bucket.c[name] for name in attributes.values())
+    ]
+    buckets = (
+        select(
+            bucket.c[calendar.start].label("period_start"),
+            bucket.c[calendar.label].label("period"),
+            *(bucket.c[column].label(name) for name, column in attributes.items()),
+        )
+        .where(in_window(bucket.c.date_key))
+        .group_by(*dict.fromkeys(bucket_columns))
+        .subquery("buckets")
+    )
+
+    source = buckets
+    matches = [facts.c.period_start == buckets.c.period_start]
+    keys = []
+    if dimensions:
+        seen = select(*(facts.c[name] for name in dimensions)).distinct().subquery("keys")
+        source = source.join(seen, true())
+        keys = [seen.c[name] for name in dimensions]
+        matches += [facts.c[name].is_not_distinct_from(seen.c[name]) for name in dimensions]
+
+    measures = [column for column in facts.c if column.name not in ("period_start", *dimensions)]
+    filled = {column.name: func.coalesce(column, 0) for column in measures}
+    windows = [
+        (func.sum if spec.agg == "sum" else func.avg)(filled[spec.measure])
+        .over(partition_by=keys or None, order_by=buckets.c.period_start, rows=(1 - spec.periods, 0))
+        .label(name)
+        for name, spec in (rolling or {}).items()
+    ]
+    stmt = (
+        select(
+            buckets.c.period_start,
+            buckets.c.period,
+            *(buckets.c[name] for name in attributes),
+            *keys,
+            *(value.label(name) for name, value in filled.items()),
+            *windows,
+        )
+        .select_from(source.outerjoin(facts, and_(*matches)))
+        .order_by(buckets.c.period_start, *keys)
+    )
+    return stmt, params
+
+
+# =====================================================
+# PANDAS
+# =====================================================
+
+
+def load_calendar(frame: pd.DataFrame) -> pd.DataFrame:
+    """dim_date rows as read from the database, with the date columns as datetime64 and indexed by day."""
+
+    frame = frame.copy()
+    for column in _DATE_COLUMNS:
+        frame[column] = pd.to_datetime(frame[column])
+    return frame.set_index("date_key", drop=False).sort_index()
+
+
+def get_calendar() -> pd.DataFrame:
+    """The whole of dim_date (a few thousand rows per decade), kept in the shared cache."""
+
+    return shared_cache().get_or_compute(
+        ("calendar",), CALENDAR_TTL_SECONDS,
+        lambda: load_calendar(run_query(select(dim_date).order_by(dim_date.c.date_key), name="dim_date")),
+    )
+
+
+def bucket_days(calendar: pd.DataFrame, days: Any, grain: str) -> np.ndarray:
+    """Bucket start (datetime64[D]) of every day in `days`, looked up in `calendar`.
+
+    The lookup is an offset into the calendar's days, so bucketing millions
+    of rows costs a subtraction and a take. Days outside the calendar get NaT.
+    """
+
+    days = np.asarray(days, dtype="datetime64[D]")
+    keys = calendar.index.to_numpy().astype("datetime64[D]")
+    starts = calendar[_grain(grain).start].to_numpy().astype("datetime64[D]")
+    span = int((keys[-1] - keys[0]).astype(np.int64)) + 1 if len(keys) else 0
+    if span != len(keys):
+        # Gaps in the calendar stay NaT
+        dense = np.full(span, np.datetime64("NaT"), dtype="datetime64[D]")
+        dense[(keys - keys[0]).astype(np.int64)] = starts
+        starts = dense
+    buckets = np.full(len(days), np.datetime64("NaT"), dtype="datetime64[D]")
+    if span:
+        offsets = (days - keys[0]).astype(np.int64)
+        inside = (offsets >= 0) & (offsets < span) & ~np.isnat(days)
+        buckets[inside] = starts[offsets[inside]]
+    return buckets
+
+
+def fill_calendar(
+    calendar: pd.DataFrame,
+    frame: pd.DataFrame,
+    grain: str,
+    from_dt: date,
+    to_dt: date,
+    keys: Sequence[str] = (),
+    attributes: Optional[Mapping[str, str]] = None,
+    rolling: Optional[Mapping[str, Rolling]] = None,
+) -> pd.DataFrame:
+    """pandas counterpart of `calendar_query` for a frame aggregated by `period_start` and `keys`.
+
+    Labels each bucket of the window from `calendar` and adds the buckets
+    missing from `frame` (for each combination of `keys` in it) with zeros,
+    then the `rolling` aggregates.
+    """
+
+    calendar_grain = _grain(grain)
+    attributes = calendar_grain.attributes if attributes is None else attributes
+    window = calendar.loc[pd.Timestamp(from_dt):pd.Timestamp(to_dt)]
+    buckets = pd.DataFrame({
+        "period_start": window[calendar_grain.start].to_numpy(),
+        "period": window[calendar_grain.label].to_numpy(),
+        **{name: window[column].to_numpy() for name, column in attributes.items()},
+    }).drop_duplicates("period_start", ignore_index=True)
+
+    frame = frame.assign(period_start=pd.to_datetime(frame["period_start"]))
+    if keys:
+        buckets = buckets.merge(frame[list(keys)].drop_duplicates(), how="cross")
+    result = buckets.merge(frame, on=["period_start", *keys], how="left")
+    measures = [column for column in frame.columns if column not in ("period_start", *keys)]
+    result[measures] = result[measures].fillna(0).astype(frame[measures].dtypes.to_dict())
+    result = result.sort_values(["period_start", *keys], ignore_index=True, kind="stable")
+    return add_rolling(result, rolling or {}, keys)
+
+
+def add_rolling(frame: pd.DataFrame, rolling: Mapping[str, Rolling], keys: Sequence[str] = ()) -> pd.DataFrame:
+    """`frame` (one row per bucket and `keys`, in bucket order) with the `rolling` aggregates added."""
+
+    for name, spec in rolling.items():
+        values = frame[spec.measure].astype(float)
+        groups = values.groupby([frame[key] for key in keys], dropna=False, sort=False) if keys else values
+        window = groups.rolling(spec.periods, min_periods=1)
+        result = window.sum() if spec.agg == "sum" else window.mean()
+        frame[name] = result.droplevel(list(range(len(keys)))) if keys else result
+    return frame
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Date Window Helpers for Reflexta Analytics Platform
+SQL fragments for index-friendly date filtering and time bucketing.
+
+Dashboards pass inclusive [from_dt, to_dt] date windows. These helpers turn
+them into half-open range predicates (`col >= :from_dt AND col < :to_dt_excl`)
+that the planner can match against the date indexes and use for partition
+pruning, and group on `date_trunc` of the bucket start so the expression
+indexes from migration 004 apply. Never wrap the filtered column in a
+function (EXTRACT, TO_CHAR, ...) inside a WHERE clause.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Any
+
+GRAINS = ("day", "week", "month", "quarter", "year")
+
+
+def window_params(from_dt: date, to_dt: date, prefix: str = "") -> dict[str, Any]:
+    """Return the bind parameters for `date_range` for an inclusive window."""
+
+    return {
+        f"{prefix}from_dt": from_dt,
+        f"{prefix}to_dt_excl": to_dt + timedelta(days=1),
+    }
+
+
+def date_range(column: str, prefix: str = "") -> str:
+    """Return a half-open range predicate on `column` bound by `window_params`."""
+
+    return f"{column} >= :{prefix}from_dt AND {column} < :{prefix}to_dt_excl"
+
+
+def bucket_start(column: str, grain: str = "month") -> str:
+    """Return the SQL expression for the start of the `grain` bucket containing `column`.
+
+    The explicit ::timestamp cast keeps the expression immutable, so it is
+    identical to (and can use) the expression indexes on the fact tables.
+    """
+
+    if grain not in GRAINS:
+        raise ValueError(f"Unsupported grain {grain!r}; expected one of {', '.join(GRAINS)}")
+    return f"date_trunc('{grain}', {column}::timestamp)"
+
+
+def previous_window(from_dt: date, to_dt: date) -> tuple[date, date]:
+    """The window of the same number of days ending the day before from_dt."""
+
+    return from_dt - timedelta(days=(to_dt - from_dt).days + 1), from_dt - timedelta(days=1)
+
+
+def year_earlier(value: date) -> date:
+    """The same date one year earlier (29 February becomes the 28th)."""
+
+    try:
+        return value.replace(year=value.year - 1)
+    except ValueError:
+        return value.replace(year=value.year - 1, day=28)
+
+
+def comparison_windows(from_dt: date, to_dt: date) -> dict[str, tuple[date, date]]:
+    """The windows a period-over-period comparison reads, by name.
+
+    "current" is [from_dt, to_dt], "previous" the window of the same length
+    just before it and "last_year" the same dates one year earlier.
+    """
+
+    return {
+        "current": (from_dt, to_dt),
+        "previous": previous_window(from_dt, to_dt),
+        "last_year": (year_earlier(from_dt), year_earlier(to_dt)),
+    }
@@ -6,9 +6,37 @@ Uses Streamlit's connection API. Configure the SQLAlchemy URL in `.streamlit/sec
 """
 
 import os
-from typing import Any
+import select
+import sys
+import threading
+from typing import Any, Iterable, Optional
 
+import pandas as pd
+import pyarrow as pa
 import streamlit as st
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import SQLAlchemyError
+
+from .result_frames import normalize_result
+
+try:  # Optional: Arrow-native transfer (COPY BINARY straight into record batches)
+    import adbc_driver_postgresql.dbapi as adbc_postgresql
+except ImportError:  # pragma: no cover - falls back to the DBAPI cursor path
+    adbc_postgresql = None
+
+# "arrow" fetches results as Arrow tables; "pandas" keeps pd.read_sql
+RESULT_TRANSFER = os.getenv("QUERY_RESULT_TRANSFER", "arrow")
+# "numpy" gives float64/object columns; "pyarrow" gives ArrowDtype columns
+DTYPE_BACKEND = os.getenv("QUERY_DTYPE_BACKEND", "numpy")
+
+_adbc = threading.local()
+# ADBC binds positional $n parameters
+_ADBC_DIALECT = postgresql.dialect(paramstyle="numeric_dollar")
+
+
+class _AdbcFallback(Exception):
+    """ADBC cannot bind the statement's parameters or reach the server; use the cursor path."""
 
 
 def get_conn() -> Any:
@@ -50,3 +78,192 @@ def health_check() -> bool:
         return False
 
 
+def run_query(statement: Any, params: Optional[dict[str, Any]] = None, name: Optional[str] = None) -> pd.DataFrame:
+    """Execute a SQLAlchemy Core statement (see `src.query_builder`) and return a DataFrame.
+
+    The frame's dtypes are compacted (`src.result_frames`) and its memory
+    savings recorded under `name`, by default the calling query function.
+    """
+
+    engine = get_conn().engine
+    if RESULT_TRANSFER == "arrow":
+        frame = arrow_to_frame(fetch_arrow(engine, statement, params))
+    else:
+        with engine.connect() as connection:
+            frame = pd.read_sql(statement, connection, params=params or {})
+    return normalize_result(frame, name or sys._getframe(1).f_code.co_name)
+
+
+def fetch_arrow(engine: Any, statement: Any, params: Optional[dict[str, Any]] = None) -> pa.Table:
+    """Execute `statement` (Core statement or SQL string) and return the result as an Arrow table.
+
+    With `adbc-driver-postgresql` installed the rows arrive as Arrow record
+    batches (binary COPY, no Python objects per value). Otherwise the DBAPI
+    cursor is read directly, skipping SQLAlchemy row objects, with NUMERIC
+    decoded to float instead of Decimal. NUMERIC columns are float64 either way.
+    Parameters are bound on both paths, so the statement text stays the same
+    for every filter value. A statement goes to the cursor path only when ADBC
+    cannot bind one of its parameters or reach the server.
+    """
+
+    if isinstance(statement, str):
+        statement = text(statement)
+    if adbc_postgresql is not None and engine.dialect.name == "postgresql":
+        try:
+            return _fetch_adbc(engine, statement, params)
+        except _AdbcFallback:
+            pass
+    return _fetch_cursor(engine, statement, params)
+
+
+def arrow_to_frame(table: pa.Table) -> pd.DataFrame:
+    """Convert a result table to pandas (Arrow-backed columns when DTYPE_BACKEND is "pyarrow")."""
+
+    if DTYPE_BACKEND == "pyarrow":
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+    return table.to_pandas(split_blocks=True)
+
+
+def _adbc_connection(engine: Any) -> Any:
+    connection = getattr(_adbc, "connection", None)
+    if connection is None:
+        uri = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        try:
+            connection = _adbc.connection = adbc_postgresql.connect(uri, autocommit=True)
+        except adbc_postgresql.Error as exc:
+            raise _AdbcFallback(str(exc)) from exc
+    return connection
+
+
+def _close_adbc_connection() -> None:
+    connection = getattr(_adbc, "connection", None)
+    _adbc.connection = None
+    if connection is not None:
+        try:
+            connection.close()
+        except adbc_postgresql.Error:
+            pass
+
+
+def _is_connection_error(exc: Exception) -> bool:
+    # Errors reported by the server carry its SQLSTATE; class 08 and 57P are connection failures
+    sqlstate = getattr(exc, "sqlstate", None)
+    return isinstance(exc, adbc_postgresql.OperationalError) and (
+        not sqlstate or sqlstate.startswith(("08", "57P"))
+    )
+
+
+def _fetch_adbc(engine: Any, statement: Any, params: Optional[dict[str, Any]]) -> pa.Table:
+    """Run `statement` over the thread's ADBC connection with its parameters bound, not inlined.
+
+    Raises `_AdbcFallback` when the parameters cannot be bound or the
+    connection fails; errors from the database itself are raised as they are.
+    """
+
+    try:
+        state = statement.compile(dialect=_ADBC_DIALECT).construct_expanded_state(params or {})
+    except SQLAlchemyError as exc:
+        raise _AdbcFallback(str(exc)) from exc
+    bound = tuple(state.parameters[name] for name in state.positiontup or ())
+
+    connection = _adbc_connection(engine)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(state.statement, bound or None)
+            table = cursor.fetch_arrow_table()
+    except (pa.ArrowException, TypeError) as exc:
+        # A parameter value with no Arrow type the driver can bind
+        raise _AdbcFallback(str(exc)) from exc
+    except adbc_postgresql.NotSupportedError as exc:
+        if exc.sqlstate:
+            raise
+        raise _AdbcFallback(str(exc)) from exc
+    except adbc_postgresql.Error as exc:
+        if not _is_connection_error(exc):
+            raise
+        _close_adbc_connection()
+        raise _AdbcFallback(str(exc)) from exc
+    return _numeric_to_float(table)
+
+
+def _numeric_to_float(table: pa.Table) -> pa.Table:
+    """Cast NUMERIC columns (decimal128, or strings tagged numeric by ADBC) to float64."""
+
+    for index, field in enumerate(table.schema):
+        typname = (field.metadata or {}).get(b"ADBC:postgresql:typname")
+        if pa.types.is_decimal(field.type) or typname == b"numeric":
+            table = table.set_column(index, field.name, table.column(index).cast(pa.float64()))
+    return table
+
+
+def _fetch_cursor(engine: Any, statement: Any, params: Optional[dict[str, Any]]) -> pa.Table:
+    with engine.connect() as connection:
+        # Expands IN lists into one placeholder per value, as SQLAlchemy does on execute
+        state = statement.compile(dialect=connection.dialect).construct_expanded_state(params or {})
+        bound = state.parameters
+        if state.positiontup is not None:
+            bound = tuple(bound[name] for name in state.positiontup)
+        cursor = connection.connection.dbapi_connection.cursor()
+        try:
+            _decode_numeric_as_float(cursor, connection.dialect.driver)
+            cursor.execute(state.statement, bound)
+            names = [column[0] for column in cursor.description] if cursor.description else []
+            rows = cursor.fetchall() if names else []
+        finally:
+            cursor.close()
+    columns = list(zip(*rows, strict=True)) if rows else [()] * len(names)
+    return pa.Table.from_arrays([pa.array(column, from_pandas=True) for column in columns], names=names)
+
+
+def _decode_numeric_as_float(cursor: Any, driver: str) -> None:
+    if driver == "psycopg":
+        from psycopg.types.numeric import FloatLoader
+
+        cursor.adapters.register_loader("numeric", FloatLoader)
+    elif driver == "psycopg2":
+        import psycopg2.extensions
+
+        numeric = psycopg2.extensions.new_type(
+            psycopg2.extensions.DECIMAL.values, "NUMERIC_FLOAT",
+            lambda value, _: None if value is None else float(value),
+        )
+        psycopg2.extensions.register_type(numeric, cursor)
+
+
+def listen(engine: Any, channels: Iterable[str]) -> Any:
+    """Open a dedicated autocommit connection that LISTENs on `channels`.
+
+    Returns the SQLAlchemy pool connection; pass it to `poll_notifications` and
+    close it when done. Works with both the psycopg2 and psycopg (v3) drivers.
+    Transaction-mode poolers (e.g. Supabase on port 6543) do not deliver
+    notifications, so callers should treat LISTEN as best effort.
+    """
+
+    raw = engine.raw_connection()
+    # Keep the autocommit listener out of the shared pool
+    raw.detach()
+    driver = raw.driver_connection
+    driver.autocommit = True
+    cursor = driver.cursor()
+    try:
+        for channel in channels:
+            cursor.execute(f'LISTEN "{channel}"')
+    finally:
+        cursor.close()
+    return raw
+
+
+def poll_notifications(raw: Any, timeout: float) -> list[tuple[str, str]]:
+    """Wait up to `timeout` seconds and return pending (channel, payload) pairs."""
+
+    driver = raw.driver_connection
+    if callable(getattr(driver, "notifies", None)):
+        # psycopg 3: returns on the first notification or after the timeout
+        return [(n.channel, n.payload) for n in driver.notifies(timeout=timeout, stop_after=1)]
+
+    # psycopg2: wait on the socket, then drain the notifies list
+    if select.select([driver], [], [], timeout) != ([], [], []):
+        driver.poll()
+    received = [(n.channel, n.payload) for n in driver.notifies]
+    driver.notifies.clear()
+    return received
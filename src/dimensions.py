@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Dimension Lookups for Reflexta Analytics Platform
+Widget options and id <-> name resolution from the dimension tables.
+
+Each dimension table (departments, vendors, categories) is read once into
+compact NumPy arrays: ids, names, and the case-folded names in sorted order,
+so labels are an index lookup and prefix search is two `searchsorted` calls,
+fast enough for pickers over tens of thousands of vendors.
+
+Migration 009 counts every write to the dimension tables in
+`dimension_versions`. The versions are checked every
+`DIMENSION_CHECK_SECONDS` and a table is read again only after it changed.
+Without that table, dimensions are re-read every `DIMENSION_MAX_AGE_SECONDS`.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+import numpy as np
+import streamlit as st
+from sqlalchemy import select
+
+from .db import fetch_arrow, get_conn
+from .query_builder import finance_departments, procurement_categories, procurement_vendors
+
+logger = logging.getLogger(__name__)
+
+DIMENSION_CHECK_SECONDS = int(os.getenv("DIMENSION_CHECK_SECONDS", "60"))
+DIMENSION_MAX_AGE_SECONDS = int(os.getenv("DIMENSION_MAX_AGE_SECONDS", "3600"))
+
+VERSIONS_SQL = "SELECT table_name, version FROM dimension_versions"
+
+
+@dataclass(frozen=True)
+class DimensionTable:
+    """Where a dimension's ids and display names come from."""
+
+    table: Any
+    key: str
+    label: str
+
+
+DIMENSION_TABLES = {
+    "departments": DimensionTable(finance_departments, "dept_id", "dept_name"),
+    "vendors": DimensionTable(procurement_vendors, "vendor_id", "vendor_name"),
+    "categories": DimensionTable(procurement_categories, "category_id", "category_name"),
+}
+
+
+class Dimension:
+    """Id <-> name arrays of one dimension table, with prefix search on names."""
+
+    def __init__(self, name: str, ids: np.ndarray, labels: np.ndarray, version: Any = None):
+        self.name = name
+        self.version = version
+        self.loaded_at = time.monotonic()
+        order = np.argsort(ids, kind="stable")
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.labels = np.asarray(labels, dtype=object)[order]
+        folded = np.array([str(label).casefold() for label in self.labels], dtype=str)
+        self._by_label = np.argsort(folded, kind="stable")
+        self._folded = folded[self._by_label]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _position(self, dimension_id: Any) -> Optional[int]:
+        position = int(np.searchsorted(self.ids, dimension_id))
+        if position < len(self.ids) and self.ids[position] == dimension_id:
+            return position
+        return None
+
+    def options(self) -> list[int]:
+        """All ids, ordered by name (for selectbox/multiselect options)."""
+
+        return self.ids[self._by_label].tolist()
+
+    def label(self, dimension_id: Any, default: str = "") -> str:
+        """The name of `dimension_id`, or `default` when it does not exist."""
+
+        if dimension_id is None:
+            return default
+        position = self._position(dimension_id)
+        return default if position is None else str(self.labels[position])
+
+    def labels_for(self, ids: Iterable[Any]) -> list[str]:
+        return [self.label(dimension_id, str(dimension_id)) for dimension_id in ids]
+
+    def resolve(self, name: str) -> Optional[int]:
+        """The id whose name equals `name` (case-insensitive), or None."""
+
+        folded = name.casefold()
+        position = int(np.searchsorted(self._folded, folded))
+        if position < len(self._folded) and self._folded[position] == folded:
+            return int(self.ids[self._by_label[position]])
+        return None
+
+    def search(self, prefix: str, limit: int = 100) -> list[int]:
+        """Ids whose name starts with `prefix` (case-insensitive), by name, at most `limit`."""
+
+        folded = prefix.casefold()
+        if not folded:
+            return self.ids[self._by_label[:limit]].tolist()
+        start = int(np.searchsorted(self._folded, folded, side="left"))
+        stop = int(np.searchsorted(self._folded, folded + "\U0010ffff", side="left"))
+        return self.ids[self._by_label[start:min(stop, start + limit)]].tolist()
+
+
+def load_dimension(engine: Any, name: str, version: Any = None) -> Dimension:
+    """Read one dimension table into a `Dimension`."""
+
+    source = DIMENSION_TABLES[name]
+    key, label = source.table.c[source.key], source.table.c[source.label]
+    frame = fetch_arrow(engine, select(key, label)).to_pandas()
+    return Dimension(name, frame[source.key].to_numpy(), frame[source.label].to_numpy(), version)
+
+
+class DimensionStore:
+    """Holds the loaded dimensions and re-reads a table when its version changes."""
+
+    def __init__(self, engine: Any):
+        self.engine = engine
+        self._dimensions: dict[str, Dimension] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, version: Any = None) -> Dimension:
+        dimension = self._dimensions.get(name)
+        if dimension is not None and not self._stale(dimension, version):
+            return dimension
+        with self._lock:
+            dimension = self._dimensions.get(name)
+            if dimension is None or self._stale(dimension, version):
+                started = time.perf_counter()
+                dimension = load_dimension(self.engine, name, version)
+                self._dimensions[name] = dimension
+                logger.info("Loaded %d %s in %.2fs", len(dimension), name, time.perf_counter() - started)
+        return dimension
+
+    @staticmethod
+    def _stale(dimension: Dimension, version: Any) -> bool:
+        if version is None:
+            return time.monotonic() - dimension.loaded_at > DIMENSION_MAX_AGE_SECONDS
+        return dimension.version != version
+
+
+@st.cache_resource(show_spinner=False)
+def _dimension_store() -> DimensionStore:
+    return DimensionStore(get_conn().engine)
+
+
+@st.cache_data(ttl=DIMENSION_CHECK_SECONDS, show_spinner=False)
+def _current_versions() -> dict[str, int]:
+    try:
+        with get_conn().engine.connect() as connection:
+            return dict(connection.exec_driver_sql(VERSIONS_SQL).all())
+    except Exception as exc:  # noqa: BLE001
+        logger.debug("Dimension versions unavailable: %s", exc)
+        return {}
+
+
+def get_dimension(name: str) -> Dimension:
+    """The current `Dimension` called `name` (departments, vendors or categories).
+
+    Returns an empty dimension when the database cannot be read, so pages can
+    still build their sidebars and report the connection problem themselves.
+    """
+
+    try:
+        version = _current_versions().get(DIMENSION_TABLES[name].table.name)
+        return _dimension_store().get(name, version)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Dimension %s unavailable: %s", name, exc)
+        return Dimension(name, np.array([], dtype=np.int64), np.array([], dtype=object))
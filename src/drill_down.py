@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Drill-Down Engine for Reflexta Analytics Platform
+One aggregate query per hierarchy level, each narrowed by the path clicked so far.
+
+A hierarchy is a list of levels ending in the fact rows, e.g. department →
+cost center → account → transactions, or month → day → transactions. The
+path is the keys selected at the levels above. Selected ids become equality
+filters on the fact; selected date buckets shrink the date window instead,
+so a deeper level reads only the rows under the path through the
+(key, date) indexes of migration 011 and partition pruning, however large
+the top level is. Each (hierarchy, path, window) result is cached.
+
+Path values are plain ids or ISO dates, so drill-down calls can be logged
+and replayed by the cache warmer like any other query.
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Optional, Sequence
+
+import pandas as pd
+from sqlalchemy import String, cast, func, select
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.expression import FromClause
+
+from .db import run_query
+from .metrics import FACTS, metric_columns
+from .query_builder import (
+    Filter,
+    QuerySpec,
+    bucket,
+    build_query,
+    const,
+    finance_accounts,
+    finance_cost_centers,
+    finance_departments,
+    finance_transactions,
+    procurement_categories,
+    procurement_orders,
+    procurement_vendors,
+)
+from .query_cache import cached_query
+
+DRILL_DETAIL_LIMIT = int(os.getenv("DRILL_DETAIL_LIMIT", "500"))
+
+# Length of one bucket of each date grain, for narrowing the window to a bucket
+GRAIN_OFFSETS = {
+    "day": pd.DateOffset(days=1),
+    "week": pd.DateOffset(weeks=1),
+    "month": pd.DateOffset(months=1),
+    "quarter": pd.DateOffset(months=3),
+    "year": pd.DateOffset(years=1),
+}
+GRAIN_LABELS = {"day": "YYYY-MM-DD", "week": "IYYY-\"W\"IW", "month": "Mon YYYY", "quarter": "YYYY-\"Q\"Q", "year": "YYYY"}
+
+t = finance_transactions.alias("t")
+po = procurement_orders.alias("po")
+d = finance_departments.alias("d")
+cc = finance_cost_centers.alias("cc")
+a = finance_accounts.alias("a")
+v = procurement_vendors.alias("v")
+c = procurement_categories.alias("c")
+
+
+@dataclass(frozen=True)
+class DrillLevel:
+    """One level of a hierarchy: a fact id column, or a bucket of the hierarchy's date column.
+
+    Id levels are labelled from `labels` (a dimension table with a column of
+    the same name as the key) after aggregating, so the join only touches the
+    groups, not the fact rows.
+    """
+
+    name: str
+    title: str
+    key: Optional[ColumnElement] = None
+    grain: Optional[str] = None
+    labels: Optional[FromClause] = None
+    label_column: str = ""
+
+
+@dataclass(frozen=True)
+class Hierarchy:
+    """A drill-down path over one fact: its levels, the measures shown and the detail rows."""
+
+    title: str
+    fact: FromClause
+    date_column: ColumnElement
+    levels: tuple[DrillLevel, ...]
+    measures: dict[str, ColumnElement]
+    detail: dict[str, ColumnElement]
+    detail_title: str
+    detail_order: tuple[str, ...] = ()
+    where: tuple[ColumnElement, ...] = ()
+
+    @property
+    def filters(self) -> tuple[Filter, ...]:
+        return tuple(Filter(level.name, level.key) for level in self.levels if level.key is not None)
+
+
+TRANSACTION_MEASURES = metric_columns(t, ("amount", "total_amount"), ("count", "total_transactions"))
+ORDER_MEASURES = metric_columns(po, ("amount", "total_spend"), ("count", "total_orders"))
+
+TRANSACTION_DETAIL = {
+    "transaction_id": t.c.transaction_id,
+    "transaction_date": t.c.transaction_date,
+    "transaction_type": t.c.transaction_type,
+    "description": t.c.description,
+    "vendor_name": t.c.vendor_name,
+    "amount": t.c.amount,
+    "status": t.c.status,
+}
+ORDER_DETAIL = {
+    "order_id": po.c.order_id,
+    "order_number": po.c.order_number,
+    "order_date": po.c.order_date,
+    "status": po.c.status,
+    "priority": po.c.priority,
+    "grand_total": po.c.grand_total,
+    "currency": po.c.currency,
+    "notes": po.c.notes,
+}
+
+HIERARCHIES = {
+    "department": Hierarchy(
+        title="Department → Cost Center → Account",
+        fact=t,
+        date_column=t.c.transaction_date,
+        levels=(
+            DrillLevel("dept_id", "Department", t.c.dept_id, labels=d, label_column="dept_name"),
+            DrillLevel("cost_center_id", "Cost Center", t.c.cost_center_id, labels=cc, label_column="cost_center_name"),
+            DrillLevel("account_id", "Account", t.c.account_id, labels=a, label_column="account_name"),
+        ),
+        measures=TRANSACTION_MEASURES,
+        detail=TRANSACTION_DETAIL,
+        detail_title="Transactions",
+        detail_order=("amount DESC", "transaction_id DESC"),
+        where=tuple(FACTS["transactions"].where(t)),
+    ),
+    "calendar": Hierarchy(
+        title="Month → Day",
+        fact=t,
+        date_column=t.c.transaction_date,
+        levels=(
+            DrillLevel("month", "Month", grain="month"),
+            DrillLevel("day", "Day", grain="day"),
+        ),
+        measures=TRANSACTION_MEASURES,
+        detail=TRANSACTION_DETAIL,
+        detail_title="Transactions",
+        detail_order=("amount DESC", "transaction_id DESC"),
+        where=tuple(FACTS["transactions"].where(t)),
+    ),
+    "vendor": Hierarchy(
+        title="Vendor → Month",
+        fact=po,
+        date_column=po.c.order_date,
+        levels=(
+            DrillLevel("vendor_id", "Vendor", po.c.vendor_id, labels=v, label_column="vendor_name"),
+            DrillLevel("month", "Month", grain="month"),
+        ),
+        measures=ORDER_MEASURES,
+        detail=ORDER_DETAIL,
+        detail_title="Orders",
+        detail_order=("order_date DESC", "order_id DESC"),
+        where=tuple(FACTS["orders"].where(po)),
+    ),
+    "category": Hierarchy(
+        title="Category → Vendor",
+        fact=po,
+        date_column=po.c.order_date,
+        levels=(
+            DrillLevel("category_id", "Category", po.c.category_id, labels=c, label_column="category_name"),
+            DrillLevel("vendor_id", "Vendor", po.c.vendor_id, labels=v, label_column="vendor_name"),
+        ),
+        measures=ORDER_MEASURES,
+        detail=ORDER_DETAIL,
+        detail_title="Orders",
+        detail_order=("order_date DESC", "order_id DESC"),
+        where=tuple(FACTS["orders"].where(po)),
+    ),
+}
+
+
+def narrow(hierarchy: Hierarchy, path: Sequence[Any], from_dt: date, to_dt: date) -> tuple[date, date, dict[str, Any]]:
+    """The window and fact filters selected by `path` (one key per level, from the top)."""
+
+    if len(path) > len(hierarchy.levels):
+        raise ValueError(f"Drill path {list(path)!r} is deeper than the {len(hierarchy.levels)} "
+                         f"levels of {hierarchy.title!r}")
+    filters: dict[str, Any] = {}
+    # A shorter path selects the levels above the one being shown
+    for level, value in zip(hierarchy.levels, path, strict=False):
+        if level.grain is None:
+            filters[level.name] = value
+            continue
+        start = date.fromisoformat(str(value))
+        end = (pd.Timestamp(start) + GRAIN_OFFSETS[level.grain]).date() - timedelta(days=1)
+        from_dt, to_dt = max(from_dt, start), min(to_dt, end)
+    return from_dt, to_dt, filters
+
+
+def level_statement(hierarchy: Hierarchy, depth: int, from_dt: date, to_dt: date,
+                    filters: dict[str, Any]) -> tuple[Any, dict[str, Any]]:
+    """Aggregate of level `depth` as (key, label, measures...) rows, largest first."""
+
+    level = hierarchy.levels[depth]
+    key = level.key if level.grain is None else bucket(hierarchy.date_column, level.grain)
+    spec = QuerySpec(
+        fact=hierarchy.fact,
+        date_column=hierarchy.date_column,
+        where=hierarchy.where,
+        filters=hierarchy.filters,
+        dimensions={"key": key},
+        measures=hierarchy.measures,
+    )
+    stmt, params = build_query(spec, from_dt, to_dt, filters, dimensions=("key",))
+    groups = stmt.subquery("groups")
+    if level.grain is not None:
+        label = func.to_char(groups.c.key, const(GRAIN_LABELS[level.grain]))
+        source, order = groups, (groups.c.key,)
+    else:
+        labels = level.labels
+        label = func.coalesce(labels.c[level.label_column], cast(groups.c.key, String))
+        source = groups.outerjoin(labels, labels.c[level.key.name] == groups.c.key)
+        order = (groups.c.amount.desc(), groups.c.key)
+    measures = [groups.c[name] for name in hierarchy.measures]
+    return select(groups.c.key, label.label("label"), *measures).select_from(source).order_by(*order), params
+
+
+def detail_statement(hierarchy: Hierarchy, from_dt: date, to_dt: date,
+                     filters: dict[str, Any]) -> tuple[Any, dict[str, Any]]:
+    """The fact rows under a full path, capped at DRILL_DETAIL_LIMIT."""
+
+    spec = QuerySpec(
+        fact=hierarchy.fact,
+        date_column=hierarchy.date_column,
+        where=hierarchy.where,
+        filters=hierarchy.filters,
+        dimensions=hierarchy.detail,
+    )
+    stmt, params = build_query(
+        spec, from_dt, to_dt, filters, dimensions=tuple(hierarchy.detail), order_by=hierarchy.detail_order
+    )
+    return stmt.limit(DRILL_DETAIL_LIMIT), params
+
+
+@cached_query(ttl=60)
+def get_drill_level(hierarchy: str, path: tuple, from_dt: date, to_dt: date) -> pd.DataFrame:
+    """Level `len(path)` of `hierarchy` under `path`: (key, label, amount, count) rows,
+    or the detail rows once the path selects every level."""
+
+    spec = HIERARCHIES[hierarchy]
+    from_dt, to_dt, filters = narrow(spec, path, from_dt, to_dt)
+    if len(path) >= len(spec.levels):
+        return run_query(*detail_statement(spec, from_dt, to_dt, filters))
+
+    depth = len(path)
+    frame = run_query(*level_statement(spec, depth, from_dt, to_dt, filters))
+    if spec.levels[depth].grain is not None and not frame.empty:
+        # Date keys travel in the path as ISO dates
+        frame["key"] = pd.to_datetime(frame["key"]).dt.strftime("%Y-%m-%d")
+    return frame
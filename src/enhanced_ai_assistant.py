@@ -26,6 +26,7 @@ class EnhancedAIAssistant:
         try:
             from src.db import get_conn
             from src.finance_queries import get_finance_kpis, get_finance_summary
+            from src.metrics import metric_definitions
             from src.procurement_queries import get_procurement_kpis, get_procurement_summary
             
             # Get real data from database with default date range
@@ -38,8 +39,8 @@ class EnhancedAIAssistant:
             to_date = today
             
             # Get current KPIs with date parameters
-            finance_kpis = get_finance_kpis(from_date, to_date, None)
-            procurement_kpis = get_procurement_kpis(from_date, to_date, None)
+            finance_kpis = self._first_row(get_finance_kpis(from_date, to_date, None))
+            procurement_kpis = self._first_row(get_procurement_kpis(from_date, to_date, None))
             
             # Get department summaries with date parameters
             finance_summary = get_finance_summary(from_date, to_date, None)
@@ -76,6 +77,7 @@ class EnhancedAIAssistant:
                     "Analytics Dashboard - Executive business intelligence and reporting",
                     "Database Analysis - Schema exploration and data quality checks"
                 ],
+                "metric_definitions": metric_definitions(),
                 "data_insights": self._generate_data_insights(finance_kpis, procurement_kpis, finance_summary, procurement_summary),
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
@@ -102,6 +104,12 @@ class EnhancedAIAssistant:
                 "fallback_mode": True
             }
     
+    def _first_row(self, df):
+        """Return the first row of a single-row KPI DataFrame as a plain dict."""
+        if df is None or df.empty:
+            return {}
+        return {col: (value.item() if hasattr(value, 'item') else value) for col, value in df.iloc[0].items()}
+    
     def _convert_dataframe_to_json(self, df):
         """Convert pandas DataFrame to JSON-serializable format."""
         try:
@@ -129,36 +137,36 @@ class EnhancedAIAssistant:
             return [{"error": f"Failed to convert data: {str(e)}"}]
     
     def _generate_data_insights(self, finance_kpis, procurement_kpis, finance_summary, procurement_summary):
-        """Generate insights from real data."""
+        """Generate insights from real data, worded and formatted by the metric registry."""
+        from src.metrics import METRICS, describe
+        
         insights = []
         
         try:
             # Finance insights
-            if finance_kpis.get('net_income', 0) > 0:
-                insights.append(f"✅ Positive net income of ${finance_kpis.get('net_income', 0):,.0f}")
-            else:
-                insights.append(f"⚠️ Negative net income of ${finance_kpis.get('net_income', 0):,.0f}")
+            net_income = finance_kpis.get('net_income') or 0
+            icon = "✅" if net_income > 0 else "⚠️"
+            insights.append(f"{icon} {describe('net_income', net_income)}")
             
-            if finance_kpis.get('revenue_growth', 0) > 0:
-                insights.append(f"📈 Revenue growth of {finance_kpis.get('revenue_growth', 0):.1f}%")
+            revenue_growth = finance_kpis.get('revenue_growth') or 0
+            if revenue_growth > 0:
+                insights.append(f"📈 {METRICS['total_revenue'].label} up {METRICS['total_revenue'].format(revenue_growth)} on the previous period")
             
             # Procurement insights
-            if procurement_kpis.get('total_orders', 0) > 0:
-                insights.append(f"📦 {procurement_kpis.get('total_orders', 0)} total orders processed")
+            if (procurement_kpis.get('total_orders') or 0) > 0:
+                insights.append(f"📦 {describe('total_orders', procurement_kpis['total_orders'])}")
             
-            if procurement_kpis.get('avg_order_value', 0) > 0:
-                insights.append(f"💰 Average order value: ${procurement_kpis.get('avg_order_value', 0):,.0f}")
+            if (procurement_kpis.get('avg_order_value') or 0) > 0:
+                insights.append(f"💰 {describe('avg_order_value', procurement_kpis['avg_order_value'])}")
             
             # Department insights
-            if not finance_summary.empty:
-                top_spender = finance_summary.loc[finance_summary['spent'].idxmax()] if 'spent' in finance_summary.columns else None
-                if top_spender is not None:
-                    insights.append(f"🏢 {top_spender.get('department', 'Unknown')} has highest spending: ${top_spender.get('spent', 0):,.0f}")
+            if finance_summary is not None and not finance_summary.empty and 'total_spent' in finance_summary.columns:
+                top_spender = finance_summary.loc[finance_summary['total_spent'].idxmax()]
+                insights.append(f"🏢 {top_spender.get('dept_name', 'Unknown')} has highest spending: {METRICS['total_amount'].format(top_spender['total_spent'])}")
             
-            if not procurement_summary.empty:
-                top_procurement = procurement_summary.loc[procurement_summary['total_value'].idxmax()] if 'total_value' in procurement_summary.columns else None
-                if top_procurement is not None:
-                    insights.append(f"🛒 {top_procurement.get('department', 'Unknown')} has highest procurement: ${top_procurement.get('total_value', 0):,.0f}")
+            if procurement_summary is not None and not procurement_summary.empty and 'total_value' in procurement_summary.columns:
+                top_procurement = procurement_summary.loc[procurement_summary['total_value'].idxmax()]
+                insights.append(f"🛒 {top_procurement.get('dept_name', 'Unknown')} has highest procurement: {METRICS['total_spend'].format(top_procurement['total_value'])}")
             
         except Exception as e:
             insights.append(f"⚠️ Error generating insights: {str(e)}")
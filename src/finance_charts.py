@@ -86,16 +86,29 @@ def monthly_trends_chart(df: pd.DataFrame) -> go.Figure:
     if df.empty:
         return go.Figure()
     
+    # Month labels with the year, so windows over a year apart do not overlap
+    x_column = 'period' if 'period' in df.columns else 'month'
     fig = px.line(
         df,
-        x='month',
+        x=x_column,
         y='total_amount',
         color='transaction_type',
         title="Monthly Finance Trends",
-        labels={'total_amount': 'Amount ($)', 'month': 'Month'},
+        labels={'total_amount': 'Amount ($)', x_column: 'Month'},
         markers=True
     )
     
+    # Moving average per transaction type, when requested
+    if 'rolling_avg_amount' in df.columns:
+        for transaction_type, type_data in df.groupby('transaction_type', sort=False):
+            fig.add_trace(go.Scatter(
+                x=type_data[x_column],
+                y=type_data['rolling_avg_amount'],
+                mode='lines',
+                name=f"{transaction_type} (moving avg)",
+                line=dict(dash='dash')
+            ))
+    
     fig.update_layout(
         height=500,
         xaxis_title="Month",
@@ -106,6 +119,30 @@ def monthly_trends_chart(df: pd.DataFrame) -> go.Figure:
     return fig
 
 
+def department_spending_chart(df: pd.DataFrame) -> go.Figure:
+    """Create department spending bar chart."""
+    
+    if df.empty:
+        return go.Figure()
+    
+    fig = px.bar(
+        df,
+        x='dept_name',
+        y='total_amount',
+        title="Spending by Department",
+        labels={'total_amount': 'Total Amount ($)', 'dept_name': 'Department'}
+    )
+    
+    fig.update_layout(
+        height=500,
+        xaxis_title="Department",
+        yaxis_title="Total Amount ($)",
+        clickmode='event+select'
+    )
+    
+    return fig
+
+
 def account_analysis_pie(df: pd.DataFrame) -> go.Figure:
     """Create account analysis pie chart."""
     
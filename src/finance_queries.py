@@ -10,291 +10,479 @@ from datetime import date
 from typing import Optional
 
 import pandas as pd
-import streamlit as st
+from sqlalchemy import case, func, select
 
-from .db import get_conn
+from .cross_filter import CROSS_FILTER_MAX_ROWS, FactSlice
+from .date_dimension import Rolling, bucket_days, calendar_query, fill_calendar, get_calendar
+from .date_windows import comparison_windows
+from .db import run_query
+from .live_aggregates import LiveWindow, live_window
+from .materialized_views import covers_whole_months
+from .metrics import FACTS, metric_columns, ratio
+from .olap_cube import OlapCube, get_cube
+from .period_comparison import compare_cube, comparison_query
+from .query_builder import (
+    Filter,
+    QuerySpec,
+    build_query,
+    const,
+    finance_account_closure,
+    finance_accounts,
+    finance_budgets,
+    finance_cost_centers,
+    finance_departments,
+    finance_transactions,
+    mv_finance_monthly_trends,
+    mv_finance_summary,
+)
+from .query_cache import cached_query
+from .range_cache import RangeQuery, covers, metric_partials, run_range_query
+from .rollups import RollupTree, rollup_statement
 
+t = finance_transactions.alias("t")
+d = finance_departments.alias("d")
+a = finance_accounts.alias("a")
+cc = finance_cost_centers.alias("cc")
+b = finance_budgets.alias("b")
 
-@st.cache_data(ttl=60, show_spinner=False)
+COMPLETED = tuple(FACTS["transactions"].where(t))
+
+
+# Metric entries shared by the SQL specs and the in-memory cube
+SUMMARY_METRICS = (("total_spent", "total_amount"),)
+MONTHLY_TREND_METRICS = (
+    "total_amount", ("transaction_count", "total_transactions"), ("avg_amount", "avg_transaction_amount")
+)
+# dim_date columns labelling each month of the trends
+MONTH_ATTRIBUTES = {"year": "year", "month_num": "month", "month": "month_name"}
+TRANSACTION_METRICS = (
+    ("transaction_count", "total_transactions"), "total_amount", ("avg_amount", "avg_transaction_amount")
+)
+KPI_METRICS = (
+    "total_transactions",
+    "total_revenue",
+    "total_expenses",
+    "net_income",
+    "avg_transaction_amount",
+    "departments_involved",
+    "accounts_used",
+)
+KPI_GROWTH = {
+    "revenue_growth": "total_revenue",
+    "expense_growth": "total_expenses",
+    "net_income_growth": "net_income",
+    "transaction_growth": "total_transactions",
+}
+
+# Derived from the total_spent measure and the department allocation
+BUDGET_USAGE = {
+    "remaining_budget": lambda c: c["budget_allocation"] - c["total_spent"],
+    "budget_utilization_pct": lambda c: ratio(c["total_spent"], c["budget_allocation"], default=0),
+}
+
+
+FINANCE_SUMMARY = QuerySpec(
+    fact=t,
+    date_column=t.c.transaction_date,
+    anchor=d,
+    anchor_on=d.c.dept_id == t.c.dept_id,
+    where=COMPLETED,
+    filters=(Filter("dept_id", d.c.dept_id),),
+    group_keys=(d.c.dept_id,),
+    dimensions={"dept_name": d.c.dept_name, "dept_code": d.c.dept_code, "budget_allocation": d.c.budget_allocation},
+    measures=metric_columns(t, *SUMMARY_METRICS),
+    derived=BUDGET_USAGE,
+)
+
+# Whole-month windows are served from the pre-aggregated view
+m = mv_finance_summary.alias("m")
+MV_FINANCE_SUMMARY = QuerySpec(
+    fact=m,
+    date_column=m.c.month_start,
+    anchor=d,
+    anchor_on=d.c.dept_id == m.c.dept_id,
+    filters=(Filter("dept_id", d.c.dept_id),),
+    group_keys=(d.c.dept_id,),
+    dimensions=FINANCE_SUMMARY.dimensions,
+    measures={"total_spent": func.coalesce(func.sum(m.c.total_spent), 0)},
+    derived=BUDGET_USAGE,
+)
+
+
+# Daily partials shared by the monthly, account, cost center and vendor breakdowns
+TRANSACTION_RANGE = metric_partials(t, *TRANSACTION_METRICS)
+AMOUNT_RANGE = {"min_amount": func.min(t.c.amount), "max_amount": func.max(t.c.amount)}
+
+# Windows that are not whole months are answered from cached daily partials
+FINANCE_MONTHLY_TRENDS = RangeQuery(
+    name="finance_monthly_trends",
+    spec=QuerySpec(
+        fact=t,
+        date_column=t.c.transaction_date,
+        where=COMPLETED,
+        filters=(Filter("transaction_type", t.c.transaction_type),),
+        dimensions={"day": t.c.transaction_date, "transaction_type": t.c.transaction_type},
+        measures=TRANSACTION_RANGE.measures,
+    ),
+    keys=("transaction_type",),
+    partials=TRANSACTION_RANGE.partials,
+    group={"period_start": lambda f: bucket_days(get_calendar(), f["day"], "month")},
+    derived=TRANSACTION_RANGE.derived,
+    columns=("period_start", "transaction_type", "total_amount", "transaction_count", "avg_amount"),
+)
+
+mt = mv_finance_monthly_trends.alias("mt")
+MV_FINANCE_MONTHLY_TRENDS = QuerySpec(
+    fact=mt,
+    date_column=mt.c.month_start,
+    filters=(Filter("transaction_type", mt.c.transaction_type),),
+    dimensions={"transaction_type": mt.c.transaction_type},
+    measures={
+        "total_amount": func.sum(mt.c.total_amount),
+        "transaction_count": func.sum(mt.c.transaction_count),
+        "avg_amount": func.sum(mt.c.total_amount) / func.nullif(func.sum(mt.c.transaction_count), 0),
+    },
+)
+
+# Compared over the current, previous and last-year windows (src.period_comparison)
+FINANCE_KPIS = QuerySpec(
+    fact=t,
+    date_column=t.c.transaction_date,
+    where=COMPLETED,
+    filters=(Filter("dept_id", t.c.dept_id),),
+)
+
+ACCOUNT_ANALYSIS = RangeQuery(
+    name="finance_account_analysis",
+    spec=QuerySpec(
+        fact=t,
+        date_column=t.c.transaction_date,
+        where=COMPLETED,
+        dimensions={"day": t.c.transaction_date, "account_id": t.c.account_id},
+        measures={**TRANSACTION_RANGE.measures, **AMOUNT_RANGE},
+    ),
+    keys=("account_id",),
+    partials={**TRANSACTION_RANGE.partials, "min_amount": "min", "max_amount": "max"},
+    derived=TRANSACTION_RANGE.derived,
+    anchor=select(a.c.account_id, a.c.account_name, a.c.account_type),
+    columns=("account_name", "account_type", *dict(TRANSACTION_RANGE.derived), *AMOUNT_RANGE),
+    order_by=(("total_amount", False),),
+)
+
+COST_CENTER_ANALYSIS = RangeQuery(
+    name="finance_cost_center_analysis",
+    spec=QuerySpec(
+        fact=t,
+        date_column=t.c.transaction_date,
+        where=COMPLETED,
+        dimensions={"day": t.c.transaction_date, "cost_center_id": t.c.cost_center_id},
+        measures=TRANSACTION_RANGE.measures,
+    ),
+    keys=("cost_center_id",),
+    partials=TRANSACTION_RANGE.partials,
+    derived=TRANSACTION_RANGE.derived,
+    anchor=select(cc.c.cost_center_id, cc.c.cost_center_name, d.c.dept_name).join_from(
+        cc, d, cc.c.dept_id == d.c.dept_id
+    ),
+    columns=("cost_center_name", "dept_name", *dict(TRANSACTION_RANGE.derived)),
+    order_by=(("total_amount", False),),
+)
+
+BUDGET_VS_ACTUAL = QuerySpec(
+    fact=t,
+    date_column=t.c.transaction_date,
+    anchor=b.join(d, b.c.dept_id == d.c.dept_id),
+    anchor_on=(b.c.dept_id == t.c.dept_id)
+    & (b.c.cost_center_id == t.c.cost_center_id)
+    & (b.c.account_id == t.c.account_id),
+    where=COMPLETED,
+    filters=(Filter("dept_id", b.c.dept_id),),
+    group_keys=(d.c.dept_id, b.c.budget_id),
+    dimensions={"dept_name": d.c.dept_name, "budget_name": b.c.budget_name, "budget_amount": b.c.budget_amount},
+    measures=metric_columns(t, ("actual_spent", "total_amount")),
+    derived={
+        "variance": lambda c: c["budget_amount"] - c["actual_spent"],
+        "utilization_pct": lambda c: ratio(c["actual_spent"], c["budget_amount"], default=0),
+        "budget_status": lambda c: case(
+            (c["actual_spent"] > c["budget_amount"], "Over Budget"),
+            (c["actual_spent"] > c["budget_amount"] * 0.9, "Near Budget"),
+            else_="Under Budget",
+        ),
+    },
+)
+
+PENDING_TRANSACTIONS = QuerySpec(
+    fact=t,
+    date_column=t.c.transaction_date,
+    joins=((d, t.c.dept_id == d.c.dept_id), (a, t.c.account_id == a.c.account_id)),
+    where=(t.c.status.in_(("Pending", "Approved")),),
+    filters=(Filter("dept_id", t.c.dept_id),),
+    dimensions={
+        "transaction_id": t.c.transaction_id,
+        "transaction_date": t.c.transaction_date,
+        "transaction_type": t.c.transaction_type,
+        "amount": t.c.amount,
+        "description": t.c.description,
+        "dept_name": d.c.dept_name,
+        "account_name": a.c.account_name,
+        "status": t.c.status,
+        "created_by": t.c.created_by,
+        "created_at": t.c.created_at,
+    },
+)
+
+VENDOR_DEPARTMENTS = metric_partials(t, ("departments_used", "departments_involved"))
+VENDOR_ANALYSIS = RangeQuery(
+    name="finance_vendor_analysis",
+    spec=QuerySpec(
+        fact=t,
+        date_column=t.c.transaction_date,
+        where=COMPLETED,
+        filters=(Filter("dept_id", t.c.dept_id),),
+        dimensions={
+            "day": t.c.transaction_date,
+            "vendor_name": func.coalesce(t.c.vendor_name, const("Unknown Vendor")),
+        },
+        measures={**TRANSACTION_RANGE.measures, **AMOUNT_RANGE, **VENDOR_DEPARTMENTS.measures},
+    ),
+    keys=("vendor_name",),
+    partials={**TRANSACTION_RANGE.partials, "min_amount": "min", "max_amount": "max", **VENDOR_DEPARTMENTS.partials},
+    derived={**TRANSACTION_RANGE.derived, **VENDOR_DEPARTMENTS.derived},
+    columns=("vendor_name", *dict(TRANSACTION_RANGE.derived), *AMOUNT_RANGE, "departments_used"),
+    order_by=(("total_amount", False),),
+)
+
+
+# Completed transactions of the window, one row each, for cross-filtered charts
+SPENDING_SLICE = QuerySpec(
+    fact=t,
+    date_column=t.c.transaction_date,
+    where=COMPLETED,
+    dimensions={
+        "dept_id": t.c.dept_id,
+        "cost_center_id": t.c.cost_center_id,
+        "account_id": t.c.account_id,
+        "vendor_name": VENDOR_ANALYSIS.spec.dimensions["vendor_name"],
+        "amount": t.c.amount,
+    },
+)
+SPENDING_SLICE_LABELS = {
+    "dept_id": select(d.c.dept_id, d.c.dept_name),
+    "cost_center_id": select(cc.c.cost_center_id, cc.c.cost_center_name, d.c.dept_name).join_from(
+        cc, d, cc.c.dept_id == d.c.dept_id
+    ),
+    "account_id": select(a.c.account_id, a.c.account_name, a.c.account_type),
+    "vendor_name": None,
+}
+
+# Completed transactions per account, rolled up the chart of accounts
+ACCOUNT_TREE = RollupTree(
+    nodes=a,
+    key="account_id",
+    parent="parent_account_id",
+    labels=("account_code", "account_name", "account_type"),
+    closure=finance_account_closure.alias("ac"),
+)
+ACCOUNT_LEAVES = QuerySpec(
+    fact=t,
+    date_column=t.c.transaction_date,
+    where=COMPLETED,
+    filters=(Filter("dept_id", t.c.dept_id),),
+    dimensions={"account_id": t.c.account_id},
+    measures=metric_columns(t, "total_amount", ("transaction_count", "total_transactions")),
+)
+
+
+def _finance_summary_from_cube(cube: OlapCube, from_dt: date, to_dt: date, dept_id: Optional[int]) -> pd.DataFrame:
+    frame = cube.anchored(
+        "departments", "dept_id", SUMMARY_METRICS, from_dt, to_dt, anchor_filters={"dept_id": dept_id}
+    )
+    for name, formula in BUDGET_USAGE.items():
+        frame[name] = formula(frame)
+    columns = ["dept_name", "dept_code", "budget_allocation", *dict(SUMMARY_METRICS), *BUDGET_USAGE]
+    return frame.sort_values("total_spent", ascending=False, kind="stable", ignore_index=True)[columns]
+
+
+def _monthly_rolling(months: Optional[int]) -> dict[str, Rolling]:
+    if not months:
+        return {}
+    return {
+        "rolling_amount": Rolling("total_amount", months),
+        "rolling_avg_amount": Rolling("total_amount", months, "avg"),
+    }
+
+
+def _monthly_trends_from_cube(cube: OlapCube, from_dt: date, to_dt: date, transaction_type: Optional[str],
+                              rolling_months: Optional[int] = None) -> pd.DataFrame:
+    frame = cube.aggregate(
+        MONTHLY_TREND_METRICS, from_dt, to_dt, ("month", "transaction_type"), {"transaction_type": transaction_type}
+    ).rename(columns={"month": "period_start"})
+    return fill_calendar(
+        cube.dimensions["calendar"], frame, "month", from_dt, to_dt, ("transaction_type",), MONTH_ATTRIBUTES,
+        _monthly_rolling(rolling_months),
+    )
+
+
+def _finance_kpis_from_cube(cube: OlapCube, from_dt: date, to_dt: date, dept_id: Optional[int]) -> pd.DataFrame:
+    return compare_cube(cube, KPI_METRICS, from_dt, to_dt, {"dept_id": dept_id}, KPI_GROWTH)
+
+
+@cached_query(ttl=60)
 def get_finance_summary(from_dt: date, to_dt: date, dept_id: Optional[int] = None) -> pd.DataFrame:
     """Get finance summary with budget vs actual spending."""
-    
-    params = {"from_dt": from_dt, "to_dt": to_dt}
-    where_dept = ""
-    if dept_id:
-        where_dept = " AND d.dept_id = :dept_id"
-        params["dept_id"] = dept_id
-    
-    sql = f"""
-    SELECT 
-        d.dept_name,
-        d.dept_code,
-        d.budget_allocation,
-        COALESCE(SUM(t.amount), 0) as total_spent,
-        d.budget_allocation - COALESCE(SUM(t.amount), 0) as remaining_budget,
-        CASE 
-            WHEN d.budget_allocation > 0 THEN 
-                ROUND((COALESCE(SUM(t.amount), 0) / d.budget_allocation) * 100, 2)
-            ELSE 0 
-        END as budget_utilization_pct
-    FROM finance_departments d
-    LEFT JOIN finance_transactions t ON d.dept_id = t.dept_id 
-        AND t.transaction_date BETWEEN :from_dt AND :to_dt
-        AND t.status = 'Completed'
-        {where_dept}
-    GROUP BY d.dept_id, d.dept_name, d.dept_code, d.budget_allocation
-    ORDER BY total_spent DESC
-    """
-    
-    conn = get_conn()
-    return conn.query(sql, params=params)
-
-
-@st.cache_data(ttl=60, show_spinner=False)
-def get_finance_monthly_trends(from_dt: date, to_dt: date, transaction_type: Optional[str] = None) -> pd.DataFrame:
-    """Get monthly finance trends by transaction type."""
-    
-    params = {"from_dt": from_dt, "to_dt": to_dt}
-    where_type = ""
-    if transaction_type and transaction_type != "All":
-        where_type = " AND transaction_type = :transaction_type"
-        params["transaction_type"] = transaction_type
-    
-    sql = f"""
-    SELECT 
-        EXTRACT(YEAR FROM transaction_date) as year,
-        EXTRACT(MONTH FROM transaction_date) as month_num,
-        TO_CHAR(transaction_date, 'Mon') as month,
-        transaction_type,
-        SUM(amount) as total_amount,
-        COUNT(*) as transaction_count,
-        AVG(amount) as avg_amount
-    FROM finance_transactions
-    WHERE transaction_date BETWEEN :from_dt AND :to_dt
-        AND status = 'Completed'
-        {where_type}
-    GROUP BY EXTRACT(YEAR FROM transaction_date), EXTRACT(MONTH FROM transaction_date), TO_CHAR(transaction_date, 'Mon'), transaction_type
-    ORDER BY year, month_num, transaction_type
-    """
-    
-    conn = get_conn()
-    return conn.query(sql, params=params)
 
+    cube = get_cube()
+    if cube is not None:
+        return _finance_summary_from_cube(cube, from_dt, to_dt, dept_id)
 
-@st.cache_data(ttl=60, show_spinner=False)
-def get_finance_kpis(from_dt: date, to_dt: date, dept_id: Optional[int] = None) -> pd.DataFrame:
-    """Get key finance KPIs with growth calculations."""
-    
-    params = {"from_dt": from_dt, "to_dt": to_dt}
-    where_dept = ""
-    if dept_id:
-        where_dept = " AND dept_id = :dept_id"
-        params["dept_id"] = dept_id
-    
-    # Calculate previous period for growth comparison
-    from datetime import timedelta
-    period_days = (to_dt - from_dt).days
-    prev_from_dt = from_dt - timedelta(days=period_days)
-    prev_to_dt = from_dt - timedelta(days=1)
-    
-    sql = f"""
-    WITH current_period AS (
-        SELECT 
-            COUNT(*) as total_transactions,
-            COALESCE(SUM(CASE WHEN transaction_type = 'Revenue' THEN amount ELSE 0 END), 0) as total_revenue,
-            COALESCE(SUM(CASE WHEN transaction_type = 'Expense' THEN amount ELSE 0 END), 0) as total_expenses,
-            COALESCE(SUM(CASE WHEN transaction_type = 'Revenue' THEN amount ELSE 0 END), 0) - 
-            COALESCE(SUM(CASE WHEN transaction_type = 'Expense' THEN amount ELSE 0 END), 0) as net_income,
-            COALESCE(AVG(amount), 0) as avg_transaction_amount,
-            COUNT(DISTINCT dept_id) as departments_involved,
-            COUNT(DISTINCT account_id) as accounts_used
-        FROM finance_transactions
-        WHERE transaction_date BETWEEN :from_dt AND :to_dt
-            AND status = 'Completed'
-            {where_dept}
-    ),
-    previous_period AS (
-        SELECT 
-            COUNT(*) as prev_total_transactions,
-            COALESCE(SUM(CASE WHEN transaction_type = 'Revenue' THEN amount ELSE 0 END), 0) as prev_total_revenue,
-            COALESCE(SUM(CASE WHEN transaction_type = 'Expense' THEN amount ELSE 0 END), 0) as prev_total_expenses,
-            COALESCE(SUM(CASE WHEN transaction_type = 'Revenue' THEN amount ELSE 0 END), 0) - 
-            COALESCE(SUM(CASE WHEN transaction_type = 'Expense' THEN amount ELSE 0 END), 0) as prev_net_income
-        FROM finance_transactions
-        WHERE transaction_date BETWEEN :prev_from_dt AND :prev_to_dt
-            AND status = 'Completed'
-            {where_dept}
+    spec = MV_FINANCE_SUMMARY if covers_whole_months(from_dt, to_dt) else FINANCE_SUMMARY
+    stmt, params = build_query(
+        spec, from_dt, to_dt, {"dept_id": dept_id},
+        dimensions=("dept_name", "dept_code", "budget_allocation"),
+        order_by=("total_spent DESC",),
     )
-    SELECT 
-        c.*,
-        COALESCE(c.total_revenue - p.prev_total_revenue, 0) as revenue_growth,
-        COALESCE(c.total_expenses - p.prev_total_expenses, 0) as expense_growth,
-        COALESCE(c.net_income - p.prev_net_income, 0) as net_income_growth,
-        COALESCE(c.total_transactions - p.prev_total_transactions, 0) as transaction_growth
-    FROM current_period c
-    CROSS JOIN previous_period p
+    return run_query(stmt, params)
+
+
+@cached_query(ttl=60)
+def get_finance_monthly_trends(from_dt: date, to_dt: date, transaction_type: Optional[str] = None,
+                               rolling_months: Optional[int] = None) -> pd.DataFrame:
+    """Get monthly finance trends by transaction type.
+
+    With `rolling_months`, adds the sum and average of total_amount over
+    that many trailing months (rolling_amount, rolling_avg_amount).
     """
-    
-    params["prev_from_dt"] = prev_from_dt
-    params["prev_to_dt"] = prev_to_dt
-    
-    conn = get_conn()
-    return conn.query(sql, params=params)
+
+    cube = get_cube()
+    if cube is not None:
+        return _monthly_trends_from_cube(cube, from_dt, to_dt, transaction_type, rolling_months)
+
+    filters = {"transaction_type": transaction_type}
+    rolling = _monthly_rolling(rolling_months)
+    if covers(FINANCE_MONTHLY_TRENDS, from_dt, to_dt, filters) or not covers_whole_months(from_dt, to_dt):
+        frame = run_range_query(FINANCE_MONTHLY_TRENDS, from_dt, to_dt, filters)
+        return fill_calendar(
+            get_calendar(), frame, "month", from_dt, to_dt, ("transaction_type",), MONTH_ATTRIBUTES, rolling
+        )
+
+    stmt, params = calendar_query(
+        MV_FINANCE_MONTHLY_TRENDS, "month", from_dt, to_dt, filters,
+        dimensions=("transaction_type",), attributes=MONTH_ATTRIBUTES, rolling=rolling,
+    )
+    return run_query(stmt, params)
 
 
-@st.cache_data(ttl=60, show_spinner=False)
+@cached_query(ttl=60)
+def get_finance_kpis(from_dt: date, to_dt: date, dept_id: Optional[int] = None) -> pd.DataFrame:
+    """Get key finance KPIs compared with the previous period and the same period last year."""
+
+    cube = get_cube()
+    if cube is not None:
+        return _finance_kpis_from_cube(cube, from_dt, to_dt, dept_id)
+
+    stmt, params = comparison_query(FINANCE_KPIS, KPI_METRICS, from_dt, to_dt, {"dept_id": dept_id}, KPI_GROWTH)
+    return run_query(stmt, params)
+
+
+@cached_query(ttl=60)
 def get_account_analysis(from_dt: date, to_dt: date) -> pd.DataFrame:
     """Get account-wise analysis."""
-    
-    sql = """
-    SELECT 
-        a.account_name,
-        a.account_type,
-        COUNT(t.transaction_id) as transaction_count,
-        SUM(t.amount) as total_amount,
-        AVG(t.amount) as avg_amount,
-        MIN(t.amount) as min_amount,
-        MAX(t.amount) as max_amount
-    FROM finance_accounts a
-    LEFT JOIN finance_transactions t ON a.account_id = t.account_id
-        AND t.transaction_date BETWEEN :from_dt AND :to_dt
-        AND t.status = 'Completed'
-    GROUP BY a.account_id, a.account_name, a.account_type
-    ORDER BY total_amount DESC
-    """
-    
-    conn = get_conn()
-    return conn.query(sql, params={"from_dt": from_dt, "to_dt": to_dt})
 
+    return run_range_query(ACCOUNT_ANALYSIS, from_dt, to_dt)
 
-@st.cache_data(ttl=60, show_spinner=False)
+
+@cached_query(ttl=60)
 def get_cost_center_analysis(from_dt: date, to_dt: date) -> pd.DataFrame:
     """Get cost center analysis."""
-    
-    sql = """
-    SELECT 
-        cc.cost_center_name,
-        d.dept_name,
-        COUNT(t.transaction_id) as transaction_count,
-        SUM(t.amount) as total_amount,
-        AVG(t.amount) as avg_amount
-    FROM finance_cost_centers cc
-    JOIN finance_departments d ON cc.dept_id = d.dept_id
-    LEFT JOIN finance_transactions t ON cc.cost_center_id = t.cost_center_id
-        AND t.transaction_date BETWEEN :from_dt AND :to_dt
-        AND t.status = 'Completed'
-    GROUP BY cc.cost_center_id, cc.cost_center_name, d.dept_name
-    ORDER BY total_amount DESC
-    """
-    
-    conn = get_conn()
-    return conn.query(sql, params={"from_dt": from_dt, "to_dt": to_dt})
+
+    return run_range_query(COST_CENTER_ANALYSIS, from_dt, to_dt)
 
 
-@st.cache_data(ttl=60, show_spinner=False)
+@cached_query(ttl=60)
 def get_budget_vs_actual(from_dt: date, to_dt: date, dept_id: Optional[int] = None) -> pd.DataFrame:
     """Get budget vs actual spending analysis."""
-    
-    params = {"from_dt": from_dt, "to_dt": to_dt}
-    where_dept = ""
-    if dept_id:
-        where_dept = " AND b.dept_id = :dept_id"
-        params["dept_id"] = dept_id
-    
-    sql = f"""
-    SELECT 
-        d.dept_name,
-        b.budget_name,
-        b.budget_amount,
-        COALESCE(SUM(t.amount), 0) as actual_spent,
-        b.budget_amount - COALESCE(SUM(t.amount), 0) as variance,
-        CASE 
-            WHEN b.budget_amount > 0 THEN 
-                ROUND((COALESCE(SUM(t.amount), 0) / b.budget_amount) * 100, 2)
-            ELSE 0 
-        END as utilization_pct,
-        CASE 
-            WHEN COALESCE(SUM(t.amount), 0) > b.budget_amount THEN 'Over Budget'
-            WHEN COALESCE(SUM(t.amount), 0) > b.budget_amount * 0.9 THEN 'Near Budget'
-            ELSE 'Under Budget'
-        END as budget_status
-    FROM finance_budgets b
-    JOIN finance_departments d ON b.dept_id = d.dept_id
-    LEFT JOIN finance_transactions t ON b.dept_id = t.dept_id 
-        AND b.cost_center_id = t.cost_center_id
-        AND b.account_id = t.account_id
-        AND t.transaction_date BETWEEN :from_dt AND :to_dt
-        AND t.status = 'Completed'
-        {where_dept}
-    GROUP BY d.dept_id, d.dept_name, b.budget_id, b.budget_name, b.budget_amount
-    ORDER BY utilization_pct DESC
-    """
-    
-    conn = get_conn()
-    return conn.query(sql, params=params)
+
+    stmt, params = build_query(
+        BUDGET_VS_ACTUAL, from_dt, to_dt, {"dept_id": dept_id},
+        dimensions=("dept_name", "budget_name", "budget_amount"),
+        order_by=("utilization_pct DESC",),
+    )
+    return run_query(stmt, params)
 
 
-@st.cache_data(ttl=60, show_spinner=False)
+@cached_query(ttl=60)
 def get_pending_transactions(from_dt: date, to_dt: date, dept_id: Optional[int] = None) -> pd.DataFrame:
     """Get pending transactions requiring approval."""
-    
-    params = {"from_dt": from_dt, "to_dt": to_dt}
-    where_dept = ""
-    if dept_id:
-        where_dept = " AND t.dept_id = :dept_id"
-        params["dept_id"] = dept_id
-    
-    sql = f"""
-    SELECT 
-        t.transaction_id,
-        t.transaction_date,
-        t.transaction_type,
-        t.amount,
-        t.description,
-        d.dept_name,
-        a.account_name,
-        t.status,
-        t.created_by,
-        t.created_at
-    FROM finance_transactions t
-    JOIN finance_departments d ON t.dept_id = d.dept_id
-    JOIN finance_accounts a ON t.account_id = a.account_id
-    WHERE t.transaction_date BETWEEN :from_dt AND :to_dt
-        AND t.status IN ('Pending', 'Approved')
-        {where_dept}
-    ORDER BY t.created_at DESC
-    """
-    
-    conn = get_conn()
-    return conn.query(sql, params=params)
 
+    stmt, params = build_query(
+        PENDING_TRANSACTIONS, from_dt, to_dt, {"dept_id": dept_id},
+        dimensions=tuple(PENDING_TRANSACTIONS.dimensions),
+        order_by=("created_at DESC",),
+    )
+    return run_query(stmt, params)
 
-@st.cache_data(ttl=60, show_spinner=False)
+
+@cached_query(ttl=60)
 def get_vendor_analysis(from_dt: date, to_dt: date, dept_id: Optional[int] = None) -> pd.DataFrame:
     """Get vendor spending analysis."""
-    
-    params = {"from_dt": from_dt, "to_dt": to_dt}
-    where_dept = ""
-    if dept_id:
-        where_dept = " AND dept_id = :dept_id"
-        params["dept_id"] = dept_id
-    
-    sql = f"""
-    SELECT 
-        COALESCE(vendor_name, 'Unknown Vendor') as vendor_name,
-        COUNT(*) as transaction_count,
-        SUM(amount) as total_amount,
-        AVG(amount) as avg_amount,
-        MIN(amount) as min_amount,
-        MAX(amount) as max_amount,
-        COUNT(DISTINCT dept_id) as departments_used
-    FROM finance_transactions
-    WHERE transaction_date BETWEEN :from_dt AND :to_dt
-        AND status = 'Completed'
-        {where_dept}
-    GROUP BY vendor_name
-    ORDER BY total_amount DESC
-    """
-    
-    conn = get_conn()
-    return conn.query(sql, params=params)
+
+    return run_range_query(VENDOR_ANALYSIS, from_dt, to_dt, {"dept_id": dept_id})
+
+
+# Live mode: the same aggregates from a window of transactions kept current
+# by delta polls (see src.live_aggregates); not cached, the window memoizes them
+
+def live_finance_window(from_dt: date, to_dt: date) -> LiveWindow:
+    """The shared live transactions window for from_dt..to_dt, including the comparison windows."""
+
+    earliest = min(window_from for window_from, _ in comparison_windows(from_dt, to_dt).values())
+    return live_window("transactions", earliest, to_dt)
+
+
+def get_live_finance_kpis(live: LiveWindow, from_dt: date, to_dt: date, dept_id: Optional[int] = None) -> pd.DataFrame:
+    """Live counterpart of `get_finance_kpis`."""
+
+    return live.derive(_finance_kpis_from_cube, from_dt, to_dt, dept_id)
+
+
+def get_live_finance_monthly_trends(live: LiveWindow, from_dt: date, to_dt: date,
+                                    transaction_type: Optional[str] = None,
+                                    rolling_months: Optional[int] = None) -> pd.DataFrame:
+    """Live counterpart of `get_finance_monthly_trends`."""
+
+    return live.derive(_monthly_trends_from_cube, from_dt, to_dt, transaction_type, rolling_months)
+
+
+def get_live_finance_summary(live: LiveWindow, from_dt: date, to_dt: date, dept_id: Optional[int] = None) -> pd.DataFrame:
+    """Live counterpart of `get_finance_summary`."""
+
+    return live.derive(_finance_summary_from_cube, from_dt, to_dt, dept_id)
+
+
+@cached_query(ttl=60)
+def get_spending_slice(from_dt: date, to_dt: date) -> Optional[FactSlice]:
+    """The window's completed transactions as a `FactSlice` by department, cost center,
+    account and vendor, or None when the window has more than CROSS_FILTER_MAX_ROWS rows."""
+
+    stmt, params = build_query(
+        SPENDING_SLICE, from_dt, to_dt, dimensions=tuple(SPENDING_SLICE.dimensions)
+    )
+    frame = run_query(stmt.limit(CROSS_FILTER_MAX_ROWS + 1), params)
+    if len(frame) > CROSS_FILTER_MAX_ROWS:
+        return None
+    labels = {
+        column: None if statement is None else run_query(statement)
+        for column, statement in SPENDING_SLICE_LABELS.items()
+    }
+    return FactSlice(frame, labels, "amount")
+
+
+@cached_query(ttl=60)
+def get_account_rollup(from_dt: date, to_dt: date, parent_id: Optional[int] = None,
+                       dept_id: Optional[int] = None) -> pd.DataFrame:
+    """Children of account `parent_id` (the top-level accounts when None) with the
+    totals of their whole subtrees and a has_children flag."""
+
+    leaves, params = build_query(ACCOUNT_LEAVES, from_dt, to_dt, {"dept_id": dept_id}, dimensions=("account_id",))
+    stmt = rollup_statement(ACCOUNT_TREE, leaves, ("total_amount", "transaction_count"))
+    return run_query(stmt, {**params, "parent_id": parent_id})
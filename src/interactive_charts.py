@@ -11,9 +11,11 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import streamlit as st
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 from datetime import date
 
+from .drill_down import DRILL_DETAIL_LIMIT, HIERARCHIES, get_drill_level
+
 
 class InteractiveChartManager:
     """Manages interactive charts with drill-down capabilities."""
@@ -250,73 +252,204 @@ class InteractiveChartManager:
                 st.write("📊 **Department Details:**")
                 # Add department-specific analysis here
     
-    def create_drill_down_panel(self, data: pd.DataFrame) -> None:
+    def create_drill_down_panel(self, from_date: date, to_date: date, hierarchy: str = "department") -> None:
         """
-        Create a drill-down panel that shows detailed information
-        based on the selected chart element.
+        Create a drill-down panel for `hierarchy` (see `src.drill_down.HIERARCHIES`).
+        Each level is its own aggregate query, so nothing is filtered in memory.
         """
-        if self.filter_state:
-            st.markdown("### 🔍 Drill-Down Analysis")
-            
-            # Show selected filters
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.metric(
-                    "Selected Department",
-                    self.filter_state.get('selected_department', 'None'),
-                    delta=None
-                )
-            
-            with col2:
-                st.metric(
-                    "Selected Amount",
-                    f"${self.filter_state.get('selected_amount', 0):,.0f}",
-                    delta=None
-                )
-            
-            with col3:
-                if st.button("🔄 Reset Filters"):
-                    st.session_state['chart_filters'] = {}
-                    st.rerun()
-            
-            # Show filtered data
-            if 'selected_department' in self.filter_state:
-                filtered_data = data[data['department'] == self.filter_state['selected_department']]
-                
-                if not filtered_data.empty:
-                    st.markdown("#### 📊 Detailed Breakdown")
-                    
-                    # Show sub-department breakdown
-                    sub_dept_data = filtered_data.groupby('sub_department')['amount'].sum().reset_index()
-                    sub_dept_data = sub_dept_data.sort_values('amount', ascending=False)
-                    
-                    # Create sub-department chart
-                    fig = px.bar(
-                        sub_dept_data,
-                        x='sub_department',
-                        y='amount',
-                        title=f"Sub-Departments in {self.filter_state['selected_department']}",
-                        color='amount',
-                        color_continuous_scale='Greens'
-                    )
-                    
-                    fig.update_layout(
-                        height=400,
-                        showlegend=False
-                    )
-                    
-                    st.plotly_chart(fig, use_container_width=True)
-                    
-                    # Show detailed table
-                    st.markdown("#### 📋 Transaction Details")
-                    st.dataframe(
-                        filtered_data[['date', 'description', 'amount', 'category', 'status']],
-                        use_container_width=True
-                    )
+        st.markdown("### 🔍 Drill-Down Analysis")
+        drill_down_panel(hierarchy, from_date, to_date, key=f"drill_{hierarchy}")
+
+
+def _drill_bar_chart(frame: pd.DataFrame, title: str, x_title: str, value_label: str) -> go.Figure:
+    """One-trace bar chart of a drill-down level; bar i is row i of `frame`."""
+    fig = go.Figure(
+        go.Bar(
+            x=frame['label'],
+            y=frame['amount'],
+            marker_color='#6366f1',
+            customdata=frame['count'],
+            hovertemplate=f"<b>%{{x}}</b><br>{value_label}: $%{{y:,.0f}}<br>Count: %{{customdata:,}}<br><extra></extra>",
+        )
+    )
+    fig.update_layout(
+        title={
+            'text': title,
+            'x': 0.5,
+            'xanchor': 'center',
+            'font': {'size': 16, 'color': '#1e293b'}
+        },
+        xaxis_title=x_title,
+        yaxis_title=f"{value_label} ($)",
+        hovermode='closest',
+        clickmode='event+select',
+        dragmode=False,
+        showlegend=False,
+        height=450,
+        margin=dict(l=50, r=50, t=80, b=50)
+    )
+    return fig
+
+
+def _drill_to(path_key: str, depth: int) -> None:
+    st.session_state[path_key] = st.session_state.get(path_key, [])[:depth]
+
+
+def _expand(path_key: str, select_key: str, nodes: Dict[int, tuple]) -> None:
+    node = st.session_state.get(select_key)
+    if node is not None:
+        st.session_state[path_key] = [*st.session_state.get(path_key, []), nodes[node]]
+        st.session_state[select_key] = None
+
+
+@st.fragment
+def drill_down_panel(hierarchy: str, from_date: date, to_date: date, key: str = "drill_down") -> None:
+    """
+    Server-side drill-down: click a bar to open the level below it.
+    Every level is one cached aggregate query for the path clicked so far
+    (`src.drill_down.get_drill_level`); the breadcrumb buttons go back up.
+    A fragment, so drilling reruns only this panel.
+    """
+    spec = HIERARCHIES[hierarchy]
+    path_key = f"{key}_path"
+    if st.session_state.get(f"{key}_window") != (from_date, to_date):
+        st.session_state[f"{key}_window"] = (from_date, to_date)
+        st.session_state[path_key] = []
+    path = st.session_state.setdefault(path_key, [])
+
+    crumbs = st.columns(len(path) + 2)
+    crumbs[0].button("All", key=f"{key}_crumb_0", on_click=_drill_to, args=(path_key, 0),
+                     disabled=not path, use_container_width=True)
+    for depth, (_, label) in enumerate(path, start=1):
+        crumbs[depth].button(f"› {label}", key=f"{key}_crumb_{depth}", on_click=_drill_to, args=(path_key, depth),
+                             disabled=depth == len(path), use_container_width=True)
+
+    keys = tuple(value for value, _ in path)
+    try:
+        data = get_drill_level(hierarchy, keys, from_date, to_date)
+    except Exception as exc:  # noqa: BLE001
+        # Shown here: on a fragment rerun the page's own error handling does not run
+        st.error(f"Error loading drill-down data: {exc}")
+        return
+    if len(path) == len(spec.levels):
+        st.markdown(f"#### 📋 {spec.detail_title}")
+        if data.empty:
+            st.info("No rows for this selection.")
+        else:
+            st.dataframe(data, use_container_width=True, hide_index=True)
+            if len(data) >= DRILL_DETAIL_LIMIT:
+                st.caption(f"Showing the first {DRILL_DETAIL_LIMIT:,} rows.")
+        return
+
+    level = spec.levels[len(path)]
+    if data.empty:
+        st.info("No data for this selection.")
+        return
+    title = f"{level.title} Breakdown" + (f" — {path[-1][1]}" if path else "")
+    event = st.plotly_chart(
+        _drill_bar_chart(data, title, level.title, "Amount"),
+        use_container_width=True,
+        on_select="rerun",
+        selection_mode="points",
+        # A new key per path, so the selection of the level above does not carry over
+        key=f"{key}_chart_" + "_".join(str(value) for value in keys),
+    )
+    points = event.selection.points if event else []
+    if points:
+        row = points[0].get("point_index", points[0].get("point_number"))
+        selected = data['key'].tolist()[row]
+        if selected is not None:
+            st.session_state[path_key] = [*path, (selected, str(data['label'].tolist()[row]))]
+            st.rerun(scope="fragment")
+    st.caption(f"{len(data):,} {level.title.lower()} groups · ${data['amount'].sum():,.0f} · click a bar to drill down")
+
+
+
+def _rollup_treemap(frame: pd.DataFrame, root: str, total: float, label_column: str, value_column: str,
+                    count_column: str, value_label: str) -> go.Figure:
+    """Treemap of one node's children, sized by their subtree totals.
+
+    The root is the node itself at its own total, so amounts posted
+    directly to it (not to a child) show as the space left over.
+    """
+    ids = ["root", *(str(value) for value in range(len(frame)))]
+    labels = [root, *frame[label_column].astype(str)]
+    values = [max(total, float(frame[value_column].sum())), *frame[value_column].astype(float)]
+    counts = [int(frame[count_column].sum()), *frame[count_column].astype(int)]
+    fig = go.Figure(
+        go.Treemap(
+            ids=ids,
+            labels=labels,
+            parents=["", *["root"] * len(frame)],
+            values=values,
+            customdata=counts,
+            branchvalues="total",
+            marker=dict(colors=values, colorscale="Blues"),
+            texttemplate="<b>%{label}</b><br>$%{value:,.0f}",
+            hovertemplate=f"<b>%{{label}}</b><br>{value_label}: $%{{value:,.0f}}<br>Count: %{{customdata:,}}<extra></extra>",
+        )
+    )
+    fig.update_layout(height=450, margin=dict(l=10, r=10, t=30, b=10))
+    return fig
+
+
+@st.fragment
+def hierarchy_rollup_panel(rollup: Callable[..., pd.DataFrame], from_date: date, to_date: date, *,
+                           id_column: str, label_column: str, value_column: str, count_column: str,
+                           filters: Optional[Dict[str, Any]] = None, title: str = "Total",
+                           value_label: str = "Amount", key: str = "rollup") -> None:
+    """
+    Lazily expanding tree of subtotals: shows the children of the current
+    node, each with the total of its whole subtree, and loads the next level
+    only when a node is expanded. `rollup(from_date, to_date, parent_id, **filters)`
+    returns one level (see `src.rollups`); the breadcrumb buttons go back up.
+    """
+    filters = filters or {}
+    path_key = f"{key}_path"
+    scope = (from_date, to_date, tuple(sorted((name, repr(value)) for name, value in filters.items())))
+    if st.session_state.get(f"{key}_scope") != scope:
+        st.session_state[f"{key}_scope"] = scope
+        st.session_state[path_key] = []
+    path = st.session_state.setdefault(path_key, [])
+
+    crumbs = st.columns(len(path) + 2)
+    crumbs[0].button(title, key=f"{key}_crumb_0", on_click=_drill_to, args=(path_key, 0),
+                     disabled=not path, use_container_width=True)
+    for depth, (_, label, _) in enumerate(path, start=1):
+        crumbs[depth].button(f"› {label}", key=f"{key}_crumb_{depth}", on_click=_drill_to, args=(path_key, depth),
+                             disabled=depth == len(path), use_container_width=True)
+
+    parent_id = path[-1][0] if path else None
+    try:
+        data = rollup(from_date, to_date, parent_id, **filters)
+    except Exception as exc:  # noqa: BLE001
+        # Shown here: on a fragment rerun the page's own error handling does not run
+        st.error(f"Error loading rollup data: {exc}")
+        return
+    if data.empty:
+        st.info("No child nodes below this one.")
+        return
+
+    root, total = (path[-1][1], path[-1][2]) if path else (title, float(data[value_column].sum()))
+    st.plotly_chart(
+        _rollup_treemap(data, root, total, label_column, value_column, count_column, value_label),
+        use_container_width=True,
+        key=f"{key}_chart_" + "_".join(str(node) for node, _, _ in path),
+    )
+
+    expandable = data[data['has_children']]
+    if not expandable.empty:
+        nodes = {
+            int(node): (int(node), str(label), float(value))
+            for node, label, value in expandable[[id_column, label_column, value_column]].itertuples(index=False)
+        }
+        st.selectbox("Expand", [None, *nodes], key=f"{key}_expand", on_change=_expand,
+                     args=(path_key, f"{key}_expand", nodes),
+                     format_func=lambda node: "—" if node is None else nodes[node][1])
+    st.caption(f"{len(data):,} nodes · ${data[value_column].sum():,.0f} · expand a node to load the level below")
 
 
-def render_interactive_dashboard(data: pd.DataFrame) -> None:
+def render_interactive_dashboard(data: pd.DataFrame, from_date: date, to_date: date) -> None:
     """
     Render an interactive dashboard with drill-down capabilities.
     This function demonstrates how to use the interactive chart features.
@@ -372,7 +505,7 @@ def render_interactive_dashboard(data: pd.DataFrame) -> None:
         st.plotly_chart(category_fig, use_container_width=True, key="category_chart")
     
     # Show drill-down panel
-    chart_manager.create_drill_down_panel(data)
+    chart_manager.create_drill_down_panel(from_date, to_date)
 
 
 def create_click_handler(chart_key: str) -> None:
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Live Aggregates for Reflexta Analytics Platform
+Keeps dashboard aggregates current by polling only the rows that changed.
+
+A `LiveWindow` reads the rows of one fact for a date window once, then every
+poll fetches only the rows whose `updated_at` is newer than the last one it
+has seen (the watermark, minus `LIVE_WATERMARK_OVERLAP_SECONDS` for writes
+that commit after a later timestamp was already visible). `updated_at` is
+the start time of the writing transaction, so a row whose transaction runs
+longer than the overlap can commit behind the watermark: the poll misses it
+and it appears with the next full read. Set the overlap above the longest
+write transaction to avoid that. Changed rows are
+upserted by primary key; rows that moved out of the window are dropped.
+Aggregates are computed from a small `OlapCube` over the window's rows, so
+live results use the same metric registry as every other path, and are
+memoized per window version: a poll that brought no changes recomputes
+nothing.
+
+Deleted rows leave no `updated_at` behind, so a window is read in full again
+every `LIVE_RELOAD_SECONDS`. Migration 007 keeps `updated_at` current on
+every UPDATE and indexes it.
+
+Windows are shared by every session that shows the same fact and dates
+(filters are applied to the aggregates, not the rows), so memory grows with
+the distinct windows open, at most `LIVE_MAX_WINDOWS`, not with the users.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Optional
+
+import pandas as pd
+import streamlit as st
+from sqlalchemy import func, select
+
+from .db import fetch_arrow, get_conn
+from .metrics import FACTS
+from .olap_cube import CUBE_FACTS, FactCube, OlapCube, load_dimension
+
+logger = logging.getLogger(__name__)
+
+LIVE_REFRESH_SECONDS = int(os.getenv("LIVE_REFRESH_SECONDS", "15"))
+LIVE_WATERMARK_OVERLAP_SECONDS = int(os.getenv("LIVE_WATERMARK_OVERLAP_SECONDS", "60"))
+LIVE_RELOAD_SECONDS = int(os.getenv("LIVE_RELOAD_SECONDS", "900"))
+# Distinct live windows kept per server; the least recently used go first
+LIVE_MAX_WINDOWS = int(os.getenv("LIVE_MAX_WINDOWS", "8"))
+
+# Dimension tables the live aggregates join to, per fact (the calendar labels trend buckets)
+LIVE_DIMENSIONS = {
+    "transactions": ("departments", "calendar"),
+    "orders": ("vendors", "categories", "calendar"),
+}
+
+
+class LiveWindow:
+    """One fact's rows between from_dt and to_dt, kept current by delta polls.
+
+    Shared by concurrent sessions: polls are serialized, and readers take a
+    cube of the rows as they were at some version.
+    """
+
+    def __init__(self, fact_name: str, from_dt: date, to_dt: date, engine: Any = None):
+        self.fact = FACTS[fact_name]
+        self.from_dt = from_dt
+        self.to_dt = to_dt
+        self.engine = engine if engine is not None else get_conn().engine
+        table = self.fact.table
+        self.key = next(iter(table.primary_key.columns)).name
+        self.cube_columns = CUBE_FACTS[fact_name]
+        self._columns = [table.c[name] for name in (self.key, *self.cube_columns, "updated_at")]
+        self.version = 0
+        self.polls = 0
+        self.changed_rows = 0
+        self.poll_errors = 0
+        self.last_poll: Optional[float] = None
+        self._cube: Optional[OlapCube] = None
+        self._results: dict[tuple, tuple[int, pd.DataFrame]] = {}
+        self._lock = threading.Lock()
+
+        # Read the watermark first: a write landing in between is polled again
+        with self.engine.connect() as connection:
+            self.watermark: Optional[datetime] = connection.execute(select(func.max(table.c.updated_at))).scalar()
+        date_column = table.c[self.fact.date_column]
+        self.rows = self._fetch(select(*self._columns).where(date_column.between(from_dt, to_dt)))
+        self.dimensions = {name: load_dimension(self.engine, name) for name in LIVE_DIMENSIONS.get(fact_name, ())}
+
+    def _fetch(self, statement: Any) -> pd.DataFrame:
+        rows = fetch_arrow(self.engine, statement).to_pandas().set_index(self.key)
+        rows["updated_at"] = pd.to_datetime(rows["updated_at"])
+        return rows
+
+    @staticmethod
+    def _max_updated(rows: pd.DataFrame) -> Optional[datetime]:
+        latest = rows["updated_at"].max() if len(rows) else None
+        return None if pd.isna(latest) else latest.to_pydatetime()
+
+    def poll(self, min_interval: float = 0.0) -> int:
+        """Apply the rows changed since the watermark; returns how many changed.
+
+        Polls within `min_interval` seconds of the previous one return 0
+        without querying, so several live sections can share one window.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            if self.last_poll is not None and now - self.last_poll < min_interval:
+                return 0
+            self.last_poll = now
+            self.polls += 1
+
+            updated = self.fact.table.c.updated_at
+            statement = select(*self._columns)
+            if self.watermark is not None:
+                since = self.watermark - timedelta(seconds=LIVE_WATERMARK_OVERLAP_SECONDS)
+                statement = statement.where(updated > since)
+            try:
+                delta = self._fetch(statement)
+            except Exception as exc:  # noqa: BLE001
+                # Keep serving the last applied state; the next poll retries
+                logger.warning("Live %s poll failed: %s", self.fact.name, exc)
+                self.poll_errors += 1
+                return 0
+
+            # The overlap re-reads rows already applied, and rows outside the
+            # window matter only if they used to be in it; keep real changes
+            days = pd.to_datetime(delta[self.fact.date_column]).dt.date
+            in_window = (days >= self.from_dt) & (days <= self.to_dt)
+            known = self.rows["updated_at"].reindex(delta.index)
+            changed = known.notna() & (known != delta["updated_at"])
+            keep = changed | (known.isna() & in_window)
+            delta, in_window = delta[keep], in_window[keep]
+            if delta.empty:
+                return 0
+
+            inside = delta[in_window]
+            kept = self.rows.drop(index=delta.index, errors="ignore")
+            self.rows = pd.concat([kept, inside]) if len(inside) else kept
+            latest = self._max_updated(delta)
+            if latest is not None and (self.watermark is None or latest > self.watermark):
+                self.watermark = latest
+            self.version += 1
+            self.changed_rows += len(delta)
+            logger.debug("Live %s window: %d rows changed (version %d)", self.fact.name, len(delta), self.version)
+            return len(delta)
+
+    @property
+    def cube(self) -> OlapCube:
+        """An OLAP cube over the window's current rows."""
+
+        # Version before rows: a poll replaces the rows before it bumps the
+        # version, so the rows are never older than the version they are tagged with
+        version = self.version
+        cube = self._cube
+        if cube is None or cube.version != (version,):
+            rows = self.rows.reset_index()[list(self.cube_columns)]
+            cube = OlapCube((version,), {self.fact.name: FactCube(self.fact, rows)}, self.dimensions)
+            self._cube = cube
+        return cube
+
+    def derive(self, compute: Callable[..., pd.DataFrame], *args: Any) -> pd.DataFrame:
+        """`compute(cube, *args)`, recomputed only when the window has changed."""
+
+        key = (compute, *args)
+        cached = self._results.get(key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1].copy()
+        cube = self.cube
+        result = compute(cube, *args)
+        self._results[key] = (cube.version[0], result)
+        return result.copy()
+
+
+@st.cache_resource(ttl=LIVE_RELOAD_SECONDS, max_entries=LIVE_MAX_WINDOWS, show_spinner=False)
+def live_window(fact_name: str, from_dt: date, to_dt: date) -> LiveWindow:
+    """The live window of `fact_name` covering from_dt..to_dt, shared by all sessions.
+
+    Reused across reruns, fragment runs and sessions; read again once it is
+    older than `LIVE_RELOAD_SECONDS`.
+    """
+
+    return LiveWindow(fact_name, from_dt, to_dt)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Materialized View Support for Reflexta Analytics Platform
+Window matching for the month-grain mv_* views and a background refresher
+that keeps them current on a cadence and on data change notifications (which
+also invalidate the affected query cache entries).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Optional
+
+import streamlit as st
+
+from .cache_invalidation import DataChange, invalidate, parse_change
+from .db import get_conn, listen, poll_notifications
+from .query_cache import LISTEN_TTL_SECONDS, shared_cache
+
+logger = logging.getLogger(__name__)
+
+MATERIALIZED_VIEWS = (
+    "mv_finance_summary",
+    "mv_finance_monthly_trends",
+    "mv_procurement_summary",
+    "mv_vendor_performance",
+    "mv_category_analysis",
+)
+
+# Channel raised by the statement triggers on the fact tables (migration 006)
+CHANGE_CHANNEL = "reflexta_data_changed"
+# Tables the views are built from; budget changes do not need a refresh
+SOURCE_TABLES = ("finance_transactions", "procurement_orders")
+
+REFRESH_INTERVAL_SECONDS = int(os.getenv("MATVIEW_REFRESH_SECONDS", "900"))
+MIN_REFRESH_GAP_SECONDS = int(os.getenv("MATVIEW_MIN_REFRESH_GAP_SECONDS", "30"))
+
+
+def covers_whole_months(from_dt: date, to_dt: date) -> bool:
+    """Return True if [from_dt, to_dt] starts and ends on calendar month boundaries.
+
+    Such windows can be answered exactly from the month-grain materialized views.
+    """
+
+    return from_dt <= to_dt and from_dt.day == 1 and (to_dt + timedelta(days=1)).day == 1
+
+
+def refresh_materialized_views(engine: Any) -> float:
+    """Refresh every materialized view concurrently and return the elapsed seconds."""
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("SELECT refresh_analytics_views()")
+    return time.perf_counter() - started
+
+
+class MaterializedViewRefresher:
+    """Background thread that refreshes the materialized views.
+
+    A refresh runs every `interval_seconds`, and additionally whenever a change
+    notification arrives, but never more often than `min_gap_seconds` so a burst
+    of writes triggers a single refresh.
+
+    Each notification invalidates the query cache entries it affects right
+    away, and again after the next refresh, since results read from the views
+    in between still predate the change. While the listener is up the cache
+    ttls are raised to `QUERY_CACHE_LISTEN_TTL_SECONDS` (if set).
+    """
+
+    def __init__(self, engine: Any, interval_seconds: int = REFRESH_INTERVAL_SECONDS,
+                 min_gap_seconds: int = MIN_REFRESH_GAP_SECONDS):
+        self.engine = engine
+        self.interval_seconds = interval_seconds
+        self.min_gap_seconds = min_gap_seconds
+        self.last_refresh: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.refresh_count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="matview-refresher", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _refresh(self) -> None:
+        try:
+            self.last_duration = refresh_materialized_views(self.engine)
+            self.refresh_count += 1
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Materialized view refresh failed: %s", exc)
+        self.last_refresh = time.monotonic()
+
+    def _open_listener(self) -> Any:
+        try:
+            listener = listen(self.engine, [CHANGE_CHANNEL])
+        except Exception as exc:  # noqa: BLE001
+            logger.info("LISTEN unavailable, refreshing on a timer only: %s", exc)
+            return None
+        shared_cache().ttl_floor = LISTEN_TTL_SECONDS or None
+        return listener
+
+    def _lost_listener(self) -> None:
+        if shared_cache().ttl_floor:
+            # Changes may have been missed while entries were kept past their ttl
+            invalidate([DataChange("*")])
+        shared_cache().ttl_floor = None
+
+    def _run(self) -> None:
+        listener = self._open_listener()
+        pending: list[DataChange] = []
+        try:
+            while not self._stop.is_set():
+                changed = bool(pending)
+                since_refresh = (
+                    time.monotonic() - self.last_refresh if self.last_refresh is not None
+                    else self.interval_seconds
+                )
+                if since_refresh >= self.interval_seconds or (changed and since_refresh >= self.min_gap_seconds):
+                    self._refresh()
+                    invalidate(pending)
+                    pending = []
+                    continue
+
+                wait = self.interval_seconds - since_refresh
+                if changed:
+                    wait = min(wait, self.min_gap_seconds - since_refresh)
+
+                if listener is None:
+                    self._stop.wait(wait)
+                    continue
+                try:
+                    changes = [parse_change(payload) for _, payload in poll_notifications(listener, wait)]
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning("Lost notification listener: %s", exc)
+                    self._lost_listener()
+                    listener.close()
+                    listener = self._open_listener()
+                    continue
+                invalidate(changes)
+                pending += [change for change in changes if change.table in SOURCE_TABLES]
+        finally:
+            self._lost_listener()
+            if listener is not None:
+                listener.close()
+
+
+@st.cache_resource(show_spinner=False)
+def start_refresh_scheduler() -> MaterializedViewRefresher:
+    """Start the process-wide materialized view refresher (once per server)."""
+
+    refresher = MaterializedViewRefresher(get_conn().engine)
+    refresher.start()
+    return refresher
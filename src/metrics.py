@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+Metric Registry for Reflexta Analytics Platform
+One definition per business metric, compiled to SQL or to pandas.
+
+Every metric (revenue, net income, budget utilization, completion rate, ...)
+is declared once here against a fact (transactions, orders, budgets). A base
+metric is an aggregation of one fact column, optionally restricted by
+conditions; a derived metric is a formula over other metrics of the same fact.
+The same definitions compile to:
+
+- SQL: `metric_sql(name, table)` returns the Core expression for a query
+  spec, and `build_metric_query()` fuses any set of metrics into one
+  statement: one grouped scan per fact, joined on the requested dimensions.
+- pandas: `evaluate_frame()` computes the same numbers from in-memory fact
+  rows (e.g. a frame already fetched for a page).
+
+Formatting (`describe`) and labels come from the registry as well, so the
+AI assistant and the dashboards describe a metric the same way.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Callable, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Numeric, and_, bindparam, case, cast, func, select, true
+from sqlalchemy.sql.elements import ClauseElement, ColumnElement
+
+from .date_windows import GRAINS
+from .db import run_query
+from .query_builder import (
+    Filter,
+    QuerySpec,
+    bucket,
+    build_query,
+    finance_budgets,
+    finance_transactions,
+    procurement_orders,
+)
+from .query_cache import cached_query
+
+PENDING_STATUSES = ("Draft", "Submitted", "Approved", "Ordered")
+
+# Currency of the ledger and of converted order totals (see database/load_fx_rates.py)
+REPORTING_CURRENCY = os.getenv("REPORTING_CURRENCY", "USD").upper()
+CURRENCY_SYMBOLS = {"USD": "$", "EUR": "€", "GBP": "£"}
+
+# =====================================================
+# FACTS
+# =====================================================
+
+
+@dataclass(frozen=True)
+class Fact:
+    """A fact table that metrics aggregate.
+
+    `conditions` restrict every metric of the fact (e.g. only completed
+    transactions count); `dimensions` are the fact columns metrics can be
+    grouped and filtered on. Facts without a date column are windowed on
+    `year_column` instead (budgets are yearly).
+    """
+
+    name: str
+    table: Any
+    date_column: Optional[str] = None
+    year_column: Optional[str] = None
+    conditions: Mapping[str, tuple] = field(default_factory=dict)
+    dimensions: tuple[str, ...] = ()
+
+    def where(self, table: Any) -> list[ColumnElement]:
+        return [_match(table.c[column], values) for column, values in self.conditions.items()]
+
+    def mask(self, frame: pd.DataFrame) -> pd.Series:
+        return _frame_mask(frame, self.conditions)
+
+
+FACTS: dict[str, Fact] = {
+    fact.name: fact
+    for fact in (
+        Fact(
+            name="transactions",
+            table=finance_transactions,
+            date_column="transaction_date",
+            conditions={"status": ("Completed",)},
+            dimensions=("dept_id", "cost_center_id", "account_id", "transaction_type", "vendor_name"),
+        ),
+        Fact(
+            name="orders",
+            table=procurement_orders,
+            date_column="order_date",
+            dimensions=("dept_id", "cost_center_id", "vendor_id", "category_id", "status", "priority"),
+        ),
+        Fact(
+            name="budgets",
+            table=finance_budgets,
+            year_column="budget_year",
+            dimensions=("dept_id", "cost_center_id", "account_id"),
+        ),
+    )
+}
+
+# =====================================================
+# METRICS
+# =====================================================
+
+
+@dataclass(frozen=True)
+class Metric:
+    """A named measure over one fact.
+
+    Base metrics set `agg` (sum, count, avg, count_distinct) and `column`;
+    derived metrics set `inputs` and a `formula` that receives the input
+    values positionally, as SQL expressions or as pandas Series.
+    """
+
+    name: str
+    label: str
+    fact: str
+    unit: str = "number"
+    agg: Optional[str] = None
+    column: Optional[str] = None
+    conditions: Mapping[str, tuple] = field(default_factory=dict)
+    inputs: tuple[str, ...] = ()
+    formula: Optional[Callable[..., Any]] = None
+
+    @property
+    def is_derived(self) -> bool:
+        return self.formula is not None
+
+    def format(self, value: Any) -> str:
+        """Format a value of this metric for display."""
+
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return "n/a"
+        if self.unit == "currency":
+            return f"{CURRENCY_SYMBOLS.get(REPORTING_CURRENCY, REPORTING_CURRENCY + ' ')}{value:,.0f}"
+        if self.unit == "percent":
+            return f"{value:.1f}%"
+        if self.unit == "count":
+            return f"{int(value):,}"
+        return f"{value:,.2f}"
+
+
+def ratio(part: Any, whole: Any, scale: float = 100, digits: Optional[int] = 2, default: Any = None) -> Any:
+    """part * scale / whole, None/NaN (or `default`) when whole is 0.
+
+    Works on SQL expressions and on pandas Series so derived metrics share
+    one formula between the two backends.
+    """
+
+    if isinstance(part, ClauseElement) or isinstance(whole, ClauseElement):
+        value = cast(part, Numeric) * scale / func.nullif(whole, 0)
+        if digits is not None:
+            value = func.round(value, digits)
+        return value if default is None else func.coalesce(value, default)
+
+    value = part * scale / whole.where(whole != 0)
+    if digits is not None:
+        value = value.round(digits)
+    return value if default is None else value.fillna(default)
+
+
+METRICS: dict[str, Metric] = {}
+
+
+def register(metric: Metric) -> Metric:
+    """Add a metric to the registry (names are unique across facts)."""
+
+    if metric.name in METRICS:
+        raise ValueError(f"Metric {metric.name!r} is already registered")
+    if metric.fact not in FACTS:
+        raise ValueError(f"Metric {metric.name!r} refers to unknown fact {metric.fact!r}")
+    for name in metric.inputs:
+        if METRICS.get(name) is None or METRICS[name].fact != metric.fact:
+            raise ValueError(f"Metric {metric.name!r} input {name!r} must be a registered {metric.fact} metric")
+    METRICS[metric.name] = metric
+    return metric
+
+
+for _metric in (
+    # Finance (completed transactions)
+    Metric("total_transactions", "Transactions", "transactions", "count", agg="count", column="transaction_id"),
+    Metric("total_amount", "Total Amount", "transactions", "currency", agg="sum", column="amount"),
+    Metric("total_revenue", "Revenue", "transactions", "currency", agg="sum", column="amount",
+           conditions={"transaction_type": ("Revenue",)}),
+    Metric("total_expenses", "Expenses", "transactions", "currency", agg="sum", column="amount",
+           conditions={"transaction_type": ("Expense",)}),
+    Metric("net_income", "Net Income", "transactions", "currency",
+           inputs=("total_revenue", "total_expenses"), formula=lambda revenue, expenses: revenue - expenses),
+    Metric("avg_transaction_amount", "Average Transaction", "transactions", "currency", agg="avg", column="amount"),
+    Metric("departments_involved", "Departments", "transactions", "count", agg="count_distinct", column="dept_id"),
+    Metric("accounts_used", "Accounts", "transactions", "count", agg="count_distinct", column="account_id"),
+    # Procurement (all orders)
+    Metric("total_orders", "Orders", "orders", "count", agg="count", column="order_id"),
+    Metric("total_spend", "Procurement Spend", "orders", "currency", agg="sum", column="reporting_total"),
+    Metric("avg_order_value", "Average Order Value", "orders", "currency",
+           inputs=("total_spend", "total_orders"),
+           formula=lambda spend, orders: ratio(spend, orders, scale=1, digits=None, default=0)),
+    Metric("completed_orders", "Completed Orders", "orders", "count", agg="count", column="order_id",
+           conditions={"status": ("Received",)}),
+    Metric("pending_orders", "Pending Orders", "orders", "count", agg="count", column="order_id",
+           conditions={"status": PENDING_STATUSES}),
+    Metric("cancelled_orders", "Cancelled Orders", "orders", "count", agg="count", column="order_id",
+           conditions={"status": ("Cancelled",)}),
+    Metric("high_priority_orders", "High Priority Orders", "orders", "count", agg="count", column="order_id",
+           conditions={"priority": ("High", "Urgent")}),
+    Metric("completion_rate", "Completion Rate", "orders", "percent",
+           inputs=("completed_orders", "total_orders"), formula=ratio),
+    Metric("cancellation_rate", "Cancellation Rate", "orders", "percent",
+           inputs=("cancelled_orders", "total_orders"), formula=ratio),
+    Metric("active_vendors", "Active Vendors", "orders", "count", agg="count_distinct", column="vendor_id"),
+    Metric("unique_categories", "Categories", "orders", "count", agg="count_distinct", column="category_id"),
+    Metric("ordering_departments", "Ordering Departments", "orders", "count", agg="count_distinct", column="dept_id"),
+    # Budgets (budget years overlapping the window)
+    Metric("total_budget", "Budget", "budgets", "currency", agg="sum", column="budget_amount"),
+    Metric("budget_spent", "Budget Spent", "budgets", "currency", agg="sum", column="spent_amount"),
+    Metric("budget_remaining", "Budget Remaining", "budgets", "currency", agg="sum", column="remaining_amount"),
+    Metric("budget_utilization_pct", "Budget Utilization", "budgets", "percent",
+           inputs=("budget_spent", "total_budget"),
+           formula=lambda spent, budget: ratio(spent, budget, default=0)),
+):
+    register(_metric)
+
+
+def get_metric(name: str) -> Metric:
+    """Return the registered metric `name`."""
+
+    try:
+        return METRICS[name]
+    except KeyError:
+        raise KeyError(f"Unknown metric {name!r}; expected one of {', '.join(METRICS)}") from None
+
+
+def describe(name: str, value: Any) -> str:
+    """"<label>: <formatted value>" for one metric value."""
+
+    metric = get_metric(name)
+    return f"{metric.label}: {metric.format(value)}"
+
+
+def _conditions_text(conditions: Mapping[str, tuple]) -> str:
+    return " and ".join(f"{column} in ({', '.join(values)})" for column, values in conditions.items())
+
+
+def explain(name: str) -> str:
+    """Plain-language definition of a metric, generated from the registry."""
+
+    metric = get_metric(name)
+    fact = FACTS[metric.fact]
+    if metric.is_derived:
+        text = f"{metric.label}, derived from " + " and ".join(get_metric(i).label for i in metric.inputs)
+    else:
+        verb = {"sum": "sum of", "count": "number of", "avg": "average", "count_distinct": "distinct count of"}
+        text = f"{metric.label}: {verb[metric.agg]} {metric.column}"
+        if metric.conditions:
+            text += f" where {_conditions_text(metric.conditions)}"
+    text += f" over {fact.name}"
+    if fact.conditions:
+        text += f" with {_conditions_text(fact.conditions)}"
+    return text
+
+
+def metric_definitions() -> dict[str, str]:
+    """{metric name: explain(name)} for every registered metric (e.g. AI context)."""
+
+    return {name: explain(name) for name in METRICS}
+
+
+# =====================================================
+# SQL BACKEND
+# =====================================================
+
+
+def _match(column: ColumnElement, values: tuple) -> ColumnElement:
+    return column == values[0] if len(values) == 1 else column.in_(values)
+
+
+def metric_sql(name: str, table: Any, when: Optional[ColumnElement] = None) -> ColumnElement:
+    """Core expression for metric `name` over `table` (the fact table or an alias of it).
+
+    The fact's own conditions are not included; queries apply them in WHERE
+    (or the join condition) via `Fact.where`. `when` restricts the rows
+    aggregated inside the expression (conditional aggregation), so one scan
+    can compute a metric for several windows.
+    """
+
+    metric = get_metric(name)
+    if metric.is_derived:
+        return metric.formula(*(metric_sql(input_name, table, when) for input_name in metric.inputs))
+
+    value = table.c[metric.column]
+    conditions = [_match(table.c[column], values) for column, values in metric.conditions.items()]
+    if when is not None:
+        conditions.append(when)
+    condition = and_(*conditions) if conditions else None
+    if metric.agg == "sum":
+        total = func.sum(case((condition, value), else_=0) if condition is not None else value)
+        return func.coalesce(total, 0)
+    if metric.agg == "count":
+        return func.count(case((condition, value)) if condition is not None else value)
+    if metric.agg == "avg":
+        return func.coalesce(func.avg(case((condition, value)) if condition is not None else value), 0)
+    if metric.agg == "count_distinct":
+        return func.count((case((condition, value)) if condition is not None else value).distinct())
+    raise ValueError(f"Unsupported aggregation {metric.agg!r} for metric {name!r}")
+
+
+def metric_input(name: str, table: Any) -> ColumnElement:
+    """The column base metric `name` aggregates, NULL where its conditions do not hold.
+
+    For building partial aggregates (e.g. the sum and count behind an
+    average) that other layers combine back into the metric.
+    """
+
+    metric = get_metric(name)
+    if metric.is_derived:
+        raise ValueError(f"{name!r} is derived; use its inputs")
+    value = table.c[metric.column]
+    if not metric.conditions:
+        return value
+    return case((and_(*(_match(table.c[column], values) for column, values in metric.conditions.items())), value))
+
+
+def metric_columns(table: Any, *columns: str | tuple[str, str]) -> dict[str, ColumnElement]:
+    """Measures mapping for a QuerySpec, in the given order.
+
+    Each entry is a metric name, or an (output column, metric name) pair to
+    expose a metric under a query-specific column name.
+    """
+
+    pairs = [(column, column) if isinstance(column, str) else column for column in columns]
+    return {output: metric_sql(name, table) for output, name in pairs}
+
+
+def _by_fact(names: Sequence[str]) -> dict[str, list[str]]:
+    grouped: dict[str, list[str]] = {}
+    for name in names:
+        grouped.setdefault(get_metric(name).fact, []).append(name)
+    return grouped
+
+
+def _dimension(fact: Fact, table: Any, name: str) -> ColumnElement:
+    if name in fact.dimensions:
+        return table.c[name]
+    if name in GRAINS and fact.date_column is not None:
+        return bucket(table.c[fact.date_column], name)
+    raise ValueError(f"{fact.name} metrics cannot be grouped by {name!r}")
+
+
+def _fact_query(fact: Fact, names: Sequence[str], from_dt: date, to_dt: date,
+                dimensions: Sequence[str], filters: Mapping[str, Any]):
+    table = fact.table.alias(fact.name)
+    where = fact.where(table)
+    params: dict[str, Any] = {}
+    if fact.year_column is not None:
+        where.append(table.c[fact.year_column].between(bindparam("from_year"), bindparam("to_year")))
+        params.update({"from_year": from_dt.year, "to_year": to_dt.year})
+    spec = QuerySpec(
+        fact=table,
+        date_column=table.c[fact.date_column] if fact.date_column else None,
+        where=tuple(where),
+        filters=tuple(Filter(name, table.c[name]) for name in fact.dimensions if name in filters),
+        dimensions={name: _dimension(fact, table, name) for name in dimensions},
+        measures=metric_columns(table, *names),
+    )
+    stmt, spec_params = build_query(spec, from_dt, to_dt, filters, dimensions=tuple(dimensions))
+    params.update(spec_params)
+    return stmt, params
+
+
+def build_metric_query(
+    names: Sequence[str],
+    from_dt: date,
+    to_dt: date,
+    dimensions: Sequence[str] = (),
+    filters: Optional[Mapping[str, Any]] = None,
+):
+    """Build one statement computing `names` grouped by `dimensions`.
+
+    Metrics of the same fact share one grouped scan; scans of different facts
+    are joined on the dimensions (a single row when there are none), so a page
+    asking for finance, procurement and budget metrics issues one query.
+    Filters apply to each fact that has the filtered column.
+    """
+
+    filters = {key: value for key, value in (filters or {}).items() if value is not None}
+    parts = []
+    params: dict[str, Any] = {}
+    for fact_name, fact_metrics in _by_fact(names).items():
+        stmt, fact_params = _fact_query(FACTS[fact_name], fact_metrics, from_dt, to_dt, dimensions, filters)
+        parts.append((stmt.subquery(f"{fact_name}_metrics"), fact_metrics))
+        params.update(fact_params)
+
+    if len(parts) == 1:
+        subquery, _ = parts[0]
+        stmt = select(*(subquery.c[name] for name in [*dimensions, *names])).select_from(subquery)
+    else:
+        source, keys = parts[0][0], {name: parts[0][0].c[name] for name in dimensions}
+        for subquery, _ in parts[1:]:
+            if dimensions:
+                source = source.outerjoin(
+                    subquery, and_(*(keys[name] == subquery.c[name] for name in dimensions)), full=True
+                )
+                keys = {name: func.coalesce(keys[name], subquery.c[name]) for name in dimensions}
+            else:
+                source = source.join(subquery, true())
+        located = {name: subquery.c[name] for subquery, fact_metrics in parts for name in fact_metrics}
+        stmt = select(
+            *(keys[name].label(name) for name in dimensions),
+            *(located[name].label(name) for name in names),
+        ).select_from(source)
+    if dimensions:
+        stmt = stmt.order_by(*(stmt.selected_columns[name] for name in dimensions))
+    return stmt, params
+
+
+@cached_query(ttl=60)
+def get_metrics(
+    from_dt: date,
+    to_dt: date,
+    names: tuple[str, ...],
+    dimensions: tuple[str, ...] = (),
+    dept_id: Optional[int] = None,
+) -> pd.DataFrame:
+    """Fetch registered metrics for a window in a single query."""
+
+    stmt, params = build_metric_query(names, from_dt, to_dt, dimensions, {"dept_id": dept_id})
+    return run_query(stmt, params)
+
+
+# =====================================================
+# PANDAS BACKEND
+# =====================================================
+
+
+def _frame_mask(frame: pd.DataFrame, conditions: Mapping[str, tuple]) -> pd.Series:
+    mask = pd.Series(True, index=frame.index)
+    for column, values in conditions.items():
+        mask &= frame[column].isin(values)
+    return mask
+
+
+def _frame_dimension(fact: Fact, frame: pd.DataFrame, name: str) -> pd.Series:
+    if name in fact.dimensions:
+        return frame[name]
+    if name in GRAINS and fact.date_column is not None:
+        dates = pd.to_datetime(frame[fact.date_column])
+        if name == "day":
+            return dates.dt.normalize()
+        period = {"week": "W-SUN", "month": "M", "quarter": "Q", "year": "Y"}[name]
+        return dates.dt.to_period(period).dt.start_time
+    raise ValueError(f"{fact.name} metrics cannot be grouped by {name!r}")
+
+
+def _frame_metric(name: str, frame: pd.DataFrame, keys: list[pd.Series]) -> pd.Series:
+    metric = get_metric(name)
+    if metric.is_derived:
+        return metric.formula(*(_frame_metric(input_name, frame, keys) for input_name in metric.inputs))
+
+    values = frame[metric.column]
+    if metric.conditions:
+        values = values.where(_frame_mask(frame, metric.conditions))
+    grouped = values.groupby(keys, dropna=False)
+    if metric.agg == "sum":
+        return grouped.sum(min_count=0).astype(float)
+    if metric.agg == "count":
+        return grouped.count()
+    if metric.agg == "avg":
+        return grouped.mean().fillna(0)
+    if metric.agg == "count_distinct":
+        return grouped.nunique()
+    raise ValueError(f"Unsupported aggregation {metric.agg!r} for metric {name!r}")
+
+
+def evaluate_frame(
+    frames: Mapping[str, pd.DataFrame],
+    names: Sequence[str],
+    dimensions: Sequence[str] = (),
+    filters: Optional[Mapping[str, Any]] = None,
+    from_dt: Optional[date] = None,
+    to_dt: Optional[date] = None,
+) -> pd.DataFrame:
+    """Compute `names` from in-memory fact rows, keyed by fact name.
+
+    Each frame holds raw rows of its fact table (column names as in the
+    database). Applies the same fact conditions, window and filters as the
+    SQL backend and returns the same columns as `build_metric_query`.
+    """
+
+    filters = {key: value for key, value in (filters or {}).items() if value is not None}
+    results = []
+    for fact_name, fact_metrics in _by_fact(names).items():
+        fact = FACTS[fact_name]
+        frame = frames[fact_name]
+        mask = fact.mask(frame)
+        if fact.date_column is not None and from_dt is not None and to_dt is not None:
+            dates = pd.to_datetime(frame[fact.date_column])
+            mask &= (dates >= pd.Timestamp(from_dt)) & (dates < pd.Timestamp(to_dt + timedelta(days=1)))
+        elif fact.year_column is not None and from_dt is not None and to_dt is not None:
+            mask &= frame[fact.year_column].between(from_dt.year, to_dt.year)
+        for column, value in filters.items():
+            if column in fact.dimensions:
+                values = value if isinstance(value, (list, tuple, set, frozenset)) else [value]
+                mask &= frame[column].isin(list(values))
+        frame = frame[mask]
+
+        if dimensions:
+            keys = [_frame_dimension(fact, frame, name).rename(name) for name in dimensions]
+        else:
+            keys = [pd.Series(np.zeros(len(frame), dtype=int), index=frame.index, name="_all")]
+        columns = {name: _frame_metric(name, frame, keys) for name in fact_metrics}
+        result = pd.DataFrame(columns)
+        if not dimensions and result.empty:
+            # Totals over no rows are still one row, as in SQL
+            result = result.reindex([0])
+            base = [name for name in fact_metrics if not get_metric(name).is_derived]
+            result[base] = result[base].fillna(0)
+        results.append(result)
+
+    combined = pd.concat(results, axis=1, join="outer")
+    if dimensions:
+        return combined.reset_index()[[*dimensions, *names]].sort_values(list(dimensions), ignore_index=True)
+    return combined.reset_index(drop=True)[list(names)]
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""
+In-Memory OLAP Cube for Reflexta Analytics Platform
+Answers dashboard aggregations from columnar NumPy arrays instead of SQL.
+
+The transaction and order facts are loaded once per data version into
+compact arrays: rows sorted by date (a window is a `searchsorted` slice),
+dimension and status columns as int32 category codes, amounts as float64.
+Metrics come from the registry in `src.metrics` and are computed with
+`np.bincount` group-reduces, so changing a filter or the date window is
+answered in milliseconds without a database round trip.
+
+The cube loads in a background thread. Until it is loaded for the current
+data version `get_cube()` returns None and callers run their SQL query, so a
+cold or stale cube never serves wrong numbers. The data version is read
+from `fact_versions`, which the statement triggers of migration 015 bump on
+every write to a fact table.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from .date_dimension import CALENDAR_GRAINS, bucket_days, load_calendar
+from .db import fetch_arrow, get_conn
+from .metrics import FACTS, Fact, get_metric
+
+logger = logging.getLogger(__name__)
+
+CUBE_ENABLED = os.getenv("OLAP_CUBE_ENABLED", "1") == "1"
+CUBE_MAX_ROWS = int(os.getenv("OLAP_CUBE_MAX_ROWS", "5000000"))
+
+# Facts held in the cube and the columns loaded for each
+CUBE_FACTS = {
+    "transactions": ("transaction_date", "transaction_type", "status", "dept_id",
+                     "cost_center_id", "account_id", "amount"),
+    "orders": ("order_date", "status", "priority", "dept_id", "cost_center_id",
+               "vendor_id", "category_id", "reporting_total"),
+}
+
+DIMENSION_QUERIES = {
+    "departments": "SELECT dept_id, dept_name, dept_code, budget_allocation FROM finance_departments",
+    "vendors": "SELECT vendor_id, vendor_name, vendor_code, rating FROM procurement_vendors",
+    "categories": "SELECT category_id, category_name, category_code FROM procurement_categories",
+    # dim_date (migration 014), for fiscal grains and bucket labels
+    "calendar": "SELECT * FROM dim_date",
+}
+
+# Row count and write counter of each fact (migration 015); the counts are
+# the even positions of the version tuple
+VERSION_SQL = """
+SELECT t.row_count, t.version, o.row_count, o.version
+FROM fact_versions t, fact_versions o
+WHERE t.table_name = 'finance_transactions' AND o.table_name = 'procurement_orders'
+"""
+
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def _day_number(value: date) -> int:
+    return int((np.datetime64(value, "D") - _EPOCH).astype(np.int64))
+
+
+def _is_set(value: Any) -> bool:
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return len(value) > 0
+    return value is not None and value != "" and value != "All"
+
+
+def _factorize(key: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Sorted unique values of `key` and each row's index into them.
+
+    Date buckets of date-sorted rows are already in order, so their runs are
+    found in one pass instead of sorting.
+    """
+
+    if key.dtype.kind == "M" and len(key) and not np.isnat(key).any():
+        starts = np.empty(len(key), dtype=bool)
+        starts[0] = True
+        np.not_equal(key[1:], key[:-1], out=starts[1:])
+        if (key[1:] >= key[:-1]).all():
+            return key[starts], np.cumsum(starts) - 1
+    return np.unique(key, return_inverse=True)
+
+
+class FactCube:
+    """Columnar, date-sorted copy of one fact table."""
+
+    def __init__(self, fact: Fact, frame: pd.DataFrame):
+        self.fact = fact
+        frame = frame.sort_values(fact.date_column, kind="stable")
+        self.rows = len(frame)
+        self.days = (
+            pd.to_datetime(frame[fact.date_column]).to_numpy().astype("datetime64[D]") - _EPOCH
+        ).astype(np.int32)
+        self.codes: dict[str, np.ndarray] = {}
+        self.categories: dict[str, np.ndarray] = {}
+        self.values: dict[str, np.ndarray] = {}
+        for column in frame.columns:
+            if column == fact.date_column:
+                continue
+            if column in fact.dimensions or column in fact.conditions:
+                codes, uniques = pd.factorize(frame[column], sort=True)
+                self.codes[column] = codes.astype(np.int32)
+                self.categories[column] = np.asarray(uniques)
+            else:
+                self.values[column] = pd.to_numeric(frame[column], errors="coerce").to_numpy(np.float64)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [self.days, *self.codes.values(), *self.values.values()]
+        return sum(array.nbytes for array in arrays)
+
+    def _code_mask(self, column: str, values: Any, rows: slice) -> np.ndarray:
+        wanted = list(values) if isinstance(values, (list, tuple, set, frozenset)) else [values]
+        codes = np.flatnonzero(np.isin(self.categories[column], wanted))
+        return np.isin(self.codes[column][rows], codes)
+
+    def _bucket(self, grain: str, rows: slice, calendar: Optional[pd.DataFrame]) -> np.ndarray:
+        days = self.days[rows].astype("datetime64[D]")
+        if grain == "day":
+            return days
+        if grain == "week":
+            # ISO weeks start on Monday; 1970-01-01 was a Thursday
+            return days - ((days.astype(np.int64) + 3) % 7).astype("timedelta64[D]")
+        if grain == "month":
+            return days.astype("datetime64[M]").astype("datetime64[D]")
+        if grain == "quarter":
+            months = days.astype("datetime64[M]").astype(np.int64)
+            return (months - months % 3).astype("datetime64[M]").astype("datetime64[D]")
+        if grain == "year":
+            return days.astype("datetime64[Y]").astype("datetime64[D]")
+        if grain in CALENDAR_GRAINS and calendar is not None:
+            # Fiscal buckets depend on the configured calendar
+            return bucket_days(calendar, days, grain)
+        raise ValueError(f"Unsupported grain {grain!r}")
+
+    def _metric(self, name: str, rows: slice, mask: np.ndarray, groups: np.ndarray, size: int) -> pd.Series:
+        metric = get_metric(name)
+        if metric.is_derived:
+            return metric.formula(*(self._metric(i, rows, mask, groups, size) for i in metric.inputs))
+
+        selected = mask.copy()
+        for column, values in metric.conditions.items():
+            selected &= self._code_mask(column, values, rows)
+
+        if metric.agg == "count_distinct":
+            codes = self.codes[metric.column][rows]
+            selected &= codes >= 0
+            width = len(self.categories[metric.column]) or 1
+            pairs = np.unique(groups[selected].astype(np.int64) * width + codes[selected])
+            return pd.Series(np.bincount(pairs // width, minlength=size))
+
+        if metric.column in self.values:
+            values = self.values[metric.column][rows]
+            selected &= ~np.isnan(values)
+        else:
+            # Key columns are never null: counting them counts rows
+            values = np.ones(rows.stop - rows.start)
+        counts = np.bincount(groups[selected], minlength=size)
+        if metric.agg == "count":
+            return pd.Series(counts)
+        sums = np.bincount(groups[selected], weights=values[selected], minlength=size)
+        if metric.agg == "sum":
+            return pd.Series(sums)
+        if metric.agg == "avg":
+            return pd.Series(np.divide(sums, counts, out=np.zeros(size), where=counts > 0))
+        raise ValueError(f"Unsupported aggregation {metric.agg!r} for metric {name!r}")
+
+    def aggregate(self, names: Sequence[str], dimensions: Sequence[str], from_dt: date, to_dt: date,
+                  filters: Mapping[str, Any], calendar: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        start, stop = np.searchsorted(self.days, [_day_number(from_dt), _day_number(to_dt + timedelta(days=1))])
+        rows = slice(int(start), int(stop))
+        mask = np.ones(rows.stop - rows.start, dtype=bool)
+        for column, values in self.fact.conditions.items():
+            mask &= self._code_mask(column, values, rows)
+        for column, value in filters.items():
+            if not _is_set(value):
+                continue
+            if column not in self.codes:
+                raise LookupError(f"{self.fact.name} cube cannot filter on {column!r}")
+            mask &= self._code_mask(column, value, rows)
+
+        if not mask.any():
+            return self.empty(names, dimensions, size=1 if not dimensions else 0)
+
+        keys = [
+            self.codes[name][rows] if name in self.codes else self._bucket(name, rows, calendar) for name in dimensions
+        ]
+        factorized = [_factorize(key[mask]) for key in keys]
+        uniques, inverses = zip(*factorized, strict=True) if keys else ((), ())
+        combined = np.zeros(int(mask.sum()), dtype=np.int64)
+        for unique, inverse in zip(uniques, inverses, strict=True):
+            combined = combined * len(unique) + inverse
+        if len(keys) == 1:
+            # Every code of a single key occurs: the codes are the groups
+            group_ids = np.arange(len(uniques[0]), dtype=np.int64)
+        else:
+            group_ids, combined = np.unique(combined, return_inverse=True)
+        groups = np.zeros(len(mask), dtype=np.int64)
+        groups[mask] = combined
+        size = len(group_ids)
+
+        labels = {}
+        for name, unique in reversed(list(zip(dimensions, uniques, strict=True))):
+            labels[name] = self._decode(name, unique[group_ids % len(unique)])
+            group_ids = group_ids // len(unique)
+        result = pd.DataFrame({name: labels[name] for name in dimensions}, index=range(size))
+
+        for name in names:
+            result[name] = self._metric(name, rows, mask, groups, size).to_numpy()
+        return result
+
+    def empty(self, names: Sequence[str], dimensions: Sequence[str] = (), size: int = 1) -> pd.DataFrame:
+        """Metric values over no rows (0 counts, default ratios), as the SQL LEFT JOINs produce."""
+
+        rows = slice(0, 0)
+        mask = np.zeros(0, dtype=bool)
+        groups = np.zeros(0, dtype=np.int64)
+        keys = {name: self._decode(name, self._no_keys(name)) for name in dimensions}
+        values = {name: np.resize(self._metric(name, rows, mask, groups, 1).to_numpy(), size) for name in names}
+        return pd.DataFrame({**keys, **values})
+
+    def _no_keys(self, name: str) -> np.ndarray:
+        return np.zeros(0, dtype=np.int32 if name in self.codes else "datetime64[D]")
+
+    def _decode(self, name: str, keys: np.ndarray) -> pd.Series:
+        if name not in self.codes:
+            return pd.Series(pd.to_datetime(keys))
+        categories = self.categories[name]
+        if not len(categories):
+            return pd.Series([None] * len(keys), dtype=object)
+        labels = pd.Series(categories.take(np.clip(keys, 0, None)))
+        return labels.where(keys >= 0) if (keys < 0).any() else labels
+
+
+class OlapCube:
+    """The fact cubes plus the small dimension tables, for one data version."""
+
+    def __init__(self, version: tuple, facts: Mapping[str, FactCube], dimensions: Mapping[str, pd.DataFrame]):
+        self.version = version
+        self.facts = dict(facts)
+        self.dimensions = dict(dimensions)
+        self.loaded_at = time.time()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(cube.nbytes for cube in self.facts.values())
+
+    def aggregate(
+        self,
+        columns: Sequence[str | tuple[str, str]],
+        from_dt: date,
+        to_dt: date,
+        dimensions: Sequence[str] = (),
+        filters: Optional[Mapping[str, Any]] = None,
+    ) -> pd.DataFrame:
+        """Registry metrics grouped by fact `dimensions` (columns or date grains).
+
+        `columns` are entries as for `metrics.metric_columns`: a metric name or
+        an (output column, metric name) pair. Raises LookupError when a metric's
+        fact is not held in the cube.
+        """
+
+        pairs = _column_pairs(columns)
+        names = list(dict.fromkeys(name for _, name in pairs))
+        frames = [
+            self.facts[fact].aggregate(
+                fact_metrics, dimensions, from_dt, to_dt, filters or {}, self.dimensions.get("calendar")
+            )
+            for fact, fact_metrics in self._by_fact(names).items()
+        ]
+        result = frames[0]
+        for frame in frames[1:]:
+            if dimensions:
+                result = result.merge(frame, on=list(dimensions), how="outer")
+            else:
+                result = pd.concat([result, frame], axis=1)
+        if dimensions:
+            result = result.sort_values(list(dimensions), ignore_index=True)
+        return pd.DataFrame({
+            **{name: result[name] for name in dimensions},
+            **{output: result[name] for output, name in pairs},
+        })
+
+    def anchored(
+        self,
+        anchor: str,
+        key: str,
+        columns: Sequence[str | tuple[str, str]],
+        from_dt: date,
+        to_dt: date,
+        filters: Optional[Mapping[str, Any]] = None,
+        anchor_filters: Optional[Mapping[str, Any]] = None,
+    ) -> pd.DataFrame:
+        """Metrics by `key` LEFT JOINed onto a dimension table, like an anchored QuerySpec.
+
+        Every (filtered) row of the dimension table is kept; rows without facts
+        get the metric values over no rows (0 counts, default ratios).
+        """
+
+        table = self.dimensions[anchor]
+        for column, value in (anchor_filters or {}).items():
+            if _is_set(value):
+                wanted = list(value) if isinstance(value, (list, tuple, set, frozenset)) else [value]
+                table = table[table[column].isin(wanted)]
+        metrics = self.aggregate(columns, from_dt, to_dt, (key,), filters)
+        result = table.merge(metrics, on=key, how="left")
+
+        pairs = _column_pairs(columns)
+        empty = {}
+        for fact, names in self._by_fact([name for _, name in pairs]).items():
+            empty.update(self.facts[fact].empty(names).items())
+        for output, name in pairs:
+            value = empty[name]
+            if not value.isna().all():
+                # Restore the integer dtype of counts that the unmatched rows turned into floats
+                dtype = np.result_type(value.dtype, metrics[output].dtype)
+                result[output] = result[output].fillna(value.iloc[0]).astype(dtype)
+        return result.reset_index(drop=True)
+
+    def _by_fact(self, names: Sequence[str]) -> dict[str, list[str]]:
+        by_fact: dict[str, list[str]] = {}
+        for name in names:
+            by_fact.setdefault(get_metric(name).fact, []).append(name)
+        missing = set(by_fact) - set(self.facts)
+        if missing:
+            raise LookupError(f"Facts not in the cube: {', '.join(sorted(missing))}")
+        return by_fact
+
+
+def _column_pairs(columns: Sequence[str | tuple[str, str]]) -> list[tuple[str, str]]:
+    return [column if isinstance(column, tuple) else (column, column) for column in columns]
+
+
+def load_dimension(engine: Any, name: str) -> pd.DataFrame:
+    """One of the DIMENSION_QUERIES tables as a DataFrame."""
+
+    frame = fetch_arrow(engine, DIMENSION_QUERIES[name]).to_pandas()
+    return load_calendar(frame) if name == "calendar" else frame
+
+
+def load_cube(engine: Any, version: tuple) -> OlapCube:
+    """Read the facts and dimension tables and build the cube."""
+
+    started = time.perf_counter()
+    facts = {}
+    for name, columns in CUBE_FACTS.items():
+        fact = FACTS[name]
+        frame = fetch_arrow(engine, f"SELECT {', '.join(columns)} FROM {fact.table.name}").to_pandas()
+        facts[name] = FactCube(fact, frame)
+    dimensions = {name: load_dimension(engine, name) for name in DIMENSION_QUERIES}
+    cube = OlapCube(version, facts, dimensions)
+    logger.info("Loaded OLAP cube (%s rows, %.1f MB) in %.2fs",
+                sum(fact.rows for fact in facts.values()), cube.nbytes / 1e6, time.perf_counter() - started)
+    return cube
+
+
+def data_version(engine: Any) -> tuple:
+    """Fingerprint of the fact tables: their row counts and write counters.
+
+    Changes with every statement that inserts, updates or deletes fact rows,
+    or truncates a fact table.
+    """
+
+    with engine.connect() as connection:
+        row = connection.exec_driver_sql(VERSION_SQL).one()
+    return tuple(row)
+
+
+class CubeStore:
+    """Holds the current cube and (re)loads it in the background on version changes."""
+
+    def __init__(self, engine: Any):
+        self.engine = engine
+        self.cube: Optional[OlapCube] = None
+        self.failed_version: Optional[tuple] = None
+        self._loading: Optional[tuple] = None
+        self._lock = threading.Lock()
+
+    def get(self, version: tuple) -> Optional[OlapCube]:
+        """Return the cube if it is loaded for `version`, else start loading it and return None."""
+
+        cube = self.cube
+        if cube is not None and cube.version == version:
+            return cube
+        if sum(value or 0 for value in version[::2]) > CUBE_MAX_ROWS or version == self.failed_version:
+            return None
+        with self._lock:
+            if self._loading != version:
+                self._loading = version
+                threading.Thread(target=self._load, args=(version,), name="olap-cube-loader", daemon=True).start()
+        return None
+
+    def _load(self, version: tuple) -> None:
+        try:
+            cube = load_cube(self.engine, version)
+            self.cube = cube
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("OLAP cube load failed, using SQL: %s", exc)
+            self.failed_version = version
+        finally:
+            with self._lock:
+                if self._loading == version:
+                    self._loading = None
+
+
+@st.cache_resource(show_spinner=False)
+def _cube_store() -> CubeStore:
+    return CubeStore(get_conn().engine)
+
+
+# Change notifications seen by this process (see note_data_change)
+_notified_changes = 0
+_notified_lock = threading.Lock()
+
+
+def note_data_change() -> None:
+    """Make the next `get_cube()` read the data version again.
+
+    Called by `src.cache_invalidation` for every change notification, before
+    the affected results are dropped, so they are not recomputed from a cube
+    that predates the change while the cached version is still current.
+    """
+
+    global _notified_changes
+    with _notified_lock:
+        _notified_changes += 1
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _current_version(notified_changes: int) -> tuple:
+    # Keyed on the notification count: a new notification forces a fresh read
+    return data_version(get_conn().engine)
+
+
+def get_cube() -> Optional[OlapCube]:
+    """Return the warm cube for the current data version, or None to fall back to SQL."""
+
+    if not CUBE_ENABLED:
+        return None
+    try:
+        return _cube_store().get(_current_version(_notified_changes))
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("OLAP cube unavailable: %s", exc)
+        return None
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Period Comparisons for Reflexta Analytics Platform
+Current, previous-period and same-period-last-year values of any metric set.
+
+A comparison reads three windows (`date_windows.comparison_windows`): the
+requested one, the window of the same length just before it, and the same
+dates one year earlier. For each compared metric it returns
+
+  - `<name>`: the value in the current window
+  - `<name>_previous` and `<name>_last_year`: the value in the other windows
+  - `<name>_change_pct` and `<name>_yoy_pct`: the percent change of the
+    current value against them (NULL/NaN when the base is 0)
+
+plus optional absolute growth columns (output -> metric) kept for the KPI
+cards, COALESCE(current - previous, 0).
+
+- SQL: `comparison_query()` scans the fact once. The WHERE clause is the
+  OR of the three window predicates (index ranges and partition pruning
+  still apply), and every metric is aggregated three times with the window
+  inside the aggregate (`metric_sql(..., when=...)`).
+- pandas: `compare_cube()` computes the same columns from the OLAP cube or a
+  live window.
+"""
+
+from __future__ import annotations
+
+from dataclasses import replace
+from datetime import date
+from typing import Any, Mapping, Optional, Sequence
+
+import pandas as pd
+from sqlalchemy import func, or_
+from sqlalchemy.sql.expression import Select
+
+from .date_windows import comparison_windows, window_params
+from .metrics import metric_sql, ratio
+from .olap_cube import OlapCube
+from .query_builder import QuerySpec, build_query, in_window
+
+# Bind parameter prefix of each comparison window
+WINDOW_PREFIXES = {"current": "", "previous": "prev_", "last_year": "ly_"}
+
+
+def _pairs(columns: Sequence[str | tuple[str, str]]) -> list[tuple[str, str]]:
+    return [(column, column) if isinstance(column, str) else column for column in columns]
+
+
+def comparison_columns(columns: Sequence[str | tuple[str, str]],
+                       growth: Optional[Mapping[str, str]] = None) -> list[str]:
+    """Output columns of a comparison of `columns`, in order."""
+
+    outputs = [output for output, _ in _pairs(columns)]
+    return [
+        *outputs,
+        *(f"{output}_{period}" for output in outputs for period in ("previous", "last_year")),
+        *(f"{output}_{change}" for output in outputs for change in ("change_pct", "yoy_pct")),
+        *(growth or {}),
+    ]
+
+
+def comparison_query(
+    spec: QuerySpec,
+    columns: Sequence[str | tuple[str, str]],
+    from_dt: date,
+    to_dt: date,
+    filters: Optional[Mapping[str, Any]] = None,
+    growth: Optional[Mapping[str, str]] = None,
+) -> tuple[Select, dict[str, Any]]:
+    """One-row comparison of the metrics in `columns` over `spec`'s fact, in a single scan.
+
+    `columns` takes metric names or (output column, metric name) pairs, as
+    `metric_columns`; `spec` supplies the fact, date column, conditions and
+    filters (its measures are not used). `growth` maps absolute growth
+    columns to compared outputs.
+    """
+
+    windows = {
+        period: in_window(spec.date_column, prefix) for period, prefix in WINDOW_PREFIXES.items()
+    }
+    measures = {}
+    for period, suffix in (("current", ""), ("previous", "_previous"), ("last_year", "_last_year")):
+        for output, name in _pairs(columns):
+            measures[f"{output}{suffix}"] = metric_sql(name, spec.fact, when=windows[period])
+
+    derived = {}
+    for output, _ in _pairs(columns):
+        for change, base in (("change_pct", "previous"), ("yoy_pct", "last_year")):
+            derived[f"{output}_{change}"] = (
+                lambda c, o=output, b=f"{output}_{base}": ratio(c[o] - c[b], func.abs(c[b]))
+            )
+    for name, output in (growth or {}).items():
+        derived[name] = lambda c, o=output: func.coalesce(c[o] - c[f"{o}_previous"], 0)
+
+    scan = replace(
+        spec,
+        date_column=None,
+        where=(*spec.where, or_(*windows.values())),
+        measures=measures,
+        derived=derived,
+    )
+    stmt, params = build_query(scan, filters=filters)
+    for period, (window_from, window_to) in comparison_windows(from_dt, to_dt).items():
+        params.update(window_params(window_from, window_to, WINDOW_PREFIXES[period]))
+    return stmt, params
+
+
+def compare_frames(frames: Mapping[str, pd.DataFrame], columns: Sequence[str | tuple[str, str]],
+                   growth: Optional[Mapping[str, str]] = None) -> pd.DataFrame:
+    """Comparison columns from one-row aggregates of the current, previous and last_year windows."""
+
+    outputs = [output for output, _ in _pairs(columns)]
+    current = frames["current"].reset_index(drop=True)
+    result = current[outputs].copy()
+    for period in ("previous", "last_year"):
+        for output in outputs:
+            result[f"{output}_{period}"] = frames[period].reset_index(drop=True)[output]
+    for output in outputs:
+        for change, base in (("change_pct", "previous"), ("yoy_pct", "last_year")):
+            base_value = result[f"{output}_{base}"].astype(float)
+            result[f"{output}_{change}"] = ratio(result[output].astype(float) - base_value, base_value.abs())
+    for name, output in (growth or {}).items():
+        result[name] = (result[output] - result[f"{output}_previous"]).fillna(0)
+    return result[comparison_columns(columns, growth)]
+
+
+def compare_cube(
+    cube: OlapCube,
+    columns: Sequence[str | tuple[str, str]],
+    from_dt: date,
+    to_dt: date,
+    filters: Optional[Mapping[str, Any]] = None,
+    growth: Optional[Mapping[str, str]] = None,
+) -> pd.DataFrame:
+    """Cube counterpart of `comparison_query`: the same columns from three in-memory aggregates."""
+
+    frames = {
+        period: cube.aggregate(columns, window_from, window_to, filters=filters)
+        for period, (window_from, window_to) in comparison_windows(from_dt, to_dt).items()
+    }
+    return compare_frames(frames, columns, growth)
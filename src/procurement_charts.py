@@ -57,7 +57,9 @@ def procurement_trends_chart(df: pd.DataFrame, group_by: str = "month") -> go.Fi
     
     # Determine the correct x-axis column based on available columns
     x_column = None
-    if "month_name" in df.columns:
+    if "period" in df.columns:
+        x_column = "period"
+    elif "month_name" in df.columns:
         x_column = "month_name"
     elif "quarter_name" in df.columns:
         x_column = "quarter_name"
@@ -88,6 +90,17 @@ def procurement_trends_chart(df: pd.DataFrame, group_by: str = "month") -> go.Fi
         markers=True
     )
     
+    # Moving average, when requested
+    if 'rolling_avg_value' in df.columns:
+        fig.update_traces(name="Total value", showlegend=True)
+        fig.add_trace(go.Scatter(
+            x=df[x_column],
+            y=df['rolling_avg_value'],
+            mode='lines',
+            name="Moving average",
+            line=dict(dash='dash')
+        ))
+    
     fig.update_layout(
         height=500,
         xaxis_title=group_by.title(),
@@ -6,330 +6,558 @@ Optimized database queries with caching and error handling.
 
 from __future__ import annotations
 
+from dataclasses import dataclass, fields
 from datetime import date
-from typing import Optional
+from typing import Any, Optional
 
 import pandas as pd
-import streamlit as st
+from sqlalchemy import case, func, literal_column, null, select
 
-from .db import get_conn
+from .date_dimension import CALENDAR_GRAINS, Rolling, calendar_query, fill_calendar
+from .db import run_query
+from .materialized_views import covers_whole_months
+from .metrics import PENDING_STATUSES, metric_columns, metric_sql, ratio
+from .olap_cube import OlapCube, get_cube
+from .period_comparison import compare_cube, comparison_query
+from .query_builder import (
+    Filter,
+    QuerySpec,
+    build_query,
+    finance_cost_centers,
+    finance_departments,
+    mv_category_analysis,
+    mv_procurement_summary,
+    mv_vendor_performance,
+    procurement_categories,
+    procurement_category_closure,
+    procurement_orders,
+    procurement_vendors,
+)
+from .query_cache import argument_type, cached_query
+from .range_cache import RangeQuery, covers, metric_partials, run_range_query
+from .rollups import RollupTree, rollup_statement
 
+po = procurement_orders.alias("po")
+v = procurement_vendors.alias("v")
+c = procurement_categories.alias("c")
+d = finance_departments.alias("d")
+cc = finance_cost_centers.alias("cc")
 
-@st.cache_data(ttl=60, show_spinner=False)
-def get_procurement_summary(from_dt: date, to_dt: date, dept_id: Optional[int] = None) -> pd.DataFrame:
-    """Get procurement summary by department."""
-    
-    params = {"from_dt": from_dt, "to_dt": to_dt}
-    where_dept = ""
-    if dept_id:
-        where_dept = " AND d.dept_id = :dept_id"
-        params["dept_id"] = dept_id
-    
-    sql = f"""
-    SELECT 
-        d.dept_name,
-        d.dept_code,
-        COUNT(po.order_id) as total_orders,
-        SUM(po.grand_total) as total_value,
-        AVG(po.grand_total) as avg_order_value,
-        COUNT(CASE WHEN po.status = 'Received' THEN 1 END) as completed_orders,
-        COUNT(CASE WHEN po.status IN ('Draft', 'Submitted', 'Approved', 'Ordered') THEN 1 END) as pending_orders,
-        COUNT(CASE WHEN po.status = 'Received' THEN 1 END) * 100.0 / NULLIF(COUNT(po.order_id), 0) as completion_rate
-    FROM finance_departments d
-    LEFT JOIN procurement_orders po ON d.dept_id = po.dept_id
-        AND po.order_date BETWEEN :from_dt AND :to_dt
-        {where_dept}
-    GROUP BY d.dept_id, d.dept_name, d.dept_code
-    ORDER BY total_value DESC
+_expected_delivery = po.c.order_date + literal_column("INTERVAL '30 days'")
+
+# Values allowed by the procurement_orders CHECK constraints
+ORDER_STATUSES = ("Draft", "Submitted", "Approved", "Rejected", "Ordered", "Received", "Closed", "Cancelled")
+ORDER_PRIORITIES = ("Low", "Medium", "High", "Urgent")
+
+
+@argument_type
+@dataclass(frozen=True)
+class OrderFilters:
+    """Optional multi-value order predicates accepted by every procurement query.
+
+    Each field lists the accepted values; an empty field does not filter.
+    Values are kept sorted and unique, so equal selections share cache entries.
     """
-    
-    conn = get_conn()
-    return conn.query(sql, params=params)
-
-
-@st.cache_data(ttl=60, show_spinner=False)
-def get_procurement_kpis(from_dt: date, to_dt: date, dept_id: Optional[int] = None) -> pd.DataFrame:
-    """Get key procurement KPIs with growth calculations."""
-    
-    params = {"from_dt": from_dt, "to_dt": to_dt}
-    where_dept = ""
-    if dept_id:
-        where_dept = " AND dept_id = :dept_id"
-        params["dept_id"] = dept_id
-    
-    # Calculate previous period for growth comparison
-    from datetime import timedelta
-    period_days = (to_dt - from_dt).days
-    prev_from_dt = from_dt - timedelta(days=period_days)
-    prev_to_dt = from_dt - timedelta(days=1)
-    
-    sql = f"""
-    WITH current_period AS (
-        SELECT 
-            COUNT(*) as total_orders,
-            COALESCE(SUM(grand_total), 0) as total_spend,
-            COALESCE(AVG(grand_total), 0) as avg_order_value,
-            COUNT(DISTINCT vendor_id) as active_vendors,
-            COUNT(DISTINCT category_id) as unique_categories,
-            COUNT(CASE WHEN status = 'Received' THEN 1 END) as completed_orders,
-            COUNT(CASE WHEN status IN ('Draft', 'Submitted', 'Approved', 'Ordered') THEN 1 END) as pending_orders,
-            COUNT(CASE WHEN priority = 'High' OR priority = 'Urgent' THEN 1 END) as high_priority_orders
-        FROM procurement_orders
-        WHERE order_date BETWEEN :from_dt AND :to_dt
-            {where_dept}
+
+    statuses: tuple[str, ...] = ()
+    vendor_ids: tuple[int, ...] = ()
+    category_ids: tuple[int, ...] = ()
+    priorities: tuple[str, ...] = ()
+
+    def __post_init__(self) -> None:
+        for field in fields(self):
+            object.__setattr__(self, field.name, tuple(sorted(set(getattr(self, field.name) or ()))))
+
+    def params(self) -> dict[str, tuple]:
+        """The set predicates keyed by their `Filter` parameter (the fact column)."""
+
+        values = {
+            "status": self.statuses,
+            "vendor_id": self.vendor_ids,
+            "category_id": self.category_ids,
+            "priority": self.priorities,
+        }
+        return {param: value for param, value in values.items() if value}
+
+
+# Pushed down into every query on the order fact; matched by the
+# (column, order_date) indexes of migration 008
+ORDER_FILTERS = (
+    Filter("status", po.c.status),
+    Filter("vendor_id", po.c.vendor_id),
+    Filter("category_id", po.c.category_id),
+    Filter("priority", po.c.priority),
+)
+FACT_FILTERS = (Filter("dept_id", po.c.dept_id), *ORDER_FILTERS)
+
+# Metric entries shared by the SQL specs and the in-memory cube
+SUMMARY_METRICS = (
+    "total_orders",
+    ("total_value", "total_spend"),
+    "avg_order_value",
+    "completed_orders",
+    "pending_orders",
+    "completion_rate",
+)
+KPI_METRICS = (
+    "total_orders",
+    "total_spend",
+    "avg_order_value",
+    "active_vendors",
+    "unique_categories",
+    "completed_orders",
+    "pending_orders",
+    "high_priority_orders",
+)
+KPI_GROWTH = {
+    "order_growth": "total_orders",
+    "spend_growth": "total_spend",
+    "aov_growth": "avg_order_value",
+    "vendor_growth": "active_vendors",
+}
+VENDOR_METRICS = (
+    "total_orders", ("total_value", "total_spend"), "avg_order_value", "completed_orders", "completion_rate"
+)
+CATEGORY_METRICS = (
+    ("order_count", "total_orders"),
+    ("total_value", "total_spend"),
+    "avg_order_value",
+    ("unique_vendors", "active_vendors"),
+    ("departments_using", "ordering_departments"),
+    "completed_orders",
+    "completion_rate",
+)
+TREND_METRICS = (
+    ("order_count", "total_orders"),
+    ("total_value", "total_spend"),
+    "avg_order_value",
+    "completed_orders",
+    "completion_rate",
+)
+
+PROCUREMENT_SUMMARY = QuerySpec(
+    fact=po,
+    date_column=po.c.order_date,
+    anchor=d,
+    anchor_on=d.c.dept_id == po.c.dept_id,
+    filters=(Filter("dept_id", d.c.dept_id), *ORDER_FILTERS),
+    group_keys=(d.c.dept_id,),
+    dimensions={"dept_name": d.c.dept_name, "dept_code": d.c.dept_code},
+    measures=metric_columns(po, *SUMMARY_METRICS),
+)
+
+# Whole-month windows are served from the pre-aggregated views
+ms = mv_procurement_summary.alias("ms")
+MV_PROCUREMENT_SUMMARY = QuerySpec(
+    fact=ms,
+    date_column=ms.c.month_start,
+    anchor=d,
+    anchor_on=d.c.dept_id == ms.c.dept_id,
+    filters=(Filter("dept_id", d.c.dept_id),),
+    group_keys=(d.c.dept_id,),
+    dimensions=PROCUREMENT_SUMMARY.dimensions,
+    measures={
+        "total_orders": func.coalesce(func.sum(ms.c.total_orders), 0),
+        "total_value": func.coalesce(func.sum(ms.c.total_value), 0),
+        "avg_order_value": ratio(func.sum(ms.c.total_value), func.sum(ms.c.total_orders), scale=1, digits=None, default=0),
+        "completed_orders": func.coalesce(func.sum(ms.c.completed_orders), 0),
+        "pending_orders": func.coalesce(func.sum(ms.c.pending_orders), 0),
+        "completion_rate": ratio(func.sum(ms.c.completed_orders), func.sum(ms.c.total_orders)),
+    },
+)
+
+# Compared over the current, previous and last-year windows (src.period_comparison)
+PROCUREMENT_KPIS = QuerySpec(
+    fact=po,
+    date_column=po.c.order_date,
+    filters=FACT_FILTERS,
+)
+
+# Windows that are not whole months are answered from cached daily partials
+VENDOR_RANGE = metric_partials(po, *VENDOR_METRICS)
+VENDOR_PERFORMANCE = RangeQuery(
+    name="procurement_vendor_performance",
+    spec=QuerySpec(
+        fact=po,
+        date_column=po.c.order_date,
+        filters=FACT_FILTERS,
+        dimensions={"day": po.c.order_date, "vendor_id": po.c.vendor_id},
+        measures=VENDOR_RANGE.measures,
+    ),
+    keys=("vendor_id",),
+    partials=VENDOR_RANGE.partials,
+    derived={**VENDOR_RANGE.derived, "avg_delivery_delay_days": lambda f: None},
+    anchor=select(v.c.vendor_id, v.c.vendor_name, v.c.vendor_code, v.c.rating),
+    columns=("vendor_name", "vendor_code", "rating", *dict(VENDOR_RANGE.derived), "avg_delivery_delay_days"),
+    order_by=(("total_value", False),),
+)
+
+mvp = mv_vendor_performance.alias("mvp")
+MV_VENDOR_PERFORMANCE = QuerySpec(
+    fact=mvp,
+    date_column=mvp.c.month_start,
+    anchor=v,
+    anchor_on=v.c.vendor_id == mvp.c.vendor_id,
+    filters=(Filter("dept_id", mvp.c.dept_id), Filter("vendor_id", v.c.vendor_id)),
+    group_keys=(v.c.vendor_id,),
+    dimensions={"vendor_name": v.c.vendor_name, "vendor_code": v.c.vendor_code, "rating": v.c.rating},
+    measures={
+        "total_orders": func.coalesce(func.sum(mvp.c.total_orders), 0),
+        "total_value": func.coalesce(func.sum(mvp.c.total_value), 0),
+        "avg_order_value": ratio(func.sum(mvp.c.total_value), func.sum(mvp.c.total_orders), scale=1, digits=None, default=0),
+        "completed_orders": func.coalesce(func.sum(mvp.c.completed_orders), 0),
+        "completion_rate": ratio(func.sum(mvp.c.completed_orders), func.sum(mvp.c.total_orders)),
+        "avg_delivery_delay_days": null(),
+    },
+)
+
+CATEGORY_RANGE = metric_partials(po, *CATEGORY_METRICS)
+CATEGORY_ANALYSIS = RangeQuery(
+    name="procurement_category_analysis",
+    spec=QuerySpec(
+        fact=po,
+        date_column=po.c.order_date,
+        filters=FACT_FILTERS,
+        dimensions={"day": po.c.order_date, "category_id": po.c.category_id},
+        measures=CATEGORY_RANGE.measures,
+    ),
+    keys=("category_id",),
+    partials=CATEGORY_RANGE.partials,
+    derived=CATEGORY_RANGE.derived,
+    anchor=select(c.c.category_id, c.c.category_name, c.c.category_code),
+    columns=("category_name", "category_code", *dict(CATEGORY_RANGE.derived)),
+    order_by=(("total_value", False),),
+)
+
+mc = mv_category_analysis.alias("mc")
+MV_CATEGORY_ANALYSIS = QuerySpec(
+    fact=mc,
+    date_column=mc.c.month_start,
+    anchor=c,
+    anchor_on=c.c.category_id == mc.c.category_id,
+    filters=(
+        Filter("dept_id", mc.c.dept_id), Filter("vendor_id", mc.c.vendor_id), Filter("category_id", c.c.category_id)
     ),
-    previous_period AS (
-        SELECT 
-            COUNT(*) as prev_total_orders,
-            COALESCE(SUM(grand_total), 0) as prev_total_spend,
-            COALESCE(AVG(grand_total), 0) as prev_avg_order_value,
-            COUNT(DISTINCT vendor_id) as prev_active_vendors
-        FROM procurement_orders
-        WHERE order_date BETWEEN :prev_from_dt AND :prev_to_dt
-            {where_dept}
+    group_keys=(c.c.category_id,),
+    dimensions={"category_name": c.c.category_name, "category_code": c.c.category_code},
+    measures={
+        "order_count": func.coalesce(func.sum(mc.c.order_count), 0),
+        "total_value": func.coalesce(func.sum(mc.c.total_value), 0),
+        "avg_order_value": ratio(func.sum(mc.c.total_value), func.sum(mc.c.order_count), scale=1, digits=None, default=0),
+        # The view stores missing keys as 0
+        "unique_vendors": func.count(func.nullif(mc.c.vendor_id, 0).distinct()),
+        "departments_using": func.count(func.nullif(mc.c.dept_id, 0).distinct()),
+        "completed_orders": func.coalesce(func.sum(mc.c.completed_orders), 0),
+        "completion_rate": ratio(func.sum(mc.c.completed_orders), func.sum(mc.c.order_count)),
+    },
+)
+
+
+# Bucketed through dim_date by calendar_query (any calendar or fiscal grain)
+PROCUREMENT_TRENDS = QuerySpec(
+    fact=po,
+    date_column=po.c.order_date,
+    filters=FACT_FILTERS,
+    measures=metric_columns(po, *TREND_METRICS),
+)
+
+PENDING_ORDERS = QuerySpec(
+    fact=po,
+    date_column=po.c.order_date,
+    joins=(
+        (v, po.c.vendor_id == v.c.vendor_id),
+        (c, po.c.category_id == c.c.category_id),
+        (d, po.c.dept_id == d.c.dept_id),
+    ),
+    where=(po.c.status.in_(PENDING_STATUSES),),
+    filters=FACT_FILTERS,
+    dimensions={
+        "order_id": po.c.order_id,
+        "order_number": po.c.order_number,
+        "order_date": po.c.order_date,
+        "grand_total": po.c.grand_total,
+        "currency": po.c.currency,
+        "status": po.c.status,
+        "priority": po.c.priority,
+        "vendor_name": v.c.vendor_name,
+        "category_name": c.c.category_name,
+        "dept_name": d.c.dept_name,
+        "requested_by": po.c.requested_by,
+        "expected_delivery_date": _expected_delivery,
+        "notes": po.c.notes,
+    },
+)
+
+PRIORITY_RANK = case(
+    (po.c.priority == "Urgent", 1),
+    (po.c.priority == "High", 2),
+    (po.c.priority == "Medium", 3),
+    else_=4,
+)
+
+DELIVERY_PERFORMANCE = QuerySpec(
+    fact=po,
+    date_column=po.c.order_date,
+    joins=((v, po.c.vendor_id == v.c.vendor_id),),
+    filters=FACT_FILTERS,
+    group_keys=(v.c.vendor_id,),
+    dimensions={"vendor_name": v.c.vendor_name},
+    measures={
+        **metric_columns(
+            po,
+            "total_orders",
+            ("delivered_orders", "completed_orders"),
+            ("on_time_deliveries", "completed_orders"),
+            "pending_orders",
+        ),
+        "avg_delivery_delay_days": null(),
+        "on_time_percentage": ratio(
+            metric_sql("completed_orders", po), metric_sql("total_orders", po), default=0
+        ),
+    },
+)
+
+SPEND_ANALYSIS = QuerySpec(
+    fact=po,
+    date_column=po.c.order_date,
+    joins=(
+        (v, po.c.vendor_id == v.c.vendor_id),
+        (c, po.c.category_id == c.c.category_id),
+        (d, po.c.dept_id == d.c.dept_id),
+        (cc, po.c.cost_center_id == cc.c.cost_center_id),
+    ),
+    filters=FACT_FILTERS,
+    dimensions={
+        "order_id": po.c.order_id,
+        "order_number": po.c.order_number,
+        "order_date": po.c.order_date,
+        "grand_total": po.c.grand_total,
+        "currency": po.c.currency,
+        "status": po.c.status,
+        "vendor_name": v.c.vendor_name,
+        "category_name": c.c.category_name,
+        "dept_name": d.c.dept_name,
+        "cost_center_name": cc.c.cost_center_name,
+        "requested_by": po.c.requested_by,
+        "priority": po.c.priority,
+        "expected_delivery_date": _expected_delivery,
+        "delivery_date": null(),
+    },
+)
+
+# Orders per category, rolled up the category tree
+CATEGORY_TREE = RollupTree(
+    nodes=c,
+    key="category_id",
+    parent="parent_category_id",
+    labels=("category_code", "category_name"),
+    closure=procurement_category_closure.alias("pc"),
+)
+CATEGORY_LEAVES = QuerySpec(
+    fact=po,
+    date_column=po.c.order_date,
+    filters=FACT_FILTERS,
+    dimensions={"category_id": po.c.category_id},
+    measures=metric_columns(po, ("total_value", "total_spend"), ("order_count", "total_orders")),
+)
+
+
+def _filters(dept_id: Optional[int], order_filters: Optional[OrderFilters]) -> dict[str, Any]:
+    return {"dept_id": dept_id, **(order_filters or OrderFilters()).params()}
+
+
+def _month_view_serves(spec: QuerySpec, from_dt: date, to_dt: date, order_filters: Optional[OrderFilters]) -> bool:
+    """Whether the month view behind `spec` can answer: whole months, and a column for every set predicate."""
+
+    params = {flt.param for flt in spec.filters}
+    return covers_whole_months(from_dt, to_dt) and set((order_filters or OrderFilters()).params()) <= params
+
+
+def _anchored_from_cube(cube: OlapCube, anchor: str, key: str, metrics: tuple, dimensions: tuple,
+                        from_dt: date, to_dt: date, filters: dict[str, Any]) -> pd.DataFrame:
+    # Like the SQL specs, a filter on the anchor key also narrows the anchor rows
+    frame = cube.anchored(anchor, key, metrics, from_dt, to_dt, filters=filters, anchor_filters={key: filters.get(key)})
+    columns = [*dimensions, *(metric if isinstance(metric, str) else metric[0] for metric in metrics)]
+    return frame.sort_values("total_value", ascending=False, kind="stable", ignore_index=True)[columns]
+
+
+def _trend_rolling(periods: Optional[int]) -> dict[str, Rolling]:
+    if not periods:
+        return {}
+    return {
+        "rolling_total_value": Rolling("total_value", periods),
+        "rolling_avg_value": Rolling("total_value", periods, "avg"),
+    }
+
+
+def _trends_from_cube(cube: OlapCube, from_dt: date, to_dt: date, filters: dict[str, Any], grain: str,
+                      rolling_periods: Optional[int] = None) -> pd.DataFrame:
+    frame = cube.aggregate(TREND_METRICS, from_dt, to_dt, (grain,), filters).rename(columns={grain: "period_start"})
+    return fill_calendar(
+        cube.dimensions["calendar"], frame, grain, from_dt, to_dt, rolling=_trend_rolling(rolling_periods)
     )
-    SELECT 
-        c.*,
-        COALESCE(c.total_orders - p.prev_total_orders, 0) as order_growth,
-        COALESCE(c.total_spend - p.prev_total_spend, 0) as spend_growth,
-        COALESCE(c.avg_order_value - p.prev_avg_order_value, 0) as aov_growth,
-        COALESCE(c.active_vendors - p.prev_active_vendors, 0) as vendor_growth
-    FROM current_period c
-    CROSS JOIN previous_period p
-    """
-    
-    params["prev_from_dt"] = prev_from_dt
-    params["prev_to_dt"] = prev_to_dt
-    
-    conn = get_conn()
-    return conn.query(sql, params=params)
 
 
-@st.cache_data(ttl=60, show_spinner=False)
-def get_vendor_performance(from_dt: date, to_dt: date, dept_id: Optional[int] = None) -> pd.DataFrame:
+@cached_query(ttl=60)
+def get_procurement_summary(from_dt: date, to_dt: date, dept_id: Optional[int] = None,
+                            order_filters: Optional[OrderFilters] = None) -> pd.DataFrame:
+    """Get procurement summary by department."""
+
+    filters = _filters(dept_id, order_filters)
+    cube = get_cube()
+    if cube is not None:
+        return _anchored_from_cube(
+            cube, "departments", "dept_id", SUMMARY_METRICS, ("dept_name", "dept_code"), from_dt, to_dt, filters
+        )
+
+    spec = (
+        MV_PROCUREMENT_SUMMARY if _month_view_serves(MV_PROCUREMENT_SUMMARY, from_dt, to_dt, order_filters)
+        else PROCUREMENT_SUMMARY
+    )
+    stmt, params = build_query(
+        spec, from_dt, to_dt, filters,
+        dimensions=("dept_name", "dept_code"),
+        order_by=("total_value DESC",),
+    )
+    return run_query(stmt, params)
+
+
+@cached_query(ttl=60)
+def get_procurement_kpis(from_dt: date, to_dt: date, dept_id: Optional[int] = None,
+                         order_filters: Optional[OrderFilters] = None) -> pd.DataFrame:
+    """Get key procurement KPIs compared with the previous period and the same period last year."""
+
+    filters = _filters(dept_id, order_filters)
+    cube = get_cube()
+    if cube is not None:
+        return compare_cube(cube, KPI_METRICS, from_dt, to_dt, filters, KPI_GROWTH)
+
+    stmt, params = comparison_query(PROCUREMENT_KPIS, KPI_METRICS, from_dt, to_dt, filters, KPI_GROWTH)
+    return run_query(stmt, params)
+
+
+@cached_query(ttl=60)
+def get_vendor_performance(from_dt: date, to_dt: date, dept_id: Optional[int] = None,
+                           order_filters: Optional[OrderFilters] = None) -> pd.DataFrame:
     """Get vendor performance analysis."""
-    
-    params = {"from_dt": from_dt, "to_dt": to_dt}
-    where_dept = ""
-    if dept_id:
-        where_dept = " AND po.dept_id = :dept_id"
-        params["dept_id"] = dept_id
-    
-    sql = f"""
-    SELECT 
-        v.vendor_name,
-        v.vendor_code,
-        v.rating,
-        COUNT(po.order_id) as total_orders,
-        SUM(po.grand_total) as total_value,
-        AVG(po.grand_total) as avg_order_value,
-        COUNT(CASE WHEN po.status = 'Received' THEN 1 END) as completed_orders,
-        COUNT(CASE WHEN po.status = 'Received' THEN 1 END) * 100.0 / NULLIF(COUNT(po.order_id), 0) as completion_rate,
-        NULL as avg_delivery_delay_days
-    FROM procurement_vendors v
-    LEFT JOIN procurement_orders po ON v.vendor_id = po.vendor_id
-        AND po.order_date BETWEEN :from_dt AND :to_dt
-        {where_dept}
-    GROUP BY v.vendor_id, v.vendor_name, v.vendor_code, v.rating
-    ORDER BY total_value DESC
-    """
-    
-    conn = get_conn()
-    return conn.query(sql, params=params)
+
+    filters = _filters(dept_id, order_filters)
+    cube = get_cube()
+    if cube is not None:
+        frame = _anchored_from_cube(
+            cube, "vendors", "vendor_id", VENDOR_METRICS, ("vendor_name", "vendor_code", "rating"),
+            from_dt, to_dt, filters,
+        )
+        frame["avg_delivery_delay_days"] = None
+        return frame
+
+    if (covers(VENDOR_PERFORMANCE, from_dt, to_dt, filters)
+            or not _month_view_serves(MV_VENDOR_PERFORMANCE, from_dt, to_dt, order_filters)):
+        return run_range_query(VENDOR_PERFORMANCE, from_dt, to_dt, filters)
+
+    stmt, params = build_query(
+        MV_VENDOR_PERFORMANCE, from_dt, to_dt, filters,
+        dimensions=("vendor_name", "vendor_code", "rating"),
+        order_by=("total_value DESC",),
+    )
+    return run_query(stmt, params)
 
 
-@st.cache_data(ttl=60, show_spinner=False)
-def get_category_analysis(from_dt: date, to_dt: date, dept_id: Optional[int] = None) -> pd.DataFrame:
+@cached_query(ttl=60)
+def get_category_analysis(from_dt: date, to_dt: date, dept_id: Optional[int] = None,
+                          order_filters: Optional[OrderFilters] = None) -> pd.DataFrame:
     """Get category-wise procurement analysis."""
-    
-    params = {"from_dt": from_dt, "to_dt": to_dt}
-    where_dept = ""
-    if dept_id:
-        where_dept = " AND po.dept_id = :dept_id"
-        params["dept_id"] = dept_id
-    
-    sql = f"""
-    SELECT 
-        c.category_name,
-        c.category_code,
-        COUNT(po.order_id) as order_count,
-        SUM(po.grand_total) as total_value,
-        AVG(po.grand_total) as avg_order_value,
-        COUNT(DISTINCT po.vendor_id) as unique_vendors,
-        COUNT(DISTINCT po.dept_id) as departments_using,
-        COUNT(CASE WHEN po.status = 'Received' THEN 1 END) as completed_orders,
-        COUNT(CASE WHEN po.status = 'Received' THEN 1 END) * 100.0 / NULLIF(COUNT(po.order_id), 0) as completion_rate
-    FROM procurement_categories c
-    LEFT JOIN procurement_orders po ON c.category_id = po.category_id
-        AND po.order_date BETWEEN :from_dt AND :to_dt
-        {where_dept}
-    GROUP BY c.category_id, c.category_name, c.category_code
-    ORDER BY total_value DESC
-    """
-    
-    conn = get_conn()
-    return conn.query(sql, params=params)
-
-
-@st.cache_data(ttl=60, show_spinner=False)
-def get_procurement_trends(from_dt: date, to_dt: date, dept_id: Optional[int] = None, group_by: str = "month") -> pd.DataFrame:
-    """Get procurement trends over time."""
-    
-    params = {"from_dt": from_dt, "to_dt": to_dt}
-    where_dept = ""
-    if dept_id:
-        where_dept = " AND dept_id = :dept_id"
-        params["dept_id"] = dept_id
-    
-    if group_by == "month":
-        date_part = "EXTRACT(MONTH FROM order_date)"
-        date_label = "month"
-        date_name = "TO_CHAR(order_date, 'Mon') as month_name"
-    elif group_by == "quarter":
-        date_part = "EXTRACT(QUARTER FROM order_date)"
-        date_label = "quarter"
-        date_name = "TO_CHAR(order_date, 'Q') as quarter_name"
-    else:  # week
-        date_part = "EXTRACT(WEEK FROM order_date)"
-        date_label = "week"
-        date_name = "TO_CHAR(order_date, 'WW') as week_name"
-    
-    sql = f"""
-    SELECT 
-        EXTRACT(YEAR FROM order_date) as year,
-        {date_part} as {date_label},
-        {date_name},
-        COUNT(*) as order_count,
-        SUM(grand_total) as total_value,
-        AVG(grand_total) as avg_order_value,
-        COUNT(CASE WHEN status = 'Received' THEN 1 END) as completed_orders,
-        COUNT(CASE WHEN status = 'Received' THEN 1 END) * 100.0 / NULLIF(COUNT(*), 0) as completion_rate
-    FROM procurement_orders
-    WHERE order_date BETWEEN :from_dt AND :to_dt
-    {where_dept}
-    GROUP BY EXTRACT(YEAR FROM order_date), {date_part}, {date_name.split(' as ')[0]}
-    ORDER BY year, {date_label}
+
+    filters = _filters(dept_id, order_filters)
+    cube = get_cube()
+    if cube is not None:
+        return _anchored_from_cube(
+            cube, "categories", "category_id", CATEGORY_METRICS, ("category_name", "category_code"),
+            from_dt, to_dt, filters,
+        )
+
+    if (covers(CATEGORY_ANALYSIS, from_dt, to_dt, filters)
+            or not _month_view_serves(MV_CATEGORY_ANALYSIS, from_dt, to_dt, order_filters)):
+        return run_range_query(CATEGORY_ANALYSIS, from_dt, to_dt, filters)
+
+    stmt, params = build_query(
+        MV_CATEGORY_ANALYSIS, from_dt, to_dt, filters,
+        dimensions=("category_name", "category_code"),
+        order_by=("total_value DESC",),
+    )
+    return run_query(stmt, params)
+
+
+@cached_query(ttl=60)
+def get_procurement_trends(from_dt: date, to_dt: date, dept_id: Optional[int] = None, group_by: str = "month",
+                           order_filters: Optional[OrderFilters] = None,
+                           rolling_periods: Optional[int] = None) -> pd.DataFrame:
+    """Get procurement trends per `group_by` bucket (a calendar or fiscal grain), empty buckets included.
+
+    With `rolling_periods`, adds the sum and average of total_value over
+    that many trailing buckets (rolling_total_value, rolling_avg_value).
     """
-    
-    conn = get_conn()
-    return conn.query(sql, params=params)
+
+    grain = group_by if group_by in CALENDAR_GRAINS else "week"
+    filters = _filters(dept_id, order_filters)
+    cube = get_cube()
+    if cube is not None:
+        return _trends_from_cube(cube, from_dt, to_dt, filters, grain, rolling_periods)
+
+    stmt, params = calendar_query(
+        PROCUREMENT_TRENDS, grain, from_dt, to_dt, filters, rolling=_trend_rolling(rolling_periods)
+    )
+    return run_query(stmt, params)
 
 
-@st.cache_data(ttl=60, show_spinner=False)
-def get_pending_orders(from_dt: date, to_dt: date, dept_id: Optional[int] = None) -> pd.DataFrame:
+@cached_query(ttl=60)
+def get_pending_orders(from_dt: date, to_dt: date, dept_id: Optional[int] = None,
+                       order_filters: Optional[OrderFilters] = None) -> pd.DataFrame:
     """Get pending orders requiring attention."""
-    
-    params = {"from_dt": from_dt, "to_dt": to_dt}
-    where_dept = ""
-    if dept_id:
-        where_dept = " AND po.dept_id = :dept_id"
-        params["dept_id"] = dept_id
-    
-    sql = f"""
-    SELECT 
-        po.order_id,
-        po.order_number,
-        po.order_date,
-        po.grand_total,
-        po.status,
-        po.priority,
-        v.vendor_name,
-        c.category_name,
-        d.dept_name,
-        po.requested_by,
-        po.order_date + INTERVAL '30 days' as expected_delivery_date,
-        po.notes
-    FROM procurement_orders po
-    JOIN procurement_vendors v ON po.vendor_id = v.vendor_id
-    JOIN procurement_categories c ON po.category_id = c.category_id
-    JOIN finance_departments d ON po.dept_id = d.dept_id
-    WHERE po.order_date BETWEEN :from_dt AND :to_dt
-        AND po.status IN ('Draft', 'Submitted', 'Approved', 'Ordered')
-        {where_dept}
-    ORDER BY 
-        CASE po.priority 
-            WHEN 'Urgent' THEN 1 
-            WHEN 'High' THEN 2 
-            WHEN 'Medium' THEN 3 
-            ELSE 4 
-        END,
-        po.order_date DESC
-    """
-    
-    conn = get_conn()
-    return conn.query(sql, params=params)
 
+    stmt, params = build_query(
+        PENDING_ORDERS, from_dt, to_dt, _filters(dept_id, order_filters),
+        dimensions=tuple(PENDING_ORDERS.dimensions),
+        order_by=(PRIORITY_RANK, po.c.order_date.desc()),
+    )
+    return run_query(stmt, params)
 
-@st.cache_data(ttl=60, show_spinner=False)
-def get_delivery_performance(from_dt: date, to_dt: date, dept_id: Optional[int] = None) -> pd.DataFrame:
+
+@cached_query(ttl=60)
+def get_delivery_performance(from_dt: date, to_dt: date, dept_id: Optional[int] = None,
+                             order_filters: Optional[OrderFilters] = None) -> pd.DataFrame:
     """Get delivery performance analysis."""
-    
-    params = {"from_dt": from_dt, "to_dt": to_dt}
-    where_dept = ""
-    if dept_id:
-        where_dept = " AND po.dept_id = :dept_id"
-        params["dept_id"] = dept_id
-    
-    sql = f"""
-    SELECT 
-        v.vendor_name,
-        COUNT(po.order_id) as total_orders,
-        COUNT(CASE WHEN po.status = 'Received' THEN 1 END) as delivered_orders,
-        COUNT(CASE WHEN po.status = 'Received' THEN 1 END) as on_time_deliveries,
-        COUNT(CASE WHEN po.status IN ('Draft', 'Submitted', 'Approved', 'Ordered') THEN 1 END) as pending_orders,
-        NULL as avg_delivery_delay_days,
-        CASE 
-            WHEN COUNT(po.order_id) > 0 THEN 
-                ROUND((COUNT(CASE WHEN po.status = 'Received' THEN 1 END) * 100.0 / COUNT(po.order_id)), 2)
-            ELSE 0 
-        END as on_time_percentage
-    FROM procurement_orders po
-    JOIN procurement_vendors v ON po.vendor_id = v.vendor_id
-    WHERE po.order_date BETWEEN :from_dt AND :to_dt
-        {where_dept}
-    GROUP BY v.vendor_id, v.vendor_name
-    HAVING COUNT(po.order_id) > 0
-    ORDER BY on_time_percentage DESC
-    """
-    
-    conn = get_conn()
-    return conn.query(sql, params=params)
+
+    stmt, params = build_query(
+        DELIVERY_PERFORMANCE, from_dt, to_dt, _filters(dept_id, order_filters),
+        dimensions=("vendor_name",),
+        order_by=("on_time_percentage DESC",),
+    )
+    return run_query(stmt, params)
 
 
-@st.cache_data(ttl=60, show_spinner=False)
-def get_spend_analysis(from_dt: date, to_dt: date, dept_id: Optional[int] = None) -> pd.DataFrame:
+@cached_query(ttl=60)
+def get_spend_analysis(from_dt: date, to_dt: date, dept_id: Optional[int] = None,
+                       order_filters: Optional[OrderFilters] = None) -> pd.DataFrame:
     """Get detailed spend analysis."""
-    
-    params = {"from_dt": from_dt, "to_dt": to_dt}
-    where_dept = ""
-    if dept_id:
-        where_dept = " AND po.dept_id = :dept_id"
-        params["dept_id"] = dept_id
-    
-    sql = f"""
-    SELECT 
-        po.order_id,
-        po.order_number,
-        po.order_date,
-        po.grand_total,
-        po.status,
-        v.vendor_name,
-        c.category_name,
-        d.dept_name,
-        cc.cost_center_name,
-        po.requested_by,
-        po.priority,
-        po.order_date + INTERVAL '30 days' as expected_delivery_date,
-        NULL as delivery_date
-    FROM procurement_orders po
-    JOIN procurement_vendors v ON po.vendor_id = v.vendor_id
-    JOIN procurement_categories c ON po.category_id = c.category_id
-    JOIN finance_departments d ON po.dept_id = d.dept_id
-    JOIN finance_cost_centers cc ON po.cost_center_id = cc.cost_center_id
-    WHERE po.order_date BETWEEN :from_dt AND :to_dt
-        {where_dept}
-    ORDER BY po.order_date DESC
-    """
-    
-    conn = get_conn()
-    return conn.query(sql, params=params)
+
+    stmt, params = build_query(
+        SPEND_ANALYSIS, from_dt, to_dt, _filters(dept_id, order_filters),
+        dimensions=tuple(SPEND_ANALYSIS.dimensions),
+        order_by=(po.c.order_date.desc(),),
+    )
+    return run_query(stmt, params)
+
+
+
+@cached_query(ttl=60)
+def get_category_rollup(from_dt: date, to_dt: date, parent_id: Optional[int] = None, dept_id: Optional[int] = None,
+                        order_filters: Optional[OrderFilters] = None) -> pd.DataFrame:
+    """Children of category `parent_id` (the top-level categories when None) with the
+    totals of their whole subtrees and a has_children flag."""
+
+    leaves, params = build_query(
+        CATEGORY_LEAVES, from_dt, to_dt, _filters(dept_id, order_filters), dimensions=("category_id",)
+    )
+    stmt = rollup_statement(CATEGORY_TREE, leaves, ("total_value", "order_count"))
+    return run_query(stmt, {**params, "parent_id": parent_id})
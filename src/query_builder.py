@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Query Builder for Reflexta Analytics Platform
+Composes filters, groupings and measures into SQLAlchemy Core statements.
+
+A QuerySpec declares the tables, dimensions, measures and optional filters of
+one query family; build_query() turns a request against it into a statement
+plus its bind parameters. The SQL text depends only on the shape of the
+request (which filters are set, which dimensions are grouped on), never on the
+filter values: values are always bound, and multi-valued filters bind a single
+array (`col = ANY(:param)`) rather than expanding an IN list. Each shape
+therefore has exactly one statement text, which lets the server reuse
+prepared statements and cached plans.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Callable, Mapping, Optional, Sequence
+
+from sqlalchemy import (
+    ARRAY,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Integer,
+    MetaData,
+    Numeric,
+    String,
+    Table,
+    Text,
+    and_,
+    any_,
+    asc,
+    bindparam,
+    case,
+    cast,
+    desc,
+    func,
+    literal_column,
+    select,
+)
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.expression import FromClause, Select
+
+from .date_windows import GRAINS, window_params
+
+metadata = MetaData()
+
+# =====================================================
+# TABLES (only the columns the query layer reads)
+# =====================================================
+
+finance_departments = Table(
+    "finance_departments", metadata,
+    Column("dept_id", Integer, primary_key=True),
+    Column("dept_name", String(100)),
+    Column("dept_code", String(10)),
+    Column("budget_allocation", Numeric(15, 2)),
+)
+
+finance_cost_centers = Table(
+    "finance_cost_centers", metadata,
+    Column("cost_center_id", Integer, primary_key=True),
+    Column("cost_center_name", String(100)),
+    Column("dept_id", Integer),
+)
+
+finance_accounts = Table(
+    "finance_accounts", metadata,
+    Column("account_id", Integer, primary_key=True),
+    Column("account_code", String(20)),
+    Column("account_name", String(200)),
+    Column("account_type", String(50)),
+    Column("parent_account_id", Integer),
+)
+
+finance_budgets = Table(
+    "finance_budgets", metadata,
+    Column("budget_id", Integer, primary_key=True),
+    Column("budget_name", String(200)),
+    Column("dept_id", Integer),
+    Column("cost_center_id", Integer),
+    Column("account_id", Integer),
+    Column("budget_year", Integer),
+    Column("budget_amount", Numeric(15, 2)),
+    Column("spent_amount", Numeric(15, 2)),
+    Column("remaining_amount", Numeric(15, 2)),
+)
+
+finance_transactions = Table(
+    "finance_transactions", metadata,
+    Column("transaction_id", Integer, primary_key=True),
+    Column("transaction_date", Date),
+    Column("transaction_type", String(50)),
+    Column("account_id", Integer),
+    Column("dept_id", Integer),
+    Column("cost_center_id", Integer),
+    Column("amount", Numeric(15, 2)),
+    Column("description", Text),
+    Column("reference_number", String(100)),
+    Column("vendor_name", String(200)),
+    Column("status", String(20)),
+    Column("created_by", String(100)),
+    Column("created_at", DateTime),
+    Column("updated_at", DateTime),
+)
+
+procurement_categories = Table(
+    "procurement_categories", metadata,
+    Column("category_id", Integer, primary_key=True),
+    Column("category_name", String(100)),
+    Column("category_code", String(20)),
+    Column("parent_category_id", Integer),
+)
+
+procurement_vendors = Table(
+    "procurement_vendors", metadata,
+    Column("vendor_id", Integer, primary_key=True),
+    Column("vendor_name", String(200)),
+    Column("vendor_code", String(20)),
+    Column("rating", Numeric(3, 2)),
+    Column("is_active", Boolean),
+)
+
+procurement_orders = Table(
+    "procurement_orders", metadata,
+    Column("order_id", Integer, primary_key=True),
+    Column("order_number", String(50)),
+    Column("order_date", Date),
+    Column("vendor_id", Integer),
+    Column("category_id", Integer),
+    Column("dept_id", Integer),
+    Column("cost_center_id", Integer),
+    Column("total_amount", Numeric(15, 2)),
+    Column("grand_total", Numeric(15, 2)),
+    Column("currency", String(3)),
+    Column("reporting_total", Numeric(15, 2)),  # grand_total in the reporting currency (migration 013)
+    Column("status", String(20)),
+    Column("priority", String(10)),
+    Column("requested_by", String(100)),
+    Column("notes", Text),
+    Column("expected_delivery_date", Date),
+    Column("updated_at", DateTime),
+)
+
+# Hierarchy closure tables (migration 012): every (ancestor, descendant) pair
+finance_account_closure = Table(
+    "finance_account_closure", metadata,
+    Column("ancestor_id", Integer, primary_key=True),
+    Column("descendant_id", Integer, primary_key=True),
+    Column("depth", Integer),
+)
+
+procurement_category_closure = Table(
+    "procurement_category_closure", metadata,
+    Column("ancestor_id", Integer, primary_key=True),
+    Column("descendant_id", Integer, primary_key=True),
+    Column("depth", Integer),
+)
+
+# Date dimension (migration 014): calendar and fiscal attributes per day
+dim_date = Table(
+    "dim_date", metadata,
+    Column("date_key", Date, primary_key=True),
+    *(Column(name, Integer) for name in (
+        "year", "quarter", "month", "day_of_month", "day_of_week", "iso_year", "iso_week",
+        "fiscal_year", "fiscal_quarter", "fiscal_period", "fiscal_week",
+    )),
+    Column("is_weekend", Boolean),
+    *(Column(name, String(10)) for name in (
+        "month_name", "quarter_name", "week_name",
+        "day_label", "week_label", "month_label", "quarter_label", "year_label",
+        "fiscal_week_label", "fiscal_period_label", "fiscal_quarter_label", "fiscal_year_label",
+    )),
+    *(Column(name, Date) for name in (
+        "week_start", "month_start", "quarter_start", "year_start",
+        "fiscal_week_start", "fiscal_quarter_start", "fiscal_year_start",
+    )),
+)
+
+# Month-grain materialized views (migration 003)
+mv_finance_summary = Table(
+    "mv_finance_summary", metadata,
+    Column("month_start", Date),
+    Column("dept_id", Integer),
+    Column("total_spent", Numeric),
+    Column("transaction_count", Integer),
+)
+
+mv_finance_monthly_trends = Table(
+    "mv_finance_monthly_trends", metadata,
+    Column("month_start", Date),
+    Column("transaction_type", String(50)),
+    Column("total_amount", Numeric),
+    Column("transaction_count", Integer),
+)
+
+mv_procurement_summary = Table(
+    "mv_procurement_summary", metadata,
+    Column("month_start", Date),
+    Column("dept_id", Integer),
+    Column("total_orders", Integer),
+    Column("total_value", Numeric),
+    Column("completed_orders", Integer),
+    Column("pending_orders", Integer),
+)
+
+mv_vendor_performance = Table(
+    "mv_vendor_performance", metadata,
+    Column("month_start", Date),
+    Column("vendor_id", Integer),
+    Column("dept_id", Integer),
+    Column("total_orders", Integer),
+    Column("total_value", Numeric),
+    Column("completed_orders", Integer),
+)
+
+mv_category_analysis = Table(
+    "mv_category_analysis", metadata,
+    Column("month_start", Date),
+    Column("category_id", Integer),
+    Column("dept_id", Integer),
+    Column("vendor_id", Integer),
+    Column("order_count", Integer),
+    Column("total_value", Numeric),
+    Column("completed_orders", Integer),
+)
+
+# =====================================================
+# EXPRESSION HELPERS
+# =====================================================
+
+
+def in_window(column: ColumnElement, prefix: str = "") -> ColumnElement:
+    """Half-open window predicate bound to `window_params(..., prefix)`."""
+
+    return and_(column >= bindparam(f"{prefix}from_dt"), column < bindparam(f"{prefix}to_dt_excl"))
+
+
+def bucket(column: ColumnElement, grain: str = "month") -> ColumnElement:
+    """Start of the `grain` bucket containing `column`.
+
+    Renders as date_trunc('<grain>', CAST(col AS TIMESTAMP)) with the grain
+    inlined, so it matches the expression indexes from migration 004.
+    """
+
+    if grain not in GRAINS:
+        raise ValueError(f"Unsupported grain {grain!r}; expected one of {', '.join(GRAINS)}")
+    return func.date_trunc(literal_column(f"'{grain}'"), cast(column, DateTime()))
+
+
+def const(value: str) -> ColumnElement:
+    """Inline a string constant (needed where it appears in a GROUP BY expression)."""
+
+    return literal_column("'{}'".format(value.replace("'", "''")))
+
+
+def count_where(condition: ColumnElement) -> ColumnElement:
+    """COUNT(CASE WHEN condition THEN 1 END)."""
+
+    return func.count(case((condition, 1)))
+
+
+def sum_where(condition: ColumnElement, value: ColumnElement) -> ColumnElement:
+    """SUM(CASE WHEN condition THEN value ELSE 0 END)."""
+
+    return func.sum(case((condition, value), else_=0))
+
+
+def percentage(part: ColumnElement, whole: ColumnElement) -> ColumnElement:
+    """part * 100.0 / NULLIF(whole, 0)."""
+
+    return part * 100.0 / func.nullif(whole, 0)
+
+
+# =====================================================
+# SPECS
+# =====================================================
+
+
+@dataclass(frozen=True)
+class Filter:
+    """An optional equality filter on one column, bound to parameter `param`.
+
+    A list/tuple/set value is bound as one array and matched with `= ANY(...)`.
+    None, "" and "All" mean "not filtered" and leave the clause out.
+    """
+
+    param: str
+    column: ColumnElement
+
+    def is_set(self, value: Any) -> bool:
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return len(value) > 0
+        return value is not None and value != "" and value != "All"
+
+    def clause(self, value: Any) -> ColumnElement:
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return self.column == any_(bindparam(self.param, type_=ARRAY(self.column.type)))
+        return self.column == bindparam(self.param)
+
+    def bind_value(self, value: Any) -> Any:
+        return list(value) if isinstance(value, (list, tuple, set, frozenset)) else value
+
+
+@dataclass(frozen=True)
+class QuerySpec:
+    """Declarative description of one family of queries over a fact table.
+
+    Output columns are the requested dimensions followed by the measures and
+    derived columns, in declaration order. `derived` entries are built from
+    the other column expressions (e.g. ratios of measures). When `anchor` is
+    set, the fact table is LEFT JOINed to it on `anchor_on`, so every anchor
+    row is returned; the window, `where` and fact filters then belong to the
+    join condition, while filters on anchor columns go to WHERE.
+    """
+
+    fact: FromClause
+    date_column: Optional[ColumnElement]
+    measures: Mapping[str, ColumnElement] = field(default_factory=dict)
+    dimensions: Mapping[str, ColumnElement] = field(default_factory=dict)
+    derived: Mapping[str, Callable[[Mapping[str, ColumnElement]], ColumnElement]] = field(default_factory=dict)
+    filters: Sequence[Filter] = ()
+    where: Sequence[ColumnElement] = ()
+    joins: Sequence[tuple[FromClause, ColumnElement]] = ()
+    anchor: Optional[FromClause] = None
+    anchor_on: Optional[ColumnElement] = None
+    group_keys: Sequence[ColumnElement] = ()
+
+
+def _order_clause(item: Any) -> Any:
+    if not isinstance(item, str):
+        return item
+    name, _, direction = item.partition(" ")
+    return desc(name) if direction.upper() == "DESC" else asc(name)
+
+
+def build_query(
+    spec: QuerySpec,
+    from_dt: Optional[date] = None,
+    to_dt: Optional[date] = None,
+    filters: Optional[Mapping[str, Any]] = None,
+    dimensions: Sequence[str] = (),
+    columns: Optional[Sequence[str]] = None,
+    order_by: Sequence[Any] = (),
+    prefix: str = "",
+) -> tuple[Select, dict[str, Any]]:
+    """Build the statement for one request against `spec` and its bind parameters.
+
+    `dimensions` selects (and, for aggregate specs, groups on) dimension
+    columns; `columns` restricts the measure/derived columns (default all);
+    `order_by` takes output column names with an optional " DESC" suffix or
+    Core expressions. `prefix` renames the window parameters so two windows
+    can share one statement (e.g. "prev_" for a comparison period).
+    """
+
+    expressions = {**spec.dimensions, **spec.measures}
+    for name, build in spec.derived.items():
+        expressions[name] = build(expressions)
+    selected = list(dimensions) + [
+        name for name in (columns if columns is not None else [*spec.measures, *spec.derived])
+        if name not in dimensions
+    ]
+
+    params: dict[str, Any] = {}
+    fact_predicates = list(spec.where)
+    if spec.date_column is not None:
+        fact_predicates.insert(0, in_window(spec.date_column, prefix))
+        params.update(window_params(from_dt, to_dt, prefix))
+
+    anchor_predicates = []
+    for flt in spec.filters:
+        value = (filters or {}).get(flt.param)
+        if not flt.is_set(value):
+            continue
+        params[flt.param] = flt.bind_value(value)
+        if spec.anchor is not None and spec.anchor.is_derived_from(flt.column.table):
+            anchor_predicates.append(flt.clause(value))
+        else:
+            fact_predicates.append(flt.clause(value))
+
+    source = spec.fact
+    for table, on in spec.joins:
+        source = source.join(table, on)
+    if spec.anchor is not None:
+        source = spec.anchor.outerjoin(source, and_(spec.anchor_on, *fact_predicates))
+        predicates = anchor_predicates
+    else:
+        predicates = fact_predicates
+
+    stmt = select(*(expressions[name].label(name) for name in selected)).select_from(source)
+    if predicates:
+        stmt = stmt.where(*predicates)
+    if spec.measures:
+        group_by = [*spec.group_keys, *(spec.dimensions[name] for name in dimensions)]
+        if group_by:
+            stmt = stmt.group_by(*group_by)
+    if order_by:
+        stmt = stmt.order_by(*(_order_clause(item) for item in order_by))
+    return stmt, params
+
+
+def with_period_change(stmt: Select, value: str, partition: str, period: str,
+                       previous: str, change: str, order_by: Sequence[Any] = ()) -> Select:
+    """Add the previous period's `value` and the percent change against it.
+
+    The LAG runs over the rows of `stmt` partitioned by `partition` and ordered
+    by `period`; the change is 0 when there is no positive previous value.
+    """
+
+    sub = stmt.subquery()
+    prev = func.lag(sub.c[value]).over(partition_by=sub.c[partition], order_by=sub.c[period])
+    pct = case((prev > 0, func.round((sub.c[value] - prev) / prev * 100, 2)), else_=0)
+    wrapped = select(sub, prev.label(previous), pct.label(change))
+    if order_by:
+        wrapped = wrapped.order_by(*(_order_clause(item) for item in order_by))
+    return wrapped
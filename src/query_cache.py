@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Query Result Cache for Reflexta Analytics Platform
+Memory-bounded, cost-aware caching for the query functions.
+
+`@cached_query(ttl=60)` replaces `@st.cache_data(ttl=60)` on the query
+functions. Entries are shared by all sessions of the server process (as with
+st.cache_data), but the cache tracks the bytes of every entry and keeps the
+total under `QUERY_CACHE_MAX_MB`. When over budget it evicts by GreedyDual-Size:
+an entry's priority is the clock value plus its query time divided by its
+bytes, refreshed on every hit, so large results that were cheap to compute go
+first and expensive or hot small ones stay. `cache_stats()` reports hits,
+misses and evictions.
+
+Past `ttl`, an entry is served stale while a background thread recomputes it
+(stale-while-revalidate), so users do not wait on expiry; only entries older
+than the hard ceiling `hard_ttl` (`QUERY_CACHE_HARD_TTL_SECONDS`) are
+recomputed in the foreground. Each entry refreshes a random fraction (up to
+`QUERY_CACHE_REFRESH_JITTER`) of its ttl early, so entries cached together
+do not all refresh at once.
+
+While change notifications keep the cache current (`src.cache_invalidation`),
+`QUERY_CACHE_LISTEN_TTL_SECONDS` raises every ttl to that floor.
+
+Every call is also counted in an access log (dates relative to the day of
+the call, so "the last 30 days" stays one entry), which `src.cache_warmer`
+uses to pre-populate the most requested results. Filter dataclasses in the
+arguments are logged by class name and must be registered with
+`@argument_type`; the log never names modules or callables to import.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import json
+import logging
+import os
+import pickle
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields, is_dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Hashable, Mapping, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_MAX_MB = float(os.getenv("QUERY_CACHE_MAX_MB", "256"))
+# Stale entries are served (and refreshed in the background) up to this age; 0 disables
+HARD_TTL_SECONDS = float(os.getenv("QUERY_CACHE_HARD_TTL_SECONDS", "600"))
+REFRESH_JITTER = float(os.getenv("QUERY_CACHE_REFRESH_JITTER", "0.1"))
+REFRESH_WORKERS = int(os.getenv("QUERY_CACHE_REFRESH_WORKERS", "4"))
+# Minimum ttl while a change listener invalidates entries; 0 keeps the ttls as given
+LISTEN_TTL_SECONDS = float(os.getenv("QUERY_CACHE_LISTEN_TTL_SECONDS", "0"))
+
+
+@dataclass
+class CacheEntry:
+    """One cached result with its size and the time it took to compute."""
+
+    value: Any
+    nbytes: int
+    cost: float
+    created: float = field(default_factory=time.monotonic)
+    priority: float = 0.0
+    hits: int = 0
+    jitter: float = field(default_factory=lambda: random.uniform(0, REFRESH_JITTER))
+
+    def due(self, ttl: float) -> bool:
+        """Whether the entry should be refreshed (jittered ahead of `ttl`)."""
+
+        return time.monotonic() - self.created > ttl * (1 - self.jitter)
+
+
+def _nbytes(value: Any) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, tuple):
+        return sum(_nbytes(item) for item in value)
+    if isinstance(getattr(value, "nbytes", None), int):
+        return value.nbytes  # array-backed results report their own size
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _copy(value: Any) -> Any:
+    # Callers may modify the returned frame; keep the cached one intact
+    return value.copy() if isinstance(value, pd.DataFrame) else value
+
+
+def freeze_key(value: Any) -> Hashable:
+    """Hashable form of call arguments (lists, sets and dicts included)."""
+
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze_key(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze_key(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze_key(item)) for key, item in value.items()))
+    return value
+
+
+class QueryCache:
+    """Byte-budgeted result cache with GreedyDual-Size eviction."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: dict[tuple, CacheEntry] = {}
+        self._clock = 0.0
+        self._lock = threading.RLock()
+        self._inflight: dict[tuple, threading.Event] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self.expirations = 0
+        self.rejected = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.warmups = 0
+        self.invalidations = 0
+        # Set while change notifications are being received (see effective_ttl)
+        self.ttl_floor: Optional[float] = None
+        self._generation = 0
+        self._refresher: Optional[ThreadPoolExecutor] = None
+
+    def effective_ttl(self, ttl: Optional[float]) -> Optional[float]:
+        """`ttl`, raised to `ttl_floor` while change notifications keep entries current."""
+
+        if ttl is None or not self.ttl_floor:
+            return ttl
+        return max(ttl, self.ttl_floor)
+
+    def _priority(self, entry: CacheEntry) -> float:
+        return self._clock + entry.cost / max(entry.nbytes, 1)
+
+    def peek(self, key: tuple, ttl: Optional[float]) -> Optional[CacheEntry]:
+        """Return the live entry for `key` without counting a hit, or None."""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and ttl is not None and time.monotonic() - entry.created > ttl:
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            return entry
+
+    def lookup(self, key: tuple, ttl: Optional[float]) -> Optional[CacheEntry]:
+        """Return the live entry for `key` (recording a hit), or None."""
+
+        with self._lock:
+            entry = self.peek(key, ttl)
+            if entry is None:
+                return None
+            entry.hits += 1
+            entry.priority = self._priority(entry)
+            self.hits += 1
+            return entry
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped by every `invalidate()`."""
+
+        return self._generation
+
+    def store(self, key: tuple, value: Any, cost: float, created: Optional[float] = None,
+              generation: Optional[int] = None) -> None:
+        """Cache `value`, evicting the lowest-priority entries to stay within budget.
+
+        `created` keeps the age of an entry that is being extended (its TTL
+        runs from when its oldest part was fetched). With `generation` (read
+        before the value was computed), nothing is stored if entries were
+        invalidated since: the value may predate the change.
+        """
+
+        entry = CacheEntry(value, _nbytes(value), cost)
+        if created is not None:
+            entry.created = created
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if entry.nbytes > self.max_bytes:
+                self.rejected += 1
+                return
+            self._drop(key)
+            entry.priority = self._priority(entry)
+            self._entries[key] = entry
+            self.bytes += entry.nbytes
+            while self.bytes > self.max_bytes:
+                victim_key = min(self._entries, key=lambda k: self._entries[k].priority)
+                victim = self._entries[victim_key]
+                self._clock = victim.priority
+                self._drop(victim_key)
+                self.evictions += 1
+                self.evicted_bytes += victim.nbytes
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def _drop(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.nbytes
+
+    def get_or_compute(self, key: tuple, ttl: Optional[float], compute: Callable[[], Any],
+                       hard_ttl: Optional[float] = None) -> Any:
+        """Return the cached value for `key`, computing it once even under concurrent misses.
+
+        With `hard_ttl` (> ttl), an entry past `ttl` is returned stale and
+        recomputed in the background; only past `hard_ttl` do callers wait.
+        """
+
+        revalidate = ttl is not None and hard_ttl is not None and hard_ttl > ttl
+        if revalidate:
+            # Keep the stale window as long when the floor raises the ttl
+            hard_ttl += self.effective_ttl(ttl) - ttl
+        ttl = self.effective_ttl(ttl)
+        while True:
+            entry = self.lookup(key, hard_ttl if revalidate else ttl)
+            if entry is not None:
+                if revalidate and entry.due(ttl):
+                    self._revalidate(key, compute)
+                return entry.value
+            with self._lock:
+                waiting = self._inflight.get(key)
+                if waiting is None:
+                    self._inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Another thread is running the same query; use its result
+            waiting.wait()
+        return self._compute(key, compute)
+
+    def _compute(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        # The caller has registered `key` in _inflight
+        generation = self._generation
+        try:
+            started = time.perf_counter()
+            value = compute()
+            self.store(key, value, time.perf_counter() - started, generation=generation)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key).set()
+
+    def _revalidate(self, key: tuple, compute: Callable[[], Any]) -> None:
+        with self._lock:
+            self.stale_hits += 1
+            if key in self._inflight:
+                return
+            self._inflight[key] = threading.Event()
+            self.refreshes += 1
+            if self._refresher is None:
+                self._refresher = ThreadPoolExecutor(REFRESH_WORKERS, thread_name_prefix="query-cache-refresh")
+        self._refresher.submit(self._refresh, key, compute)
+
+    def _refresh(self, key: tuple, compute: Callable[[], Any]) -> None:
+        try:
+            self._compute(key, compute)
+        except Exception:  # noqa: BLE001 - the stale entry stays until its hard expiry
+            with self._lock:
+                self.refresh_errors += 1
+            logger.warning("Background refresh of %s failed", key[0], exc_info=True)
+
+    def warm(self, key: tuple, ttl: Optional[float], compute: Callable[[], Any]) -> bool:
+        """Compute `key` now unless it is fresh or already being computed; True if it ran."""
+
+        ttl = self.effective_ttl(ttl)
+        with self._lock:
+            entry = self._entries.get(key)
+            if key in self._inflight or (entry is not None and (ttl is None or not entry.due(ttl))):
+                return False
+            self._inflight[key] = threading.Event()
+            self.warmups += 1
+        self._compute(key, compute)
+        return True
+
+    def clear(self, function: Optional[str] = None) -> None:
+        """Drop all entries, or only those of one query function."""
+
+        self.invalidate(lambda key, entry: function is None or key[0] == function)
+
+    def invalidate(self, predicate: Callable[[tuple, CacheEntry], bool]) -> int:
+        """Drop the entries for which `predicate(key, entry)` holds; returns how many."""
+
+        with self._lock:
+            self._generation += 1
+            keys = [key for key, entry in self._entries.items() if predicate(key, entry)]
+            for key in keys:
+                self._drop(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups * 100, 1) if lookups else 0.0,
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+                "expirations": self.expirations,
+                "rejected": self.rejected,
+                "stale_hits": self.stale_hits,
+                "refreshes": self.refreshes,
+                "refresh_errors": self.refresh_errors,
+                "warmups": self.warmups,
+                "invalidations": self.invalidations,
+            }
+
+    def usage(self) -> pd.DataFrame:
+        """Entries, bytes and total compute time held per query function."""
+
+        with self._lock:
+            rows = [
+                {"query": key[0], "bytes": entry.nbytes, "cost_seconds": entry.cost, "hits": entry.hits}
+                for key, entry in self._entries.items()
+            ]
+        frame = pd.DataFrame(rows, columns=["query", "bytes", "cost_seconds", "hits"])
+        usage = frame.groupby("query", as_index=False).agg(
+            entries=("bytes", "size"), bytes=("bytes", "sum"), cost_seconds=("cost_seconds", "sum"), hits=("hits", "sum")
+        )
+        return usage.sort_values("bytes", ascending=False, ignore_index=True)
+
+
+# Filter dataclasses allowed in logged arguments, by class name
+_argument_types: dict[str, type] = {}
+
+
+def argument_type(kind: type) -> type:
+    """Class decorator: allow instances of dataclass `kind` in logged query arguments."""
+
+    if not is_dataclass(kind):
+        raise TypeError(f"{kind.__qualname__} is not a dataclass")
+    if _argument_types.setdefault(kind.__name__, kind) is not kind:
+        raise ValueError(f"Argument type {kind.__name__!r} is already registered")
+    return kind
+
+
+def relative_arguments(arguments: Mapping[str, Any], today: Optional[date] = None) -> dict[str, Any]:
+    """JSON-friendly call arguments with dates stored as days before `today`.
+
+    Raises TypeError for a dataclass that is not a registered `argument_type`.
+    """
+
+    today = today or date.today()
+    encoded = {}
+    for name, value in arguments.items():
+        if isinstance(value, date) and not isinstance(value, datetime):
+            value = {"days_ago": (today - value).days}
+        elif isinstance(value, (tuple, set, frozenset)):
+            value = list(value)
+        elif is_dataclass(value) and not isinstance(value, type):
+            # Typed filter objects, rebuilt from their fields
+            kind = type(value)
+            if _argument_types.get(kind.__name__) is not kind:
+                raise TypeError(f"{kind.__qualname__} is not a registered argument type")
+            values = {item.name: getattr(value, item.name) for item in fields(value)}
+            value = {"dataclass": kind.__name__, "fields": relative_arguments(values, today)}
+        encoded[name] = value
+    return encoded
+
+
+def absolute_arguments(encoded: Mapping[str, Any], today: Optional[date] = None) -> dict[str, Any]:
+    """Inverse of `relative_arguments` for the day `today`.
+
+    Raises ValueError for a dataclass name that is not a registered `argument_type`.
+    """
+
+    today = today or date.today()
+    decoded = {}
+    for name, value in encoded.items():
+        if isinstance(value, dict) and "days_ago" in value:
+            value = today - timedelta(days=value["days_ago"])
+        elif isinstance(value, dict) and "dataclass" in value:
+            kind = _argument_types.get(value["dataclass"])
+            if kind is None or not isinstance(value.get("fields"), dict):
+                raise ValueError(f"Unknown argument type {value['dataclass']!r}")
+            value = kind(**absolute_arguments(value["fields"], today))
+        decoded[name] = value
+    return decoded
+
+
+class AccessLog:
+    """Call counts per (query function, relative arguments), for cache warming."""
+
+    def __init__(self):
+        self._counts: dict[tuple, float] = {}
+        self._calls: dict[tuple, tuple[str, dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, function: str, arguments: Mapping[str, Any], weight: float = 1.0) -> None:
+        try:
+            encoded = relative_arguments(arguments)
+            # Only calls the warmer can save: the log is persisted as JSON
+            json.dumps(encoded)
+        except (TypeError, ValueError) as exc:
+            # Not worth failing the query over; the call just is not warmed
+            logger.debug("Not logging a call of %s: %s", function, exc)
+            return
+        self.record_relative(function, encoded, weight)
+
+    def record_relative(self, function: str, encoded: Mapping[str, Any], weight: float = 1.0) -> None:
+        key = (function, freeze_key(dict(encoded)))
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0.0) + weight
+            self._calls.setdefault(key, (function, dict(encoded)))
+
+    def top(self, n: Optional[int] = None) -> list[tuple[str, dict[str, Any], float]]:
+        """The `n` most called (function, relative arguments, count), most called first."""
+
+        with self._lock:
+            ranked = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+            return [(*self._calls[key], count) for key, count in ranked[:n]]
+
+    def decay(self, factor: float, floor: float = 0.05) -> None:
+        """Scale all counts by `factor`, forgetting calls that fall below `floor`."""
+
+        with self._lock:
+            for key in list(self._counts):
+                self._counts[key] *= factor
+                if self._counts[key] < floor:
+                    del self._counts[key], self._calls[key]
+
+
+_cache = QueryCache(int(QUERY_CACHE_MAX_MB * 1024 * 1024))
+_access_log = AccessLog()
+_functions: dict[str, Callable[..., Any]] = {}
+
+
+def cached_query(
+    ttl: Optional[float] = 60, hard_ttl: Optional[float] = HARD_TTL_SECONDS
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Cache a query function's results for `ttl` seconds in the shared, byte-budgeted cache.
+
+    Between `ttl` and `hard_ttl` the stale result is returned while it is
+    refreshed in the background; pass `hard_ttl=None` for strict expiry.
+    Arguments are normalized against the signature, so f(a, b) and
+    f(a, b, None) share an entry. The wrapper gets `clear()` and
+    `warm(**arguments)` (compute unless fresh, without logging an access).
+    """
+
+    def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+        name = f"{func.__module__}.{func.__qualname__}"
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = (name, freeze_key(bound.arguments))
+            _access_log.record(name, bound.arguments)
+            return _copy(_cache.get_or_compute(key, ttl, lambda: func(*args, **kwargs), hard_ttl))
+
+        def warm(**arguments: Any) -> bool:
+            bound = signature.bind(**arguments)
+            bound.apply_defaults()
+            key = (name, freeze_key(bound.arguments))
+            return _cache.warm(key, ttl, lambda: func(**arguments))
+
+        wrapper.clear = lambda: _cache.clear(name)
+        wrapper.warm = warm
+        _functions[name] = wrapper
+        return wrapper
+
+    return decorator
+
+
+def shared_cache() -> QueryCache:
+    """The process-wide cache behind `cached_query` (for other cache layers)."""
+
+    return _cache
+
+
+def access_log() -> AccessLog:
+    """The process-wide log of query function calls."""
+
+    return _access_log
+
+
+def cached_functions() -> dict[str, Callable[..., Any]]:
+    """Every `cached_query` function imported so far, by qualified name."""
+
+    return dict(_functions)
+
+
+def cache_stats() -> dict[str, Any]:
+    """Hit/miss/eviction counters and memory use of the query cache."""
+
+    return _cache.stats()
+
+
+def cache_usage() -> pd.DataFrame:
+    """Per-query-function entries and bytes currently cached."""
+
+    return _cache.usage()
+
+
+def clear_query_cache() -> None:
+    """Drop every cached query result."""
+
+    _cache.clear()
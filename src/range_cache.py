@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Window-Aware Result Reuse for Reflexta Analytics Platform
+Answers additive breakdowns for any sub-range from cached daily partials.
+
+A `RangeQuery` describes an additive query (trends and breakdowns made of
+sums, counts, min/max and distinct counts) as a daily-grain partial
+aggregate. `run_range_query()` keeps one cached frame of daily partials per
+(query, filters) together with the window it covers:
+
+  - a window inside the covered one is sliced and re-aggregated in-process
+  - a wider or shifted window fetches only the missing edge days and
+    extends the cached frame (a far-away window is fetched on its own)
+
+Entries live in the shared, byte-budgeted query cache (`src.query_cache`).
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Callable, Mapping, Optional
+
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.sql.elements import ColumnElement
+
+from .db import run_query
+from .metrics import get_metric, metric_input, ratio
+from .query_builder import QuerySpec, build_query
+from .query_cache import freeze_key, shared_cache
+
+RANGE_TTL_SECONDS = 60
+
+
+@dataclass(frozen=True)
+class RangeQuery:
+    """An additive query served from cached daily partial aggregates.
+
+    `spec` groups by a "day" dimension and the `keys` dimensions and returns
+    partial measures; `partials` gives how each re-aggregates across days
+    (sum, min, max, or distinct for arrays of distinct values). `group` adds
+    result keys computed from the day rows (e.g. month labels); `derived`
+    computes final columns from the re-aggregated partials. With `anchor` (a
+    statement returning one row per `keys` value) every dimension row is kept,
+    like an anchored QuerySpec.
+    """
+
+    name: str
+    spec: QuerySpec
+    keys: tuple[str, ...]
+    partials: Mapping[str, str]
+    columns: tuple[str, ...]
+    group: Mapping[str, Callable[[pd.DataFrame], Any]] = field(default_factory=dict)
+    derived: Mapping[str, Callable[[pd.DataFrame], Any]] = field(default_factory=dict)
+    anchor: Optional[Any] = None
+    order_by: tuple[tuple[str, bool], ...] = ()
+
+
+@dataclass(frozen=True)
+class MetricPartials:
+    """Daily partial measures for registry metrics and how to finish them."""
+
+    measures: dict[str, ColumnElement]
+    partials: dict[str, str]
+    derived: dict[str, Callable[[pd.DataFrame], Any]]
+
+
+def _finish(name: str, frame: pd.DataFrame) -> Any:
+    metric = get_metric(name)
+    if metric.is_derived:
+        return metric.formula(*(_finish(input_name, frame) for input_name in metric.inputs))
+    if metric.agg == "avg":
+        return ratio(frame[f"_{name}_sum"], frame[f"_{name}_n"], scale=1, digits=None, default=0)
+    return frame[f"_{name}"]
+
+
+def metric_partials(table: Any, *columns: str | tuple[str, str]) -> MetricPartials:
+    """Partials for `metrics.metric_columns`-style entries over `table`.
+
+    Sums and counts re-aggregate by summing, averages are kept as sum and
+    count, distinct counts as arrays of distinct values; derived metrics are
+    computed from their inputs after re-aggregation.
+    """
+
+    measures: dict[str, ColumnElement] = {}
+    partials: dict[str, str] = {}
+
+    def add(name: str) -> None:
+        metric = get_metric(name)
+        if metric.is_derived:
+            for input_name in metric.inputs:
+                add(input_name)
+            return
+        value = metric_input(name, table)
+        if metric.agg == "avg":
+            measures[f"_{name}_sum"] = func.coalesce(func.sum(value), 0)
+            measures[f"_{name}_n"] = func.count(value)
+            partials.update({f"_{name}_sum": "sum", f"_{name}_n": "sum"})
+        elif metric.agg == "count_distinct":
+            measures[f"_{name}"] = func.array_agg(value.distinct()).filter(value.isnot(None))
+            partials[f"_{name}"] = "distinct"
+        else:
+            measures[f"_{name}"] = func.coalesce(func.sum(value), 0) if metric.agg == "sum" else func.count(value)
+            partials[f"_{name}"] = "sum"
+
+    derived = {}
+    for column in columns:
+        output, name = (column, column) if isinstance(column, str) else column
+        add(name)
+        derived[output] = lambda frame, name=name: _finish(name, frame)
+    return MetricPartials(measures, partials, derived)
+
+
+def _cache_key(query: RangeQuery, filters: Mapping[str, Any]) -> tuple:
+    return (f"range:{query.name}", freeze_key(dict(filters)))
+
+
+def _fetch(query: RangeQuery, from_dt: date, to_dt: date, filters: Mapping[str, Any]) -> pd.DataFrame:
+    stmt, params = build_query(query.spec, from_dt, to_dt, filters, dimensions=tuple(query.spec.dimensions))
+    frame = run_query(stmt, params, name=query.name)
+    frame["day"] = pd.to_datetime(frame["day"])
+    return frame
+
+
+def covers(query: RangeQuery, from_dt: date, to_dt: date, filters: Optional[Mapping[str, Any]] = None) -> bool:
+    """Whether the cached daily partials already cover [from_dt, to_dt]."""
+
+    cache = shared_cache()
+    entry = cache.peek(_cache_key(query, filters or {}), cache.effective_ttl(RANGE_TTL_SECONDS))
+    return entry is not None and entry.value[0] <= from_dt and to_dt <= entry.value[1]
+
+
+def daily_partials(query: RangeQuery, from_dt: date, to_dt: date,
+                   filters: Optional[Mapping[str, Any]] = None) -> pd.DataFrame:
+    """Daily partial rows for [from_dt, to_dt], fetching only days not cached yet."""
+
+    cache = shared_cache()
+    filters = dict(filters or {})
+    key = _cache_key(query, filters)
+    # Read first: an invalidation after this makes the merged frame unfit to store
+    generation = cache.generation
+    entry = cache.lookup(key, cache.effective_ttl(RANGE_TTL_SECONDS))
+    edges, frames, created = [(from_dt, to_dt)], [], None
+    covered_from, covered_to = from_dt, to_dt
+    if entry is not None:
+        cached_from, cached_to, cached = entry.value
+        gap = max((from_dt - cached_to).days, (cached_from - to_dt).days) - 1
+        # Extend the cached window unless the gap to it is larger than the request
+        if gap <= (to_dt - from_dt).days:
+            edges = []
+            if from_dt < cached_from:
+                edges.append((from_dt, cached_from - timedelta(days=1)))
+            if to_dt > cached_to:
+                edges.append((cached_to + timedelta(days=1), to_dt))
+            frames, created = [cached], entry.created
+            covered_from, covered_to = min(from_dt, cached_from), max(to_dt, cached_to)
+
+    if edges:
+        cache.record_miss()
+        started = time.perf_counter()
+        frames += [_fetch(query, edge_from, edge_to, filters) for edge_from, edge_to in edges]
+        frame = pd.concat([f for f in frames if not f.empty] or frames[:1], ignore_index=True)
+        cache.store(key, (covered_from, covered_to, frame), time.perf_counter() - started,
+                    created=created, generation=generation)
+    else:
+        frame = frames[0]
+
+    days = frame["day"]
+    return frame[(days >= pd.Timestamp(from_dt)) & (days < pd.Timestamp(to_dt + timedelta(days=1)))]
+
+
+def _distinct_count(arrays: pd.Series) -> int:
+    values: set = set()
+    for array in arrays:
+        if array is not None and not (isinstance(array, float) and pd.isna(array)):
+            values.update(array)
+    return len(values)
+
+
+def reaggregate(query: RangeQuery, partials: pd.DataFrame,
+                filters: Optional[Mapping[str, Any]] = None) -> pd.DataFrame:
+    """Combine daily partial rows into the query's result.
+
+    Filters on the anchor keys also narrow the anchor rows, as in an
+    anchored QuerySpec.
+    """
+
+    frame = partials.copy()
+    for name, compute in query.group.items():
+        frame[name] = compute(frame)
+    keys = [*query.group, *query.keys]
+    aggregations = {
+        name: _distinct_count if how == "distinct" else how for name, how in query.partials.items()
+    }
+    result = frame.groupby(keys, dropna=False, as_index=False, observed=True).agg(aggregations)
+
+    if query.anchor is not None:
+        anchor = shared_cache().get_or_compute(
+            (f"anchor:{query.name}",), 300, lambda: run_query(query.anchor, name=f"{query.name}_anchor")
+        )
+        for key in query.keys:
+            wanted = (filters or {}).get(key)
+            if isinstance(wanted, (list, tuple, set, frozenset)):
+                if wanted:
+                    anchor = anchor[anchor[key].isin(list(wanted))]
+            elif wanted is not None and wanted != "" and wanted != "All":
+                anchor = anchor[anchor[key] == wanted]
+        result = anchor.merge(result, on=list(query.keys), how="left")
+        for name, how in query.partials.items():
+            if how in ("sum", "distinct"):
+                result[name] = result[name].fillna(0)
+    for name in query.partials:
+        # Empty fetches come back as untyped (object) columns
+        result[name] = pd.to_numeric(result[name])
+
+    for name, compute in query.derived.items():
+        result[name] = compute(result)
+    if query.order_by:
+        columns, ascending = zip(*query.order_by, strict=True)
+        result = result.sort_values(list(columns), ascending=list(ascending), kind="stable")
+    return result.reset_index(drop=True)[list(query.columns)]
+
+
+def run_range_query(query: RangeQuery, from_dt: date, to_dt: date,
+                    filters: Optional[Mapping[str, Any]] = None) -> pd.DataFrame:
+    """Answer `query` for [from_dt, to_dt] from (extended) cached daily partials."""
+
+    return reaggregate(query, daily_partials(query, from_dt, to_dt, filters), filters)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Result Frame Normalization for Reflexta Analytics Platform
+Compact dtypes for query results before they are cached.
+
+`db.run_query` passes every result through `compact_frame()`:
+  - Decimal object columns become float64
+  - int64 columns with small values become int32, and so do whole-number
+    floats of calendar parts (EXTRACT year/month/...), ids and counts
+  - date/datetime object columns become datetime64
+  - repeated strings (dept_name, vendor_name, status, ...) become `category`
+    on frames large enough for the dictionary to pay off
+
+Other floats (amounts, averages, percentages) stay float64 whatever their
+values, so a column has the same dtype for every window. Per-query memory
+before/after is recorded; `savings_report()` summarizes it.
+"""
+
+from __future__ import annotations
+
+import datetime as dt
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Below this many rows a category dictionary costs more than it saves
+CATEGORY_MIN_ROWS = int(os.getenv("CATEGORY_MIN_ROWS", "200"))
+# Convert only when values repeat: unique values / rows at most this
+CATEGORY_MAX_RATIO = 0.5
+
+# int32 only below 2**24, leaving headroom for "* 100" percentage math
+SMALL_INT_LIMIT = 2**24
+
+# Float columns that hold whole numbers by definition (besides ids, counts
+# and count metrics); NUMERIC and EXTRACT results arrive as floats
+CALENDAR_COLUMNS = frozenset({
+    "year", "quarter", "month", "month_num", "week", "day", "iso_year", "iso_week",
+    "fiscal_year", "fiscal_quarter", "fiscal_period", "fiscal_week",
+})
+INTEGER_SUFFIXES = ("_id", "_count")
+
+
+@dataclass
+class DtypeSavings:
+    """Accumulated memory of one query's result frames before and after compaction."""
+
+    query: str
+    calls: int = 0
+    bytes_before: int = 0
+    bytes_after: int = 0
+
+    @property
+    def saved_pct(self) -> float:
+        return round((1 - self.bytes_after / self.bytes_before) * 100, 1) if self.bytes_before else 0.0
+
+
+_savings: dict[str, DtypeSavings] = {}
+_savings_lock = threading.Lock()
+
+
+def _first_value(series: pd.Series):
+    non_null = series.dropna()
+    return non_null.iloc[0] if len(non_null) else None
+
+
+def _fits_small_int(values: np.ndarray) -> bool:
+    return bool(len(values)) and np.abs(values).max() < SMALL_INT_LIMIT
+
+
+def _holds_integers(name: object) -> bool:
+    if not isinstance(name, str):
+        return False
+    if name in CALENDAR_COLUMNS or name.endswith(INTEGER_SUFFIXES):
+        return True
+    # Imported here: src.metrics imports src.db, which imports this module
+    from .metrics import METRICS
+
+    metric = METRICS.get(name)
+    return metric is not None and metric.unit == "count"
+
+
+def _compact_object(series: pd.Series) -> pd.Series:
+    sample = _first_value(series)
+    if isinstance(sample, Decimal):
+        return _compact_column(pd.to_numeric(series, errors="coerce").astype(np.float64))
+    if isinstance(sample, (dt.date, dt.datetime)):
+        parsed = pd.to_datetime(series, errors="coerce")
+        # Keep the column as is when some values did not parse (mixed content)
+        return parsed if parsed.isna().sum() == series.isna().sum() else series
+    if isinstance(sample, str) and len(series) >= CATEGORY_MIN_ROWS:
+        if series.nunique(dropna=True) <= len(series) * CATEGORY_MAX_RATIO:
+            return series.astype("category")
+    return series
+
+
+def _compact_column(series: pd.Series) -> pd.Series:
+    dtype = series.dtype
+    if dtype == object:
+        return _compact_object(series)
+    if dtype == np.float64:
+        if not _holds_integers(series.name):
+            return series
+        values = series.to_numpy()
+        if not np.isnan(values).any() and _fits_small_int(values) and np.array_equal(values, np.trunc(values)):
+            return series.astype(np.int32)
+        return series
+    if dtype == np.int64 and _fits_small_int(series.to_numpy()):
+        return series.astype(np.int32)
+    return series
+
+
+def compact_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Return `frame` with compact dtypes (see the module docstring); values compare equal."""
+
+    if frame.empty or not frame.columns.is_unique:
+        return frame
+    return pd.DataFrame({name: _compact_column(frame[name]) for name in frame.columns}, index=frame.index)
+
+
+def record_savings(query: str, before: int, after: int) -> None:
+    """Add one result's memory before/after compaction to `query`'s totals."""
+
+    with _savings_lock:
+        savings = _savings.setdefault(query, DtypeSavings(query))
+        savings.calls += 1
+        savings.bytes_before += before
+        savings.bytes_after += after
+    logger.debug("%s: %d -> %d bytes after dtype compaction", query, before, after)
+
+
+def normalize_result(frame: pd.DataFrame, query: str) -> pd.DataFrame:
+    """Compact `frame` and record the memory saved for `query`."""
+
+    before = int(frame.memory_usage(deep=True).sum())
+    frame = compact_frame(frame)
+    record_savings(query, before, int(frame.memory_usage(deep=True).sum()))
+    return frame
+
+
+def savings_report() -> pd.DataFrame:
+    """Per-query result memory before and after compaction, largest savings first."""
+
+    with _savings_lock:
+        rows = [
+            {
+                "query": s.query,
+                "calls": s.calls,
+                "bytes_before": s.bytes_before,
+                "bytes_after": s.bytes_after,
+                "saved_pct": s.saved_pct,
+            }
+            for s in _savings.values()
+        ]
+    report = pd.DataFrame(rows, columns=["query", "calls", "bytes_before", "bytes_after", "saved_pct"])
+    return report.sort_values("bytes_before", ascending=False, ignore_index=True)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Hierarchy Rollups for Reflexta Analytics Platform
+Subtotals at every level of the account and category trees.
+
+Facts point at any node of a parent-id tree (usually a leaf). A node's
+subtotal is the sum over its whole subtree, read through the closure tables
+of migration 012: the facts are first aggregated per node they point at,
+then summed per ancestor. No recursive CTE runs at query time, and the
+fact scan is the same as for a flat breakdown.
+
+Rollups are fetched one level at a time (the children of a node, or the
+roots), so tree views expand lazily; pass `all_levels=True` for every node.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Sequence
+
+from sqlalchemy import bindparam, false, func, select
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.expression import FromClause
+
+
+@dataclass(frozen=True)
+class RollupTree:
+    """A parent-id hierarchy table, the columns shown per node and its closure table."""
+
+    nodes: FromClause
+    key: str
+    parent: str
+    labels: tuple[str, ...]
+    closure: FromClause
+
+
+def rollup_statement(tree: RollupTree, leaves: Select, measures: Sequence[str], all_levels: bool = False) -> Select:
+    """Subtree totals of additive `measures` per node, largest first.
+
+    `leaves` aggregates the facts per node id (a `tree.key` column plus the
+    measures). Returns the children of bind parameter `parent_id` (the roots
+    when it is None), or every node with `all_levels`, each with its parent,
+    labels, a `has_children` flag and the subtree totals.
+    """
+
+    nodes, closure = tree.nodes, tree.closure
+    leaf = leaves.subquery("leaf")
+    totals = [func.coalesce(func.sum(leaf.c[name]), 0).label(name) for name in measures]
+    has_children = func.coalesce(func.bool_or(closure.c.depth == 1), false()).label("has_children")
+    source = nodes.join(closure, closure.c.ancestor_id == nodes.c[tree.key]).outerjoin(
+        leaf, leaf.c[tree.key] == closure.c.descendant_id
+    )
+    stmt = (
+        select(nodes.c[tree.key], nodes.c[tree.parent], *(nodes.c[name] for name in tree.labels), has_children, *totals)
+        .select_from(source)
+        .group_by(nodes.c[tree.key])
+        .order_by(totals[0].desc(), nodes.c[tree.key])
+    )
+    if not all_levels:
+        parent = nodes.c[tree.parent]
+        stmt = stmt.where(
+            (parent == bindparam("parent_id"))
+            | (parent.is_(None) & bindparam("parent_id", type_=parent.type).is_(None))
+        )
+    return stmt
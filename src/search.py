@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Text Search for Reflexta Analytics Platform
+Ranked, paginated free-text search over transactions and purchase orders.
+
+Each fact has one search document, its searchable columns joined with
+spaces, indexed twice by migration 010: a 'simple' tsvector (whole words and
+word prefixes, so "offi" finds "Office") and pg_trgm trigrams (substrings of
+three or more characters, so "V-204" finds "INV-2048"). A row matches when
+either index does.
+
+Ranking is done on a bounded set of candidates: the newest
+`SEARCH_CANDIDATES` matches are scored with ts_rank + word_similarity and
+only those are sorted, so a very common term costs one index scan and a
+top-N sort instead of ranking every matching row.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from datetime import date
+from functools import reduce
+from typing import Any, Optional
+
+import pandas as pd
+from sqlalchemy import and_, bindparam, func, or_, select
+
+from .date_windows import window_params
+from .db import run_query
+from .query_builder import (
+    const,
+    finance_transactions,
+    in_window,
+    procurement_orders,
+)
+from .query_cache import cached_query
+
+SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", "1000"))
+SEARCH_MIN_CHARS = 2
+TRIGRAM_MIN_CHARS = 3  # pg_trgm cannot use the index for shorter substrings
+MAX_PAGE_SIZE = 100
+
+t = finance_transactions.alias("t")
+po = procurement_orders.alias("po")
+
+
+@dataclass(frozen=True)
+class SearchTarget:
+    """A searchable fact: its searched columns (in index order) and result columns."""
+
+    table: Any
+    key: str
+    date_column: str
+    fields: tuple[str, ...]
+    columns: tuple[str, ...]
+
+    def document(self) -> Any:
+        """The searched columns joined with spaces, exactly as indexed by migration 010."""
+
+        parts = [func.coalesce(self.table.c[name], const("")) for name in self.fields]
+        return reduce(lambda left, right: left.op("||")(const(" ")).op("||")(right), parts)
+
+
+SEARCH_TARGETS = {
+    "transactions": SearchTarget(
+        t, "transaction_id", "transaction_date",
+        fields=("description", "vendor_name", "reference_number"),
+        columns=(
+            "transaction_id", "transaction_date", "transaction_type", "description",
+            "vendor_name", "reference_number", "amount", "status", "dept_id",
+        ),
+    ),
+    "orders": SearchTarget(
+        po, "order_id", "order_date",
+        fields=("order_number", "notes"),
+        columns=(
+            "order_id", "order_number", "order_date", "vendor_id", "status",
+            "priority", "grand_total", "currency", "notes",
+        ),
+    ),
+}
+
+
+def prefix_query(text: str) -> str:
+    """to_tsquery syntax matching every word of `text` as a prefix ("net inv" -> "net:* & inv:*")."""
+
+    return " & ".join(f"{word}:*" for word in re.findall(r"[^\W_]+", text.lower()))
+
+
+def search_statement(target: SearchTarget, text: str, dated: bool = False) -> Any:
+    """Candidate-bounded, ranked search over `target`; binds query, pattern, limit and offset."""
+
+    table = target.table
+    document = target.document()
+    tsquery = func.to_tsquery(const("simple"), bindparam("query"))
+    vector = func.to_tsvector(const("simple"), document)
+    matches = [vector.op("@@")(tsquery)]
+    if len(text) >= TRIGRAM_MIN_CHARS:
+        matches.append(document.ilike(bindparam("pattern")))
+    conditions = [or_(*matches)]
+    if dated:
+        conditions.append(in_window(table.c[target.date_column]))
+
+    rank = func.ts_rank(vector, tsquery) + func.word_similarity(bindparam("text"), document)
+    candidates = (
+        select(*(table.c[name] for name in target.columns), rank.label("rank"))
+        .where(and_(*conditions))
+        .order_by(table.c[target.date_column].desc(), table.c[target.key].desc())
+        .limit(bindparam("candidates"))
+        .subquery("candidates")
+    )
+    return (
+        select(candidates)
+        .order_by(candidates.c.rank.desc(), candidates.c[target.date_column].desc(), candidates.c[target.key].desc())
+        .limit(bindparam("limit"))
+        .offset(bindparam("offset"))
+    )
+
+
+def search_params(text: str, page: int = 0, page_size: int = 20,
+                  from_dt: Optional[date] = None, to_dt: Optional[date] = None) -> dict[str, Any]:
+    """Bind parameters of `search_statement` for a stripped search text."""
+
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    params = {
+        "query": prefix_query(text),
+        "pattern": f"%{escaped}%",
+        "text": text,
+        "candidates": SEARCH_CANDIDATES,
+        "limit": page_size,
+        "offset": max(page, 0) * page_size,
+    }
+    if from_dt is not None and to_dt is not None:
+        params.update(window_params(from_dt, to_dt))
+    return params
+
+
+def _search(name: str, text: str, page: int, page_size: int,
+            from_dt: Optional[date], to_dt: Optional[date]) -> pd.DataFrame:
+    target = SEARCH_TARGETS[name]
+    text = (text or "").strip()
+    if len(text) < SEARCH_MIN_CHARS or not prefix_query(text):
+        return pd.DataFrame(columns=[*target.columns, "rank"])
+
+    page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+    dated = from_dt is not None and to_dt is not None
+    params = search_params(text, page, page_size, from_dt, to_dt)
+    return run_query(search_statement(target, text, dated), params, name=f"search_{name}")
+
+
+@cached_query(ttl=30)
+def search_transactions(text: str, page: int = 0, page_size: int = 20,
+                        from_dt: Optional[date] = None, to_dt: Optional[date] = None) -> pd.DataFrame:
+    """Transactions whose description, vendor name or reference number match `text`, best first."""
+
+    return _search("transactions", text, page, page_size, from_dt, to_dt)
+
+
+@cached_query(ttl=30)
+def search_orders(text: str, page: int = 0, page_size: int = 20,
+                  from_dt: Optional[date] = None, to_dt: Optional[date] = None) -> pd.DataFrame:
+    """Purchase orders whose order number or notes match `text`, best first."""
+
+    return _search("orders", text, page, page_size, from_dt, to_dt)
@@ -6,7 +6,8 @@ Professional UI helpers for Streamlit layout and KPIs.
 
 from __future__ import annotations
 
-from typing import Optional
+import time
+from typing import Any, Callable, Optional
 
 import pandas as pd
 import streamlit as st
@@ -113,3 +114,92 @@ def empty_state(df: pd.DataFrame, message: str = "No data for selected filters."
     return False
 
 
+def change_text(value: Any) -> Optional[str]:
+    """A percent change as "+12.3%", or None when there is no base to compare with."""
+
+    if value is None or pd.isna(value):
+        return None
+    return f"{float(value):+.1f}%"
+
+
+def comparison_delta(row: Any, name: str) -> Optional[str]:
+    """st.metric delta for compared KPI `name`: the change against the previous period."""
+
+    change = change_text(row[f"{name}_change_pct"])
+    return f"{change} vs previous period" if change else None
+
+
+def comparison_help(row: Any, name: str, fmt: str = "{:,.2f}") -> str:
+    """Tooltip with the previous-period and last-year values of compared KPI `name`."""
+
+    yoy = change_text(row[f"{name}_yoy_pct"]) or "n/a"
+    return (
+        f"Previous period: {fmt.format(row[f'{name}_previous'])}  \n"
+        f"Same period last year: {fmt.format(row[f'{name}_last_year'])} ({yoy} YoY)"
+    )
+
+
+
+
+def _turn_page(key: str, step: int) -> None:
+    st.session_state[key] = max(st.session_state.get(key, 0) + step, 0)
+
+
+@st.fragment
+def search_panel(
+    key: str,
+    search: Callable[..., pd.DataFrame],
+    from_date: Any,
+    to_date: Any,
+    label: str = "Search",
+    placeholder: str = "",
+    page_size: int = 20,
+    min_chars: int = 2,
+) -> None:
+    """Search box with paged results (see `src.search`).
+
+    A fragment, so typing a query and paging rerun only this panel, not the
+    dashboard around it. Searches the selected period unless "All dates" is
+    ticked; a new query or date choice starts again at the first page.
+    """
+
+    col1, col2 = st.columns([5, 1])
+    with col1:
+        text = st.text_input(label, key=f"{key}_text", placeholder=placeholder)
+    with col2:
+        all_dates = st.checkbox("All dates", key=f"{key}_all_dates")
+
+    page_key = f"{key}_page"
+    if st.session_state.get(f"{key}_query") != (text, all_dates):
+        st.session_state[f"{key}_query"] = (text, all_dates)
+        st.session_state[page_key] = 0
+    if len(text.strip()) < min_chars:
+        st.caption(f"Type at least {min_chars} characters to search.")
+        return
+
+    page = st.session_state[page_key]
+    window = (None, None) if all_dates else (from_date, to_date)
+    started = time.perf_counter()
+    try:
+        results = search(text, page, page_size, *window)
+    except Exception as exc:  # noqa: BLE001
+        # Shown here: on a fragment rerun the page's own error handling does not run
+        st.error(f"Search failed: {exc}")
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if results.empty:
+        st.info("No matches." if page == 0 else "No more matches.")
+    else:
+        st.dataframe(results.drop(columns="rank"), use_container_width=True, hide_index=True)
+
+    col1, col2, col3 = st.columns([1, 1, 4])
+    with col1:
+        st.button("◀ Previous", key=f"{key}_previous", disabled=page == 0,
+                  on_click=_turn_page, args=(page_key, -1))
+    with col2:
+        st.button("Next ▶", key=f"{key}_next", disabled=len(results) < page_size,
+                  on_click=_turn_page, args=(page_key, 1))
+    with col3:
+        first = page * page_size
+        st.caption(f"Results {first + 1:,}–{first + len(results):,} · {elapsed_ms:.0f} ms")